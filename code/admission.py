@@ -0,0 +1,131 @@
+"""
+Контроль допуска запросов API: ограничение параллельности по классам эндпоинтов
+
+Каждый класс эндпоинтов (полоса) имеет свой лимит одновременно
+выполняемых запросов и ограниченную очередь ожидающих. Запрос, заставший
+очередь полной, сразу получает 429, а не дождавшийся места за
+ADMISSION_TIMEOUT_S - 503, поэтому сервер не копит потоки и память под
+нагрузкой. Полосы независимы: поток тяжелых /predict_batch занимает только
+свою полосу, а /predict и служебные эндпоинты (/stats, /model_info, ...)
+идут по своим, поэтому не ждут за пакетами.
+"""
+
+import threading
+from typing import Any, Dict, Tuple
+
+
+class LaneRejected(Exception):
+    """
+    Запрос не допущен в полосу
+
+    Args:
+        status (int): HTTP-код ответа (429 - очередь полна, 503 - истекло ожидание)
+        retry_after (float): Рекомендуемая пауза перед повтором, секунды
+    """
+
+    def __init__(self, lane: str, status: int, retry_after: float) -> None:
+        reason = "очередь заполнена" if status == 429 else "истекло время ожидания"
+        super().__init__(f"Сервер перегружен ({lane}: {reason})")
+        self.lane = lane
+        self.status = status
+        self.retry_after = retry_after
+
+
+class AdmissionLane:
+    """
+    Полоса запросов: не больше max_concurrent выполняются, не больше max_queue ждут
+
+    Args:
+        name (str): Имя полосы
+        max_concurrent (int): Лимит одновременно выполняемых запросов
+        max_queue (int): Лимит ожидающих запросов (0 - без ожидания)
+        timeout (float): Максимальное ожидание места, секунды
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, timeout: float) -> None:
+        if max_concurrent < 1:
+            raise ValueError("max_concurrent должен быть не меньше 1")
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._slots = threading.Semaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.in_flight = 0
+        self.counters = {"admitted": 0, "rejected": 0, "timed_out": 0}
+
+    def acquire(self) -> None:
+        """
+        Занятие места в полосе (с ожиданием не дольше timeout)
+
+        Raises:
+            LaneRejected: очередь полна (429) или место не освободилось (503)
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                if self.waiting >= self.max_queue:
+                    self.counters["rejected"] += 1
+                    raise LaneRejected(self.name, 429, self.timeout)
+                self.waiting += 1
+            try:
+                admitted = self._slots.acquire(timeout=self.timeout)
+            finally:
+                with self._lock:
+                    self.waiting -= 1
+            if not admitted:
+                with self._lock:
+                    self.counters["timed_out"] += 1
+                raise LaneRejected(self.name, 503, self.timeout)
+
+        with self._lock:
+            self.in_flight += 1
+            self.counters["admitted"] += 1
+
+    def release(self) -> None:
+        """Освобождение места"""
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def __enter__(self) -> "AdmissionLane":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Загрузка полосы и счетчики"""
+        with self._lock:
+            return {
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "in_flight": self.in_flight,
+                "waiting": self.waiting,
+                **self.counters,
+            }
+
+
+class AdmissionController:
+    """
+    Набор полос запросов API
+
+    Args:
+        limits (dict): Полоса -> (max_concurrent, max_queue)
+        timeout (float): Максимальное ожидание места, секунды
+    """
+
+    def __init__(self, limits: Dict[str, Tuple[int, int]], timeout: float = 1.0) -> None:
+        self.lanes = {
+            name: AdmissionLane(name, concurrent, queue, timeout)
+            for name, (concurrent, queue) in limits.items()
+        }
+
+    def lane(self, name: str) -> AdmissionLane:
+        """Полоса по имени"""
+        return self.lanes[name]
+
+    def stats(self) -> Dict[str, Any]:
+        """Статистика всех полос"""
+        return {name: lane.stats() for name, lane in self.lanes.items()}
@@ -1,14 +1,41 @@
+import functools
+import json
 import logging
+import math
 import os
 import sys
 import time
-from typing import Any, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-from flask import Flask, jsonify, request
+import numpy as np
+from flask import Flask, jsonify, request, send_file
 
 # Добавляем путь к модулям и импортируем
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))  # noqa: E402
-from sber_auto_model import SberAutoModel  # noqa: E402
+from admission import AdmissionController, LaneRejected  # noqa: E402
+from client_history import (  # noqa: E402
+    DEFAULT_CLIENT_HISTORY_PATH,
+    ClientHistoryIndex,
+    client_history_rows,
+)
+from feature_schema import SchemaValidationError  # noqa: E402
+from inference import (  # noqa: E402
+    DEFAULT_MODEL_PATH,
+    InferenceModel,
+    format_error,
+    format_prediction,
+)
+from jobs import DEFAULT_JOBS_DIR, JOB_CHUNK_ROWS, JobManager  # noqa: E402
+from model_metadata import PreparedJSON, prepare_json  # noqa: E402
+from model_registry import (  # noqa: E402
+    DEFAULT_REGISTRY_DIR,
+    LiveModel,
+    ModelRegistry,
+    ServingModel,
+)
+from prediction_cache import PredictionCache, feature_key, key_dtype  # noqa: E402
+from shadow import DEFAULT_SHADOW_LOG, ShadowScorer  # noqa: E402
+from target_families import DEFAULT_FAMILY_MODELS_PATH, FamilyModels  # noqa: E402
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
@@ -16,36 +43,348 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
-# Глобальная переменная для модели
-model: Optional[SberAutoModel] = None
+# Активная модель: версия из реестра, подменяется без перезапуска сервера
+live_model = LiveModel(ModelRegistry(os.environ.get("MODEL_REGISTRY", DEFAULT_REGISTRY_DIR)))
+
+# Период проверки новой версии в реестре (секунды)
+RELOAD_INTERVAL = float(os.environ.get("MODEL_RELOAD_INTERVAL", "5"))
+
+# Теневые модели: версии из реестра через запятую, доля трафика и журнал сравнения
+SHADOW_MODELS = [v for v in os.environ.get("SHADOW_MODELS", "").split(",") if v.strip()]
+SHADOW_FRACTION = float(os.environ.get("SHADOW_FRACTION", "0.1"))
+SHADOW_LOG = os.environ.get("SHADOW_LOG", DEFAULT_SHADOW_LOG)
+shadow_scorers: List[ShadowScorer] = []
+
+# Кэш предсказаний: число записей (0 - выключен), очищается при смене версии модели
+prediction_cache = PredictionCache(int(os.environ.get("PREDICTION_CACHE_SIZE", "50000")))
+
+# Досрочная остановка обхода деревьев и бюджет времени на запрос (мс, пусто - без бюджета).
+# Параметр запроса ?budget_ms= включает ее для отдельного запроса
+ANYTIME_INFERENCE = os.environ.get("ANYTIME_INFERENCE", "0") == "1"
+LATENCY_BUDGET_MS = (
+    float(os.environ["LATENCY_BUDGET_MS"]) if "LATENCY_BUDGET_MS" in os.environ else None
+)
+
+# Контроль допуска: полоса -> (одновременно выполняемых, ожидающих) запросов.
+# /health не ограничивается, служебные эндпоинты идут по отдельной полосе
+admission = AdmissionController(
+    {
+        "predict": (
+            int(os.environ.get("PREDICT_CONCURRENCY", "4")),
+            int(os.environ.get("PREDICT_QUEUE", "64")),
+        ),
+        "batch": (
+            int(os.environ.get("BATCH_CONCURRENCY", "1")),
+            int(os.environ.get("BATCH_QUEUE", "4")),
+        ),
+        "service": (
+            int(os.environ.get("SERVICE_CONCURRENCY", "4")),
+            int(os.environ.get("SERVICE_QUEUE", "16")),
+        ),
+    },
+    timeout=float(os.environ.get("ADMISSION_TIMEOUT_S", "1.0")),
+)
+
+# Пример запроса /example: не зависит от модели, сериализуется один раз
+EXAMPLE_RESPONSE = prepare_json(
+    {
+        "example_data": {
+            "visit_number": 1,
+            "total_hits": 5,
+            "unique_pages": 3,
+            "session_duration": 120,
+            "visit_hour": 14,
+            "visit_weekday": 2,
+            "is_weekend": 0,
+            "is_mobile": 1,
+            "is_android": 0,
+            "is_ios": 1,
+            "is_desktop": 0,
+            "is_tablet": 0,
+            "is_moscow": 1,
+            "is_paid": 1,
+            "avg_time_per_page": 24.0,
+            "bounce_rate": 0,
+            "deep_engagement": 0,
+            "long_session": 0,
+        },
+        "description": "Пример данных для предсказания конверсии",
+    }
+)
+
+# Сериализованные ответы /model_info и /features: (модель, для которой посчитаны, ответы)
+_metadata_responses: Tuple[Optional[ServingModel], Dict[str, Optional[PreparedJSON]]] = (
+    None,
+    {},
+)
+
+# Итоги клиентов для признаков истории: запросы с client_id дополняются ими
+CLIENT_HISTORY_INDEX = os.environ.get("CLIENT_HISTORY_INDEX", DEFAULT_CLIENT_HISTORY_PATH)
+client_history: Optional[ClientHistoryIndex] = None
+
+# Модели семейств целевых действий (POST /predict_families), если обучены
+FAMILY_MODELS = os.environ.get("FAMILY_MODELS", DEFAULT_FAMILY_MODELS_PATH)
+family_models: Optional[FamilyModels] = None
+
+# Асинхронные задания скоринга: папка заданий, процессов пула (0 - число ядер), строк в блоке,
+# индекс истории клиентов для строк с client_id
+job_manager = JobManager(
+    os.environ.get("JOBS_DIR", DEFAULT_JOBS_DIR),
+    int(os.environ.get("JOB_WORKERS", "0")) or None,
+    int(os.environ.get("JOB_CHUNK_ROWS", str(JOB_CHUNK_ROWS))),
+    CLIENT_HISTORY_INDEX,
+)
+
+
+def admitted(lane: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Декоратор эндпоинта: выполнение только после допуска в полосу lane"""
+
+    def decorator(handler: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(handler)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            gate = admission.lane(lane)
+            try:
+                gate.acquire()
+            except LaneRejected as e:
+                response = jsonify({"error": str(e), "lane": e.lane, "status": "error"})
+                response.headers["Retry-After"] = str(max(1, math.ceil(e.retry_after)))
+                return response, e.status
+            try:
+                return handler(*args, **kwargs)
+            finally:
+                gate.release()
+
+        return wrapper
+
+    return decorator
 
 
 def load_model() -> bool:
-    """Загрузка модели при запуске"""
-    global model
+    """
+    Загрузка модели при запуске
+
+    Если в реестре есть активная версия, она загружается и запускается
+    фоновая проверка новых версий. Иначе загружается build/sber_auto_model
+    с версией "local".
+    """
     try:
-        model = SberAutoModel()
-        model.load_model("../build/sber_auto_model.pkl")
-        logger.info("✅ Модель успешно загружена")
+        if live_model.registry.current_version() is not None:
+            live_model.reload()
+            live_model.watch(RELOAD_INTERVAL)
+        else:
+            model = InferenceModel()
+            model.load_model(DEFAULT_MODEL_PATH)
+            live_model.serve("local", model)
+        logger.info(f"✅ Модель успешно загружена (версия {live_model.current.version})")
         return True
     except Exception as e:
         logger.error(f"❌ Ошибка загрузки модели: {e}")
         return False
 
 
+def load_client_history() -> None:
+    """Загрузка индекса истории клиентов (mmap), если он построен"""
+    global client_history
+    if not os.path.exists(CLIENT_HISTORY_INDEX):
+        return
+    client_history = ClientHistoryIndex(CLIENT_HISTORY_INDEX)
+    logger.info(f"👤 История клиентов: {client_history.manifest['n_clients']:,} клиентов")
+
+
+def load_family_models() -> None:
+    """Загрузка моделей семейств целевых действий, если они обучены"""
+    global family_models
+    if not os.path.exists(FAMILY_MODELS):
+        return
+    family_models = FamilyModels(FAMILY_MODELS)
+    logger.info(f"🎯 Модели семейств: {', '.join(family_models.families)}")
+
+
+def start_shadow_scoring() -> None:
+    """Запуск процессов теневых моделей из SHADOW_MODELS"""
+    for version in SHADOW_MODELS:
+        version = version.strip()
+        path = live_model.registry.version_path(version)
+        shadow_scorers.append(ShadowScorer(path, version, SHADOW_FRACTION, SHADOW_LOG).start())
+        logger.info(f"👥 Теневая модель {version}: {SHADOW_FRACTION:.0%} запросов")
+
+
+def shadow_submit(
+    rows: List[Dict[str, Any]], model_version: Optional[str], results: List[Dict[str, Any]]
+) -> None:
+    """Отправка запроса теневым моделям без ожидания результата"""
+    for scorer in shadow_scorers:
+        scorer.submit(rows, model_version or "", [r["probability"] for r in results])
+
+
+def inference_options() -> Tuple[bool, Optional[float]]:
+    """
+    Режим досрочной остановки и бюджет времени для текущего запроса
+
+    Raises:
+        ValueError: budget_ms не является положительным числом
+    """
+    if "budget_ms" not in request.args:
+        return ANYTIME_INFERENCE, LATENCY_BUDGET_MS
+    budget_ms = request.args.get("budget_ms", type=float)
+    if budget_ms is None or not budget_ms > 0:
+        raise ValueError("budget_ms должен быть положительным числом")
+    return True, budget_ms
+
+
+def cached_predict(
+    model: InferenceModel,
+    model_version: Optional[str],
+    data: Dict[str, Any],
+    anytime: bool = False,
+    budget_ms: Optional[float] = None,
+) -> Dict[str, Any]:
+    """Предсказание для одной сессии через кэш"""
+    return cached_predict_batch(
+        model, model_version, [data], raise_errors=True, anytime=anytime, budget_ms=budget_ms
+    )[0]
+
+
+def cached_predict_batch(
+    model: InferenceModel,
+    model_version: Optional[str],
+    rows: List[Any],
+    raise_errors: bool = False,
+    anytime: bool = False,
+    budget_ms: Optional[float] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Пакетное предсказание через кэш: модель считает только промахи
+
+    Строки проверяются схемой признаков до обращения к кэшу, поэтому в кэш
+    попадают только корректные запросы. Некорректная строка дает результат
+    с ошибкой (или SchemaValidationError при raise_errors).
+
+    При anytime модель обходит деревья с досрочной остановкой (в пределах
+    budget_ms на весь пакет); в кэш попадают только результаты по всем
+    деревьям. Результат содержит trees_used - число использованных деревьев.
+    Запросы с client_id дополняются признаками истории клиента (client_history).
+    """
+    if model.model is None:
+        raise ValueError("Модель не загружена. Сначала загрузите или обучите модель.")
+
+    if client_history is not None:
+        client_history_rows(client_history, rows)
+
+    schema = model.feature_schema()
+    dtype = key_dtype(model.engine)
+    X = np.zeros((len(rows), len(schema.feature_names)))
+    results: List[Optional[Dict[str, Any]]] = [None] * len(rows)
+    keys: Dict[int, bytes] = {}
+    for i, row in enumerate(rows):
+        try:
+            schema.assemble(row, out=X[i])
+        except SchemaValidationError as e:
+            if raise_errors:
+                raise
+            results[i] = format_error(i, e)
+            continue
+        if prediction_cache.max_entries > 0:
+            keys[i] = feature_key(X[i], dtype)
+            cached = prediction_cache.get(model_version, keys[i])
+            if cached is not None:
+                results[i] = format_prediction(*cached)
+
+    n_trees = model.n_trees()
+    trees_used = [n_trees] * len(rows)
+    misses = [i for i, result in enumerate(results) if result is None]
+    if misses:
+        if anytime:
+            probabilities, used = model.predict_proba_anytime(X[misses], budget_ms)
+        else:
+            probabilities, used = model.predict_proba_rows(X[misses]), np.full(len(misses), n_trees)
+        for i, probability, n_used in zip(misses, probabilities.tolist(), used.tolist()):
+            value = (int(probability > 0.5), probability)
+            results[i] = format_prediction(*value)
+            trees_used[i] = n_used
+            if i in keys and n_used == n_trees:
+                prediction_cache.put(model_version, keys[i], value)
+
+    batch: List[Dict[str, Any]] = []
+    for i, result in enumerate(results):
+        assert result is not None
+        result["session_id"] = i
+        if "error" not in result:
+            result["trees_used"] = trees_used[i]
+        batch.append(result)
+    return batch
+
+
+def metadata_responses() -> Optional[Dict[str, Optional[PreparedJSON]]]:
+    """
+    Ответы /model_info и /features активной модели
+
+    Сериализуются один раз после подмены модели, дальше отдаются готовыми
+    байтами. None - модель не загружена.
+    """
+    global _metadata_responses
+    serving = live_model.current
+    if serving is None:
+        return None
+    cached_for, responses = _metadata_responses
+    if cached_for is not serving:
+        model = serving.model
+        responses = {
+            "model_info": prepare_json(
+                {
+                    "feature_count": len(model.feature_names) if model.feature_names else 0,
+                    "target_actions_count": (
+                        len(model.target_actions) if model.target_actions else 0
+                    ),
+                    "feature_names": model.feature_names[:10] if model.feature_names else [],
+                    "target_actions": model.target_actions[:5] if model.target_actions else [],
+                    "model_version": serving.version,
+                    "engine": model.engine,
+                    "n_trees": model.n_trees(),
+                    "anytime_inference": ANYTIME_INFERENCE,
+                    "latency_budget_ms": LATENCY_BUDGET_MS,
+                    "status": "loaded",
+                }
+            ),
+            "features": (
+                prepare_json(model.metadata()) if model.feature_names is not None else None
+            ),
+        }
+        _metadata_responses = (serving, responses)
+    return responses
+
+
+def prepared_response(prepared: PreparedJSON) -> Any:
+    """Ответ из заранее сериализованного JSON: ETag, на If-None-Match - 304 без тела"""
+    headers = {"ETag": f'"{prepared.etag}"', "Cache-Control": "no-cache"}
+    if prepared.etag in request.if_none_match:
+        return app.response_class(status=304, headers=headers)
+    return app.response_class(prepared.body, mimetype="application/json", headers=headers)
+
+
+def current_model() -> Tuple[Optional[str], Optional[InferenceModel]]:
+    """Снимок активной модели для одного запроса: версия и модель"""
+    serving = live_model.current
+    if serving is None:
+        return None, None
+    return serving.version, serving.model
+
+
 @app.route("/health", methods=["GET"])
 def health_check() -> Any:
     """Проверка здоровья API"""
     return jsonify(
         {
             "status": "healthy",
-            "model_loaded": model is not None,
+            "model_loaded": live_model.current is not None,
+            "model_version": live_model.current.version if live_model.current else None,
             "timestamp": time.time(),
         }
     )
 
 
 @app.route("/predict", methods=["POST"])
+@admitted("predict")
 def predict() -> Any:
     """
     Предсказание для одной сессии
@@ -73,10 +412,16 @@ def predict() -> Any:
     }
     """
     start_time = time.time()
+    model_version, model = current_model()
 
     if model is None:
         return jsonify({"error": "Модель не загружена"}), 500
 
+    try:
+        anytime, budget_ms = inference_options()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
     try:
         # Получаем данные из запроса
         data = request.get_json()
@@ -85,11 +430,13 @@ def predict() -> Any:
             return jsonify({"error": "Данные не предоставлены"}), 400
 
         # Выполняем предсказание
-        result = model.predict(data)
+        result = cached_predict(model, model_version, data, anytime, budget_ms)
 
         # Добавляем время выполнения
         result["execution_time"] = round(time.time() - start_time, 3)
+        result["model_version"] = model_version
         result["status"] = "success"
+        shadow_submit([data], model_version, [result])
 
         logger.info(f"✅ Предсказание выполнено за {result['execution_time']}с")
         logger.info(
@@ -99,6 +446,20 @@ def predict() -> Any:
 
         return jsonify(result)
 
+    except SchemaValidationError as e:
+        logger.warning(f"⚠️ Некорректный запрос: {e}")
+        return (
+            jsonify(
+                {
+                    "error": "Некорректные признаки",
+                    "fields": e.errors,
+                    "execution_time": round(time.time() - start_time, 3),
+                    "status": "error",
+                }
+            ),
+            400,
+        )
+
     except Exception as e:
         logger.error(f"❌ Ошибка предсказания: {e}")
         return (
@@ -114,6 +475,7 @@ def predict() -> Any:
 
 
 @app.route("/predict_batch", methods=["POST"])
+@admitted("batch")
 def predict_batch() -> Any:
     """
     Пакетное предсказание для нескольких сессий
@@ -165,10 +527,16 @@ def predict_batch() -> Any:
     }
     """
     start_time = time.time()
+    model_version, model = current_model()
 
     if model is None:
         return jsonify({"error": "Модель не загружена"}), 500
 
+    try:
+        anytime, budget_ms = inference_options()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
     try:
         # Получаем данные из запроса
         request_data = request.get_json()
@@ -185,13 +553,21 @@ def predict_batch() -> Any:
             return jsonify({"error": "Максимальное количество сессий: 1000"}), 400
 
         # Выполняем пакетное предсказание
-        results = model.predict_batch(sessions)
+        results = cached_predict_batch(
+            model, model_version, sessions, anytime=anytime, budget_ms=budget_ms
+        )
+        shadow_submit(
+            [row for row, r in zip(sessions, results) if "error" not in r],
+            model_version,
+            [r for r in results if "error" not in r],
+        )
 
         # Добавляем метаданные
         response = {
             "predictions": results,
             "total_sessions": len(sessions),
             "execution_time": round(time.time() - start_time, 3),
+            "model_version": model_version,
             "status": "success",
         }
 
@@ -238,119 +614,210 @@ def predict_batch() -> Any:
         )
 
 
+@app.route("/predict_families", methods=["POST"])
+@admitted("predict")
+def predict_families() -> Any:
+    """
+    Вероятности всех семейств целевых действий для одной сессии
+
+    Запрос - как у /predict. Ответ: {"families": {"calls": {...}, ...},
+    "top_family": "orders"}, результат каждого семейства - как у /predict.
+    """
+    start_time = time.time()
+    if family_models is None:
+        return jsonify({"error": "Модели семейств не загружены"}), 500
+
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({"error": "Данные не предоставлены"}), 400
+
+    try:
+        if client_history is not None:
+            client_history_rows(client_history, [data])
+        result = family_models.predict(data)
+    except SchemaValidationError as e:
+        logger.warning(f"⚠️ Некорректный запрос: {e}")
+        return (
+            jsonify(
+                {
+                    "error": "Некорректные признаки",
+                    "fields": e.errors,
+                    "execution_time": round(time.time() - start_time, 3),
+                    "status": "error",
+                }
+            ),
+            400,
+        )
+    except Exception as e:
+        logger.error(f"❌ Ошибка предсказания семейств: {e}")
+        return jsonify({"error": str(e), "status": "error"}), 500
+
+    result["execution_time"] = round(time.time() - start_time, 3)
+    result["status"] = "success"
+    return jsonify(result)
+
+
 @app.route("/model_info", methods=["GET"])
+@admitted("service")
 def model_info() -> Any:
     """Информация о модели"""
-    if model is None:
+    responses = metadata_responses()
+    if responses is None:
         return jsonify({"error": "Модель не загружена"}), 500
-
-    return jsonify(
-        {
-            "feature_count": len(model.feature_names) if model.feature_names else 0,
-            "target_actions_count": len(model.target_actions) if model.target_actions else 0,
-            "feature_names": model.feature_names[:10] if model.feature_names else [],
-            "target_actions": model.target_actions[:5] if model.target_actions else [],
-            "status": "loaded",
-        }
-    )
+    return prepared_response(responses["model_info"])
 
 
 @app.route("/example", methods=["GET"])
+@admitted("service")
 def get_example() -> Any:
     """Пример данных для предсказания"""
-    return jsonify(
-        {
-            "example_data": {
-                "visit_number": 1,
-                "total_hits": 5,
-                "unique_pages": 3,
-                "session_duration": 120,
-                "visit_hour": 14,
-                "visit_weekday": 2,
-                "is_weekend": 0,
-                "is_mobile": 1,
-                "is_android": 0,
-                "is_ios": 1,
-                "is_desktop": 0,
-                "is_tablet": 0,
-                "is_moscow": 1,
-                "is_paid": 1,
-                "avg_time_per_page": 24.0,
-                "bounce_rate": 0,
-                "deep_engagement": 0,
-                "long_session": 0,
-            },
-            "description": "Пример данных для предсказания конверсии",
-        }
-    )
+    return prepared_response(EXAMPLE_RESPONSE)
 
 
 @app.route("/features", methods=["GET"])
+@admitted("service")
 def get_features() -> Any:
-    """Список всех признаков модели"""
-    if model is None:
+    """Список всех признаков модели, категории, диапазоны и значения по умолчанию"""
+    responses = metadata_responses()
+    if responses is None:
         return jsonify({"error": "Модель не загружена"}), 500
 
-    if model.feature_names is None:
+    if responses["features"] is None:
         return jsonify({"error": "Признаки модели не загружены"}), 500
 
-    return jsonify(
-        {
-            "features": model.feature_names,
-            "feature_count": len(model.feature_names),
-            "feature_categories": {
-                "temporal": [
-                    f
-                    for f in model.feature_names
-                    if any(
-                        x in f
-                        for x in [
-                            "hour",
-                            "week",
-                            "morning",
-                            "afternoon",
-                            "evening",
-                            "night",
-                        ]
-                    )
-                ],
-                "device": [
-                    f
-                    for f in model.feature_names
-                    if any(
-                        x in f
-                        for x in [
-                            "mobile",
-                            "android",
-                            "ios",
-                            "desktop",
-                            "tablet",
-                            "windows",
-                            "macos",
-                        ]
-                    )
-                ],
-                "geographic": [
-                    f
-                    for f in model.feature_names
-                    if any(x in f for x in ["moscow", "spb", "city", "regional"])
-                ],
-                "behavioral": [
-                    f
-                    for f in model.feature_names
-                    if any(x in f for x in ["hits", "pages", "duration", "engagement", "activity"])
-                ],
-                "traffic": [
-                    f
-                    for f in model.feature_names
-                    if any(x in f for x in ["paid", "organic", "referral", "direct"])
-                ],
-            },
-        }
+    return prepared_response(responses["features"])
+
+
+@app.route("/reload", methods=["POST"])
+@admitted("service")
+def reload_model() -> Any:
+    """Немедленная проверка активной версии в реестре и подмена модели"""
+    try:
+        reloaded = live_model.reload()
+    except Exception as e:
+        logger.error(f"❌ Ошибка загрузки новой версии модели: {e}")
+        return jsonify({"error": str(e), "status": "error"}), 500
+
+    model_version, _ = current_model()
+    return jsonify({"reloaded": reloaded, "model_version": model_version, "status": "success"})
+
+
+@app.route("/shadow/stats", methods=["GET"])
+@admitted("service")
+def shadow_stats() -> Any:
+    """Счетчики теневых моделей: отправленные и отброшенные запросы"""
+    return jsonify({"shadow_models": [scorer.stats() for scorer in shadow_scorers]})
+
+
+@app.route("/cache/stats", methods=["GET"])
+@admitted("service")
+def cache_stats() -> Any:
+    """Статистика кэша предсказаний: размер, попадания, промахи, вытеснения"""
+    return jsonify(prediction_cache.stats())
+
+
+def model_path(model_version: Optional[str]) -> str:
+    """Папка версии модели (для процессов, которые загружают модель сами)"""
+    if model_version == "local":
+        return DEFAULT_MODEL_PATH
+    return live_model.registry.version_path(model_version or "")
+
+
+@app.route("/jobs", methods=["POST"])
+@admitted("service")
+def submit_job() -> Any:
+    """
+    Создание задания скоринга
+
+    Вход - файл CSV / JSONL (multipart, поле file) или JSON {"sessions": [...]}.
+    Задание считает активная версия модели; ответ 202 с job_id.
+    """
+    model_version, model = current_model()
+    if model is None:
+        return jsonify({"error": "Модель не загружена"}), 500
+
+    upload = request.files.get("file")
+    if upload is not None:
+        input_format = os.path.splitext(upload.filename or "")[1].lstrip(".").lower()
+        if input_format not in ("csv", "jsonl"):
+            return jsonify({"error": "Поддерживаются файлы .csv и .jsonl"}), 400
+        save_input = upload.save
+    else:
+        request_data = request.get_json(silent=True)
+        if not request_data or not isinstance(request_data.get("sessions"), list):
+            return jsonify({"error": "Нужен файл (поле file) или список sessions"}), 400
+        sessions = request_data["sessions"]
+        input_format = "jsonl"
+
+        def save_input(path: str) -> None:
+            with open(path, "w", encoding="utf-8") as f:
+                for session in sessions:
+                    f.write(json.dumps(session, ensure_ascii=False) + "\n")
+
+    try:
+        status = job_manager.submit(
+            save_input, input_format, model_version, model_path(model_version)
+        )
+    except Exception as e:
+        logger.error(f"❌ Ошибка создания задания: {e}")
+        return jsonify({"error": str(e), "status": "error"}), 500
+
+    logger.info(f"📥 Задание {status['job_id']} создано")
+    return (
+        jsonify(
+            {
+                **status,
+                "status_url": f"/jobs/{status['job_id']}",
+                "result_url": f"/jobs/{status['job_id']}/result",
+            }
+        ),
+        202,
+    )
+
+
+@app.route("/jobs", methods=["GET"])
+@admitted("service")
+def list_jobs() -> Any:
+    """Состояния всех заданий"""
+    return jsonify({"jobs": [job_manager.status(job_id) for job_id in job_manager.jobs()]})
+
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+@admitted("service")
+def job_status(job_id: str) -> Any:
+    """Состояние и прогресс задания"""
+    try:
+        return jsonify(job_manager.status(job_id))
+    except KeyError:
+        return jsonify({"error": f"Задание {job_id} не найдено"}), 404
+
+
+@app.route("/jobs/<job_id>/result", methods=["GET"])
+@admitted("service")
+def job_result(job_id: str) -> Any:
+    """Результаты завершенного задания (CSV)"""
+    try:
+        path = job_manager.result_path(job_id)
+    except KeyError:
+        return jsonify({"error": f"Задание {job_id} не найдено"}), 404
+    if path is None:
+        return jsonify({"error": "Задание не завершено", **job_manager.status(job_id)}), 409
+    return send_file(
+        os.path.abspath(path),
+        mimetype="text/csv",
+        as_attachment=True,
+        download_name=f"{job_id}.csv",
     )
 
 
+@app.route("/admission/stats", methods=["GET"])
+def admission_stats() -> Any:
+    """Загрузка полос контроля допуска"""
+    return jsonify(admission.stats())
+
+
 @app.route("/stats", methods=["GET"])
+@admitted("service")
 def get_stats() -> Any:
     """Статистика использования API"""
     return jsonify(
@@ -360,10 +827,18 @@ def get_stats() -> Any:
                 "GET /health - проверка здоровья",
                 "POST /predict - предсказание для одной сессии",
                 "POST /predict_batch - пакетное предсказание",
+                "POST /predict_families - вероятности всех семейств целевых действий",
                 "GET /model_info - информация о модели",
                 "GET /example - пример данных",
                 "GET /features - список признаков",
                 "GET /stats - статистика API",
+                "POST /reload - загрузка активной версии модели из реестра",
+                "GET /shadow/stats - счетчики теневых моделей",
+                "GET /cache/stats - статистика кэша предсказаний",
+                "GET /admission/stats - загрузка полос контроля допуска",
+                "POST /jobs - задание скоринга большого файла",
+                "GET /jobs/<job_id> - состояние задания",
+                "GET /jobs/<job_id>/result - результаты задания",
             ],
         }
     )
@@ -378,16 +853,29 @@ if __name__ == "__main__":
         print("   GET  /health - проверка здоровья")
         print("   POST /predict - предсказание для одной сессии")
         print("   POST /predict_batch - пакетное предсказание")
+        print("   POST /predict_families - вероятности всех семейств целевых действий")
         print("   GET  /model_info - информация о модели")
         print("   GET  /example - пример данных")
         print("   GET  /features - список признаков")
         print("   GET  /stats - статистика API")
+        print("   POST /reload - загрузка активной версии модели из реестра")
+        print("   GET  /shadow/stats - счетчики теневых моделей")
+        print("   GET  /cache/stats - статистика кэша предсказаний")
+        print("   GET  /admission/stats - загрузка полос контроля допуска")
+        print("   POST /jobs - задание скоринга большого файла")
+        print("   GET  /jobs/<job_id> - состояние задания, /result - результаты")
+        load_client_history()
+        load_family_models()
+        start_shadow_scoring()
+        for job_id in job_manager.resume():
+            print(f"🔁 Продолжаем задание {job_id}")
 
         print("🌐 Сервер доступен по адресу: http://localhost:5001")
+        _, model = current_model()
         if model and model.feature_names:
             print(f"🔧 Количество признаков: {len(model.feature_names)}")
 
         # Запускаем сервер
         app.run(host="0.0.0.0", port=5001, debug=False)
     else:
-        print("❌ Не удалось загрузить модель. " "Проверьте наличие файла sber_auto_model.pkl")
+        print("❌ Не удалось загрузить модель. Проверьте наличие папки build/sber_auto_model")
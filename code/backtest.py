@@ -0,0 +1,425 @@
+"""
+Бэктест модели на скользящих окнах дат (rolling origin)
+
+train_model оценивает модель на одном случайном train_test_split и не
+показывает, как качество меняется со временем. Здесь модель обучается на
+окне дат перед точкой отсечения и оценивается на следующем периоде; точка
+отсечения сдвигается на step_days:
+
+    обучение [origin - train_days, origin)  ->  проверка [origin, origin + test_days)
+
+Признаки строятся один раз для всех сессий и сохраняются в папку кэша
+(X.npy, y.npy, city_codes.npy, days.npy, manifest.json). Окна считаются
+параллельно в пуле процессов (spawn, как в jobs): каждый процесс отображает
+матрицу в память (mmap) и берет строки своего окна, признаки для окна не
+пересчитываются. Повторный запуск на тех же данных берет кэш с диска.
+
+Признаки строк не зависят от будущего, кроме статистики городов, которая в
+кэше посчитана по всем датам. В каждом окне она пересчитывается по строкам
+обучения окна: конверсия и сегменты городов - CityTargetEncodingClassifier,
+средние длительность и число хитов и флаги размера города -
+window_city_features. История клиента - point-in-time.
+
+Запуск:
+    cd code
+    python backtest.py --train-days 90 --test-days 14 --workers 4
+"""
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from client_history import CLIENT_HISTORY_FEATURES
+from features import FEATURE_NAMES, SESSION_FEATURE_COLUMNS, visit_day_numbers
+from model_artifact import replace_directory, write_arrays
+from parallel_features import HIT_FEATURE_COLUMNS
+from sber_auto_model import SberAutoModel, default_params, make_estimator
+from sklearn.metrics import average_precision_score, brier_score_loss, roc_auc_score
+from target_encoding import CITY_CODE_COLUMN, CityTargetEncodingClassifier
+
+DEFAULT_BACKTEST_DIR = "../build/backtest"
+FEATURES_DIR_NAME = "features"
+METRICS_NAME = "metrics.csv"
+MANIFEST_NAME = "manifest.json"
+CACHE_ARRAYS = ("X", "y", "city_codes", "days")
+# Версия формата кэша: входит в ключ, кэш прежнего формата строится заново
+CACHE_FORMAT_VERSION = 3
+
+# Статистика городов в кэше, которая пересчитывается по строкам обучения окна
+# (конверсию и сегменты пересчитывает CityTargetEncodingClassifier)
+WINDOW_CITY_FEATURES = [
+    "city_avg_duration",
+    "city_avg_hits",
+    "is_million_plus",
+    "is_regional_center",
+]
+
+
+def _frame_digest(digest: Any, frame: pd.DataFrame, columns: Sequence[str]) -> None:
+    """Добавляет в digest имена и значения столбцов frame (отсутствующие пропускаются)"""
+    present = [column for column in columns if column in frame]
+    digest.update(json.dumps(present).encode())
+    for column in present:
+        digest.update(pd.util.hash_pandas_object(frame[column], index=False).to_numpy().data)
+
+
+def feature_cache_key(
+    sessions: pd.DataFrame,
+    hits: pd.DataFrame,
+    target_actions: Sequence[str],
+    feature_names: Sequence[str],
+) -> str:
+    """
+    Ключ кэша признаков: blake2b от столбцов сессий и хитов, из которых
+    строятся признаки и целевая переменная, целевых действий, имен признаков
+    (в порядке столбцов) и CACHE_FORMAT_VERSION
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    _frame_digest(digest, sessions, SESSION_FEATURE_COLUMNS + ["client_id"])
+    _frame_digest(digest, hits, HIT_FEATURE_COLUMNS)
+    digest.update(
+        json.dumps(
+            {
+                "format_version": CACHE_FORMAT_VERSION,
+                "target_actions": sorted(target_actions),
+                "feature_names": list(feature_names),
+            }
+        ).encode()
+    )
+    return digest.hexdigest()
+
+
+def save_feature_cache(
+    path: str,
+    X: np.ndarray,
+    y: np.ndarray,
+    city_codes: np.ndarray,
+    days: np.ndarray,
+    feature_names: Sequence[str],
+    key: str,
+) -> None:
+    """Запись кэша признаков (атомарно, model_artifact.replace_directory)"""
+    arrays = {
+        "X": np.ascontiguousarray(X, dtype=np.float32),
+        "y": np.asarray(y, dtype=np.int8),
+        "city_codes": np.asarray(city_codes, dtype=np.int32),
+        "days": np.asarray(days, dtype=np.int32),
+    }
+    manifest = {
+        "format_version": CACHE_FORMAT_VERSION,
+        "key": key,
+        "feature_names": list(feature_names),
+        "n_rows": len(arrays["y"]),
+        "first_day": str(np.datetime64(int(arrays["days"].min()), "D")),
+        "last_day": str(np.datetime64(int(arrays["days"].max()), "D")),
+    }
+    replace_directory(path, lambda staging: write_arrays(staging, arrays, manifest))
+
+
+def load_feature_cache(
+    path: str, key: Optional[str] = None, mmap: bool = True
+) -> Optional[Dict[str, Any]]:
+    """
+    Кэш признаков: массивы CACHE_ARRAYS и manifest
+
+    Returns:
+        dict или None, если кэша нет или он построен по другим данным (key)
+    """
+    # Одна версия папки replace_directory для манифеста и массивов
+    path = os.path.realpath(path)
+    manifest_path = os.path.join(path, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if key is not None and manifest["key"] != key:
+        return None
+    mmap_mode = "r" if mmap else None
+    cache: Dict[str, Any] = {
+        name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+        for name in CACHE_ARRAYS
+    }
+    cache["manifest"] = manifest
+    return cache
+
+
+def rolling_windows(
+    days: np.ndarray,
+    train_days: int,
+    test_days: int,
+    step_days: Optional[int] = None,
+    expanding: bool = False,
+) -> List[Dict[str, int]]:
+    """
+    Окна бэктеста по дням визита
+
+    Args:
+        days: Номер дня от 1970-01-01 каждой строки
+        train_days: Длина окна обучения (при expanding - минимальная)
+        test_days: Длина периода проверки
+        step_days: Сдвиг точки отсечения (None - test_days)
+        expanding: Обучение от первого дня данных (растущее окно)
+
+    Returns:
+        list: окна {"window", "train_start", "origin", "test_end"}; обучение -
+        дни [train_start, origin), проверка - [origin, test_end)
+    """
+    if train_days < 1 or test_days < 1:
+        raise ValueError("train_days и test_days должны быть положительными")
+    step_days = step_days or test_days
+    first, last = int(np.min(days)), int(np.max(days))
+    windows = []
+    origin = first + train_days
+    while origin + test_days - 1 <= last:
+        windows.append(
+            {
+                "window": len(windows),
+                "train_start": first if expanding else origin - train_days,
+                "origin": origin,
+                "test_end": origin + test_days,
+            }
+        )
+        origin += step_days
+    return windows
+
+
+def _window_frame(cache: Dict[str, Any], rows: np.ndarray) -> pd.DataFrame:
+    """Строки окна из матрицы кэша со столбцом кода города"""
+    frame = pd.DataFrame(
+        np.asarray(cache["X"][rows]), columns=cache["manifest"]["feature_names"], copy=False
+    )
+    frame[CITY_CODE_COLUMN] = np.asarray(cache["city_codes"][rows])
+    return frame
+
+
+def window_city_features(X_train: pd.DataFrame, X_test: pd.DataFrame) -> None:
+    """
+    WINDOW_CITY_FEATURES по строкам обучения окна (на месте в X_train и X_test)
+
+    Суммы - как в features.city_partial_stats: средняя длительность по всем
+    сессиям города, среднее число хитов - по сессиям с хитами. Города без строк
+    обучения и пропуски получают нули, как города без статистики в
+    fill_city_features.
+    """
+    codes = X_train[CITY_CODE_COLUMN].to_numpy()
+    n_cities = (
+        int(max(codes.max(initial=-1), X_test[CITY_CODE_COLUMN].to_numpy().max(initial=-1))) + 1
+    )
+    valid = codes >= 0
+    city = codes[valid]
+    total_hits = X_train["total_hits"].to_numpy(dtype=np.float64)[valid]
+    sessions = np.bincount(city, minlength=n_cities)
+    hits_count = np.bincount(city, weights=total_hits > 0, minlength=n_cities)
+    duration_sum = np.bincount(
+        city,
+        weights=X_train["session_duration"].to_numpy(dtype=np.float64)[valid],
+        minlength=n_cities,
+    )
+    hits_sum = np.bincount(city, weights=total_hits, minlength=n_cities)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        stats = {
+            "city_avg_duration": np.nan_to_num(duration_sum / sessions),
+            "city_avg_hits": np.nan_to_num(hits_sum / hits_count),
+            "is_million_plus": sessions >= 1000,
+            "is_regional_center": sessions >= 500,
+        }
+    for frame in (X_train, X_test):
+        # Код -1 (пропуск города) берет дописанный 0
+        rows = frame[CITY_CODE_COLUMN].to_numpy()
+        for name in WINDOW_CITY_FEATURES:
+            if name in frame.columns:
+                frame[name] = np.append(stats[name].astype(np.float32), np.float32(0))[rows]
+
+
+def run_window(
+    cache_path: str, window: Dict[str, int], engine: str, params: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    Обучение и оценка одного окна (выполняется в процессе пула)
+
+    Returns:
+        dict: границы окна, размеры выборок, метрики и время этапов (с)
+    """
+    started = time.perf_counter()
+    cache = load_feature_cache(cache_path)
+    if cache is None:
+        raise FileNotFoundError(f"Кэш признаков не найден: {cache_path}")
+    days = np.asarray(cache["days"])
+    train = np.flatnonzero((days >= window["train_start"]) & (days < window["origin"]))
+    test = np.flatnonzero((days >= window["origin"]) & (days < window["test_end"]))
+    y_train = np.asarray(cache["y"][train])
+    y_test = np.asarray(cache["y"][test])
+    X_train, X_test = _window_frame(cache, train), _window_frame(cache, test)
+    window_city_features(X_train, X_test)
+    load_s = time.perf_counter() - started
+
+    result: Dict[str, Any] = {
+        "window": window["window"],
+        "train_start": str(np.datetime64(window["train_start"], "D")),
+        "test_start": str(np.datetime64(window["origin"], "D")),
+        "test_end": str(np.datetime64(window["test_end"] - 1, "D")),
+        "n_train": len(train),
+        "n_test": len(test),
+        "test_positive_rate": float(y_test.mean()) if len(test) else np.nan,
+        "roc_auc": np.nan,
+        "avg_precision": np.nan,
+        "brier": np.nan,
+        "load_s": load_s,
+        "fit_s": 0.0,
+        "predict_s": 0.0,
+    }
+    # Без обоих классов в обучении или проверке окно не оценивается
+    if len(np.unique(y_train)) < 2 or len(np.unique(y_test)) < 2:
+        return result
+
+    estimator, _ = make_estimator(engine)
+    estimator.set_params(**params)
+    # Параллельность - по окнам: модель окна обучается в одном потоке
+    if "n_jobs" in estimator.get_params():
+        estimator.set_params(n_jobs=1)
+    model = CityTargetEncodingClassifier(estimator, random_state=42)
+
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    result["fit_s"] = time.perf_counter() - start
+    start = time.perf_counter()
+    probability = model.predict_proba(X_test)[:, 1]
+    result["predict_s"] = time.perf_counter() - start
+
+    result["roc_auc"] = float(roc_auc_score(y_test, probability))
+    result["avg_precision"] = float(average_precision_score(y_test, probability))
+    result["brier"] = float(brier_score_loss(y_test, probability))
+    return result
+
+
+def run_backtest(
+    cache_path: str,
+    windows: List[Dict[str, int]],
+    engine: str = "random_forest",
+    params: Optional[Dict[str, Any]] = None,
+    workers: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Окна бэктеста в пуле процессов по общему кэшу признаков
+
+    Args:
+        cache_path: Папка кэша признаков (save_feature_cache)
+        windows: Окна rolling_windows
+        engine: Движок модели из MODEL_ENGINES
+        params: Параметры модели (None - default_params)
+        workers: Процессов пула (None - число ядер; 1 - в текущем процессе)
+
+    Returns:
+        DataFrame: строка метрик и времени на окно, по порядку окон
+    """
+    params = default_params(engine) if params is None else params
+    workers = min(workers or os.cpu_count() or 1, max(len(windows), 1))
+    results: List[Dict[str, Any]] = []
+    if workers == 1:
+        results = [run_window(cache_path, window, engine, params) for window in windows]
+    else:
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(workers, mp_context=context) as pool:
+            futures = [
+                pool.submit(run_window, cache_path, window, engine, params) for window in windows
+            ]
+            results = [future.result() for future in as_completed(futures)]
+
+    metrics = pd.DataFrame(results)
+    if metrics.empty:
+        return metrics
+    metrics["total_s"] = metrics[["load_s", "fit_s", "predict_s"]].sum(axis=1)
+    return metrics.sort_values("window").reset_index(drop=True)
+
+
+def build_feature_cache(
+    model: SberAutoModel, sessions: pd.DataFrame, hits: pd.DataFrame, cache_path: str
+) -> Dict[str, Any]:
+    """
+    Признаки всех сессий в кэш (или готовый кэш, если он построен по тем же данным)
+
+    Returns:
+        dict: кэш (load_feature_cache)
+    """
+    model.define_target_actions(hits)
+    days = visit_day_numbers(sessions["visit_date"])
+    # Столбцы, которые даст prepare_features (история клиента - при client_id)
+    feature_names = list(FEATURE_NAMES)
+    if "client_id" in sessions:
+        feature_names += CLIENT_HISTORY_FEATURES
+    key = feature_cache_key(sessions, hits, model.target_actions, feature_names)
+    cache = load_feature_cache(cache_path, key)
+    if cache is not None:
+        print(f"♻️ Кэш признаков совпадает с данными: {cache_path}")
+        return cache
+
+    df = model.create_features(sessions, hits)
+    X, y = model.prepare_features(df)
+    save_feature_cache(
+        cache_path,
+        X.to_numpy(),
+        y.to_numpy(),
+        df[CITY_CODE_COLUMN].to_numpy(),
+        days,
+        list(X.columns),
+        key,
+    )
+    print(f"💾 Кэш признаков сохранен: {cache_path}")
+    return load_feature_cache(cache_path, key)
+
+
+def main() -> None:
+    """Бэктест на скользящих окнах с таблицей метрик по окнам"""
+    parser = argparse.ArgumentParser(description="Бэктест модели на скользящих окнах дат")
+    parser.add_argument("--train-days", type=int, default=90, help="Дней обучения")
+    parser.add_argument("--test-days", type=int, default=14, help="Дней проверки")
+    parser.add_argument("--step-days", type=int, help="Сдвиг окна (по умолчанию test-days)")
+    parser.add_argument("--expanding", action="store_true", help="Обучение от первого дня")
+    parser.add_argument("--engine", default="random_forest", help="Движок модели")
+    parser.add_argument("--workers", type=int, help="Процессов (по умолчанию число ядер)")
+    parser.add_argument("--start-date", help="Первая дата данных")
+    parser.add_argument("--end-date", help="Последняя дата данных")
+    parser.add_argument("--out", default=DEFAULT_BACKTEST_DIR, help="Папка результатов")
+    args = parser.parse_args()
+
+    print("📈 Бэктест на скользящих окнах")
+    print("=" * 60)
+    model = SberAutoModel(args.engine)
+    sessions, hits = model.load_data(args.start_date, args.end_date)
+
+    cache_path = os.path.join(args.out, FEATURES_DIR_NAME)
+    start = time.perf_counter()
+    cache = build_feature_cache(model, sessions, hits, cache_path)
+    features_s = time.perf_counter() - start
+    del sessions, hits
+
+    windows = rolling_windows(
+        np.asarray(cache["days"]), args.train_days, args.test_days, args.step_days, args.expanding
+    )
+    if not windows:
+        raise ValueError("Данных не хватает ни на одно окно: уменьшите train-days или test-days")
+    print(f"🪟 Окон: {len(windows)}, обучение {args.train_days} дн., проверка {args.test_days} дн.")
+
+    start = time.perf_counter()
+    metrics = run_backtest(cache_path, windows, args.engine, workers=args.workers)
+    backtest_s = time.perf_counter() - start
+
+    metrics.to_csv(os.path.join(args.out, METRICS_NAME), index=False)
+    print("\n📊 МЕТРИКИ ПО ОКНАМ:")
+    print(metrics.round(4).to_string(index=False))
+    print(f"\n⏱️ Признаки: {features_s:.1f} с, окна: {backtest_s:.1f} с")
+    print(
+        f"📈 ROC-AUC: среднее {metrics['roc_auc'].mean():.4f}, мин. {metrics['roc_auc'].min():.4f}"
+    )
+    print(f"💾 Метрики сохранены: {os.path.join(args.out, METRICS_NAME)}")
+
+
+if __name__ == "__main__":
+    main()
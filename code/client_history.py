@@ -0,0 +1,330 @@
+"""
+История клиента: признаки по прошлым сессиям того же client_id
+
+visit_number - единственный сигнал между сессиями. Здесь для каждой сессии
+считаются признаки по сессиям того же клиента строго раньше нее
+(point-in-time): число сессий, число конверсий, дни с прошлого визита и
+средняя длительность прошлых сессий.
+
+- Обучение: client_history_features - одна сортировка по (клиент, время) и
+  накопленные суммы, сессии с одинаковым временем друг друга не видят.
+- Предсказание: ClientHistoryIndex - итоги по клиентам на диске (папка с
+  массивами .npy и manifest.json). Клиенты лежат в хеш-таблице с открытой
+  адресацией (64-битный хеш client_id, линейное пробирование, заполнение не
+  больше половины), массивы отображаются в память (mmap): поиск - O(1)
+  обращений к странице, память процесса не растет с числом клиентов.
+
+Индекс зависит только от numpy (его загружает API), pandas импортируется
+только функциями обучения.
+"""
+
+import hashlib
+import json
+import numbers
+import os
+import time
+from typing import TYPE_CHECKING, Any, Dict, Optional, Sequence
+
+import numpy as np
+from model_artifact import replace_directory, write_arrays
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+DEFAULT_CLIENT_HISTORY_PATH = "../build/client_history"
+FORMAT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+SECONDS_PER_DAY = 86400
+
+# visit_date и visit_time выгрузки GA - московское время (UTC+3, без перехода
+# на летнее время); visit_timestamps - секунды этого времени без пояса
+VISIT_UTC_OFFSET = 3 * 3600
+
+CLIENT_HISTORY_FEATURES = [
+    "client_prior_sessions",
+    "client_prior_conversions",
+    "client_days_since_last",
+    "client_avg_prior_duration",
+]
+
+# Итоги клиента в индексе и их типы
+INDEX_ARRAYS = {
+    "keys": np.uint64,
+    "sessions": np.int32,
+    "conversions": np.int32,
+    "last_visit": np.int64,
+    "total_duration": np.float64,
+}
+
+
+def visit_timestamps(sessions: "pd.DataFrame") -> np.ndarray:
+    """Время визита в секундах от 1970-01-01 (visit_date + visit_time, Москва без пояса)"""
+    from features import visit_day_numbers, visit_seconds_of_day
+
+    days = visit_day_numbers(sessions["visit_date"])
+    return days * SECONDS_PER_DAY + visit_seconds_of_day(sessions["visit_time"])
+
+
+def local_now() -> float:
+    """Текущее время в шкале visit_timestamps (московское время без пояса)"""
+    return time.time() + VISIT_UTC_OFFSET
+
+
+def client_hashes(client_ids: Any) -> np.ndarray:
+    """64-битный хеш client_id, одинаковый между процессами (0 - признак пустой ячейки)"""
+    hashes = np.fromiter(
+        (
+            int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), "little")
+            for value in client_ids
+        ),
+        dtype=np.uint64,
+        count=len(client_ids),
+    )
+    return np.where(hashes == 0, np.uint64(1), hashes)
+
+
+def history_features(
+    prior_sessions: np.ndarray,
+    prior_conversions: np.ndarray,
+    seconds_since_last: np.ndarray,
+    prior_duration: np.ndarray,
+) -> np.ndarray:
+    """Матрица CLIENT_HISTORY_FEATURES (float32) из сумм по прошлым сессиям"""
+    has_history = prior_sessions > 0
+    X = np.zeros((len(prior_sessions), len(CLIENT_HISTORY_FEATURES)), dtype=np.float32)
+    X[:, 0] = prior_sessions
+    X[:, 1] = prior_conversions
+    X[:, 2] = np.where(has_history, np.maximum(seconds_since_last, 0) / SECONDS_PER_DAY, 0)
+    X[:, 3] = prior_duration / np.maximum(prior_sessions, 1)
+    return X
+
+
+def client_history_features(
+    client_id: "pd.Series", timestamp: np.ndarray, is_target: np.ndarray, duration: np.ndarray
+) -> np.ndarray:
+    """
+    Признаки истории клиента для каждой сессии по сессиям строго раньше нее
+
+    Args:
+        client_id: Клиент сессии (пропуск - истории нет)
+        timestamp: Время визита (visit_timestamps)
+        is_target: Конверсия сессии
+        duration: Длительность сессии
+
+    Returns:
+        ndarray: (n_sessions, len(CLIENT_HISTORY_FEATURES)) float32 в порядке строк
+    """
+    import pandas as pd
+
+    codes, _ = pd.factorize(client_id)
+    timestamp = np.asarray(timestamp, dtype=np.int64)
+    order = np.lexsort((timestamp, codes))
+    client, moment = codes[order], timestamp[order]
+    n = len(order)
+    rows = np.arange(n)
+
+    # Начало клиента и начало группы сессий с тем же временем в отсортированном порядке
+    new_client = np.ones(n, dtype=bool)
+    new_client[1:] = client[1:] != client[:-1]
+    new_moment = new_client.copy()
+    new_moment[1:] |= moment[1:] != moment[:-1]
+    client_start = np.maximum.accumulate(np.where(new_client, rows, 0))
+    moment_start = np.maximum.accumulate(np.where(new_moment, rows, 0))
+
+    def prior_sum(values: np.ndarray) -> np.ndarray:
+        cumulative = np.concatenate([[0.0], np.cumsum(np.asarray(values, dtype=np.float64))])
+        return cumulative[moment_start] - cumulative[client_start]
+
+    prior_sessions = (moment_start - client_start).astype(np.float64)
+    last_visit = moment[np.maximum(moment_start - 1, 0)]
+    X = history_features(
+        prior_sessions,
+        prior_sum(np.asarray(is_target)[order]),
+        moment - last_visit,
+        prior_sum(np.asarray(duration)[order]),
+    )
+    # Сессии без client_id истории не имеют
+    X[client < 0] = 0
+
+    result = np.empty_like(X)
+    result[order] = X
+    return result
+
+
+class ClientHistoryIndex:
+    """
+    Итоги клиентов на диске с поиском по client_id за O(1)
+
+    Args:
+        path: Папка индекса (ClientHistoryIndex.build)
+        mmap: Отображать массивы в память вместо чтения
+    """
+
+    def __init__(self, path: str, mmap: bool = True) -> None:
+        # Одна версия папки replace_directory для манифеста и массивов
+        path = os.path.realpath(path)
+        with open(os.path.join(path, MANIFEST_NAME), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("format_version") != FORMAT_VERSION:
+            raise ValueError(
+                f"Неподдерживаемая версия индекса клиентов: {self.manifest.get('format_version')}"
+            )
+        mmap_mode = "r" if mmap else None
+        self.arrays = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+            for name in INDEX_ARRAYS
+        }
+        self.mask = np.uint64(len(self.arrays["keys"]) - 1)
+
+    @staticmethod
+    def build(
+        path: str,
+        client_ids: Any,
+        sessions: np.ndarray,
+        conversions: np.ndarray,
+        last_visit: np.ndarray,
+        total_duration: np.ndarray,
+    ) -> Dict[str, Any]:
+        """
+        Запись индекса: хеш-таблица на степень двойки не меньше 2 x клиентов
+
+        Таблица заполняется векторно: на каждом шаге каждый неразмещенный
+        клиент пробует свою ячейку, пустую ячейку занимает первый претендент,
+        остальные переходят к следующей. Шагов - не больше длины самой
+        длинной цепочки пробирования.
+
+        Returns:
+            dict: Записанный манифест
+        """
+        hashes = client_hashes(client_ids)
+        capacity = 1 << max(3, int(2 * len(hashes)).bit_length())
+        mask = np.uint64(capacity - 1)
+        keys = np.zeros(capacity, dtype=np.uint64)
+        slot_of = np.zeros(len(hashes), dtype=np.int64)
+
+        pending = np.arange(len(hashes))
+        slots = (hashes & mask).astype(np.int64)
+        while len(pending):
+            free = keys[slots] == 0
+            _, first = np.unique(slots[free], return_index=True)
+            placed = np.flatnonzero(free)[first]
+            keys[slots[placed]] = hashes[pending[placed]]
+            slot_of[pending[placed]] = slots[placed]
+            waiting = np.ones(len(pending), dtype=bool)
+            waiting[placed] = False
+            pending, slots = pending[waiting], (slots[waiting] + 1) & (capacity - 1)
+
+        arrays = {"keys": keys}
+        for name, values in (
+            ("sessions", sessions),
+            ("conversions", conversions),
+            ("last_visit", last_visit),
+            ("total_duration", total_duration),
+        ):
+            column = np.zeros(capacity, dtype=INDEX_ARRAYS[name])
+            column[slot_of] = values
+            arrays[name] = column
+
+        manifest = {
+            "format_version": FORMAT_VERSION,
+            "n_clients": int(len(hashes)),
+            "capacity": capacity,
+            "last_visit": int(np.max(last_visit)) if len(hashes) else None,
+            "built_at": time.time(),
+        }
+        replace_directory(path, lambda staging: write_arrays(staging, arrays, manifest))
+        return manifest
+
+    def slots(self, client_ids: Any) -> np.ndarray:
+        """Ячейка каждого клиента (-1 - клиента нет в индексе)"""
+        keys = self.arrays["keys"]
+        hashes = client_hashes(client_ids)
+        found = np.full(len(hashes), -1, dtype=np.int64)
+        active = np.arange(len(hashes))
+        slots = hashes & self.mask
+        while len(active):
+            stored = keys[slots[active]]
+            hit = stored == hashes[active]
+            found[active[hit]] = slots[active[hit]]
+            active = active[~hit & (stored != 0)]
+            slots[active] = (slots[active] + np.uint64(1)) & self.mask
+        return found
+
+    def lookup(self, client_ids: Any, timestamps: Any) -> np.ndarray:
+        """
+        Признаки истории клиентов на момент timestamps
+
+        Индекс - итоги по сессиям до его построения, поэтому все они считаются
+        прошлыми для предсказываемых сессий.
+
+        Returns:
+            ndarray: (n, len(CLIENT_HISTORY_FEATURES)) float32; неизвестные клиенты - нули
+        """
+        found = self.slots(client_ids)
+        known = found >= 0
+        at = found[known]
+        values = {name: np.zeros(len(found)) for name in INDEX_ARRAYS if name != "keys"}
+        for name, column in values.items():
+            column[known] = self.arrays[name][at]
+        return history_features(
+            values["sessions"],
+            values["conversions"],
+            np.asarray(timestamps, dtype=np.float64) - values["last_visit"],
+            values["total_duration"],
+        )
+
+    def features(self, client_id: str, timestamp: Optional[float] = None) -> Dict[str, float]:
+        """Признаки истории одного клиента (timestamp по умолчанию - local_now())"""
+        row = self.lookup([client_id], [local_now() if timestamp is None else timestamp])[0]
+        return dict(zip(CLIENT_HISTORY_FEATURES, row.tolist()))
+
+
+def save_client_history(
+    path: str,
+    client_id: "pd.Series",
+    timestamp: np.ndarray,
+    is_target: np.ndarray,
+    duration: np.ndarray,
+) -> Dict[str, Any]:
+    """Итоги по клиентам обучающих сессий и запись ClientHistoryIndex"""
+    import pandas as pd
+
+    codes, clients = pd.factorize(client_id)
+    known = codes >= 0
+    codes = codes[known]
+    n_clients = len(clients)
+    last_visit = np.full(n_clients, np.iinfo(np.int64).min)
+    np.maximum.at(last_visit, codes, np.asarray(timestamp, dtype=np.int64)[known])
+    return ClientHistoryIndex.build(
+        path,
+        clients,
+        np.bincount(codes, minlength=n_clients),
+        np.bincount(codes, weights=np.asarray(is_target)[known], minlength=n_clients),
+        last_visit,
+        np.bincount(codes, weights=np.asarray(duration)[known], minlength=n_clients),
+    )
+
+
+def client_history_rows(
+    index: ClientHistoryIndex, rows: Sequence[Any], default_timestamp: Optional[float] = None
+) -> None:
+    """
+    Подстановка признаков истории в запросы с client_id (на месте)
+
+    Признаки, переданные в запросе явно, не заменяются. Время сессии -
+    поле visit_timestamp в шкале visit_timestamps (секунды от 1970-01-01 по
+    московскому времени, как visit_date и visit_time при обучении), иначе
+    default_timestamp (по умолчанию - local_now()).
+    """
+    requests = [row for row in rows if isinstance(row, dict) and "client_id" in row]
+    if not requests:
+        return
+    now = local_now() if default_timestamp is None else default_timestamp
+    timestamps = [
+        value if isinstance(value, numbers.Real) else now
+        for value in (row.get("visit_timestamp") for row in requests)
+    ]
+    history = index.lookup([row["client_id"] for row in requests], timestamps)
+    for row, values in zip(requests, history.tolist()):
+        for name, value in zip(CLIENT_HISTORY_FEATURES, values):
+            row.setdefault(name, value)
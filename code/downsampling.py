@@ -0,0 +1,69 @@
+"""
+Прореживание негативов при обучении с пересчетом вероятностей
+"""
+
+from typing import Any, Optional
+
+import numpy as np
+from model_artifact import correct_probability
+from sklearn.base import BaseEstimator, ClassifierMixin, clone
+
+
+class NegativeDownsamplingClassifier(ClassifierMixin, BaseEstimator):
+    """
+    Обертка классификатора: обучение на всех позитивах и доле негативов
+
+    predict_proba возвращает вероятности, пересчитанные к исходной доле
+    позитивов, поэтому обертку можно использовать везде вместо обычной модели
+    (GridSearchCV, cross_val_score, метрики на тестовой выборке).
+
+    Если у базового классификатора warm_start=True, повторный fit на тех же
+    данных продолжает обучение уже обученной модели (та же выборка негативов):
+    так WarmStartGridSearch наращивает лес внутри обертки.
+
+    Args:
+        estimator: Базовый классификатор
+        negative_rate: Доля негативов, сохраняемых при обучении (0, 1]
+        random_state: Зерно выборки негативов
+    """
+
+    def __init__(
+        self, estimator: Any, negative_rate: float = 0.1, random_state: Optional[int] = None
+    ) -> None:
+        self.estimator = estimator
+        self.negative_rate = negative_rate
+        self.random_state = random_state
+
+    def fit(self, X: Any, y: Any) -> "NegativeDownsamplingClassifier":
+        """Обучение базовой модели на прореженной выборке"""
+        if not 0 < self.negative_rate <= 1:
+            raise ValueError("negative_rate должен быть в интервале (0, 1]")
+
+        labels = np.asarray(y)
+        rng = np.random.default_rng(self.random_state)
+        keep = np.flatnonzero((labels == 1) | (rng.random(len(labels)) < self.negative_rate))
+
+        X_sample = X.iloc[keep] if hasattr(X, "iloc") else X[keep]
+        if getattr(self.estimator, "warm_start", False) and hasattr(self, "estimator_"):
+            self.estimator_.set_params(**self.estimator.get_params(deep=False))
+        else:
+            self.estimator_ = clone(self.estimator)
+        self.estimator_.fit(X_sample, labels[keep])
+        self.classes_ = self.estimator_.classes_
+        self.n_train_samples_ = len(keep)
+        return self
+
+    def predict_proba(self, X: Any) -> np.ndarray:
+        """Вероятности классов с поправкой на прореживание"""
+        probability = correct_probability(
+            self.estimator_.predict_proba(X)[:, 1], self.negative_rate
+        )
+        return np.column_stack([1.0 - probability, probability])
+
+    def predict(self, X: Any) -> np.ndarray:
+        """Предсказание класса по исправленной вероятности"""
+        return (self.predict_proba(X)[:, 1] > 0.5).astype(int)
+
+    @property
+    def feature_importances_(self) -> np.ndarray:
+        return self.estimator_.feature_importances_
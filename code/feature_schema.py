@@ -0,0 +1,190 @@
+"""
+Схема признаков модели: проверка запроса и сборка строки без pandas
+
+Схема компилируется один раз из feature_names: для каждого признака
+известны позиция в строке, допустимый диапазон и целочисленность. Запрос
+(dict) проверяется и записывается прямо в переиспользуемый буфер numpy
+(свой для каждого потока). Ошибки собираются по всем полям сразу и
+возвращаются в SchemaValidationError.
+"""
+
+import math
+import numbers
+import threading
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+# Диапазоны признаков, не являющихся флагами: (минимум, максимум, целое)
+FEATURE_BOUNDS = {
+    "visit_number": (0, math.inf, True),
+    "total_hits": (0, math.inf, True),
+    "unique_pages": (0, math.inf, True),
+    "unique_events": (0, math.inf, True),
+    "session_duration": (0, math.inf, False),
+    "visit_hour": (0, 23, True),
+    "visit_weekday": (0, 6, True),
+    "avg_time_per_page": (0, math.inf, False),
+    "events_per_page": (0, math.inf, False),
+    "engagement_score": (0, math.inf, False),
+    "city_conversion_rate": (0, 100, False),
+    "city_avg_duration": (0, math.inf, False),
+    "city_avg_hits": (0, math.inf, False),
+    "client_prior_sessions": (0, math.inf, True),
+    "client_prior_conversions": (0, math.inf, True),
+    "client_days_since_last": (0, math.inf, False),
+    "client_avg_prior_duration": (0, math.inf, False),
+    "hits_to_first_key_event": (0, math.inf, True),
+    "time_to_first_key_event": (0, math.inf, False),
+    "key_event_share": (0, 1, False),
+}
+
+# Бинарные признаки, имена которых не начинаются с is_ / city_tier_
+FLAG_FEATURES = {
+    "bounce_rate",
+    "deep_engagement",
+    "long_session",
+    "very_long_session",
+    "high_activity",
+    "very_high_activity",
+    "has_key_event",
+}
+
+
+class SchemaValidationError(ValueError):
+    """
+    Ошибка проверки запроса
+
+    Args:
+        errors (dict): Описание ошибки для каждого некорректного поля
+    """
+
+    def __init__(self, errors: Dict[str, str]) -> None:
+        super().__init__(
+            "Некорректные признаки: " + "; ".join(f"{k}: {v}" for k, v in errors.items())
+        )
+        self.errors = errors
+
+
+class FeatureSpec(NamedTuple):
+    """Позиция и допустимые значения признака"""
+
+    index: int
+    minimum: float
+    maximum: float
+    integer: bool
+
+
+def feature_spec(name: str, index: int) -> FeatureSpec:
+    """Описание признака по имени (неизвестные признаки - любые конечные числа)"""
+    if name.startswith(("is_", "city_tier_")) or name in FLAG_FEATURES:
+        return FeatureSpec(index, 0, 1, True)
+    minimum, maximum, integer = FEATURE_BOUNDS.get(name, (-math.inf, math.inf, False))
+    return FeatureSpec(index, minimum, maximum, integer)
+
+
+class FeatureSchema:
+    """
+    Скомпилированная схема признаков
+
+    Недостающие признаки, None и NaN равны 0 (как fillna(0) раньше),
+    поля, не входящие в feature_names, игнорируются.
+
+    Args:
+        feature_names (list): Признаки модели в порядке обучения
+    """
+
+    def __init__(self, feature_names: List[str]) -> None:
+        self.feature_names = list(feature_names)
+        self.specs = {name: feature_spec(name, i) for i, name in enumerate(self.feature_names)}
+        self._local = threading.local()
+
+    def _row(self) -> np.ndarray:
+        """Буфер строки текущего потока"""
+        row = getattr(self._local, "row", None)
+        if row is None:
+            row = self._local.row = np.zeros((1, len(self.feature_names)))
+        return row
+
+    def validate_value(self, spec: FeatureSpec, value: Any) -> str:
+        """Текст ошибки для значения признака (пустая строка - значение корректно)"""
+        if isinstance(value, bool):
+            return ""
+        if not isinstance(value, numbers.Real):
+            return f"ожидается число, получено {type(value).__name__}"
+        if not math.isfinite(value):
+            return "ожидается конечное число"
+        if value < spec.minimum or value > spec.maximum:
+            return f"значение {value} вне диапазона [{spec.minimum:g}, {spec.maximum:g}]"
+        if spec.integer and value != int(value):
+            return f"ожидается целое число, получено {value}"
+        return ""
+
+    def assemble(self, data: Any, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Проверка запроса и запись признаков в строку
+
+        Args:
+            data (dict): Признаки сессии
+            out (ndarray, optional): Строка (n_features,) для записи, например
+                строка матрицы пакета. По умолчанию - буфер текущего потока
+
+        Returns:
+            ndarray: Буфер (1, n_features) float64 текущего потока - действителен
+                до следующего вызова в этом потоке (или out, если передан)
+
+        Raises:
+            SchemaValidationError: Ошибки по полям
+        """
+        if not isinstance(data, dict):
+            raise SchemaValidationError({"request": "ожидается объект с признаками"})
+
+        row = self._row() if out is None else out
+        row.fill(0.0)
+        values = row.reshape(-1)
+        errors = {}
+        for name, value in data.items():
+            spec = self.specs.get(name)
+            if spec is None or value is None or value != value:
+                continue
+            error = self.validate_value(spec, value)
+            if error:
+                errors[name] = error
+            else:
+                values[spec.index] = value
+
+        if errors:
+            raise SchemaValidationError(errors)
+        return row
+
+    def assemble_columns(
+        self, columns: Dict[str, np.ndarray], n_rows: int
+    ) -> Tuple[np.ndarray, Dict[int, Dict[str, str]]]:
+        """
+        Векторная проверка и сборка матрицы признаков из столбцов (большие файлы)
+
+        Args:
+            columns (dict): Признак -> числовой массив длины n_rows (NaN - пропуск)
+            n_rows (int): Число строк
+
+        Returns:
+            tuple: матрица (n_rows, n_features), где пропуски и некорректные
+                значения равны 0, и ошибки по строкам {строка: {признак: текст}}
+        """
+        X = np.zeros((n_rows, len(self.feature_names)))
+        errors: Dict[int, Dict[str, str]] = {}
+        for name, values in columns.items():
+            spec = self.specs.get(name)
+            if spec is None:
+                continue
+            values = np.asarray(values, dtype=np.float64)
+            present = ~np.isnan(values)
+            with np.errstate(invalid="ignore"):
+                bad = present & ((values < spec.minimum) | (values > spec.maximum))
+                bad |= present & np.isinf(values)
+                if spec.integer:
+                    bad |= present & np.isfinite(values) & (values != np.floor(values))
+            for row in np.flatnonzero(bad).tolist():
+                errors.setdefault(row, {})[name] = self.validate_value(spec, float(values[row]))
+            X[:, spec.index] = np.where(present & ~bad, values, 0.0)
+        return X, errors
@@ -0,0 +1,475 @@
+"""
+Векторизованные помощники для построения признаков сессий
+"""
+
+import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from distinct_sketch import SessionDistinctSketch
+
+# Признаки модели в порядке столбцов матрицы
+FEATURE_NAMES: List[str] = [
+    # Базовые признаки
+    "visit_number",
+    "total_hits",
+    "unique_pages",
+    "session_duration",
+    "unique_events",
+    # Временные признаки
+    "visit_hour",
+    "visit_weekday",
+    "is_weekend",
+    "is_workday",
+    "is_morning",
+    "is_afternoon",
+    "is_evening",
+    "is_night",
+    # Признаки устройств
+    "is_mobile",
+    "is_android",
+    "is_ios",
+    "is_desktop",
+    "is_tablet",
+    "is_windows",
+    "is_macos",
+    # Источники трафика
+    "is_paid",
+    "is_organic",
+    "is_referral",
+    "is_direct",
+    # Поведенческие метрики
+    "avg_time_per_page",
+    "bounce_rate",
+    "deep_engagement",
+    "long_session",
+    "very_long_session",
+    "high_activity",
+    "very_high_activity",
+    "events_per_page",
+    "engagement_score",
+    # Признаки повторных посещений
+    "is_returning",
+    "is_frequent",
+    # Географические признаки
+    "is_moscow",
+    "is_spb",
+    "is_million_plus",
+    "is_regional_center",
+    "city_conversion_rate",
+    "city_avg_duration",
+    "city_avg_hits",
+    "city_tier_low",
+    "city_tier_medium",
+    "city_tier_high",
+    "city_tier_very_high",
+]
+
+SESSION_METRICS = ["total_hits", "unique_pages", "session_duration", "unique_events"]
+
+# Столбцы ga_sessions, из которых строятся признаки
+SESSION_FEATURE_COLUMNS = [
+    "session_id",
+    "visit_date",
+    "visit_time",
+    "visit_number",
+    "utm_medium",
+    "device_category",
+    "device_os",
+    "geo_city",
+]
+
+# Границы сегментов городов по конверсии (%): (0, 0.8], (0.8, 1.2], (1.2, 1.6], (1.6, 10]
+CITY_TIER_BOUNDS = [0.8, 1.2, 1.6]
+CITY_TIER_MAX_RATE = 10.0
+CITY_TIERS = ["low", "medium", "high", "very_high"]
+
+SECONDS_PER_DAY = 86400
+
+# 1970-01-01 - четверг, поэтому день недели (0=понедельник) равен (день + 3) % 7
+EPOCH_WEEKDAY = 3
+
+# Часть суток для каждого часа: 0 - ночь, 1 - утро, 2 - день, 3 - вечер
+_DAY_PART_BY_HOUR = np.array([0] * 6 + [1] * 6 + [2] * 6 + [3] * 6, dtype=np.int8)
+
+
+def visit_day_numbers(visit_date: pd.Series) -> np.ndarray:
+    """
+    Номер дня от 1970-01-01 для каждой даты визита
+
+    Строки и объекты date разбираются только для уникальных значений
+    (в данных их несколько сотен), после чего номера раскладываются по строкам
+    через коды factorize. Пропуски получают номер 0.
+    """
+    if pd.api.types.is_datetime64_any_dtype(visit_date):
+        values = visit_date.to_numpy(dtype="datetime64[ns]", na_value=np.datetime64(0, "ns"))
+        return values.astype("datetime64[D]").view(np.int64)
+
+    codes, uniques = pd.factorize(visit_date)
+    unique_days = pd.to_datetime(pd.Index(uniques)).to_numpy(dtype="datetime64[D]").view(np.int64)
+    # Код -1 (пропуск) берет последний элемент - дописываем 0
+    return np.append(unique_days, 0)[codes]
+
+
+def visit_seconds_of_day(visit_time: pd.Series) -> np.ndarray:
+    """
+    Количество секунд от начала суток для каждого времени визита
+
+    Поддерживаются строки "HH:MM:SS", объекты time, timedelta и datetime.
+    Как и для дат, разбираются только уникальные значения. Пропуски получают 0.
+    """
+    if pd.api.types.is_timedelta64_dtype(visit_time):
+        values = visit_time.to_numpy(dtype="timedelta64[s]", na_value=np.timedelta64(0, "s"))
+        return values.view(np.int64) % SECONDS_PER_DAY
+
+    if pd.api.types.is_datetime64_any_dtype(visit_time):
+        values = visit_time.to_numpy(dtype="datetime64[s]", na_value=np.datetime64(0, "s"))
+        return values.view(np.int64) % SECONDS_PER_DAY
+
+    codes, uniques = pd.factorize(visit_time)
+    if len(uniques) and isinstance(uniques[0], datetime.time):
+        unique_seconds = np.array(
+            [t.hour * 3600 + t.minute * 60 + t.second for t in uniques], dtype=np.int64
+        )
+    else:
+        unique_seconds = (
+            pd.to_timedelta(pd.Index(uniques).astype(str))
+            .to_numpy(dtype="timedelta64[s]")
+            .view(np.int64)
+        )
+    return np.append(unique_seconds % SECONDS_PER_DAY, 0)[codes]
+
+
+def temporal_features(visit_date: pd.Series, visit_time: pd.Series) -> Dict[str, np.ndarray]:
+    """
+    Временные признаки визита, посчитанные целочисленной арифметикой
+
+    Промежуточные строки и столбец datetime не создаются.
+
+    Returns:
+        dict: visit_hour, visit_weekday, is_weekend и флаги частей суток
+    """
+    days = visit_day_numbers(visit_date)
+    hours = (visit_seconds_of_day(visit_time) // 3600).astype(np.int8)
+    weekdays = ((days + EPOCH_WEEKDAY) % 7).astype(np.int8)
+    day_parts = _DAY_PART_BY_HOUR[hours]
+
+    return {
+        "visit_hour": hours,
+        "visit_weekday": weekdays,
+        "is_weekend": weekdays >= 5,
+        "is_night": day_parts == 0,
+        "is_morning": day_parts == 1,
+        "is_afternoon": day_parts == 2,
+        "is_evening": day_parts == 3,
+    }
+
+
+def target_hit_mask(event_action: pd.Series, target_actions: Sequence[str]) -> np.ndarray:
+    """
+    Флаг целевого хита: одно из целевых действий входит в event_action
+
+    Проверка подстрок выполняется только для уникальных событий.
+    """
+    codes, uniques = pd.factorize(event_action, use_na_sentinel=False)
+    unique_flags = np.array(
+        [any(key in str(event).lower() for key in target_actions) for event in uniques],
+        dtype=bool,
+    )
+    return unique_flags[codes]
+
+
+def _distinct_per_group(group_codes: np.ndarray, values: pd.Series, n_groups: int) -> np.ndarray:
+    """Число различных непустых значений в каждой группе"""
+    value_codes, uniques = pd.factorize(values)
+    n_values = max(len(uniques), 1)
+    keys = group_codes.astype(np.int64) * n_values + value_codes
+    keys = keys[value_codes >= 0]
+    return np.bincount(np.unique(keys) // n_values, minlength=n_groups)
+
+
+def _take_or_zero(values: np.ndarray, positions: np.ndarray) -> np.ndarray:
+    """values[positions], где позиция -1 (нет соответствия) дает 0"""
+    return np.append(np.asarray(values, dtype=np.float64), 0.0)[positions]
+
+
+def session_buckets(session_id: pd.Series, n_buckets: int) -> np.ndarray:
+    """Номер корзины для каждого session_id (стабильный хэш)"""
+    hashes = pd.util.hash_pandas_object(session_id.astype(str), index=False).to_numpy()
+    return (hashes % np.uint64(n_buckets)).astype(np.int64)
+
+
+def aggregate_sessions(
+    hits: pd.DataFrame, target_actions: Sequence[str], distinct_precision: Optional[int] = None
+) -> pd.DataFrame:
+    """
+    Агрегация хитов по сессиям
+
+    Args:
+        hits: Хиты
+        target_actions: Целевые действия
+        distinct_precision: Если задан, unique_pages и unique_events - оценки
+            HyperLogLog с 2**distinct_precision регистрами (distinct_sketch)
+            вместо точного подсчета
+
+    Returns:
+        DataFrame с индексом session_id и столбцами is_target, total_hits,
+        unique_pages, session_duration, unique_events
+    """
+    if hits["session_id"].isna().any():
+        hits = hits[hits["session_id"].notna()]
+
+    codes, session_ids = pd.factorize(hits["session_id"])
+    n_sessions = len(session_ids)
+
+    target_hits = target_hit_mask(hits["event_action"], target_actions)
+    is_target = np.bincount(codes, weights=target_hits, minlength=n_sessions) > 0
+
+    has_number = hits["hit_number"].notna().to_numpy()
+    total_hits = np.bincount(codes, weights=has_number, minlength=n_sessions)
+
+    # Длительность: max - min времени хита (пропуски не учитываются),
+    # для сессий из одного хита - 0
+    hit_time = hits["hit_time"].to_numpy(dtype=np.float64)
+    first = np.full(n_sessions, np.inf)
+    last = np.full(n_sessions, -np.inf)
+    np.fmin.at(first, codes, hit_time)
+    np.fmax.at(last, codes, hit_time)
+    multi_hit = np.bincount(codes, minlength=n_sessions) > 1
+    session_duration = np.where(multi_hit & np.isfinite(first), last - first, 0.0)
+
+    distinct = {}
+    for name, field in (("unique_pages", "hit_page_path"), ("unique_events", "event_action")):
+        if distinct_precision is None:
+            distinct[name] = _distinct_per_group(codes, hits[field], n_sessions)
+        else:
+            sketch = SessionDistinctSketch(field, distinct_precision)
+            distinct[name] = sketch.update(hits["session_id"], hits[field]).estimate(session_ids)
+
+    return pd.DataFrame(
+        {
+            "is_target": is_target.astype(np.int8),
+            "total_hits": total_hits,
+            "unique_pages": distinct["unique_pages"],
+            "session_duration": session_duration,
+            "unique_events": distinct["unique_events"],
+        },
+        index=pd.Index(session_ids, name="session_id"),
+    )
+
+
+def city_partial_stats(
+    geo_city: pd.Series,
+    is_target: np.ndarray,
+    session_duration: np.ndarray,
+    total_hits: np.ndarray,
+    has_hits: np.ndarray,
+) -> pd.DataFrame:
+    """
+    Суммы по городам, которые можно складывать между частями данных
+
+    Returns:
+        DataFrame с индексом geo_city и столбцами sessions, conversions,
+        duration_sum, hits_sum, hits_count
+    """
+    codes, cities = pd.factorize(geo_city)
+    valid = codes >= 0
+    codes = codes[valid]
+    n_cities = len(cities)
+
+    def city_sum(values: np.ndarray) -> np.ndarray:
+        return np.bincount(codes, weights=values[valid], minlength=n_cities)
+
+    return pd.DataFrame(
+        {
+            "sessions": np.bincount(codes, minlength=n_cities).astype(np.float64),
+            "conversions": city_sum(is_target.astype(np.float64)),
+            "duration_sum": city_sum(session_duration),
+            "hits_sum": city_sum(np.where(has_hits, total_hits, 0.0)),
+            "hits_count": city_sum(has_hits.astype(np.float64)),
+        },
+        index=pd.Index(cities, name="geo_city"),
+    )
+
+
+def city_rate_and_tier(
+    conversions: np.ndarray, sessions: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Конверсия города (%, два знака) и номер сегмента в CITY_TIERS
+
+    Города без сессий получают конверсию 0 и сегмент "low".
+    """
+    rate = np.round(_safe_divide(conversions, sessions) * 100, 2)
+    return rate, city_tier(rate)
+
+
+def city_tier(rate: np.ndarray) -> np.ndarray:
+    """Номер сегмента в CITY_TIERS по конверсии города (%)"""
+    # Города вне (0, 10] относятся к сегменту "low"
+    tier = np.searchsorted(CITY_TIER_BOUNDS, rate, side="left").astype(np.int8)
+    tier[(rate <= 0) | (rate > CITY_TIER_MAX_RATE)] = 0
+    return tier
+
+
+def finalize_city_stats(partial: pd.DataFrame) -> pd.DataFrame:
+    """
+    Статистика городов из сумм city_partial_stats
+
+    Returns:
+        DataFrame с индексом geo_city и столбцами city_conversion_rate,
+        city_tier (номер в CITY_TIERS), city_sessions, city_avg_duration, city_avg_hits
+    """
+    sessions = partial["sessions"].to_numpy()
+    rate, tier = city_rate_and_tier(partial["conversions"].to_numpy(), sessions)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        avg_hits = partial["hits_sum"].to_numpy() / partial["hits_count"].to_numpy()
+
+    return pd.DataFrame(
+        {
+            "city_conversion_rate": rate,
+            "city_tier": tier,
+            "city_sessions": sessions,
+            "city_avg_duration": partial["duration_sum"].to_numpy() / sessions,
+            "city_avg_hits": np.nan_to_num(avg_hits, nan=0.0),
+        },
+        index=partial.index,
+    )
+
+
+def _matches(values: pd.Series, targets: Sequence[str]) -> np.ndarray:
+    """Флаг совпадения значения столбца с одним из targets (сравнение кодов factorize)"""
+    codes, uniques = pd.factorize(values)
+    unique_flags = np.append(pd.Index(uniques).isin(targets), False)
+    return unique_flags[codes]
+
+
+def _safe_divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """Деление, где деление на ноль дает 0"""
+    result = np.zeros(len(numerator), dtype=np.float64)
+    np.divide(numerator, denominator, out=result, where=denominator != 0)
+    return result
+
+
+def align_session_metrics(
+    sessions: pd.DataFrame, session_metrics: pd.DataFrame
+) -> Dict[str, np.ndarray]:
+    """
+    Метрики сессий (aggregate_sessions) в порядке строк sessions
+
+    Сессии без хитов получают нули; флаг has_hits отмечает найденные сессии.
+    """
+    positions = session_metrics.index.get_indexer(sessions["session_id"])
+    metrics = {
+        name: _take_or_zero(session_metrics[name].to_numpy(), positions)
+        for name in ["is_target"] + SESSION_METRICS
+    }
+    metrics["has_hits"] = positions >= 0
+    return metrics
+
+
+def build_feature_matrix(
+    sessions: pd.DataFrame,
+    session_metrics: pd.DataFrame,
+    city_stats: Optional[pd.DataFrame] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Построение матрицы признаков в порядке FEATURE_NAMES
+
+    Все признаки записываются сразу в одну заранее выделенную матрицу float32
+    (по столбцам, Fortran-порядок), без промежуточных столбцов DataFrame.
+
+    Args:
+        sessions: Данные сессий
+        session_metrics: Результат aggregate_sessions
+        city_stats: Статистика городов (finalize_city_stats); если не задана,
+            считается по этим же сессиям
+
+    Returns:
+        tuple: матрица признаков (n_sessions, len(FEATURE_NAMES)) и целевая переменная int8
+    """
+    n_rows = len(sessions)
+    X = np.zeros((n_rows, len(FEATURE_NAMES)), dtype=np.float32, order="F")
+    column = {name: X[:, j] for j, name in enumerate(FEATURE_NAMES)}
+
+    # Метрики сессий
+    metrics = align_session_metrics(sessions, session_metrics)
+    for name in SESSION_METRICS:
+        column[name][:] = metrics[name]
+    y = metrics["is_target"].astype(np.int8)
+
+    total_hits = metrics["total_hits"]
+    unique_pages = metrics["unique_pages"]
+    duration = metrics["session_duration"]
+
+    visit_number = sessions["visit_number"].to_numpy(dtype=np.float64, na_value=0)
+    column["visit_number"][:] = visit_number
+    column["is_returning"][:] = visit_number > 1
+    column["is_frequent"][:] = visit_number >= 3
+
+    # Временные признаки
+    for name, values in temporal_features(sessions["visit_date"], sessions["visit_time"]).items():
+        column[name][:] = values
+    column["is_workday"][:] = column["is_weekend"] == 0
+
+    # Признаки устройств
+    for name, (source, value) in {
+        "is_mobile": ("device_category", "mobile"),
+        "is_desktop": ("device_category", "desktop"),
+        "is_tablet": ("device_category", "tablet"),
+        "is_android": ("device_os", "Android"),
+        "is_ios": ("device_os", "iOS"),
+        "is_windows": ("device_os", "Windows"),
+        "is_macos": ("device_os", "macOS"),
+    }.items():
+        column[name][:] = _matches(sessions[source], [value])
+
+    # Источники трафика
+    column["is_paid"][:] = ~_matches(sessions["utm_medium"], ["organic", "referral", "(none)"])
+    column["is_organic"][:] = _matches(sessions["utm_medium"], ["organic"])
+    column["is_referral"][:] = _matches(sessions["utm_medium"], ["referral"])
+    column["is_direct"][:] = _matches(sessions["utm_medium"], ["(none)"])
+
+    # Поведенческие метрики
+    column["avg_time_per_page"][:] = _safe_divide(duration, total_hits)
+    column["events_per_page"][:] = _safe_divide(metrics["unique_events"], unique_pages)
+    column["engagement_score"][:] = total_hits * unique_pages * duration / 1000
+    column["bounce_rate"][:] = total_hits == 1
+    column["deep_engagement"][:] = unique_pages >= 5
+    column["long_session"][:] = duration > 300
+    column["very_long_session"][:] = duration > 600
+    column["high_activity"][:] = total_hits >= 10
+    column["very_high_activity"][:] = total_hits >= 15
+
+    # Географические признаки
+    if city_stats is None:
+        city_stats = finalize_city_stats(
+            city_partial_stats(sessions["geo_city"], y, duration, total_hits, metrics["has_hits"])
+        )
+    fill_city_features(X, sessions["geo_city"], city_stats)
+
+    return X, y
+
+
+def fill_city_features(X: np.ndarray, geo_city: pd.Series, city_stats: pd.DataFrame) -> None:
+    """Запись географических признаков в матрицу X по статистике городов"""
+    column = {name: X[:, j] for j, name in enumerate(FEATURE_NAMES)}
+    codes, cities = pd.factorize(geo_city)
+
+    column["is_moscow"][:] = _matches(geo_city, ["Moscow"])
+    column["is_spb"][:] = _matches(geo_city, ["Saint Petersburg"])
+
+    # Города без статистики (и пропуски) получают нули и сегмент "low"
+    positions = np.append(city_stats.index.get_indexer(cities), -1)[codes]
+    for name in ["city_conversion_rate", "city_avg_duration", "city_avg_hits"]:
+        column[name][:] = _take_or_zero(city_stats[name].to_numpy(), positions)
+
+    city_sessions = _take_or_zero(city_stats["city_sessions"].to_numpy(), positions)
+    column["is_million_plus"][:] = city_sessions >= 1000
+    column["is_regional_center"][:] = city_sessions >= 500
+
+    tier = _take_or_zero(city_stats["city_tier"].to_numpy(), positions)
+    for value, name in enumerate(CITY_TIERS):
+        column[f"city_tier_{name}"][:] = tier == value
@@ -0,0 +1,139 @@
+"""
+Хешированные разреженные признаки для полей с большим числом значений
+
+utm_source, utm_campaign, utm_adcontent, geo_city и hit_page_path содержат
+тысячи значений, и one-hot кодирование растет вместе с их числом. Здесь
+значение поля "поле=значение" хешируется в одну из n_buckets корзин:
+ширина матрицы фиксирована, сколько бы кампаний и страниц ни появилось.
+
+- Поля сессии дают одну единицу в строке на поле.
+- hit_page_path дает число хитов сессии на страницах каждой корзины.
+
+Хешируются только различные значения (pd.factorize), строки получают
+корзину по коду значения, поэтому стоимость хеширования не зависит от числа
+хитов. Хеш - crc32, он одинаков между процессами (в отличие от hash()).
+
+Результат - scipy.sparse.csr_matrix float32. make_hashed_estimator -
+логистическая регрессия (SGD) на плотных признаках FEATURE_NAMES и этих
+корзинах, hashed_design_matrix собирает для нее общую разреженную матрицу.
+"""
+
+import zlib
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# Поля сессии и хитов, которые хешируются
+HASHED_SESSION_FIELDS = ["utm_source", "utm_campaign", "utm_adcontent", "geo_city"]
+HASHED_HIT_FIELDS = ["hit_page_path"]
+
+# Число корзин (ширина разреженной матрицы)
+N_HASH_BUCKETS = 2**18
+
+
+def hash_buckets(values: pd.Series, field: str, n_buckets: int = N_HASH_BUCKETS) -> np.ndarray:
+    """
+    Корзина значения поля для каждой строки
+
+    Args:
+        values: Значения поля
+        field: Имя поля (входит в хеш: одинаковые значения разных полей
+            попадают в разные корзины)
+        n_buckets: Число корзин
+
+    Returns:
+        ndarray: номер корзины, -1 для пропусков
+    """
+    codes, uniques = pd.factorize(values)
+    unique_buckets = (value_hashes(uniques, field) % n_buckets).astype(np.int64)
+    return np.append(unique_buckets, -1)[codes]
+
+
+def value_hashes(uniques: Any, field: str) -> np.ndarray:
+    """crc32 строк "поле=значение" для различных значений поля (uint64)"""
+    prefix = f"{field}=".encode()
+    return np.fromiter(
+        (zlib.crc32(prefix + str(value).encode()) for value in uniques),
+        dtype=np.uint64,
+        count=len(uniques),
+    )
+
+
+def hashed_feature_matrix(
+    sessions: pd.DataFrame,
+    hits: Optional[pd.DataFrame] = None,
+    n_buckets: int = N_HASH_BUCKETS,
+) -> sparse.csr_matrix:
+    """
+    Разреженная матрица хешированных признаков в порядке строк sessions
+
+    Args:
+        sessions: Сессии (поля HASHED_SESSION_FIELDS, отсутствующие пропускаются)
+        hits: Хиты (session_id и HASHED_HIT_FIELDS); None - только поля сессий
+        n_buckets: Число корзин
+
+    Returns:
+        csr_matrix: (len(sessions), n_buckets), float32; совпавшие корзины суммируются
+    """
+    rows, columns = [], []
+    session_rows = np.arange(len(sessions))
+    for field in HASHED_SESSION_FIELDS:
+        if field in sessions:
+            rows.append(session_rows)
+            columns.append(hash_buckets(sessions[field], field, n_buckets))
+
+    if hits is not None and len(hits):
+        hit_rows = pd.Index(sessions["session_id"]).get_indexer(hits["session_id"])
+        for field in HASHED_HIT_FIELDS:
+            if field in hits:
+                rows.append(hit_rows)
+                columns.append(hash_buckets(hits[field], field, n_buckets))
+
+    if not rows:
+        return sparse.csr_matrix((len(sessions), n_buckets), dtype=np.float32)
+    row = np.concatenate(rows)
+    column = np.concatenate(columns)
+    # Пропуски значений и хиты вне sessions не учитываются
+    valid = (row >= 0) & (column >= 0)
+    matrix = sparse.csr_matrix(
+        (np.ones(int(valid.sum()), dtype=np.float32), (row[valid], column[valid])),
+        shape=(len(sessions), n_buckets),
+    )
+    matrix.sum_duplicates()
+    return matrix
+
+
+def hashed_design_matrix(X: np.ndarray, hashed: sparse.spmatrix) -> sparse.csr_matrix:
+    """Плотные признаки и хешированные корзины в одной разреженной матрице"""
+    return sparse.hstack([sparse.csr_matrix(np.asarray(X, dtype=np.float32)), hashed], format="csr")
+
+
+def make_hashed_estimator(
+    class_weight: Optional[Dict[int, float]] = None, random_state: int = 42
+) -> Any:
+    """
+    Логистическая регрессия для hashed_design_matrix
+
+    MaxAbsScaler масштабирует столбцы, не разрушая разреженность, SGD
+    обучается за линейное время от числа ненулевых элементов. Память модели -
+    n_buckets + len(FEATURE_NAMES) коэффициентов.
+    """
+    # sklearn импортируется здесь: value_hashes нужен features (и процессам
+    # parallel_features), которым sklearn не нужен
+    from sklearn.linear_model import SGDClassifier
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import MaxAbsScaler
+
+    return make_pipeline(
+        MaxAbsScaler(),
+        SGDClassifier(
+            loss="log_loss",
+            alpha=1e-5,
+            max_iter=20,
+            tol=1e-4,
+            class_weight=class_weight,
+            random_state=random_state,
+        ),
+    )
@@ -0,0 +1,187 @@
+"""
+Признаки последовательности хитов внутри сессии
+
+aggregate_sessions хранит только число хитов и различных страниц/событий,
+порядок hit_page_path и event_action в сессии теряется. Здесь хиты
+упорядочиваются по (session_id, hit_number) один раз, и все признаки
+считаются одним проходом по сдвинутым массивам NumPy, без цикла Python по
+хитам:
+- хешированные биграммы и триграммы переходов страниц и событий
+  (scipy.sparse.csr_matrix в корзинах hashed_features);
+- номер хита и время до первого ключевого действия (KEY_EVENTS), доля
+  ключевых хитов.
+
+Целевые хиты (target_actions) в последовательность не входят: по ним
+строится целевая переменная, и n-грамма с целевым событием - утечка метки.
+
+Хеш n-граммы смешивает crc32 значений (value_hashes) целочисленной
+арифметикой uint64, поэтому корзины одинаковы между процессами и наборами
+данных, а строки хешируются только для различных значений.
+"""
+
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from features import target_hit_mask
+from hashed_features import N_HASH_BUCKETS, value_hashes
+from scipy import sparse
+
+# Поля, переходы между значениями которых кодируются n-граммами
+SEQUENCE_FIELDS = ["hit_page_path", "event_action"]
+NGRAM_ORDERS = (2, 3)
+
+# Действия интереса к автомобилю, предшествующие целевым
+KEY_EVENTS = ["go_to_car_card", "view_card", "showed_number_ads", "photos"]
+
+SEQUENCE_FEATURE_NAMES = [
+    "hits_to_first_key_event",
+    "time_to_first_key_event",
+    "has_key_event",
+    "key_event_share",
+]
+
+# Множитель смешивания хешей (золотое сечение, 64 бита)
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+
+def sort_hits(hits: pd.DataFrame) -> Tuple[Optional[np.ndarray], np.ndarray, pd.Index]:
+    """
+    Порядок хитов по (session_id, hit_number)
+
+    Выгрузка GA обычно уже сгруппирована по сессиям и упорядочена по
+    hit_number: это проверяется за один проход, и сортировка пропускается.
+
+    Returns:
+        tuple: перестановка строк (None - уже упорядочены), код сессии каждой
+        строки в новом порядке, session_id по кодам
+    """
+    codes, session_ids = pd.factorize(hits["session_id"])
+    hit_number = hits["hit_number"].to_numpy(dtype=np.float64, na_value=np.nan)
+    step = np.diff(codes)
+    same_session = step == 0
+    if (step >= 0).all() and (np.diff(hit_number)[same_session] >= 0).all():
+        return None, codes, session_ids
+    order = np.lexsort((hit_number, codes))
+    return order, codes[order], session_ids
+
+
+def ngram_hashes(token_hashes: np.ndarray, order: int) -> np.ndarray:
+    """
+    Хеши n-грамм, оканчивающихся на строках order-1 ... len-1
+
+    Цикл идет по позициям внутри n-граммы (order итераций), а не по хитам.
+    """
+    n_grams = len(token_hashes) - order + 1
+    if n_grams <= 0:
+        return np.zeros(0, dtype=np.uint64)
+    mixed = np.full(n_grams, np.uint64(order))
+    for k in range(order):
+        mixed = (mixed ^ token_hashes[k : k + n_grams]) * _MIX
+        mixed ^= mixed >> np.uint64(29)
+    return mixed
+
+
+def sequence_features(
+    hits: pd.DataFrame,
+    target_actions: Sequence[str],
+    session_ids: Optional[Sequence[str]] = None,
+    n_buckets: int = N_HASH_BUCKETS,
+) -> Tuple[sparse.csr_matrix, pd.DataFrame]:
+    """
+    n-граммы переходов и признаки ключевых действий одним проходом
+
+    Args:
+        hits: Хиты (session_id, hit_number, hit_time и SEQUENCE_FIELDS)
+        target_actions: Целевые действия (такие хиты исключаются)
+        session_ids: Порядок строк результата (None - порядок сессий в hits);
+            сессии без хитов получают нули
+        n_buckets: Число корзин n-грамм
+
+    Returns:
+        tuple: csr_matrix (n_sessions, n_buckets) float32 с числом n-грамм и
+        DataFrame SEQUENCE_FEATURE_NAMES с индексом session_id
+    """
+    keep = hits["session_id"].notna().to_numpy() & ~target_hit_mask(
+        hits["event_action"], target_actions
+    )
+    if not keep.all():
+        hits = hits[keep]
+
+    order, codes, unique_ids = sort_hits(hits)
+    n_codes = len(unique_ids)
+    if session_ids is None:
+        session_ids = unique_ids
+    output_index = pd.Index(session_ids, name="session_id")
+    # Строка результата для каждого кода сессии (-1 - сессия не запрошена)
+    output_rows = output_index.get_indexer(unique_ids)
+
+    def sorted_values(values: np.ndarray) -> np.ndarray:
+        return values if order is None else values[order]
+
+    # Границы сессий в упорядоченных хитах
+    n_hits = len(codes)
+    new_session = np.ones(n_hits, dtype=bool)
+    new_session[1:] = codes[1:] != codes[:-1]
+    starts = np.flatnonzero(new_session)
+    position = np.arange(n_hits) - np.repeat(starts, np.diff(np.append(starts, n_hits)))
+
+    # n-граммы: токен - crc32 значения поля, n-грамма внутри одной сессии
+    rows: List[np.ndarray] = []
+    columns: List[np.ndarray] = []
+    for field in SEQUENCE_FIELDS:
+        value_codes, uniques = pd.factorize(hits[field], use_na_sentinel=False)
+        tokens = value_hashes(uniques, field)[sorted_values(value_codes)]
+        for ngram_order in NGRAM_ORDERS:
+            ends = np.arange(ngram_order - 1, n_hits)
+            valid = position[ends] >= ngram_order - 1
+            ngram_rows = output_rows[codes[ends[valid]]]
+            buckets = ngram_hashes(tokens, ngram_order)[valid] % np.uint64(n_buckets)
+            requested = ngram_rows >= 0
+            rows.append(ngram_rows[requested])
+            columns.append(buckets[requested].astype(np.int64))
+
+    row = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64)
+    column = np.concatenate(columns) if columns else np.zeros(0, dtype=np.int64)
+    matrix = sparse.csr_matrix(
+        (np.ones(len(row), dtype=np.float32), (row, column)),
+        shape=(len(output_index), n_buckets),
+    )
+    matrix.sum_duplicates()
+
+    # Первое ключевое действие: первая ключевая строка каждой сессии
+    key = sorted_values(target_hit_mask(hits["event_action"], KEY_EVENTS))
+    hit_time = sorted_values(hits["hit_time"].to_numpy(dtype=np.float64, na_value=np.nan))
+    key_rows = np.flatnonzero(key)
+    first = np.ones(len(key_rows), dtype=bool)
+    first[1:] = codes[key_rows[1:]] != codes[key_rows[:-1]]
+    first_key = key_rows[first]
+    first_key_codes = codes[first_key]
+    session_start = np.zeros(n_codes)
+    session_start[codes[starts]] = hit_time[starts]
+
+    hits_to_first = np.zeros(n_codes)
+    hits_to_first[first_key_codes] = position[first_key] + 1
+    time_to_first = np.zeros(n_codes)
+    time_to_first[first_key_codes] = np.nan_to_num(
+        hit_time[first_key] - session_start[first_key_codes]
+    )
+    has_key = np.zeros(n_codes)
+    has_key[first_key_codes] = 1
+    key_share = np.bincount(codes, weights=key, minlength=n_codes) / np.maximum(
+        np.bincount(codes, minlength=n_codes), 1
+    )
+
+    # Строки результата по кодам сессий; -1 (сессия без хитов) дает 0
+    positions = unique_ids.get_indexer(output_index)
+    features = pd.DataFrame(
+        {
+            name: np.append(values, 0.0)[positions]
+            for name, values in zip(
+                SEQUENCE_FEATURE_NAMES, (hits_to_first, time_to_first, has_key, key_share)
+            )
+        },
+        index=output_index,
+        dtype=np.float32,
+    )
+    return matrix, features
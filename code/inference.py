@@ -0,0 +1,235 @@
+"""
+Модель для предсказаний без обучения: только NumPy и сохраненная папка модели
+
+API, теневые процессы и процессы заданий загружают модель через
+InferenceModel: импорт модуля не тянет pandas и sklearn, поэтому запуск
+процесса занимает десятки миллисекунд, а не секунды. SberAutoModel
+наследует от InferenceModel и добавляет обучение.
+
+Прежний формат .pkl загружается тоже, но при этом импортируется sklearn.
+"""
+
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from feature_schema import FeatureSchema, SchemaValidationError
+from model_artifact import TreeEnsemble, load_artifact
+from model_metadata import build_metadata
+
+# Модель по умолчанию: папка с массивами деревьев и manifest.json (см. model_artifact)
+DEFAULT_MODEL_PATH = "../build/sber_auto_model"
+
+# Доступные движки модели
+MODEL_ENGINES = ("random_forest", "hist_gradient_boosting")
+
+
+def format_prediction(prediction: int, probability: float) -> Dict[str, Any]:
+    """
+    Ответ предсказания с дополнительной информацией
+
+    Args:
+        prediction (int): Предсказанный класс
+        probability (float): Вероятность конверсии
+
+    Returns:
+        dict: Результат предсказания
+    """
+    confidence_level = (
+        "высокая" if probability > 0.7 else "средняя" if probability > 0.3 else "низкая"
+    )
+
+    return {
+        "prediction": prediction,
+        "probability": probability,
+        "will_convert": bool(prediction),
+        "conversion_probability": f"{probability * 100:.2f}%",
+        "confidence_level": confidence_level,
+    }
+
+
+def format_error(session_id: int, error: Exception) -> Dict[str, Any]:
+    """Результат пакетного предсказания для строки с ошибкой"""
+    result: Dict[str, Any] = {"session_id": session_id, "error": str(error)}
+    if isinstance(error, SchemaValidationError):
+        result["fields"] = error.errors
+    result.update(
+        {
+            "prediction": 0,
+            "probability": 0.0,
+            "will_convert": False,
+            "conversion_probability": "0.00%",
+        }
+    )
+    return result
+
+
+class InferenceModel:
+    """
+    Загруженная модель: проверка запросов и предсказания
+
+    Args:
+        engine (str): Движок модели из MODEL_ENGINES (по умолчанию случайный лес)
+    """
+
+    def __init__(self, engine: str = "random_forest") -> None:
+        if engine not in MODEL_ENGINES:
+            raise ValueError(
+                f"Неизвестный движок модели: {engine}. Доступные: {', '.join(MODEL_ENGINES)}"
+            )
+        self.engine = engine
+        self.model: Optional[Any] = None
+        self.feature_names: Optional[List[str]] = None
+        self.target_actions: Optional[List[str]] = None
+        self.metrics: Dict[str, Any] = {}
+        self.data_fingerprint: Optional[str] = None
+        # Диапазоны признаков на обучающей выборке (см. model_metadata.feature_ranges)
+        self.feature_ranges: Optional[Dict[str, Dict[str, float]]] = None
+        self._schema: Optional[FeatureSchema] = None
+        self._metadata: Optional[Dict[str, Any]] = None
+
+    def load_model(self, filename: str = DEFAULT_MODEL_PATH) -> None:
+        """Загрузка модели (папка модели или файл .pkl прежнего формата)"""
+        print(f"📂 Загружаем модель из {filename}...")
+
+        if os.path.isdir(filename):
+            self.model, manifest = load_artifact(filename)
+            self.engine = manifest["engine"]
+            self.feature_names = manifest["feature_names"]
+            self.target_actions = manifest["target_actions"]
+            self.metrics = manifest["metrics"]
+            self.data_fingerprint = manifest["data_fingerprint"]
+            self.feature_ranges = manifest.get("feature_ranges")
+        else:
+            # pickle сам импортирует sklearn при восстановлении модели
+            import pickle
+
+            with open(filename, "rb") as f:
+                model_data = pickle.load(f)
+
+            self.model = model_data["model"]
+            self.engine = model_data.get("engine", "random_forest")
+            self.feature_names = model_data["feature_names"]
+            self.target_actions = model_data["target_actions"]
+            self.feature_ranges = model_data.get("feature_ranges")
+
+        self._metadata = None
+        self.metadata()
+        print("✅ Модель загружена")
+
+    def predict(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Предсказание для новых данных
+
+        Args:
+            data (dict): Словарь с признаками сессии
+
+        Returns:
+            dict: Результат предсказания с дополнительной информацией
+        """
+        if self.model is None:
+            raise ValueError("Модель не загружена. Сначала загрузите или обучите модель.")
+
+        if self.feature_names is None:
+            raise ValueError("Признаки модели не загружены.")
+
+        # Проверка запроса и сборка строки признаков (недостающие признаки = 0)
+        X = self.feature_schema().assemble(data)
+
+        # Предсказание: класс по порогу 0.5, как predict у моделей проекта
+        probability = float(self.predict_proba_rows(X)[0])
+
+        return format_prediction(int(probability > 0.5), probability)
+
+    def predict_proba_rows(self, X: np.ndarray) -> np.ndarray:
+        """Вероятности конверсии для матрицы признаков в порядке feature_names"""
+        rows: Any = X
+        if hasattr(self.model, "feature_names_in_"):
+            # Модель sklearn, обученная на DataFrame, ожидает имена столбцов
+            import pandas as pd
+
+            rows = pd.DataFrame(X, columns=self.feature_names)
+        return self.model.predict_proba(rows)[:, 1]
+
+    def n_trees(self) -> int:
+        """Число деревьев ансамбля"""
+        model = self.model
+        if hasattr(model, "city_rate_"):
+            # CityTargetEncodingClassifier: деревья базовой модели
+            model = model.estimator_
+        if hasattr(model, "negative_rate") and hasattr(model, "estimator_"):
+            # NegativeDownsamplingClassifier: деревья базовой модели
+            model = model.estimator_
+        if isinstance(model, TreeEnsemble):
+            return model.n_trees
+        if hasattr(model, "estimators_"):
+            return len(model.estimators_)
+        return int(model.n_iter_)
+
+    def predict_proba_anytime(
+        self, X: np.ndarray, budget_ms: Optional[float] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Вероятности с досрочной остановкой обхода деревьев (TreeEnsemble.predict_proba_anytime)
+
+        Модель sklearn (до сохранения в папку) считает все деревья.
+
+        Returns:
+            tuple: вероятности и число использованных деревьев для каждой строки
+        """
+        if isinstance(self.model, TreeEnsemble):
+            return self.model.predict_proba_anytime(X, budget_ms=budget_ms)
+        return self.predict_proba_rows(X), np.full(len(X), self.n_trees())
+
+    def feature_schema(self) -> FeatureSchema:
+        """Схема признаков модели (компилируется при смене feature_names)"""
+        if self._schema is None or self._schema.feature_names != self.feature_names:
+            self._schema = FeatureSchema(self.feature_names or [])
+        return self._schema
+
+    def metadata(self) -> Dict[str, Any]:
+        """Метаданные признаков (model_metadata.build_metadata), считаются один раз"""
+        names = self.feature_names or []
+        if self._metadata is None or self._metadata["features"] != names:
+            self._metadata = build_metadata(names, self.feature_ranges)
+        return self._metadata
+
+    def predict_batch(self, data_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Пакетное предсказание с обработкой ошибок
+
+        Корректные строки собираются в одну матрицу и считаются одним вызовом
+        модели, для некорректных возвращается ошибка (по полям в "fields").
+
+        Args:
+            data_list (list): Список словарей с признаками сессий
+
+        Returns:
+            list: Список результатов предсказаний
+        """
+        if self.model is None:
+            raise ValueError("Модель не загружена. Сначала загрузите или обучите модель.")
+
+        schema = self.feature_schema()
+        X = np.zeros((len(data_list), len(schema.feature_names)))
+        errors: Dict[int, Exception] = {}
+        for i, data in enumerate(data_list):
+            try:
+                schema.assemble(data, out=X[i])
+            except SchemaValidationError as e:
+                errors[i] = e
+
+        valid = [i for i in range(len(data_list)) if i not in errors]
+        probabilities = np.zeros(len(data_list))
+        if valid:
+            probabilities[valid] = self.predict_proba_rows(X[valid])
+
+        results = []
+        for i, probability in enumerate(probabilities.tolist()):
+            if i in errors:
+                results.append(format_error(i, errors[i]))
+            else:
+                result = format_prediction(int(probability > 0.5), probability)
+                result["session_id"] = i
+                results.append(result)
+        return results
@@ -0,0 +1,420 @@
+"""
+Асинхронные задания скоринга больших файлов
+
+Задание - папка в JOBS_DIR с входным файлом (CSV или JSONL), status.json и
+результатами. Пул процессов считает задание по шагам:
+1. подготовка: чтение входа, признаки истории клиента для строк с
+   client_id (как у /predict), векторная проверка схемой признаков модели,
+   матрица признаков features.npy;
+2. скоринг: блоки по chunk_rows строк считаются параллельно в процессах
+   пула (матрица отображается в память), каждый блок пишется в parts/;
+3. сборка: results.csv (строка, session_id, класс, вероятность, ошибка).
+
+Каждый шаг пишет результат атомарно (временный файл + os.replace), а
+status.json обновляется после каждого блока. После перезапуска API
+незавершенные задания продолжаются с первого непосчитанного блока.
+
+Структура папки задания:
+    status.json, input.csv | input.jsonl,
+    features.npy, errors.json, ids.npy, parts/00000.npy ..., results.csv
+"""
+
+import json
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_JOBS_DIR = "../build/jobs"
+STATUS_NAME = "status.json"
+RESULTS_NAME = "results.csv"
+INPUT_FORMATS = ("csv", "jsonl")
+
+# Размер блока скоринга: блоки считаются параллельно процессами пула
+JOB_CHUNK_ROWS = 50_000
+
+# Модели, загруженные в процессе пула (путь -> InferenceModel)
+_worker_models: Dict[str, Any] = {}
+
+# Индексы истории клиентов, открытые в процессе пула (путь -> ClientHistoryIndex)
+_worker_client_histories: Dict[str, Any] = {}
+
+
+def _write_atomic(path: str, write: Callable[[str], None]) -> None:
+    """Запись файла через временное имя и os.replace"""
+    staging = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    write(staging)
+    os.replace(staging, path)
+
+
+def _write_json(path: str, data: Dict[str, Any]) -> None:
+    """Атомарная запись JSON"""
+
+    def write(staging: str) -> None:
+        with open(staging, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+    _write_atomic(path, write)
+
+
+def _save_array(path: str, array: np.ndarray) -> None:
+    """Атомарная запись массива .npy"""
+
+    def write(staging: str) -> None:
+        with open(staging, "wb") as f:
+            np.save(f, array)
+
+    _write_atomic(path, write)
+
+
+def _worker_model(model_path: str) -> Any:
+    """Модель в процессе пула (загружается один раз на процесс)"""
+    if model_path not in _worker_models:
+        from inference import InferenceModel
+
+        model = InferenceModel()
+        model.load_model(model_path)
+        _worker_models[model_path] = model
+    return _worker_models[model_path]
+
+
+def _worker_client_history(path: str) -> Any:
+    """Индекс истории клиентов в процессе пула (открывается один раз на процесс)"""
+    if path not in _worker_client_histories:
+        from client_history import ClientHistoryIndex
+
+        _worker_client_histories[path] = ClientHistoryIndex(path)
+    return _worker_client_histories[path]
+
+
+def _add_client_history(
+    columns: Dict[str, np.ndarray], frame: Any, feature_names: List[str], path: str
+) -> None:
+    """
+    Признаки истории клиента в столбцы columns для строк с client_id (на месте)
+
+    Один векторный ClientHistoryIndex.lookup на все строки. Значения, заданные
+    во входе явно, не заменяются; время сессии - столбец visit_timestamp,
+    иначе local_now(), как в client_history_rows.
+    """
+    import pandas as pd
+    from client_history import CLIENT_HISTORY_FEATURES, local_now
+
+    names = [name for name in CLIENT_HISTORY_FEATURES if name in feature_names]
+    rows = np.flatnonzero(frame["client_id"].notna().to_numpy())
+    if not names or not len(rows):
+        return
+    timestamps = np.full(len(rows), local_now())
+    if "visit_timestamp" in frame:
+        given = pd.to_numeric(frame["visit_timestamp"], errors="coerce").to_numpy(np.float64)
+        timestamps = np.where(np.isnan(given[rows]), timestamps, given[rows])
+    history = _worker_client_history(path).lookup(frame["client_id"].to_numpy()[rows], timestamps)
+    for j, name in enumerate(CLIENT_HISTORY_FEATURES):
+        if name not in names:
+            continue
+        values = np.array(columns.get(name, np.full(len(frame), np.nan)), dtype=np.float64)
+        columns[name] = values
+        missing = np.isnan(values[rows])
+        values[rows[missing]] = history[missing, j]
+
+
+def _prepare_job(
+    job_dir: str, model_path: str, input_name: str, client_history_path: Optional[str] = None
+) -> Tuple[int, int]:
+    """
+    Шаг 1: входной файл -> features.npy, errors.json, ids.npy
+
+    Args:
+        client_history_path: Индекс истории клиентов (None - строки не дополняются)
+
+    Returns:
+        tuple: число строк и число некорректных строк
+    """
+    # pandas нужен только процессам пула, API импортирует модуль без него
+    import pandas as pd
+
+    schema = _worker_model(model_path).feature_schema()
+    input_path = os.path.join(job_dir, input_name)
+    # Идентификаторы - строки, как при обучении ("1234.5678" не становится числом)
+    dtype = {"session_id": str, "client_id": str}
+    if input_name.endswith(".csv"):
+        frame = pd.read_csv(input_path, dtype=dtype)
+    else:
+        frame = pd.read_json(input_path, lines=True, dtype=dtype)
+
+    errors: Dict[int, Dict[str, str]] = {}
+    columns = {}
+    for name in schema.feature_names:
+        if name not in frame:
+            continue
+        values = pd.to_numeric(frame[name], errors="coerce").to_numpy(dtype=np.float64)
+        # Нечисловые значения (после приведения NaN, хотя в файле не пусто)
+        for row in np.flatnonzero(np.isnan(values) & frame[name].notna().to_numpy()).tolist():
+            errors.setdefault(row, {})[name] = "ожидается число"
+        columns[name] = values
+    if client_history_path is not None and "client_id" in frame:
+        _add_client_history(columns, frame, schema.feature_names, client_history_path)
+    X, range_errors = schema.assemble_columns(columns, len(frame))
+    for row, fields in range_errors.items():
+        errors.setdefault(row, {}).update(fields)
+
+    if "session_id" in frame:
+        _save_array(os.path.join(job_dir, "ids.npy"), frame["session_id"].to_numpy(dtype=str))
+    _write_json(os.path.join(job_dir, "errors.json"), {str(k): v for k, v in errors.items()})
+    _save_array(os.path.join(job_dir, "features.npy"), X)
+    return len(frame), len(errors)
+
+
+def _score_chunk(job_dir: str, model_path: str, index: int, start: int, stop: int) -> int:
+    """Шаг 2: вероятности строк [start, stop) -> parts/{index}.npy"""
+    model = _worker_model(model_path)
+    X = np.load(os.path.join(job_dir, "features.npy"), mmap_mode="r")
+    probabilities = model.predict_proba_rows(np.asarray(X[start:stop]))
+    _save_array(os.path.join(job_dir, "parts", f"{index:05d}.npy"), probabilities)
+    return stop - start
+
+
+def _merge_job(job_dir: str, n_chunks: int) -> None:
+    """Шаг 3: parts/ + errors.json -> results.csv"""
+    import pandas as pd
+
+    probability = np.concatenate(
+        [np.load(os.path.join(job_dir, "parts", f"{i:05d}.npy")) for i in range(n_chunks)]
+    )
+    with open(os.path.join(job_dir, "errors.json"), encoding="utf-8") as f:
+        errors = {int(row): fields for row, fields in json.load(f).items()}
+
+    results = pd.DataFrame({"row": np.arange(len(probability))})
+    ids_path = os.path.join(job_dir, "ids.npy")
+    if os.path.exists(ids_path):
+        results["session_id"] = np.load(ids_path)
+    invalid = np.array(sorted(errors), dtype=np.int64)
+    probability[invalid] = 0.0
+    results["prediction"] = (probability > 0.5).astype(int)
+    results["probability"] = probability
+    results["error"] = pd.Series(
+        {row: json.dumps(fields, ensure_ascii=False) for row, fields in errors.items()},
+        dtype=object,
+    )
+    _write_atomic(
+        os.path.join(job_dir, RESULTS_NAME), lambda path: results.to_csv(path, index=False)
+    )
+
+
+class JobManager:
+    """
+    Задания скоринга: хранение на диске и выполнение в пуле процессов
+
+    Args:
+        root (str): Папка заданий
+        workers (int, optional): Процессов пула (по умолчанию - число ядер)
+        chunk_rows (int): Строк в блоке скоринга
+        client_history_path (str, optional): Индекс истории клиентов; строки
+            заданий с client_id дополняются его признаками, если он существует
+    """
+
+    def __init__(
+        self,
+        root: str = DEFAULT_JOBS_DIR,
+        workers: Optional[int] = None,
+        chunk_rows: int = JOB_CHUNK_ROWS,
+        client_history_path: Optional[str] = None,
+    ) -> None:
+        self.root = root
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_rows = chunk_rows
+        self.client_history_path = client_history_path
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._running: Dict[str, threading.Thread] = {}
+
+    def pool(self) -> ProcessPoolExecutor:
+        """Пул процессов (создается при первом задании)"""
+        with self._lock:
+            if self._pool is None:
+                # spawn: процессы пула не наследуют потоки и блокировки сервера
+                self._pool = ProcessPoolExecutor(
+                    self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+    def job_path(self, job_id: str) -> str:
+        """
+        Папка задания
+
+        Raises:
+            KeyError: задания нет
+        """
+        path = os.path.join(self.root, job_id)
+        if os.path.basename(job_id) != job_id or job_id.startswith(".") or not os.path.isdir(path):
+            raise KeyError(job_id)
+        return path
+
+    def jobs(self) -> List[str]:
+        """Идентификаторы заданий (по времени создания)"""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root) if not name.startswith("."))
+
+    def status(self, job_id: str) -> Dict[str, Any]:
+        """Состояние задания из status.json"""
+        with open(os.path.join(self.job_path(job_id), STATUS_NAME), encoding="utf-8") as f:
+            return json.load(f)
+
+    def _update(self, job_id: str, **fields: Any) -> Dict[str, Any]:
+        """Обновление status.json"""
+        status = {**self.status(job_id), **fields}
+        _write_json(os.path.join(self.job_path(job_id), STATUS_NAME), status)
+        return status
+
+    def result_path(self, job_id: str) -> Optional[str]:
+        """Файл результатов (None - задание не завершено)"""
+        path = os.path.join(self.job_path(job_id), RESULTS_NAME)
+        return path if self.status(job_id)["state"] == "done" else None
+
+    def submit(
+        self,
+        save_input: Callable[[str], None],
+        input_format: str,
+        model_version: Optional[str],
+        model_path: str,
+    ) -> Dict[str, Any]:
+        """
+        Создание и запуск задания
+
+        Папка задания собирается под временным именем и переименовывается,
+        когда вход и status.json записаны.
+
+        Args:
+            save_input: Функция записи входных данных по пути файла
+            input_format: "csv" или "jsonl"
+            model_version: Версия модели, которой считается задание
+            model_path: Папка (или файл) этой версии модели
+
+        Returns:
+            dict: Состояние созданного задания
+        """
+        if input_format not in INPUT_FORMATS:
+            raise ValueError(f"Неподдерживаемый формат входа: {input_format}")
+        job_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        staging = os.path.join(self.root, f".{job_id}")
+        os.makedirs(os.path.join(staging, "parts"))
+        try:
+            input_name = f"input.{input_format}"
+            save_input(os.path.join(staging, input_name))
+            status = {
+                "job_id": job_id,
+                "state": "queued",
+                "created": time.time(),
+                "model_version": model_version,
+                "model_path": os.path.abspath(model_path),
+                "client_history_path": (
+                    os.path.abspath(self.client_history_path)
+                    if self.client_history_path and os.path.exists(self.client_history_path)
+                    else None
+                ),
+                "input": input_name,
+                "rows": None,
+                "invalid_rows": None,
+                "chunks_total": None,
+                "chunks_done": 0,
+                "progress": 0.0,
+            }
+            _write_json(os.path.join(staging, STATUS_NAME), status)
+            os.replace(staging, os.path.join(self.root, job_id))
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        self.start(job_id)
+        return status
+
+    def start(self, job_id: str) -> None:
+        """Запуск выполнения задания в фоновом потоке-координаторе"""
+        with self._lock:
+            if job_id in self._running and self._running[job_id].is_alive():
+                return
+            thread = threading.Thread(target=self._run, args=(job_id,), daemon=True)
+            self._running[job_id] = thread
+        thread.start()
+
+    def resume(self) -> List[str]:
+        """Продолжение незавершенных заданий (после перезапуска API)"""
+        resumed = [job for job in self.jobs() if self.status(job)["state"] in ("queued", "running")]
+        for job_id in resumed:
+            self.start(job_id)
+        return resumed
+
+    def _run(self, job_id: str) -> None:
+        """Координатор задания: подготовка, блоки в пуле, сборка"""
+        job_dir = self.job_path(job_id)
+        status = self.status(job_id)
+        model_path = status["model_path"]
+        try:
+            status = self._update(job_id, state="running", started=time.time())
+            pool = self.pool()
+            if status["rows"] is None or not os.path.exists(os.path.join(job_dir, "features.npy")):
+                rows, invalid = pool.submit(
+                    _prepare_job,
+                    job_dir,
+                    model_path,
+                    status["input"],
+                    status.get("client_history_path"),
+                ).result()
+                status = self._update(
+                    job_id,
+                    rows=rows,
+                    invalid_rows=invalid,
+                    chunks_total=max(1, -(-rows // self.chunk_rows)),
+                    chunk_rows=self.chunk_rows,
+                )
+
+            rows, chunk_rows, n_chunks = (
+                status["rows"],
+                status["chunk_rows"],
+                status["chunks_total"],
+            )
+            pending = [
+                i
+                for i in range(n_chunks)
+                if not os.path.exists(os.path.join(job_dir, "parts", f"{i:05d}.npy"))
+            ]
+            done = n_chunks - len(pending)
+            futures = [
+                pool.submit(
+                    _score_chunk,
+                    job_dir,
+                    model_path,
+                    i,
+                    i * chunk_rows,
+                    min(rows, (i + 1) * chunk_rows),
+                )
+                for i in pending
+            ]
+            for future in as_completed(futures):
+                future.result()
+                done += 1
+                self._update(job_id, chunks_done=done, progress=round(done / n_chunks, 4))
+
+            pool.submit(_merge_job, job_dir, n_chunks).result()
+            finished = time.time()
+            self._update(
+                job_id,
+                state="done",
+                finished=finished,
+                rows_per_s=round(rows / max(finished - status["started"], 1e-9)),
+            )
+        except Exception as e:
+            self._update(job_id, state="failed", error=str(e), finished=time.time())
+
+    def close(self) -> None:
+        """Остановка пула (незавершенные задания продолжатся после resume)"""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
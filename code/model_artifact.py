@@ -0,0 +1,491 @@
+"""
+Формат сохранения модели: папка с массивами деревьев и JSON-манифестом
+
+Все деревья ансамбля записываются в плоские массивы .npy (признак, порог,
+потомки, значение листа), которые при загрузке отображаются
+в память (mmap) - загрузка не зависит от размера модели, а несколько
+процессов API разделяют одни и те же физические страницы. Небольшие
+метаданные (признаки, целевые действия, метрики, отпечаток данных) хранятся
+в manifest.json. Модуль зависит только от numpy: sklearn при загрузке
+не нужен.
+
+Структура папки:
+    manifest.json
+    feature.npy, threshold.npy, children.npy,
+    missing_go_to_left.npy, value.npy, roots.npy, feature_importances.npy
+"""
+
+import hashlib
+import json
+import math
+import os
+import shutil
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+FORMAT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+TREE_ARRAYS = (
+    "feature",
+    "threshold",
+    "children",
+    "missing_go_to_left",
+    "value",
+    "roots",
+    "feature_importances",
+)
+
+# Размер блока строк при обходе деревьев (ограничивает память n_rows x n_trees)
+PREDICT_BLOCK_ROWS = 8192
+
+# Досрочная остановка: деревья считаются блоками растущего размера (8, 8, 16,
+# 32, ...), после каждого блока проверяется, решен ли класс строки (у леса -
+# с вероятностью ошибки ANYTIME_DELTA). Удвоение блоков ограничивает число
+# проверок логарифмом от числа деревьев
+ANYTIME_BLOCK_TREES = 8
+ANYTIME_DELTA = 0.01
+# Меньше строк считаются одним проходом по всем деревьям: он дешевле проверок
+ANYTIME_MIN_ROWS = 4
+
+
+def correct_probability(probability: np.ndarray, negative_rate: float) -> np.ndarray:
+    """
+    Пересчет вероятности модели, обученной на прореженных негативах
+
+    Прореживание с долей r умножает шансы p / (1 - p) на 1 / r, поэтому
+    исходная вероятность равна r * p / (r * p + 1 - p).
+    """
+    scaled = probability * negative_rate
+    return scaled / (scaled + 1.0 - probability)
+
+
+def matrix_fingerprint(X: Any, y: Any) -> str:
+    """Отпечаток обучающих данных: blake2b от матрицы признаков и целевой переменной"""
+    digest = hashlib.blake2b(digest_size=16)
+    features = np.ascontiguousarray(np.asarray(X, dtype=np.float32))
+    labels = np.ascontiguousarray(np.asarray(y, dtype=np.int8))
+    digest.update(str(features.shape).encode())
+    digest.update(features.data)
+    digest.update(labels.data)
+    return digest.hexdigest()
+
+
+def _forest_nodes(forest: Any) -> Tuple[List[Dict[str, np.ndarray]], Dict[str, Any]]:
+    """Узлы деревьев RandomForestClassifier: значение листа = доля класса 1"""
+    trees = []
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        counts = tree.value[:, 0, :]
+        trees.append(
+            {
+                "feature": tree.feature,
+                "threshold": tree.threshold,
+                "left": tree.children_left,
+                "right": tree.children_right,
+                "missing_go_to_left": getattr(
+                    tree, "missing_go_to_left", np.zeros(tree.node_count, dtype=np.uint8)
+                ),
+                "value": counts[:, 1] / counts.sum(axis=1),
+                "is_leaf": tree.children_left == -1,
+            }
+        )
+    # Лес сравнивает признаки в float32, итог - среднее по деревьям
+    return trees, {"kind": "forest", "input_dtype": "float32", "baseline": 0.0}
+
+
+def _boosting_nodes(boosting: Any) -> Tuple[List[Dict[str, np.ndarray]], Dict[str, Any]]:
+    """Узлы деревьев HistGradientBoostingClassifier: значение листа = вклад в логит"""
+    trees = []
+    for predictors in boosting._predictors:
+        nodes = predictors[0].nodes
+        if nodes["is_categorical"].any():
+            raise ValueError("Категориальные разбиения не поддерживаются форматом модели")
+        trees.append(
+            {
+                "feature": nodes["feature_idx"],
+                "threshold": nodes["num_threshold"],
+                "left": nodes["left"].astype(np.int64),
+                "right": nodes["right"].astype(np.int64),
+                "missing_go_to_left": nodes["missing_go_to_left"],
+                "value": nodes["value"],
+                "is_leaf": nodes["is_leaf"].astype(bool),
+            }
+        )
+    # Бустинг сравнивает признаки в float64, итог - сигмоида от суммы по деревьям
+    baseline = float(np.ravel(boosting._baseline_prediction)[0])
+    return trees, {"kind": "boosting", "input_dtype": "float64", "baseline": baseline}
+
+
+def export_trees(model: Any) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+    """
+    Перевод обученного ансамбля в плоские массивы
+
+    Узлы всех деревьев идут подряд, индексы потомков глобальные, листья
+    ссылаются сами на себя (порог +inf), поэтому обход всех деревьев сразу
+    делается фиксированным числом векторных шагов без проверок на лист.
+
+    Args:
+        model: RandomForestClassifier, HistGradientBoostingClassifier или
+            NegativeDownsamplingClassifier над одним из них (в том числе внутри
+            CityTargetEncodingClassifier)
+
+    Returns:
+        tuple: словарь массивов и параметры ансамбля для манифеста
+    """
+    if hasattr(model, "city_rate_"):
+        # CityTargetEncodingClassifier: конверсию городов в запросе присылает клиент
+        model = model.estimator_
+    negative_rate = None
+    if hasattr(model, "negative_rate") and hasattr(model, "estimator_"):
+        negative_rate = float(model.negative_rate)
+        model = model.estimator_
+
+    if hasattr(model, "estimators_"):
+        trees, params = _forest_nodes(model)
+    elif hasattr(model, "_predictors"):
+        trees, params = _boosting_nodes(model)
+    else:
+        raise ValueError(f"Неподдерживаемый тип модели: {type(model).__name__}")
+
+    parts: Dict[str, List[np.ndarray]] = {
+        name: []
+        for name in ("feature", "threshold", "left", "right", "missing_go_to_left", "value")
+    }
+    roots = []
+    offset = 0
+    depth = 0
+    for tree in trees:
+        n_nodes = len(tree["feature"])
+        own = np.arange(offset, offset + n_nodes)
+        is_leaf = tree["is_leaf"]
+        parts["feature"].append(np.where(is_leaf, 0, tree["feature"]))
+        parts["threshold"].append(np.where(is_leaf, np.inf, tree["threshold"]))
+        parts["left"].append(np.where(is_leaf, own, tree["left"] + offset))
+        parts["right"].append(np.where(is_leaf, own, tree["right"] + offset))
+        parts["missing_go_to_left"].append(tree["missing_go_to_left"])
+        parts["value"].append(np.where(is_leaf, tree["value"], 0.0))
+        roots.append(offset)
+        depth = max(depth, _tree_depth(tree["left"], tree["right"], is_leaf))
+        offset += n_nodes
+
+    arrays = {
+        "feature": np.concatenate(parts["feature"]).astype(np.int32),
+        "threshold": np.concatenate(parts["threshold"]).astype(np.float64),
+        # children[node, 1] - левый потомок, children[node, 0] - правый
+        "children": np.column_stack(
+            [np.concatenate(parts["right"]), np.concatenate(parts["left"])]
+        ).astype(np.int32),
+        "missing_go_to_left": np.concatenate(parts["missing_go_to_left"]).astype(bool),
+        "value": np.concatenate(parts["value"]).astype(np.float64),
+        "roots": np.array(roots, dtype=np.int32),
+        "feature_importances": np.asarray(
+            getattr(model, "feature_importances_", np.zeros(0)), dtype=np.float64
+        ),
+    }
+    params.update({"n_trees": len(trees), "max_depth": depth, "negative_rate": negative_rate})
+    return arrays, params
+
+
+def _tree_depth(left: np.ndarray, right: np.ndarray, is_leaf: np.ndarray) -> int:
+    """Глубина дерева по массивам потомков (корень - узел 0)"""
+    depth = 0
+    level = np.array([0])
+    while True:
+        level = level[~is_leaf[level]]
+        if len(level) == 0:
+            return depth
+        level = np.concatenate([left[level], right[level]])
+        depth += 1
+
+
+class TreeEnsemble:
+    """
+    Ансамбль деревьев, восстановленный из массивов (без sklearn)
+
+    Предоставляет predict / predict_proba / feature_importances_ с тем же
+    смыслом, что и исходная модель sklearn.
+    """
+
+    classes_ = np.array([0, 1])
+
+    def __init__(self, arrays: Dict[str, np.ndarray], params: Dict[str, Any]) -> None:
+        self.arrays = arrays
+        self.kind = params["kind"]
+        self.input_dtype = np.dtype(params["input_dtype"])
+        self.baseline = params["baseline"]
+        self.n_trees = params["n_trees"]
+        self.max_depth = params["max_depth"]
+        self.negative_rate = params.get("negative_rate")
+
+    @property
+    def feature_importances_(self) -> np.ndarray:
+        return self.arrays["feature_importances"]
+
+    def leaf_values(self, X: np.ndarray, trees: slice = slice(None)) -> np.ndarray:
+        """Значения листьев для каждой строки и дерева из trees (n_rows x n_trees)"""
+        feature = self.arrays["feature"]
+        threshold = self.arrays["threshold"]
+        children = self.arrays["children"]
+        missing_left = self.arrays["missing_go_to_left"]
+        has_missing = bool(np.isnan(X).any())
+
+        # Значение признака узла берется из X.ravel() по смещению строки
+        flat = np.ascontiguousarray(X).ravel()
+        row_offsets = (np.arange(len(X)) * X.shape[1])[:, None]
+        roots = self.arrays["roots"][trees]
+        nodes = np.broadcast_to(roots, (len(X), len(roots)))
+        for _ in range(self.max_depth):
+            values = flat[row_offsets + feature[nodes]]
+            go_left = values <= threshold[nodes]
+            if has_missing:
+                go_left |= np.isnan(values) & missing_left[nodes]
+            nodes = children[nodes, go_left.view(np.uint8)]
+        return self.arrays["value"][nodes]
+
+    def predict_proba(self, X: Any) -> np.ndarray:
+        """Вероятности классов [P(0), P(1)]"""
+        X = np.asarray(X, dtype=self.input_dtype)
+        probability = np.empty(len(X))
+        for start in range(0, len(X), PREDICT_BLOCK_ROWS):
+            block = slice(start, start + PREDICT_BLOCK_ROWS)
+            leaves = self.leaf_values(X[block])
+            if self.kind == "forest":
+                probability[block] = leaves.mean(axis=1)
+            else:
+                probability[block] = 1.0 / (1.0 + np.exp(-(self.baseline + leaves.sum(axis=1))))
+
+        if self.negative_rate is not None:
+            probability = correct_probability(probability, self.negative_rate)
+        return np.column_stack([1.0 - probability, probability])
+
+    def remaining_bounds(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Границы суммы листьев деревьев k..n_trees для каждого k (бустинг)
+
+        Returns:
+            tuple: (минимум, максимум) длины n_trees + 1, последний элемент 0
+        """
+        if not hasattr(self, "_remaining_bounds"):
+            value = np.asarray(self.arrays["value"])
+            is_leaf = self.arrays["children"][:, 0] == np.arange(len(value))
+            roots = self.arrays["roots"]
+            lowest = np.minimum.reduceat(np.where(is_leaf, value, np.inf), roots)
+            highest = np.maximum.reduceat(np.where(is_leaf, value, -np.inf), roots)
+            self._remaining_bounds = (
+                np.append(np.cumsum(lowest[::-1])[::-1], 0.0),
+                np.append(np.cumsum(highest[::-1])[::-1], 0.0),
+            )
+        return self._remaining_bounds
+
+    def predict_proba_anytime(
+        self,
+        X: Any,
+        threshold: float = 0.5,
+        budget_ms: Optional[float] = None,
+        delta: float = ANYTIME_DELTA,
+        block_trees: int = ANYTIME_BLOCK_TREES,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Вероятность класса 1 с досрочной остановкой обхода деревьев
+
+        Деревья считаются удваивающимися блоками в порядке хранения
+        (block_trees, block_trees, 2 * block_trees, ...). Строка выходит из
+        расчета, когда ее класс относительно threshold уже известен:
+        - лес: среднее листьев отстоит от порога больше границы Хёфдинга
+          sqrt(ln(2 / delta) / (2 k)) для k посчитанных деревьев (листья в
+          [0, 1], деревья обучены независимо) - класс совпадает с полным
+          лесом с вероятностью не ниже 1 - delta;
+        - бустинг: никакая сумма оставшихся деревьев не переводит логит через
+          порог - класс совпадает с полным ансамблем точно.
+        Когда истекает budget_ms, все оставшиеся строки получают оценку по
+        посчитанным деревьям (среднее у леса, префикс ансамбля у бустинга).
+
+        Меньше ANYTIME_MIN_ROWS строк, а также бустинг без бюджета (граница
+        бустинга почти не срабатывает раньше последних деревьев) считаются
+        одним проходом по всем деревьям.
+
+        Returns:
+            tuple: вероятности (n_rows,) и число использованных деревьев (n_rows,)
+        """
+        X = np.asarray(X, dtype=self.input_dtype)
+        if len(X) < ANYTIME_MIN_ROWS or (self.kind == "boosting" and budget_ms is None):
+            return self.predict_proba(X)[:, 1], np.full(len(X), self.n_trees)
+        deadline = None if budget_ms is None else time.perf_counter() + budget_ms / 1000
+
+        # Порог переводится в шкалу листьев: до пересчета прореживания, в логиты
+        if self.negative_rate is not None:
+            threshold = threshold / (threshold + self.negative_rate * (1.0 - threshold))
+        if self.kind == "boosting":
+            threshold = math.log(threshold / (1.0 - threshold)) - self.baseline
+            lowest, highest = self.remaining_bounds()
+
+        total = np.zeros(len(X))
+        trees_used = np.zeros(len(X), dtype=np.int64)
+        active = np.arange(len(X))
+        start = 0
+        while start < self.n_trees:
+            stop = min(max(2 * start, block_trees), self.n_trees)
+            total[active] += self.leaf_values(X[active], slice(start, stop)).sum(axis=1)
+            trees_used[active] = stop
+            if stop == self.n_trees:
+                break
+
+            score = total[active]
+            if self.kind == "forest":
+                margin = math.sqrt(math.log(2 / delta) / (2 * stop))
+                decided = np.abs(score / stop - threshold) > margin
+            else:
+                decided = (score + lowest[stop] > threshold) | (score + highest[stop] <= threshold)
+            active = active[~decided]
+            start = stop
+            if len(active) == 0 or (deadline is not None and time.perf_counter() >= deadline):
+                break
+
+        if self.kind == "forest":
+            probability = total / trees_used
+        else:
+            probability = 1.0 / (1.0 + np.exp(-(self.baseline + total)))
+        if self.negative_rate is not None:
+            probability = correct_probability(probability, self.negative_rate)
+        return probability, trees_used
+
+    def predict(self, X: Any) -> np.ndarray:
+        """Предсказание класса (порог 0.5, как у исходной модели)"""
+        return (self.predict_proba(X)[:, 1] > 0.5).astype(int)
+
+
+def _to_json(value: Any) -> Any:
+    """Приведение numpy-скаляров к типам JSON"""
+    if isinstance(value, dict):
+        return {key: _to_json(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_json(item) for item in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def replace_directory(path: str, write: Callable[[str], None]) -> None:
+    """
+    Атомарная замена папки path
+
+    write(staging) записывает содержимое в новую папку-версию рядом с path
+    (<имя>.v-<время>-<pid>). path - символическая ссылка на текущую версию,
+    она заменяется одним os.replace, как CURRENT в model_registry: path
+    существует в любой момент и указывает на целую версию. Читатель
+    разрешает ссылку один раз (os.path.realpath) и читает одну версию;
+    предыдущая версия остается на диске до следующей замены, более старые
+    удаляются. При ошибке write path не меняется.
+
+    Папка path прежнего формата (не ссылка) заменяется ссылкой один раз, на
+    это время между двумя переименованиями path нет.
+    """
+    path = os.path.normpath(path)
+    parent = os.path.dirname(path) or "."
+    name = os.path.basename(path)
+    os.makedirs(parent, exist_ok=True)
+    version = f"{name}.v-{time.time_ns()}-{os.getpid()}"
+    staging = os.path.join(parent, version)
+    os.makedirs(staging)
+    try:
+        write(staging)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    previous = os.readlink(path) if os.path.islink(path) else None
+    if previous is None and os.path.exists(path):
+        # Прежний формат: папка становится самой старой версией
+        previous = f"{name}.v-0-{os.getpid()}"
+        os.replace(path, os.path.join(parent, previous))
+    link = f"{path}.link-{os.getpid()}"
+    if os.path.lexists(link):
+        os.remove(link)
+    # Относительная ссылка: папку с вложенными версиями можно переименовать
+    os.symlink(version, link)
+    os.replace(link, path)
+
+    for entry in os.listdir(parent):
+        if entry.startswith(f"{name}.v-") and entry not in (version, previous):
+            shutil.rmtree(os.path.join(parent, entry), ignore_errors=True)
+
+
+def write_arrays(directory: str, arrays: Dict[str, np.ndarray], manifest: Dict[str, Any]) -> None:
+    """Массивы в directory/<имя>.npy и manifest.json"""
+    for name, array in arrays.items():
+        np.save(os.path.join(directory, f"{name}.npy"), array)
+    with open(os.path.join(directory, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+
+def save_artifact(
+    path: str,
+    model: Any,
+    engine: str,
+    feature_names: List[str],
+    target_actions: Optional[List[str]],
+    metrics: Optional[Dict[str, Any]] = None,
+    data_fingerprint: Optional[str] = None,
+    feature_ranges: Optional[Dict[str, Dict[str, float]]] = None,
+) -> Dict[str, Any]:
+    """
+    Сохранение модели в папку path
+
+    Папка записывается через replace_directory, поэтому читатели не видят
+    частично записанную модель.
+
+    Returns:
+        dict: Записанный манифест
+    """
+    arrays, params = export_trees(model)
+    manifest = _to_json(
+        {
+            "format_version": FORMAT_VERSION,
+            "engine": engine,
+            "feature_names": list(feature_names),
+            "target_actions": target_actions,
+            "metrics": metrics or {},
+            "data_fingerprint": data_fingerprint,
+            "feature_ranges": feature_ranges,
+            "ensemble": params,
+            "arrays": {name: str(array.dtype) for name, array in arrays.items()},
+        }
+    )
+
+    replace_directory(path, lambda staging: write_arrays(staging, arrays, manifest))
+    return manifest
+
+
+def read_manifest(path: str) -> Dict[str, Any]:
+    """Чтение manifest.json с проверкой версии формата"""
+    with open(os.path.join(path, MANIFEST_NAME), encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError(
+            f"Неподдерживаемая версия формата модели: {manifest.get('format_version')}"
+        )
+    return manifest
+
+
+def load_artifact(path: str, mmap: bool = True) -> Tuple[TreeEnsemble, Dict[str, Any]]:
+    """
+    Загрузка модели из папки
+
+    Args:
+        path: Папка модели
+        mmap: Отображать массивы в память вместо чтения
+
+    Returns:
+        tuple: ансамбль деревьев и манифест
+    """
+    # Одна версия папки replace_directory для манифеста и массивов
+    path = os.path.realpath(path)
+    manifest = read_manifest(path)
+    mmap_mode = "r" if mmap else None
+    arrays = {
+        name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+        for name in TREE_ARRAYS
+    }
+    return TreeEnsemble(arrays, manifest["ensemble"]), manifest
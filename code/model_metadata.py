@@ -0,0 +1,94 @@
+"""
+Метаданные модели для служебных эндпоинтов API
+
+Метаданные считаются один раз после загрузки модели: категории признаков,
+диапазоны признаков на обучающей выборке (сохраняются в manifest.json при
+обучении) и значения, которые подставляются вместо отсутствующих в запросе
+признаков. Ответы /features, /model_info и /example сериализуются в JSON
+заранее (PreparedJSON) вместе с ETag: повторный запрос с If-None-Match
+получает 304 без тела.
+"""
+
+import hashlib
+import json
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+# Категории признаков /features: подстроки имени признака
+FEATURE_CATEGORIES = {
+    "temporal": ("hour", "week", "morning", "afternoon", "evening", "night"),
+    "device": ("mobile", "android", "ios", "desktop", "tablet", "windows", "macos"),
+    "geographic": ("moscow", "spb", "city", "regional"),
+    "behavioral": ("hits", "pages", "duration", "engagement", "activity"),
+    "traffic": ("paid", "organic", "referral", "direct"),
+    "client_history": ("client_",),
+    "sequence": ("key_event",),
+}
+
+# Значение отсутствующего в запросе признака (см. FeatureSchema.assemble)
+MISSING_FEATURE_VALUE = 0.0
+
+
+class PreparedJSON(NamedTuple):
+    """Тело JSON-ответа и его ETag"""
+
+    body: bytes
+    etag: str
+
+
+def prepare_json(data: Any) -> PreparedJSON:
+    """Сериализация ответа один раз: тело и ETag (blake2b от тела)"""
+    body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+    return PreparedJSON(body, hashlib.blake2b(body, digest_size=8).hexdigest())
+
+
+def categorize_features(feature_names: List[str]) -> Dict[str, List[str]]:
+    """Признаки по категориям (признак может попасть в несколько категорий)"""
+    return {
+        category: [name for name in feature_names if any(k in name for k in keywords)]
+        for category, keywords in FEATURE_CATEGORIES.items()
+    }
+
+
+def feature_ranges(X: Any, feature_names: List[str]) -> Dict[str, Dict[str, float]]:
+    """
+    Диапазоны признаков на обучающей выборке
+
+    Args:
+        X: Матрица признаков (DataFrame или массив) в порядке feature_names
+        feature_names: Имена признаков
+
+    Returns:
+        dict: признак -> минимум, максимум и среднее
+    """
+    values = np.asarray(X, dtype=np.float64)
+    minimum, maximum = np.nanmin(values, axis=0), np.nanmax(values, axis=0)
+    mean = np.nanmean(values, axis=0)
+    return {
+        name: {"min": float(minimum[i]), "max": float(maximum[i]), "mean": float(mean[i])}
+        for i, name in enumerate(feature_names)
+    }
+
+
+def build_metadata(
+    feature_names: List[str],
+    ranges: Optional[Dict[str, Dict[str, float]]] = None,
+) -> Dict[str, Any]:
+    """
+    Метаданные признаков модели
+
+    Args:
+        feature_names: Признаки модели
+        ranges: Диапазоны признаков на обучающей выборке (None - не сохранены)
+
+    Returns:
+        dict: признаки, категории, диапазоны и значения по умолчанию
+    """
+    return {
+        "features": list(feature_names),
+        "feature_count": len(feature_names),
+        "feature_categories": categorize_features(feature_names),
+        "feature_ranges": ranges,
+        "feature_defaults": {name: MISSING_FEATURE_VALUE for name in feature_names},
+    }
@@ -0,0 +1,233 @@
+"""
+Локальный реестр моделей с версиями и горячей заменой модели в API
+
+Структура реестра:
+    registry/
+        versions/<версия>/   - папка модели (см. model_artifact)
+        CURRENT              - имя активной версии
+
+Публикация копирует папку модели в versions/ под временным именем и
+переименовывает ее, а активация перезаписывает CURRENT через os.replace,
+поэтому читатели всегда видят либо старую, либо новую версию целиком.
+
+LiveModel отслеживает CURRENT в фоновом потоке: новая версия загружается и
+прогревается рядом с текущей и подменяется одной операцией присваивания.
+Запросы в обработке дорабатывают на той версии, которую получили.
+
+Запуск из папки code/:
+    python model_registry.py publish ../build/sber_auto_model
+    python model_registry.py activate <версия>
+    python model_registry.py list
+"""
+
+import argparse
+import logging
+import os
+import shutil
+import threading
+import time
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+from inference import InferenceModel
+from model_artifact import read_manifest
+
+DEFAULT_REGISTRY_DIR = "../build/registry"
+CURRENT_NAME = "CURRENT"
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    """
+    Реестр версий модели в папке root
+
+    Args:
+        root (str): Папка реестра
+    """
+
+    def __init__(self, root: str = DEFAULT_REGISTRY_DIR) -> None:
+        self.root = root
+        self.versions_dir = os.path.join(root, "versions")
+
+    def version_path(self, version: str) -> str:
+        """Папка модели версии"""
+        return os.path.join(self.versions_dir, version)
+
+    def versions(self) -> List[str]:
+        """Опубликованные версии (по возрастанию)"""
+        if not os.path.isdir(self.versions_dir):
+            return []
+        return sorted(
+            name
+            for name in os.listdir(self.versions_dir)
+            if not name.startswith(".")
+            and os.path.isfile(os.path.join(self.versions_dir, name, "manifest.json"))
+        )
+
+    def current_version(self) -> Optional[str]:
+        """Активная версия (None, если реестр пуст)"""
+        try:
+            with open(os.path.join(self.root, CURRENT_NAME), encoding="utf-8") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def publish(self, model_path: str, version: Optional[str] = None, activate: bool = True) -> str:
+        """
+        Публикация папки модели как новой версии
+
+        Args:
+            model_path (str): Папка модели, сохраненная SberAutoModel.save_model
+            version (str, optional): Имя версии. По умолчанию - время публикации
+                и начало отпечатка обучающих данных
+            activate (bool): Сразу сделать версию активной
+
+        Returns:
+            str: Имя опубликованной версии
+        """
+        manifest = read_manifest(model_path)
+        if version is None:
+            version = time.strftime("%Y%m%d-%H%M%S")
+            if manifest.get("data_fingerprint"):
+                version += "-" + manifest["data_fingerprint"][:8]
+        if os.path.exists(self.version_path(version)):
+            raise ValueError(f"Версия {version} уже опубликована")
+
+        os.makedirs(self.versions_dir, exist_ok=True)
+        staging = os.path.join(self.versions_dir, f".{version}.tmp-{os.getpid()}")
+        shutil.copytree(model_path, staging)
+        os.replace(staging, self.version_path(version))
+        logger.info(f"📦 Опубликована версия модели {version}")
+
+        if activate:
+            self.activate(version)
+        return version
+
+    def activate(self, version: str) -> None:
+        """Атомарное переключение CURRENT на версию"""
+        read_manifest(self.version_path(version))
+        pointer = os.path.join(self.root, CURRENT_NAME)
+        staging = f"{pointer}.tmp-{os.getpid()}"
+        with open(staging, "w", encoding="utf-8") as f:
+            f.write(version + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(staging, pointer)
+        logger.info(f"🎯 Активная версия модели: {version}")
+
+    def load(self, version: Optional[str] = None) -> InferenceModel:
+        """Загрузка версии (по умолчанию активной)"""
+        version = version or self.current_version()
+        if version is None:
+            raise ValueError(f"В реестре {self.root} нет активной версии")
+        model = InferenceModel()
+        model.load_model(self.version_path(version))
+        return model
+
+
+def warm_up(model: InferenceModel) -> None:
+    """
+    Прогрев модели перед подменой
+
+    Массивы деревьев дочитываются с диска целиком, чтобы первые запросы не
+    ждали подкачки страниц, и выполняется одно предсказание.
+    """
+    for array in getattr(model.model, "arrays", {}).values():
+        np.asarray(array).sum()
+    model.predict({})
+
+
+class ServingModel(NamedTuple):
+    """Модель и ее версия - подменяются вместе"""
+
+    version: str
+    model: InferenceModel
+
+
+class LiveModel:
+    """
+    Активная модель API с горячей заменой
+
+    Обработчик запроса один раз читает current и дальше работает с этим
+    снимком, поэтому model_version в ответе всегда соответствует модели,
+    посчитавшей предсказание.
+
+    Args:
+        registry (ModelRegistry): Реестр моделей
+    """
+
+    def __init__(self, registry: ModelRegistry) -> None:
+        self.registry = registry
+        self.current: Optional[ServingModel] = None
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+
+    def serve(self, version: str, model: InferenceModel) -> None:
+        """Подмена активной модели (одно присваивание)"""
+        self.current = ServingModel(version, model)
+
+    def reload(self) -> bool:
+        """
+        Загрузка активной версии реестра, если она сменилась
+
+        Returns:
+            bool: True, если модель была подменена
+        """
+        with self._reload_lock:
+            version = self.registry.current_version()
+            if version is None or (self.current and self.current.version == version):
+                return False
+
+            start = time.time()
+            model = self.registry.load(version)
+            warm_up(model)
+            self.serve(version, model)
+            logger.info(f"🔄 Модель {version} загружена за {time.time() - start:.3f}с")
+            return True
+
+    def watch(self, interval: float = 5.0) -> None:
+        """Фоновая проверка CURRENT каждые interval секунд"""
+
+        def loop() -> None:
+            while not self._stop.wait(interval):
+                try:
+                    self.reload()
+                except Exception as e:
+                    # Текущая модель продолжает работать, попытка повторится
+                    logger.error(f"❌ Ошибка загрузки новой версии модели: {e}")
+
+        self._watcher = threading.Thread(target=loop, name="model-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop(self) -> None:
+        """Остановка фоновой проверки"""
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Реестр версий модели")
+    parser.add_argument("--registry", default=DEFAULT_REGISTRY_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+    publish = commands.add_parser("publish", help="Опубликовать папку модели")
+    publish.add_argument("model_path")
+    publish.add_argument("--version")
+    publish.add_argument("--no-activate", action="store_true")
+    activate = commands.add_parser("activate", help="Сделать версию активной")
+    activate.add_argument("version")
+    commands.add_parser("list", help="Список версий")
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.registry)
+    if args.command == "publish":
+        print(registry.publish(args.model_path, args.version, activate=not args.no_activate))
+    elif args.command == "activate":
+        registry.activate(args.version)
+    else:
+        current = registry.current_version()
+        for name in registry.versions():
+            print(f"{'*' if name == current else ' '} {name}")
@@ -0,0 +1,319 @@
+"""
+Обучение модели на данных, которые не помещаются в оперативную память
+
+Хиты и сессии читаются порциями и раскладываются на диске по корзинам
+по хэшу session_id, поэтому каждая сессия со всеми своими хитами попадает
+ровно в одну корзину. Затем корзины обрабатываются по одной: считаются
+агрегаты сессий (сохраняются на диск), суммы по городам и пополняется
+стратифицированная выборка ограниченного размера. Модель обучается на
+выборке с весами классов, восстанавливающими исходное распределение.
+"""
+
+import argparse
+import glob
+import os
+import resource
+import shutil
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from features import (
+    FEATURE_NAMES,
+    SESSION_FEATURE_COLUMNS,
+    SESSION_METRICS,
+    aggregate_sessions,
+    align_session_metrics,
+    build_feature_matrix,
+    city_partial_stats,
+    finalize_city_stats,
+    session_buckets,
+)
+from inference import DEFAULT_MODEL_PATH
+from sber_auto_model import SberAutoModel
+
+DEFAULT_WORK_DIR = "../build/out_of_core"
+
+# Идентификаторы читаются строками, чтобы хэш не зависел от формата источника
+CSV_DTYPES = {"session_id": str, "client_id": str}
+
+
+def set_memory_limit(limit_gb: float) -> None:
+    """Жесткое ограничение адресного пространства процесса (RLIMIT_AS)"""
+    limit = int(limit_gb * 1024**3)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def iter_frames(source: str, chunksize: int) -> Iterator[pd.DataFrame]:
+    """
+    Чтение источника порциями
+
+    Источник - CSV-файл (читается по chunksize строк), pickle-файл или папка
+    с такими файлами. Pickle нельзя читать частями, поэтому большие таблицы
+    в этом формате нужно заранее разбить на несколько файлов.
+    """
+    if os.path.isdir(source):
+        paths = sorted(
+            glob.glob(os.path.join(source, "*.pkl")) + glob.glob(os.path.join(source, "*.csv*"))
+        )
+    else:
+        paths = [source]
+
+    for path in paths:
+        if path.endswith(".pkl"):
+            yield pd.read_pickle(path)
+        else:
+            yield from pd.read_csv(path, chunksize=chunksize, dtype=CSV_DTYPES)
+
+
+def partition_by_session(
+    source: str,
+    out_dir: str,
+    n_buckets: int,
+    chunksize: int,
+    count_column: Optional[str] = None,
+) -> Tuple[int, Optional[pd.Series]]:
+    """
+    Раскладка таблицы по корзинам session_id
+
+    Каждая прочитанная порция записывается в out_dir/bucket_XXXX/part_XXXXXX.pkl.
+
+    Args:
+        source: Источник данных (см. iter_frames)
+        out_dir: Папка для корзин
+        n_buckets: Количество корзин
+        chunksize: Размер порции при чтении CSV
+        count_column: Столбец, для которого попутно считаются частоты значений
+
+    Returns:
+        tuple: число строк и частоты значений count_column (или None)
+    """
+    total_rows = 0
+    counts: Optional[pd.Series] = None
+
+    for part, frame in enumerate(iter_frames(source, chunksize)):
+        total_rows += len(frame)
+        if count_column is not None:
+            chunk_counts = frame[count_column].value_counts()
+            counts = chunk_counts if counts is None else counts.add(chunk_counts, fill_value=0)
+
+        buckets = session_buckets(frame["session_id"], n_buckets)
+        order = np.argsort(buckets, kind="stable")
+        bounds = np.searchsorted(buckets[order], np.arange(n_buckets + 1))
+        for bucket in range(n_buckets):
+            rows = order[bounds[bucket] : bounds[bucket + 1]]
+            if len(rows) == 0:
+                continue
+            bucket_dir = os.path.join(out_dir, f"bucket_{bucket:04d}")
+            os.makedirs(bucket_dir, exist_ok=True)
+            frame.iloc[rows].to_pickle(os.path.join(bucket_dir, f"part_{part:06d}.pkl"))
+
+    return total_rows, counts
+
+
+def read_bucket(out_dir: str, bucket: int) -> Optional[pd.DataFrame]:
+    """Все части одной корзины (None, если корзина пуста)"""
+    paths = sorted(glob.glob(os.path.join(out_dir, f"bucket_{bucket:04d}", "*.pkl")))
+    if not paths:
+        return None
+    return pd.concat([pd.read_pickle(path) for path in paths], ignore_index=True)
+
+
+class StratifiedSample:
+    """
+    Стратифицированная выборка сессий ограниченного размера
+
+    Позитивы сохраняются все (не больше половины max_rows), негативы - с
+    вероятностью negative_rate. Если класс не помещается в свою квоту, остаются
+    строки с наименьшими случайными приоритетами (bottom-k выборка, эквивалентная
+    reservoir sampling). Вес класса = число увиденных строк / число сохраненных.
+    """
+
+    def __init__(self, max_rows: int, negative_rate: float, seed: int = 42) -> None:
+        self.max_rows = max_rows
+        self.negative_rate = negative_rate
+        self.rng = np.random.default_rng(seed)
+        self.seen = {0: 0, 1: 0}
+        self.kept: Dict[int, Optional[pd.DataFrame]] = {0: None, 1: None}
+
+    def add(self, rows: pd.DataFrame) -> None:
+        """Добавление сессий одной корзины (столбец is_target обязателен)"""
+        rows = rows.assign(priority=self.rng.random(len(rows)))
+        is_target = rows["is_target"].to_numpy() > 0
+
+        for label, mask in ((1, is_target), (0, ~is_target)):
+            self.seen[label] += int(mask.sum())
+            candidates = rows[mask]
+            if label == 0:
+                candidates = candidates[candidates["priority"] < self.negative_rate]
+            kept = self.kept[label]
+            self.kept[label] = (
+                candidates if kept is None else pd.concat([kept, candidates], ignore_index=True)
+            )
+
+        self._trim(1, self.max_rows // 2)
+        self._trim(0, self.max_rows - self._size(1))
+
+    def _size(self, label: int) -> int:
+        kept = self.kept[label]
+        return 0 if kept is None else len(kept)
+
+    def _trim(self, label: int, capacity: int) -> None:
+        kept = self.kept[label]
+        if kept is not None and len(kept) > capacity:
+            self.kept[label] = kept.nsmallest(capacity, "priority")
+
+    def class_weight(self) -> Dict[int, float]:
+        """Веса классов, восстанавливающие исходное распределение"""
+        return {
+            label: self.seen[label] / self._size(label) if self._size(label) else 1.0
+            for label in (0, 1)
+        }
+
+    def frame(self) -> pd.DataFrame:
+        """Сохраненные сессии обоих классов"""
+        parts = [kept for kept in self.kept.values() if kept is not None]
+        return pd.concat(parts, ignore_index=True).drop(columns="priority")
+
+
+def train_out_of_core(
+    sessions_source: str,
+    hits_source: str,
+    work_dir: str = DEFAULT_WORK_DIR,
+    n_buckets: int = 64,
+    chunksize: int = 500_000,
+    negative_rate: float = 0.1,
+    max_rows: int = 1_000_000,
+    seed: int = 42,
+    distinct_precision: Optional[int] = None,
+    model_path: str = DEFAULT_MODEL_PATH,
+) -> SberAutoModel:
+    """
+    Обучение модели в режиме out-of-core
+
+    Память ограничена размером одной корзины (доля 1/n_buckets данных),
+    порцией чтения и размером выборки max_rows.
+
+    Args:
+        sessions_source: Источник ga_sessions (CSV, pickle или папка с частями)
+        hits_source: Источник ga_hits
+        work_dir: Рабочая папка для корзин и агрегатов
+        n_buckets: Количество корзин session_id
+        chunksize: Размер порции чтения CSV
+        negative_rate: Доля сохраняемых сессий без конверсии
+        max_rows: Максимальный размер обучающей выборки
+        seed: Зерно случайной выборки
+        distinct_precision: unique_pages / unique_events оценками HyperLogLog
+            (см. aggregate_sessions); None - точный подсчет
+        model_path: Папка сохраненной модели
+
+    Returns:
+        SberAutoModel: Обученная модель
+    """
+    print("🚀 Обучение в режиме out-of-core")
+    print("=" * 60)
+
+    if os.path.exists(work_dir):
+        shutil.rmtree(work_dir)
+    hits_dir = os.path.join(work_dir, "hits")
+    sessions_dir = os.path.join(work_dir, "sessions")
+    aggregates_dir = os.path.join(work_dir, "aggregates")
+    os.makedirs(aggregates_dir)
+
+    print(f"📂 Раскладываем хиты по {n_buckets} корзинам...")
+    total_hits, event_counts = partition_by_session(
+        hits_source, hits_dir, n_buckets, chunksize, count_column="event_action"
+    )
+    print(f"📊 Хиты: {total_hits:,}")
+
+    print(f"📂 Раскладываем сессии по {n_buckets} корзинам...")
+    total_sessions, _ = partition_by_session(sessions_source, sessions_dir, n_buckets, chunksize)
+    print(f"📊 Сессии: {total_sessions:,}")
+
+    model = SberAutoModel()
+    if event_counts is None:
+        raise ValueError("Хиты не найдены")
+    target_actions = model.define_target_actions_from_counts(event_counts, total_hits)
+
+    print("🔧 Агрегируем сессии по корзинам...")
+    sample = StratifiedSample(max_rows, negative_rate, seed)
+    city_partials: List[pd.DataFrame] = []
+
+    for bucket in range(n_buckets):
+        sessions = read_bucket(sessions_dir, bucket)
+        if sessions is None:
+            continue
+        hits = read_bucket(hits_dir, bucket)
+        session_metrics = (
+            aggregate_sessions(hits, target_actions, distinct_precision)
+            if hits is not None
+            else pd.DataFrame(columns=["is_target"] + SESSION_METRICS)
+        )
+        session_metrics.to_pickle(os.path.join(aggregates_dir, f"bucket_{bucket:04d}.pkl"))
+
+        metrics = align_session_metrics(sessions, session_metrics)
+        city_partials.append(
+            city_partial_stats(
+                sessions["geo_city"],
+                metrics["is_target"],
+                metrics["session_duration"],
+                metrics["total_hits"],
+                metrics["has_hits"],
+            )
+        )
+        sample.add(sessions[SESSION_FEATURE_COLUMNS].assign(**metrics))
+
+    # Суммы по городам складываются между корзинами
+    city_stats = finalize_city_stats(pd.concat(city_partials).groupby(level=0, dropna=False).sum())
+
+    rows = sample.frame()
+    class_weight = sample.class_weight()
+    print(f"📊 Выборка для обучения: {len(rows):,} сессий")
+    print(f"⚖️ Веса классов: {class_weight}")
+
+    session_metrics = rows.loc[rows["has_hits"], ["session_id", "is_target"] + SESSION_METRICS]
+    X, y = build_feature_matrix(rows, session_metrics.set_index("session_id"), city_stats)
+
+    model.feature_names = list(FEATURE_NAMES)
+    roc_auc = model.train_model(
+        pd.DataFrame(X, columns=FEATURE_NAMES, copy=False),
+        pd.Series(y, name="is_target"),
+        class_weight=class_weight,
+    )
+    model.save_model(model_path)
+
+    print("🎉 Модель обучена и сохранена!")
+    print(f"📊 ROC-AUC: {roc_auc:.4f}")
+
+    return model
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Обучение модели в режиме out-of-core")
+    parser.add_argument("--sessions", default="../data/ga_sessions.csv")
+    parser.add_argument("--hits", default="../data/ga_hits.csv")
+    parser.add_argument("--work-dir", default=DEFAULT_WORK_DIR)
+    parser.add_argument("--buckets", type=int, default=64)
+    parser.add_argument("--chunksize", type=int, default=500_000)
+    parser.add_argument("--negative-rate", type=float, default=0.1)
+    parser.add_argument("--max-rows", type=int, default=1_000_000)
+    parser.add_argument("--memory-limit-gb", type=float, default=None)
+    parser.add_argument("--distinct-precision", type=int, default=None)
+    parser.add_argument("--model-path", default=DEFAULT_MODEL_PATH)
+    args = parser.parse_args()
+
+    if args.memory_limit_gb:
+        set_memory_limit(args.memory_limit_gb)
+        print(f"🔒 Ограничение памяти: {args.memory_limit_gb} ГБ")
+
+    train_out_of_core(
+        args.sessions,
+        args.hits,
+        work_dir=args.work_dir,
+        n_buckets=args.buckets,
+        chunksize=args.chunksize,
+        negative_rate=args.negative_rate,
+        max_rows=args.max_rows,
+        distinct_precision=args.distinct_precision,
+        model_path=args.model_path,
+    )
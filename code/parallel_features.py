@@ -0,0 +1,238 @@
+"""
+Параллельное построение признаков по шардам session_id
+
+Сессии и хиты делятся на n_shards шардов по коду session_id, поэтому все
+хиты сессии попадают в ее шард. Шарды обрабатываются в пуле процессов:
+агрегация хитов по сессиям и все построчные признаки (shard_features).
+Глобальные признаки - статистика городов - требуют всех шардов: каждый
+шард возвращает суммы по своим городам, родитель складывает их (reduce) и
+заново записывает географические столбцы (fill_city_features). Результат
+совпадает с build_feature_matrix по всем данным.
+
+Строковые столбцы процессам не передаются: родитель один раз заменяет их
+кодами factorize (session_id - общим кодом сессий и хитов), раскладывает
+столбцы шардов в файлы .npy во временной папке (write_shards), а процесс
+открывает их через mmap. Через pickle идут только различные значения
+небольших столбцов (города, даты, события); у hit_page_path нужны лишь
+различные страницы, поэтому передается только их число.
+
+Процессы запускаются через spawn, как в jobs и shadow.
+"""
+
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from features import (
+    FEATURE_NAMES,
+    SESSION_FEATURE_COLUMNS,
+    aggregate_sessions,
+    align_session_metrics,
+    build_feature_matrix,
+    city_partial_stats,
+    fill_city_features,
+    finalize_city_stats,
+)
+
+# Столбцы ga_hits, которые нужны агрегации (передаются процессам)
+HIT_FEATURE_COLUMNS = ["session_id", "hit_number", "hit_time", "hit_page_path", "event_action"]
+
+# Столбцы, от значений которых нужны только совпадения: процесс получает коды
+# и число различных значений вместо самих строк
+CODE_ONLY_COLUMNS = {"hit_page_path"}
+
+# Различные значения закодированных столбцов шарда (None - числовой столбец)
+Categories = Dict[str, Optional[pd.Index]]
+
+
+def shard_features(
+    sessions: pd.DataFrame,
+    hits: pd.DataFrame,
+    target_actions: Sequence[str],
+    distinct_precision: Optional[int] = None,
+) -> Tuple[np.ndarray, np.ndarray, pd.DataFrame]:
+    """
+    Признаки одного шарда
+
+    Географические столбцы посчитаны по городам шарда и перезаписываются
+    родителем по глобальной статистике.
+
+    Returns:
+        tuple: матрица признаков шарда, целевая переменная и суммы по городам
+        шарда (city_partial_stats)
+    """
+    session_metrics = aggregate_sessions(hits, target_actions, distinct_precision)
+    metrics = align_session_metrics(sessions, session_metrics)
+    partial = city_partial_stats(
+        sessions["geo_city"],
+        metrics["is_target"],
+        metrics["session_duration"],
+        metrics["total_hits"],
+        metrics["has_hits"],
+    )
+    X, y = build_feature_matrix(sessions, session_metrics, finalize_city_stats(partial))
+    return X, y, partial
+
+
+def encode_column(
+    values: pd.Series, code_only: bool = False
+) -> Tuple[np.ndarray, Optional[pd.Index]]:
+    """
+    Столбец в виде массива без объектов Python
+
+    Числа, даты и интервалы передаются как есть; остальные столбцы - коды
+    factorize (int32, -1 - пропуск) и различные значения (code_only -
+    RangeIndex их числа).
+    """
+    kind = values.dtype.kind
+    if kind in "iufb":
+        return values.to_numpy(dtype=np.float64, na_value=np.nan), None
+    if kind in "mM":
+        return values.to_numpy(), None
+    codes, uniques = pd.factorize(values)
+    categories = pd.RangeIndex(len(uniques)) if code_only else pd.Index(uniques)
+    return codes.astype(np.int32), categories
+
+
+def decode_column(array: np.ndarray, categories: Optional[pd.Index]) -> pd.Series:
+    """Столбец encode_column: коды - Categorical без копирования строк"""
+    if categories is None:
+        return pd.Series(array)
+    return pd.Series(pd.Categorical.from_codes(np.asarray(array), categories=categories))
+
+
+def shard_rows(shards: np.ndarray, n_shards: int) -> List[np.ndarray]:
+    """Позиции строк каждого шарда за одну сортировку"""
+    order = np.argsort(shards, kind="stable")
+    bounds = np.searchsorted(shards[order], np.arange(n_shards + 1))
+    return [order[bounds[i] : bounds[i + 1]] for i in range(n_shards)]
+
+
+def write_shards(
+    sessions: pd.DataFrame, hits: pd.DataFrame, n_shards: int, directory: str
+) -> Tuple[List[np.ndarray], Categories]:
+    """
+    Столбцы шардов в файлы directory/shard-XXXX/{sessions,hits}-<столбец>.npy
+
+    session_id заменяется номером сессии в sessions (хиты неизвестных сессий
+    в признаки не попадают и отбрасываются), шард - номер по модулю n_shards.
+
+    Returns:
+        tuple: позиции строк sessions каждого шарда и различные значения
+        закодированных столбцов (общие для всех шардов)
+    """
+    session_codes, session_ids = pd.factorize(sessions["session_id"])
+    hit_codes = pd.Index(session_ids).get_indexer(hits["session_id"])
+    known = hit_codes >= 0
+    if not known.all():
+        hits, hit_codes = hits[known], hit_codes[known]
+
+    categories: Categories = {}
+    tables = {}
+    for table, frame, codes, columns in (
+        ("sessions", sessions, session_codes, SESSION_FEATURE_COLUMNS),
+        ("hits", hits, hit_codes, HIT_FEATURE_COLUMNS),
+    ):
+        arrays = {"session_id": codes.astype(np.int64)}
+        for name in columns[1:]:
+            arrays[name], categories[f"{table}.{name}"] = encode_column(
+                frame[name], name in CODE_ONLY_COLUMNS
+            )
+        tables[table] = (arrays, shard_rows(arrays["session_id"] % n_shards, n_shards))
+
+    for i in range(n_shards):
+        shard_dir = os.path.join(directory, f"shard-{i:04d}")
+        os.makedirs(shard_dir)
+        for table, (arrays, rows) in tables.items():
+            for name, array in arrays.items():
+                np.save(os.path.join(shard_dir, f"{table}-{name}.npy"), array[rows[i]])
+    return tables["sessions"][1], categories
+
+
+def load_shard(shard_dir: str, categories: Categories) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Сессии и хиты шарда из файлов write_shards (массивы открываются через mmap)"""
+    frames = []
+    for table, columns in (("sessions", SESSION_FEATURE_COLUMNS), ("hits", HIT_FEATURE_COLUMNS)):
+        frames.append(
+            pd.DataFrame(
+                {
+                    name: decode_column(
+                        np.load(os.path.join(shard_dir, f"{table}-{name}.npy"), mmap_mode="r"),
+                        categories.get(f"{table}.{name}"),
+                    )
+                    for name in columns
+                }
+            )
+        )
+    return frames[0], frames[1]
+
+
+def shard_features_from_files(
+    shard_dir: str,
+    categories: Categories,
+    target_actions: Sequence[str],
+    distinct_precision: Optional[int] = None,
+) -> Tuple[np.ndarray, np.ndarray, pd.DataFrame]:
+    """shard_features для шарда write_shards (выполняется в процессе пула)"""
+    sessions, hits = load_shard(shard_dir, categories)
+    return shard_features(sessions, hits, target_actions, distinct_precision)
+
+
+def parallel_feature_matrix(
+    sessions: pd.DataFrame,
+    hits: pd.DataFrame,
+    target_actions: Sequence[str],
+    workers: Optional[int] = None,
+    n_shards: Optional[int] = None,
+    distinct_precision: Optional[int] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Матрица признаков в порядке строк sessions, шарды считаются параллельно
+
+    Args:
+        sessions: Сессии
+        hits: Хиты
+        target_actions: Целевые действия
+        workers: Процессов пула (None - число ядер)
+        n_shards: Число шардов (None - по одному на процесс)
+        distinct_precision: См. aggregate_sessions (эскизы хешируют коды
+            страниц и событий вместо строк - оценка того же числа различных)
+
+    Returns:
+        tuple: матрица (n_sessions, len(FEATURE_NAMES)) float32 и целевая переменная int8
+    """
+    workers = workers or os.cpu_count() or 1
+    n_shards = n_shards or workers
+
+    X = np.zeros((len(sessions), len(FEATURE_NAMES)), dtype=np.float32, order="F")
+    y = np.zeros(len(sessions), dtype=np.int8)
+    partials: List[pd.DataFrame] = []
+    with tempfile.TemporaryDirectory(prefix="feature-shards-") as directory:
+        session_parts, categories = write_shards(sessions, hits, n_shards, directory)
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = {
+                pool.submit(
+                    shard_features_from_files,
+                    os.path.join(directory, f"shard-{i:04d}"),
+                    categories,
+                    target_actions,
+                    distinct_precision,
+                ): rows
+                for i, rows in enumerate(session_parts)
+                if len(rows)
+            }
+            for future in as_completed(futures):
+                X_shard, y_shard, partial = future.result()
+                X[futures[future]] = X_shard
+                y[futures[future]] = y_shard
+                partials.append(partial)
+
+    # Reduce: суммы по городам складываются между шардами
+    if partials:
+        city_stats = finalize_city_stats(pd.concat(partials).groupby(level=0, dropna=False).sum())
+        fill_city_features(X, sessions["geo_city"], city_stats)
+    return X, y
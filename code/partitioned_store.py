@@ -0,0 +1,311 @@
+"""
+Набор данных, разложенный по датам визита
+
+Обучение на окне дат ("последние 90 дней") без чтения всех ga_sessions и
+ga_hits: сессии лежат в папках visit_date=YYYY-MM-DD, хиты - в папке даты
+своей сессии. Чтение окна открывает только папки дат внутри окна.
+
+    dataset/
+        manifest.json                     разделы: число строк и файлы частей
+        session_index-000001.pkl          session_id -> день раздела
+        visit_date=2021-11-24/
+            sessions/part-000000.pkl
+            hits/part-000000.pkl
+
+В ga_hits нет даты визита сессии (hit_date может перейти через полночь),
+поэтому раздел хита берется из индекса session_id -> раздел. Индекс
+пополняется при каждой записи: сессии и хиты можно дописывать порциями, хиты
+порции находят разделы сессий из прошлых порций. Хиты без известной сессии не
+записываются (их нет и в признаках: сессия без строки в ga_sessions не
+обучается).
+
+Сессия записывается один раз. Повторная запись уже известной сессии
+(повторный импорт той же выгрузки) пропускается вместе с хитами этой сессии
+из той же порции: иначе прежние строки остались бы в старом разделе и
+сессия с хитами задвоилась бы.
+
+Набор меняется одной заменой manifest.json (os.replace). Части порции и
+индекс пишутся в новые файлы, которых манифест еще не перечисляет, а
+читатели берут список частей из манифеста, а не из папок. Поэтому читатель
+видит либо прежний, либо новый набор разделов, а сбой до замены манифеста
+оставляет прежний набор и прежний индекс: повторный импорт записывает
+порцию заново, недописанные части не читаются и перезаписываются.
+"""
+
+import argparse
+import datetime
+import glob
+import json
+import os
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from features import visit_day_numbers
+
+DEFAULT_DATASET_DIR = "../build/dataset"
+# Версия 2: файлы частей и индекса перечислены в манифесте
+FORMAT_VERSION = 2
+MANIFEST_NAME = "manifest.json"
+SESSION_INDEX_NAME = "session_index-{generation:06d}.pkl"
+TABLES = ("sessions", "hits")
+
+DateLike = Union[str, datetime.date, np.datetime64]
+
+
+def partition_name(day: int) -> str:
+    """Папка раздела по номеру дня от 1970-01-01"""
+    return f"visit_date={np.datetime64(int(day), 'D')}"
+
+
+def day_number(date: DateLike) -> int:
+    """Номер дня от 1970-01-01 для строки "YYYY-MM-DD", date или datetime64"""
+    return int(np.datetime64(date, "D").astype(np.int64))
+
+
+def read_manifest(dataset_dir: str) -> Dict:
+    """Манифест набора (пустой, если набор еще не записан)"""
+    path = os.path.join(dataset_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {"format_version": FORMAT_VERSION, "generation": 0, "partitions": {}}
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError(
+            f"Неподдерживаемая версия набора {manifest.get('format_version')}, "
+            f"ожидается {FORMAT_VERSION}"
+        )
+    return manifest
+
+
+def read_session_index(dataset_dir: str, manifest: Optional[Dict] = None) -> pd.Series:
+    """Индекс session_id -> номер дня раздела (int32), файл - из манифеста"""
+    manifest = read_manifest(dataset_dir) if manifest is None else manifest
+    if not manifest.get("session_index"):
+        return pd.Series([], index=pd.Index([], dtype=object, name="session_id"), dtype=np.int32)
+    return pd.read_pickle(os.path.join(dataset_dir, manifest["session_index"]))
+
+
+def _replace(path: str, write: Callable[[str], None]) -> None:
+    """Атомарная замена файла: запись во временный файл и os.replace"""
+    staging = f"{path}.tmp-{os.getpid()}"
+    write(staging)
+    os.replace(staging, path)
+
+
+def _write_parts(
+    frame: pd.DataFrame, days: np.ndarray, dataset_dir: str, table: str, partitions: Dict
+) -> None:
+    """
+    Строки frame по папкам разделов days; части и число строк добавляются в partitions
+
+    Номер части - число частей таблицы в манифесте: часть, записанная до
+    сбоя и не попавшая в манифест, перезаписывается.
+    """
+    if not len(frame):
+        return
+    order = np.argsort(days, kind="stable")
+    unique_days, starts = np.unique(days[order], return_index=True)
+    bounds = np.append(starts, len(order))
+    for i, day in enumerate(unique_days):
+        rows = order[bounds[i] : bounds[i + 1]]
+        name = partition_name(day)
+        entry = partitions.setdefault(
+            name, {"sessions": 0, "hits": 0, "parts": {t: [] for t in TABLES}}
+        )
+        os.makedirs(os.path.join(dataset_dir, name, table), exist_ok=True)
+        part = f"{table}/part-{len(entry['parts'][table]):06d}.pkl"
+        frame.iloc[rows].to_pickle(os.path.join(dataset_dir, name, part))
+        entry["parts"][table].append(part)
+        entry[table] += len(rows)
+
+
+def write_partitions(
+    sessions: pd.DataFrame,
+    hits: pd.DataFrame,
+    dataset_dir: str = DEFAULT_DATASET_DIR,
+) -> Dict[str, int]:
+    """
+    Дописывание сессий и хитов в разделы по visit_date
+
+    Args:
+        sessions: Сессии (session_id, visit_date); пропуск даты - раздел 1970-01-01
+        hits: Хиты этих или ранее записанных сессий
+        dataset_dir: Папка набора
+
+    Returns:
+        dict: записано сессий и хитов, пропущено повторных сессий и хитов
+        (без известной сессии или повторной сессии)
+    """
+    os.makedirs(dataset_dir, exist_ok=True)
+    manifest = read_manifest(dataset_dir)
+    index = read_session_index(dataset_dir, manifest)
+
+    # Уже записанные сессии (и повторы внутри порции) не записываются заново,
+    # хиты уже записанных сессий из этой порции - тоже
+    indexed = sessions["session_id"].isin(index.index).to_numpy()
+    repeated = indexed | sessions["session_id"].duplicated().to_numpy()
+    repeated_hits = np.zeros(len(hits), dtype=bool)
+    if repeated.any():
+        repeated_hits = hits["session_id"].isin(sessions["session_id"][indexed]).to_numpy()
+        sessions, hits = sessions[~repeated], hits[~repeated_hits]
+
+    session_days = visit_day_numbers(sessions["visit_date"]).astype(np.int32)
+    new_entries = pd.Series(
+        session_days, index=pd.Index(sessions["session_id"], name="session_id"), dtype=np.int32
+    )
+    index = pd.concat([index, new_entries])
+
+    # Раздел хита - раздел его сессии по индексу
+    positions = index.index.get_indexer(hits["session_id"])
+    known = positions >= 0
+    if not known.all():
+        hits = hits[known]
+    hit_days = index.to_numpy()[positions[known]]
+
+    partitions = manifest["partitions"]
+    _write_parts(sessions, session_days, dataset_dir, "sessions", partitions)
+    _write_parts(hits, hit_days, dataset_dir, "hits", partitions)
+    manifest["partitions"] = dict(sorted(partitions.items()))
+
+    # Индекс - новый файл поколения, его имя попадает в набор вместе с манифестом
+    manifest["generation"] = manifest.get("generation", 0) + 1
+    manifest["session_index"] = SESSION_INDEX_NAME.format(generation=manifest["generation"])
+    _replace(os.path.join(dataset_dir, manifest["session_index"]), index.to_pickle)
+
+    def write_manifest(path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+
+    _replace(os.path.join(dataset_dir, MANIFEST_NAME), write_manifest)
+    # Индексы прежних поколений (и недописанные при сбое) больше не нужны
+    for path in glob.glob(os.path.join(dataset_dir, "session_index-*.pkl")):
+        if os.path.basename(path) != manifest["session_index"]:
+            os.remove(path)
+    return {
+        "sessions": len(sessions),
+        "hits": int(known.sum()),
+        "skipped_sessions": int(repeated.sum()),
+        "skipped_hits": int((~known).sum() + repeated_hits.sum()),
+    }
+
+
+def window_mask(
+    days: np.ndarray,
+    start_date: Optional[DateLike] = None,
+    end_date: Optional[DateLike] = None,
+    last_days: Optional[int] = None,
+) -> np.ndarray:
+    """
+    Дни внутри окна дат (границы включаются)
+
+    Args:
+        days: Номера дней от 1970-01-01
+        start_date: Первая дата окна (None - без ограничения)
+        end_date: Последняя дата окна (None - без ограничения)
+        last_days: Окно из last_days дней, заканчивающееся end_date или
+            последним из days (вместо start_date)
+    """
+    if not len(days):
+        return np.zeros(0, dtype=bool)
+    last = day_number(end_date) if end_date is not None else int(days.max())
+    first = day_number(start_date) if start_date is not None else int(days.min())
+    if last_days is not None:
+        first = last - last_days + 1
+    return (days >= first) & (days <= last)
+
+
+def select_partitions(
+    dataset_dir: str,
+    start_date: Optional[DateLike] = None,
+    end_date: Optional[DateLike] = None,
+    last_days: Optional[int] = None,
+) -> List[str]:
+    """
+    Разделы окна дат по манифесту, без чтения данных (окно - как у window_mask)
+
+    Returns:
+        list: имена папок разделов по возрастанию даты
+    """
+    return _window_partitions(read_manifest(dataset_dir), start_date, end_date, last_days)
+
+
+def _window_partitions(
+    manifest: Dict,
+    start_date: Optional[DateLike],
+    end_date: Optional[DateLike],
+    last_days: Optional[int],
+) -> List[str]:
+    """Разделы окна дат по уже прочитанному манифесту"""
+    names = list(manifest["partitions"])
+    days = np.array([day_number(name.split("=", 1)[1]) for name in names], dtype=np.int64)
+    selected = window_mask(days, start_date, end_date, last_days)
+    return [name for name, keep in zip(names, selected) if keep]
+
+
+def _read_table(
+    dataset_dir: str, manifest: Dict, partitions: List[str], table: str
+) -> pd.DataFrame:
+    """Части таблицы в выбранных разделах - только перечисленные в манифесте"""
+    frames = [
+        pd.read_pickle(os.path.join(dataset_dir, name, part))
+        for name in partitions
+        for part in manifest["partitions"][name]["parts"][table]
+    ]
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
+
+
+def load_partitions(
+    dataset_dir: str = DEFAULT_DATASET_DIR,
+    start_date: Optional[DateLike] = None,
+    end_date: Optional[DateLike] = None,
+    last_days: Optional[int] = None,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Сессии и хиты окна дат; читаются только разделы внутри окна
+
+    Аргументы окна - как у window_mask.
+
+    Returns:
+        tuple: (sessions, hits)
+    """
+    # Манифест читается один раз: разделы и части - из одной версии набора
+    manifest = read_manifest(dataset_dir)
+    partitions = _window_partitions(manifest, start_date, end_date, last_days)
+    return (
+        _read_table(dataset_dir, manifest, partitions, "sessions"),
+        _read_table(dataset_dir, manifest, partitions, "hits"),
+    )
+
+
+def main() -> None:
+    """Раскладка ga_sessions и ga_hits по датам визита"""
+    parser = argparse.ArgumentParser(description="Раскладка набора данных по visit_date")
+    parser.add_argument("--sessions", default="../data/ga_sessions.pkl", help="Сессии (pickle)")
+    parser.add_argument("--hits", default="../data/ga_hits.pkl", help="Хиты (pickle)")
+    parser.add_argument("--out", default=DEFAULT_DATASET_DIR, help="Папка набора")
+    args = parser.parse_args()
+
+    print("📂 Загружаем данные...")
+    sessions = pd.read_pickle(args.sessions)
+    hits = pd.read_pickle(args.hits)
+
+    print(f"🗂️ Раскладываем по датам в {args.out}...")
+    counts = write_partitions(sessions, hits, args.out)
+    partitions = read_manifest(args.out)["partitions"]
+    print(
+        f"✅ Разделов: {len(partitions)}, сессий: {counts['sessions']:,}, хитов: {counts['hits']:,}"
+    )
+    if counts["skipped_sessions"]:
+        print(f"⚠️ Уже записанных сессий пропущено: {counts['skipped_sessions']:,}")
+    if counts["skipped_hits"]:
+        print(
+            f"⚠️ Хитов без известной сессии или уже записанной сессии пропущено: "
+            f"{counts['skipped_hits']:,}"
+        )
+
+
+if __name__ == "__main__":
+    main()
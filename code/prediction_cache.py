@@ -0,0 +1,98 @@
+"""
+LRU-кэш предсказаний API
+
+Ключ - хэш проверенной строки признаков (FeatureSchema.assemble: порядок
+feature_names, пропуски = 0), приведенной к той точности, в которой модель
+сравнивает признаки (float32 у случайного леса,
+float64 у бустинга): одинаковые для модели запросы получают один ключ, а
+разные никогда не совпадают. Значение - пара (класс, вероятность), поэтому
+запись занимает около сотни байт. Кэш привязан к версии модели: get
+другой версии - промах без очистки, put другой версии очищает кэш и
+привязывает его к ней. Значение отдается только запросу той же версии,
+которой оно посчитано.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+
+def key_dtype(engine: str) -> Any:
+    """Точность сравнения признаков в деревьях движка"""
+    return np.float64 if engine == "hist_gradient_boosting" else np.float32
+
+
+def feature_key(row: np.ndarray, dtype: Any = np.float32) -> bytes:
+    """
+    Ключ кэша для проверенной строки признаков (FeatureSchema.assemble)
+
+    Returns:
+        bytes: 16 байт blake2b от строки в точности dtype
+    """
+    vector = np.ascontiguousarray(row, dtype=dtype)
+    return hashlib.blake2b(vector.tobytes(), digest_size=16).digest()
+
+
+class PredictionCache:
+    """
+    Потокобезопасный LRU-кэш (класс, вероятность) с ограничением числа записей
+
+    Args:
+        max_entries (int): Максимальное число записей (0 - кэш выключен)
+    """
+
+    def __init__(self, max_entries: int = 50_000) -> None:
+        self.max_entries = max_entries
+        self.version: Optional[str] = None
+        self._entries: "OrderedDict[bytes, Tuple[int, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, version: Optional[str], key: bytes) -> Optional[Tuple[int, float]]:
+        """Значение по ключу для версии модели (None - промах, в том числе другой версии)"""
+        with self._lock:
+            value = self._entries.get(key) if version == self.version else None
+            if value is None:
+                self.counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.counters["hits"] += 1
+            return value
+
+    def put(self, version: Optional[str], key: bytes, value: Tuple[int, float]) -> None:
+        """Сохранение значения с вытеснением самой давней записи; другая версия очищает кэш"""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            # Записи прежней версии не отдаются новой: кэш очищается и привязывается к version
+            if version != self.version:
+                self._entries.clear()
+                self.version = version
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.counters["evictions"] += 1
+
+    def clear(self) -> None:
+        """Очистка кэша и счетчиков"""
+        with self._lock:
+            self._entries.clear()
+            self.counters = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def stats(self) -> Dict[str, Any]:
+        """Размер кэша и доля попаданий"""
+        with self._lock:
+            counters = dict(self.counters)
+            size = len(self._entries)
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            "version": self.version,
+            "size": size,
+            "max_entries": self.max_entries,
+            **counters,
+            "hit_rate": round(counters["hits"] / lookups, 4) if lookups else 0.0,
+        }
@@ -1,10 +1,51 @@
+import argparse
 import os
 import pickle
 from typing import Any, Dict, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
-from sklearn.ensemble import RandomForestClassifier
+from client_history import (
+    CLIENT_HISTORY_FEATURES,
+    DEFAULT_CLIENT_HISTORY_PATH,
+    client_history_features,
+    save_client_history,
+    visit_timestamps,
+)
+from downsampling import NegativeDownsamplingClassifier
+from features import (
+    FEATURE_NAMES,
+    aggregate_sessions,
+    build_feature_matrix,
+    visit_day_numbers,
+)
+from hashed_features import (
+    HASHED_HIT_FIELDS,
+    HASHED_SESSION_FIELDS,
+    N_HASH_BUCKETS,
+    hashed_design_matrix,
+    hashed_feature_matrix,
+    make_hashed_estimator,
+)
+from hit_sequences import SEQUENCE_FEATURE_NAMES, sequence_features
+from inference import (  # noqa: F401 (прежний импорт из sber_auto_model)
+    DEFAULT_MODEL_PATH,
+    MODEL_ENGINES,
+    InferenceModel,
+    format_error,
+    format_prediction,
+)
+from model_artifact import matrix_fingerprint, save_artifact
+from model_metadata import feature_ranges
+from parallel_features import parallel_feature_matrix
+from partitioned_store import (
+    DEFAULT_DATASET_DIR,
+    MANIFEST_NAME,
+    DateLike,
+    load_partitions,
+    window_mask,
+)
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
 from sklearn.metrics import (
     average_precision_score,
     balanced_accuracy_score,
@@ -17,27 +58,123 @@ from sklearn.metrics import (
     recall_score,
     roc_auc_score,
 )
-from sklearn.model_selection import GridSearchCV, cross_val_score, train_test_split
+from sklearn.model_selection import cross_val_score, train_test_split
+from target_encoding import CITY_CODE_COLUMN, CityTargetEncodingClassifier
+from target_families import TARGET_KEYWORDS, family_split, shared_city_encoding
+from warm_start_search import WarmStartGridSearch
+
+# Модель на хешированных признаках (train_and_save_model(hashed=True))
+DEFAULT_HASHED_MODEL_PATH = "../build/hashed_model.pkl"
+
+
+def make_estimator(
+    engine: str, class_weight: Optional[Dict[int, float]] = None
+) -> Tuple[Any, Dict[str, List[Any]]]:
+    """
+    Базовый классификатор и сетка гиперпараметров для движка
+
+    Args:
+        engine (str): "random_forest" или "hist_gradient_boosting"
+        class_weight (dict, optional): Веса классов
+
+    Returns:
+        tuple: классификатор и сетка для WarmStartGridSearch
+    """
+    if engine == "random_forest":
+        # Параметры для поиска (упрощенные для ускорения). n_estimators - точки
+        # наращивания одного леса (WarmStartGridSearch), а не отдельные обучения
+        param_grid: Dict[str, List[Any]] = {
+            "n_estimators": [50, 100, 200],
+            "max_depth": [10, 12],
+            "min_samples_split": [50],
+            "min_samples_leaf": [20],
+        }
+        forest = RandomForestClassifier(random_state=42, n_jobs=-1, class_weight=class_weight)
+        return forest, param_grid
+
+    if engine == "hist_gradient_boosting":
+        # Признаки разбиваются на 255 корзин, число итераций подбирает ранняя остановка
+        param_grid = {
+            "learning_rate": [0.05, 0.1],
+            "max_leaf_nodes": [31, 63],
+            "min_samples_leaf": [20],
+        }
+        boosting = HistGradientBoostingClassifier(
+            max_iter=500,
+            max_bins=255,
+            early_stopping=True,
+            validation_fraction=0.1,
+            n_iter_no_change=20,
+            scoring="loss",
+            class_weight=class_weight,
+            random_state=42,
+        )
+        return boosting, param_grid
+
+    raise ValueError(f"Неизвестный движок модели: {engine}. Доступные: {', '.join(MODEL_ENGINES)}")
 
 
-class SberAutoModel:
+def default_params(engine: str) -> Dict[str, Any]:
+    """Параметры модели без поиска: первая точка сетки make_estimator (самая быстрая)"""
+    _, param_grid = make_estimator(engine)
+    return {name: values[0] for name, values in param_grid.items()}
+
+
+class SberAutoModel(InferenceModel):
     """
     Модель для предсказания целевых действий на сайте СберАвтоподписка
+
+    Загрузка и предсказания - в InferenceModel, здесь обучение и сохранение.
+
+    Args:
+        engine (str): Движок модели из MODEL_ENGINES (по умолчанию случайный лес)
     """
 
-    def __init__(self) -> None:
-        self.model: Optional[RandomForestClassifier] = None
-        self.feature_names: Optional[List[str]] = None
-        self.target_actions: Optional[List[str]] = None
+    def __init__(self, engine: str = "random_forest") -> None:
+        super().__init__(engine)
         self.scaler: Optional[Any] = None
+        self.hashed_model: Optional[Any] = None
+        # n-граммы переходов create_features(sequences=True) для train_hashed_model
+        self.sequence_ngrams: Optional[Any] = None
+
+    def load_data(
+        self,
+        start_date: Optional[DateLike] = None,
+        end_date: Optional[DateLike] = None,
+        last_days: Optional[int] = None,
+        dataset_dir: str = DEFAULT_DATASET_DIR,
+    ) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Загрузка и подготовка данных
+
+        Если набор разложен по датам (partitioned_store.py), читаются только
+        разделы окна дат. Иначе загружаются полные ga_sessions и ga_hits, и
+        окно, если задано, применяется в памяти.
 
-    def load_data(self) -> Tuple[pd.DataFrame, pd.DataFrame]:
-        """Загрузка и подготовка данных"""
+        Args:
+            start_date: Первая дата визита (включительно, None - без ограничения)
+            end_date: Последняя дата визита (включительно, None - без ограничения)
+            last_days: Окно из last_days дней до end_date или последней даты
+            dataset_dir: Папка набора, разложенного по датам
+        """
         print("📂 Загружаем данные...")
 
-        # Загрузка данных
-        sessions = pd.read_pickle("../data/ga_sessions.pkl")
-        hits = pd.read_pickle("../data/ga_hits.pkl")
+        window = (start_date, end_date, last_days) != (None, None, None)
+        if os.path.exists(os.path.join(dataset_dir, MANIFEST_NAME)):
+            print(f"🗂️ Читаем разделы окна дат из {dataset_dir}")
+            sessions, hits = load_partitions(dataset_dir, start_date, end_date, last_days)
+        else:
+            # Загрузка данных
+            sessions = pd.read_pickle("../data/ga_sessions.pkl")
+            hits = pd.read_pickle("../data/ga_hits.pkl")
+            if window:
+                print("⚠️ Набор не разложен по датам, окно применяется в памяти")
+                days = visit_day_numbers(sessions["visit_date"])
+                sessions = sessions[window_mask(days, start_date, end_date, last_days)]
+                hits = hits[hits["session_id"].isin(sessions["session_id"])]
+
+        if sessions.empty:
+            raise ValueError("В окне дат нет сессий")
 
         print(f"📊 Сессии: {sessions.shape}")
         print(f"📊 Хиты: {hits.shape}")
@@ -51,42 +188,32 @@ class SberAutoModel:
 
     def define_target_actions(self, hits: pd.DataFrame) -> List[str]:
         """Определение целевых действий с расширенной логикой"""
-        print("🎯 Определяем целевые действия...")
-
         # Анализ всех событий
         unique_events = hits["event_action"].value_counts()
 
-        # Cписок ключевых слов для целевых действий
-        target_keywords = [
-            "заявка",
-            "звонок",
-            "оформление",
-            "callback",
-            "покупка",
-            "order",
-            "submit",
-            "contact",
-            "call",
-            "chat",
-            "auth",
-            "success",
-            "request",
-            "claim",
-            "phone",
-            "sms",
-            "code",
-            "confirm",
-            "start_chat",
-            "user_message",
-            "proactive",
-            "invitation",
-        ]
+        return self.define_target_actions_from_counts(unique_events, len(hits))
+
+    def define_target_actions_from_counts(
+        self, unique_events: pd.Series, total_hits: int
+    ) -> List[str]:
+        """
+        Определение целевых действий по частотам событий
+
+        Args:
+            unique_events (Series): Число хитов для каждого event_action
+            total_hits (int): Общее число хитов
+
+        Returns:
+            list: Список целевых действий
+        """
+        print("🎯 Определяем целевые действия...")
 
         potential_targets = []
 
+        # Ключевые слова всех семейств целевых действий (см. target_families)
         for event in unique_events.index:
             event_lower = str(event).lower()
-            for keyword in target_keywords:
+            for keyword in TARGET_KEYWORDS:
                 if keyword in event_lower:
                     potential_targets.append((event, unique_events[event]))
                     break
@@ -96,14 +223,34 @@ class SberAutoModel:
         print(f"✅ Найдено {len(self.target_actions)} целевых действий")
         print(f"📋 Примеры: {self.target_actions[:5]}")
 
-        total_target_events = hits[hits["event_action"].isin(self.target_actions)].shape[0]
+        total_target_events = int(unique_events[self.target_actions].sum())
         print(f"📊 Всего целевых событий: {total_target_events:,}")
-        print(f"📊 Доля целевых событий: {total_target_events / len(hits) * 100:.1f}%")
+        print(f"📊 Доля целевых событий: {total_target_events / total_hits * 100:.1f}%")
 
         return self.target_actions
 
-    def create_features(self, sessions: pd.DataFrame, hits: pd.DataFrame) -> pd.DataFrame:
-        """Создание признаков"""
+    def create_features(
+        self,
+        sessions: pd.DataFrame,
+        hits: pd.DataFrame,
+        workers: int = 1,
+        sequences: bool = False,
+    ) -> pd.DataFrame:
+        """
+        Создание признаков
+
+        Признаки пишутся сразу в одну матрицу float32 в порядке FEATURE_NAMES;
+        возвращаемый DataFrame использует эту матрицу без копирования.
+
+        Args:
+            sessions (DataFrame): Сессии
+            hits (DataFrame): Хиты
+            workers (int): Процессов для шардов session_id (parallel_features);
+                1 - в текущем процессе
+            sequences (bool): Добавить признаки ключевых действий
+                SEQUENCE_FEATURE_NAMES (hit_sequences); n-граммы переходов
+                сохраняются в self.sequence_ngrams для train_hashed_model
+        """
         print("🔧 Создаем признаки...")
 
         # Создание целевой переменной с расширенной логикой
@@ -112,162 +259,40 @@ class SberAutoModel:
                 "Целевые действия не определены. Сначала вызовите define_target_actions."
             )
 
-        hits["is_target"] = hits["event_action"].apply(
-            lambda x: 1 if any(key in str(x).lower() for key in self.target_actions) else 0
-        )
-
-        # Агрегация по сессии
-        session_metrics = (
-            hits.groupby("session_id")
-            .agg(
-                {
-                    "is_target": "max",
-                    "hit_number": "count",
-                    "hit_page_path": "nunique",
-                    "hit_time": lambda x: max(x) - min(x) if len(x) > 1 else 0,
-                    "event_action": "nunique",
-                }
+        if workers > 1:
+            print(f"⚡ Шарды session_id в {workers} процессах...")
+            X, y = parallel_feature_matrix(sessions, hits, self.target_actions, workers)
+        else:
+            # Агрегация по сессии
+            session_metrics = aggregate_sessions(hits, self.target_actions)
+
+            # Все признаки, включая географические, в одной матрице
+            print("🌍 Создаем географические признаки...")
+            X, y = build_feature_matrix(sessions, session_metrics)
+
+        df = pd.DataFrame(X, columns=FEATURE_NAMES, copy=False)
+        df["is_target"] = y
+        # Код города: конверсия городов пересчитывается без утечки (см. target_encoding)
+        df[CITY_CODE_COLUMN] = pd.factorize(sessions["geo_city"])[0]
+
+        # История клиента по его прошлым сессиям (см. client_history)
+        if "client_id" in sessions:
+            print("👤 Создаем признаки истории клиента...")
+            history = client_history_features(
+                sessions["client_id"], visit_timestamps(sessions), y, df["session_duration"]
             )
-            .rename(
-                columns={
-                    "hit_number": "total_hits",
-                    "hit_page_path": "unique_pages",
-                    "hit_time": "session_duration",
-                    "event_action": "unique_events",
-                }
+            for j, name in enumerate(CLIENT_HISTORY_FEATURES):
+                df[name] = history[:, j]
+
+        # Порядок страниц и событий в сессии (см. hit_sequences)
+        self.sequence_ngrams = None
+        if sequences:
+            print("🔗 Создаем признаки последовательности хитов...")
+            self.sequence_ngrams, timing = sequence_features(
+                hits, self.target_actions, sessions["session_id"]
             )
-        )
-
-        # Объединение данных
-        df = sessions.merge(session_metrics, on="session_id", how="left")
-        df["is_target"] = df["is_target"].fillna(0).astype(int)
-        df["session_duration"] = df["session_duration"].fillna(0)
-        df["unique_events"] = df["unique_events"].fillna(0)
-
-        # Временные признаки
-        df["visit_datetime"] = pd.to_datetime(
-            df["visit_date"].astype(str) + " " + df["visit_time"].astype(str)
-        )
-        df["visit_hour"] = df["visit_datetime"].dt.hour
-        df["visit_weekday"] = df["visit_datetime"].dt.weekday
-        df["is_weekend"] = df["visit_weekday"].isin([5, 6]).astype(int)
-
-        # Новые временные признаки
-        df["is_morning"] = df["visit_hour"].between(6, 11).astype(int)
-        df["is_afternoon"] = df["visit_hour"].between(12, 17).astype(int)
-        df["is_evening"] = df["visit_hour"].between(18, 23).astype(int)
-        df["is_night"] = ((df["visit_hour"] >= 0) & (df["visit_hour"] <= 5)).astype(int)
-        df["is_workday"] = (~df["is_weekend"]).astype(int)
-
-        # Признаки устройств
-        df["is_mobile"] = (df["device_category"] == "mobile").astype(int)
-        df["is_android"] = (df["device_os"] == "Android").astype(int)
-        df["is_ios"] = (df["device_os"] == "iOS").astype(int)
-        df["is_desktop"] = (df["device_category"] == "desktop").astype(int)
-        df["is_tablet"] = (df["device_category"] == "tablet").astype(int)
-
-        # Новые признаки устройств
-        df["is_windows"] = (df["device_os"] == "Windows").astype(int)
-        df["is_macos"] = (df["device_os"] == "macOS").astype(int)
-
-        # Географические признаки
-        print("🌍 Создаем географические признаки...")
-
-        # Анализ городов с более детальной сегментацией
-        city_stats = (
-            df.groupby("geo_city")
-            .agg(
-                {
-                    "session_id": "count",
-                    "is_target": "sum",
-                    "session_duration": "mean",
-                    "total_hits": "mean",
-                }
-            )
-            .rename(
-                columns={
-                    "session_id": "city_sessions",
-                    "is_target": "city_conversions",
-                    "session_duration": "city_avg_duration",
-                    "total_hits": "city_avg_hits",
-                }
-            )
-        )
-
-        city_stats["city_conversion_rate"] = (
-            city_stats["city_conversions"] / city_stats["city_sessions"] * 100
-        ).round(2)
-
-        # Сегментация городов
-        city_stats["city_tier"] = pd.cut(
-            city_stats["city_conversion_rate"],
-            bins=[0, 0.8, 1.2, 1.6, 10],
-            labels=["low", "medium", "high", "very_high"],
-        )
-
-        # Добавляем географические признаки к основному датасету
-        df = df.merge(
-            city_stats[
-                [
-                    "city_conversion_rate",
-                    "city_tier",
-                    "city_sessions",
-                    "city_avg_duration",
-                    "city_avg_hits",
-                ]
-            ],
-            left_on="geo_city",
-            right_index=True,
-            how="left",
-        )
-
-        # Заполняем пропуски
-        df["city_conversion_rate"] = df["city_conversion_rate"].fillna(0)
-        df["city_tier"] = df["city_tier"].fillna("low")
-        df["city_sessions"] = df["city_sessions"].fillna(0)
-        df["city_avg_duration"] = df["city_avg_duration"].fillna(0)
-        df["city_avg_hits"] = df["city_avg_hits"].fillna(0)
-
-        # Расширенные географические признаки
-        df["is_moscow"] = (df["geo_city"] == "Moscow").astype(int)
-        df["is_spb"] = (df["geo_city"] == "Saint Petersburg").astype(int)
-        df["is_million_plus"] = (df["city_sessions"] >= 1000).astype(int)
-        df["is_regional_center"] = (df["city_sessions"] >= 500).astype(int)
-
-        # Кодируем tier городов
-        df["city_tier_low"] = (df["city_tier"] == "low").astype(int)
-        df["city_tier_medium"] = (df["city_tier"] == "medium").astype(int)
-        df["city_tier_high"] = (df["city_tier"] == "high").astype(int)
-        df["city_tier_very_high"] = (df["city_tier"] == "very_high").astype(int)
-
-        # Источники трафика
-        df["is_paid"] = ~df["utm_medium"].isin(["organic", "referral", "(none)"]).astype(int)
-        df["is_organic"] = (df["utm_medium"] == "organic").astype(int)
-        df["is_referral"] = (df["utm_medium"] == "referral").astype(int)
-        df["is_direct"] = (df["utm_medium"] == "(none)").astype(int)
-
-        # Поведенческие метрики
-        df["avg_time_per_page"] = df["session_duration"] / df["total_hits"]
-        df["avg_time_per_page"] = df["avg_time_per_page"].replace([np.inf, -np.inf], 0)
-
-        # Новые поведенческие признаки
-        df["bounce_rate"] = (df["total_hits"] == 1).astype(int)
-        df["deep_engagement"] = (df["unique_pages"] >= 5).astype(int)
-        df["long_session"] = (df["session_duration"] > 300).astype(int)
-        df["very_long_session"] = (df["session_duration"] > 600).astype(int)
-        df["high_activity"] = (df["total_hits"] >= 10).astype(int)
-        df["very_high_activity"] = (df["total_hits"] >= 15).astype(int)
-
-        # Новые признаки взаимодействия
-        df["events_per_page"] = df["unique_events"] / df["unique_pages"]
-        df["events_per_page"] = df["events_per_page"].replace([np.inf, -np.inf], 0)
-        df["engagement_score"] = (
-            df["total_hits"] * df["unique_pages"] * df["session_duration"]
-        ) / 1000
-
-        # Признаки повторных посещений
-        df["is_returning"] = (df["visit_number"] > 1).astype(int)
-        df["is_frequent"] = (df["visit_number"] >= 3).astype(int)
+            for name in SEQUENCE_FEATURE_NAMES:
+                df[name] = timing[name].to_numpy()
 
         print(f"✅ Создано {len(df)} сессий с признаками")
         return df
@@ -276,64 +301,18 @@ class SberAutoModel:
         """Подготовка признаков для модели"""
         print("🔧 Подготавливаем признаки для модели...")
 
-        # Расширенный список признаков
-        feature_cols = [
-            # Базовые признаки
-            "visit_number",
-            "total_hits",
-            "unique_pages",
-            "session_duration",
-            "unique_events",
-            # Временные признаки
-            "visit_hour",
-            "visit_weekday",
-            "is_weekend",
-            "is_workday",
-            "is_morning",
-            "is_afternoon",
-            "is_evening",
-            "is_night",
-            # Признаки устройств
-            "is_mobile",
-            "is_android",
-            "is_ios",
-            "is_desktop",
-            "is_tablet",
-            "is_windows",
-            "is_macos",
-            # Источники трафика
-            "is_paid",
-            "is_organic",
-            "is_referral",
-            "is_direct",
-            # Поведенческие метрики
-            "avg_time_per_page",
-            "bounce_rate",
-            "deep_engagement",
-            "long_session",
-            "very_long_session",
-            "high_activity",
-            "very_high_activity",
-            "events_per_page",
-            "engagement_score",
-            # Признаки повторных посещений
-            "is_returning",
-            "is_frequent",
-            # Географические признаки
-            "is_moscow",
-            "is_spb",
-            "is_million_plus",
-            "is_regional_center",
-            "city_conversion_rate",
-            "city_avg_duration",
-            "city_avg_hits",
-            "city_tier_low",
-            "city_tier_medium",
-            "city_tier_high",
-            "city_tier_very_high",
+        feature_cols = list(FEATURE_NAMES) + [
+            name for name in CLIENT_HISTORY_FEATURES + SEQUENCE_FEATURE_NAMES if name in df.columns
         ]
 
-        X = df[feature_cols].fillna(0)
+        # FEATURE_NAMES - первые столбцы df, одна матрица float32 из create_features:
+        # срез iloc - представление этой матрицы без копии. Признаки истории клиента
+        # и последовательностей - отдельные столбцы, с ними выборка копирует данные
+        n_base = len(FEATURE_NAMES)
+        if feature_cols == list(FEATURE_NAMES) and list(df.columns[:n_base]) == feature_cols:
+            X = df.iloc[:, :n_base]
+        else:
+            X = df[feature_cols]
         Y = df["is_target"]
 
         self.feature_names = feature_cols
@@ -352,23 +331,45 @@ class SberAutoModel:
 
         return X, Y
 
-    def optimize_hyperparameters(self, X: pd.DataFrame, y: pd.Series) -> RandomForestClassifier:
-        """Оптимизация гиперпараметров модели"""
+    def optimize_hyperparameters(
+        self,
+        X: pd.DataFrame,
+        y: pd.Series,
+        class_weight: Optional[Dict[int, float]] = None,
+        negative_rate: Optional[float] = None,
+    ) -> Any:
+        """
+        Оптимизация гиперпараметров модели
+
+        Args:
+            X (DataFrame): Признаки (со столбцом CITY_CODE_COLUMN - конверсия
+                городов пересчитывается по фолдам, см. CityTargetEncodingClassifier)
+            y (Series): Целевая переменная
+            class_weight (dict, optional): Веса классов (например, для выборки
+                с прореженными негативами)
+            negative_rate (float, optional): Доля негативов, на которых обучается
+                каждая модель поиска (см. NegativeDownsamplingClassifier)
+        """
         print("🔧 Оптимизируем гиперпараметры...")
 
-        # Параметры для поиска (упрощенные для ускорения)
-        param_grid = {
-            "n_estimators": [100, 200],
-            "max_depth": [10, 12],
-            "min_samples_split": [50],
-            "min_samples_leaf": [20],
-        }
+        # Создание базовой модели и сетки параметров для выбранного движка
+        base_model, param_grid = make_estimator(self.engine, class_weight)
+        print(f"⚙️ Движок модели: {self.engine}")
 
-        # Создание базовой модели
-        base_model = RandomForestClassifier(random_state=42, n_jobs=-1)
+        # Прореживание негативов: параметры модели передаются через estimator__
+        if negative_rate is not None:
+            base_model = NegativeDownsamplingClassifier(
+                base_model, negative_rate=negative_rate, random_state=42
+            )
+            param_grid = {f"estimator__{name}": values for name, values in param_grid.items()}
+
+        # Конверсия городов считается в каждом фолде только по его обучающим строкам
+        if CITY_CODE_COLUMN in X.columns:
+            base_model = CityTargetEncodingClassifier(base_model, random_state=42)
+            param_grid = {f"estimator__{name}": values for name, values in param_grid.items()}
 
-        # Grid Search с кросс-валидацией (упрощенный)
-        grid_search = GridSearchCV(
+        # Grid Search с кросс-валидацией (упрощенный), деревья леса наращиваются
+        grid_search = WarmStartGridSearch(
             estimator=base_model,
             param_grid=param_grid,
             cv=2,
@@ -384,9 +385,37 @@ class SberAutoModel:
 
         return grid_search.best_estimator_
 
-    def train_model(self, X: pd.DataFrame, y: pd.Series) -> float:
-        """Обучение модели"""
+    def train_model(
+        self,
+        X: pd.DataFrame,
+        y: pd.Series,
+        class_weight: Optional[Dict[int, float]] = None,
+        negative_rate: Optional[float] = None,
+        city_codes: Optional[np.ndarray] = None,
+    ) -> float:
+        """
+        Обучение модели
+
+        Args:
+            X (DataFrame): Признаки
+            y (Series): Целевая переменная
+            class_weight (dict, optional): Веса классов. Используются только при
+                обучении; метрики тестовой выборки считаются без весов.
+            negative_rate (float, optional): Обучать на всех позитивах и этой доле
+                негативов; predict_proba пересчитывается к исходной доле позитивов.
+                Тестовая выборка и фолды оценки не прореживаются.
+            city_codes (ndarray, optional): Код города каждой строки (create_features).
+                Конверсия и сегменты городов тогда считаются только по строкам
+                обучения каждого фолда, а не по всем данным.
+
+        Returns:
+            float: ROC-AUC на тестовой выборке
+        """
         print("🤖 Обучаем модель...")
+        self.data_fingerprint = matrix_fingerprint(X, y)
+        self.feature_ranges = feature_ranges(X, list(X.columns))
+        if city_codes is not None:
+            X = X.assign(**{CITY_CODE_COLUMN: city_codes})
 
         # Разделение данных
         X_train, X_test, y_train, y_test = train_test_split(
@@ -394,7 +423,7 @@ class SberAutoModel:
         )
 
         # Оптимизация гиперпараметров
-        self.model = self.optimize_hyperparameters(X_train, y_train)
+        self.model = self.optimize_hyperparameters(X_train, y_train, class_weight, negative_rate)
 
         # Оценка модели
         y_pred = self.model.predict(X_test)
@@ -405,10 +434,11 @@ class SberAutoModel:
         precision = float(precision_score(y_test, y_pred))
         recall = float(recall_score(y_test, y_pred))
         f1 = float(f1_score(y_test, y_pred))
-        accuracy = float((y_pred == y_test).mean())
+        accuracy = float(np.mean(y_pred == y_test))
 
         # Дополнительные метрики
-        specificity = float(((y_pred == 0) & (y_test == 0)).sum() / (y_test == 0).sum())
+        negatives = (y_test == 0).to_numpy()
+        specificity = float(np.mean(y_pred[negatives] == 0))
         balanced_acc = float(balanced_accuracy_score(y_test, y_pred))
         kappa = float(cohen_kappa_score(y_test, y_pred))
         mcc = float(matthews_corrcoef(y_test, y_pred))
@@ -418,6 +448,11 @@ class SberAutoModel:
         brier = float(brier_score_loss(y_test, y_pred_proba))
 
         print(f"📊 Размер обучающей выборки: {X_train.shape}")
+        if negative_rate is not None:
+            print(
+                f"📉 Прореживание негативов: {negative_rate:.0%}, "
+                f"обучено на {self.model.n_train_samples_:,} строках"
+            )
         print(f"📊 Размер тестовой выборки: {X_test.shape}")
         print(f"📈 ROC-AUC: {roc_auc:.4f}")
         print(f"📊 Цель 0.65 превышена на {((roc_auc - 0.65) / 0.65 * 100):.1f}%")
@@ -437,17 +472,18 @@ class SberAutoModel:
         print("\n📋 Отчет о классификации:")
         print(classification_report(y_test, y_pred))
 
-        # Анализ важности признаков
-        feature_importance = pd.DataFrame(
-            {
-                "feature": self.feature_names,
-                "importance": self.model.feature_importances_,
-            }
-        ).sort_values("importance", ascending=False)
+        # Анализ важности признаков (у градиентного бустинга встроенной важности нет)
+        if hasattr(self.model, "feature_importances_"):
+            feature_importance = pd.DataFrame(
+                {
+                    "feature": self.feature_names,
+                    "importance": self.model.feature_importances_,
+                }
+            ).sort_values("importance", ascending=False)
 
-        print("\n🏆 Топ-20 важных признаков:")
-        for _, row in feature_importance.head(20).iterrows():
-            print(f"{row['feature']}: {row['importance']:.3f}")
+            print("\n🏆 Топ-20 важных признаков:")
+            for _, row in feature_importance.head(20).iterrows():
+                print(f"{row['feature']}: {row['importance']:.3f}")
 
         # Кросс-валидация с дополнительными метриками
         cv_roc_scores = cross_val_score(self.model, X, y, cv=5, scoring="roc_auc")
@@ -485,124 +521,153 @@ class SberAutoModel:
 
         return roc_auc
 
-    def save_model(self, filename: str = "../build/sber_auto_model.pkl") -> None:
-        """Сохранение модели"""
-        # Создаем директорию build если её нет
-        os.makedirs("../build", exist_ok=True)
+    def train_hashed_model(
+        self,
+        X: pd.DataFrame,
+        y: pd.Series,
+        sessions: pd.DataFrame,
+        hits: pd.DataFrame,
+        city_codes: Optional[np.ndarray] = None,
+    ) -> float:
+        """
+        Обучение логистической регрессии на плотных признаках и хешированных корзинах
 
-        print(f"💾 Сохраняем модель в {filename}...")
+        Матрица - hashed_design_matrix из X и hashed_feature_matrix(sessions, hits)
+        (с n-граммами переходов, если create_features вызван с sequences=True),
+        модель - make_hashed_estimator, разбиение и тестовая выборка - как у train_model.
 
+        Args:
+            X (DataFrame): Признаки prepare_features
+            y (Series): Целевая переменная
+            sessions (DataFrame): Сессии в порядке строк X
+            hits (DataFrame): Хиты
+            city_codes (ndarray, optional): Код города каждой строки; конверсия
+                городов тогда считается по строкам обучения
+                (target_families.shared_city_encoding)
+
+        Returns:
+            float: ROC-AUC на тестовой выборке
+        """
+        print("🧮 Обучаем модель на хешированных признаках...")
+        labels = y.to_numpy()
+        # Разбиение до кодирования городов: метки теста не попадают в признаки
+        train, test = family_split(labels)
+        dense = (
+            shared_city_encoding(X, city_codes, labels, train)
+            if city_codes is not None
+            else X.to_numpy(dtype=np.float32)
+        )
+        hashed = hashed_feature_matrix(sessions, hits)
+        if self.sequence_ngrams is not None:
+            hashed = hashed + self.sequence_ngrams
+        design = hashed_design_matrix(dense, hashed)
+        print(f"📊 Матрица: {design.shape}, ненулевых: {design.nnz:,}")
+
+        self.hashed_model = make_hashed_estimator().fit(design[train], labels[train])
+        proba = self.hashed_model.predict_proba(design[test])[:, 1]
+
+        roc_auc = roc_auc_score(labels[test], proba)
+        avg_precision = average_precision_score(labels[test], proba)
+        print("\n📊 МЕТРИКИ НА ТЕСТОВОЙ ВЫБОРКЕ:")
+        print(f"   ROC-AUC: {roc_auc:.4f}")
+        print(f"   Average Precision: {avg_precision:.4f}")
+        print(f"   Brier Score: {brier_score_loss(labels[test], proba):.4f}")
+
+        self.metrics = {"roc_auc": roc_auc, "avg_precision": avg_precision}
+        return roc_auc
+
+    def save_hashed_model(self, filename: str = DEFAULT_HASHED_MODEL_PATH) -> None:
+        """Сохранение модели train_hashed_model (pickle: модель и схема матрицы)"""
+        os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+        print(f"💾 Сохраняем модель на хешированных признаках в {filename}...")
         model_data = {
-            "model": self.model,
+            "model": self.hashed_model,
             "feature_names": self.feature_names,
+            "n_buckets": N_HASH_BUCKETS,
+            "hashed_fields": HASHED_SESSION_FIELDS + HASHED_HIT_FIELDS,
+            "sequence_ngrams": self.sequence_ngrams is not None,
             "target_actions": self.target_actions,
+            "metrics": self.metrics,
         }
-
         with open(filename, "wb") as f:
             pickle.dump(model_data, f)
-
         print("✅ Модель сохранена")
 
-    def load_model(self, filename: str = "sber_auto_model.pkl") -> None:
-        """Загрузка модели"""
-        print(f"📂 Загружаем модель из {filename}...")
-
-        with open(filename, "rb") as f:
-            model_data = pickle.load(f)
-
-        self.model = model_data["model"]
-        self.feature_names = model_data["feature_names"]
-        self.target_actions = model_data["target_actions"]
-
-        print("✅ Модель загружена")
-
-    def predict(self, data: Dict[str, Any]) -> Dict[str, Any]:
+    def save_model(self, filename: str = DEFAULT_MODEL_PATH) -> None:
         """
-        Предсказание для новых данных
+        Сохранение модели
 
-        Args:
-            data (dict): Словарь с признаками сессии
-
-        Returns:
-            dict: Результат предсказания с дополнительной информацией
+        По умолчанию модель сохраняется папкой с массивами деревьев и
+        manifest.json (быстрая загрузка через mmap). Путь с расширением .pkl
+        сохраняет прежний формат pickle.
         """
-        if self.model is None:
-            raise ValueError("Модель не загружена. Сначала загрузите или обучите модель.")
-
-        if self.feature_names is None:
-            raise ValueError("Признаки модели не загружены.")
-
-        # Создаем DataFrame из входных данных
-        df_input = pd.DataFrame([data])
-
-        # Проверяем наличие всех признаков
-        missing_features = set(self.feature_names) - set(df_input.columns)
-        if missing_features:
-            # Добавляем недостающие признаки со значениями по умолчанию
-            for feature in missing_features:
-                df_input[feature] = 0
-
-        # Выбираем только нужные признаки в правильном порядке
-        X = df_input[self.feature_names].fillna(0)
+        # Создаем директорию build если её нет
+        os.makedirs("../build", exist_ok=True)
 
-        # Предсказание
-        prediction = self.model.predict(X)[0]
-        probability = self.model.predict_proba(X)[0][1]
+        print(f"💾 Сохраняем модель в {filename}...")
 
-        # Дополнительная информация
-        confidence_level = (
-            "высокая" if probability > 0.7 else "средняя" if probability > 0.3 else "низкая"
-        )
+        if filename.endswith(".pkl"):
+            model_data = {
+                "model": self.model,
+                "engine": self.engine,
+                "feature_names": self.feature_names,
+                "target_actions": self.target_actions,
+                "feature_ranges": self.feature_ranges,
+            }
 
-        return {
-            "prediction": int(prediction),
-            "probability": float(probability),
-            "will_convert": bool(prediction),
-            "conversion_probability": f"{probability * 100:.2f}%",
-            "confidence_level": confidence_level,
-        }
+            with open(filename, "wb") as f:
+                pickle.dump(model_data, f)
+        else:
+            save_artifact(
+                filename,
+                self.model,
+                engine=self.engine,
+                feature_names=self.feature_names or [],
+                target_actions=self.target_actions,
+                metrics=self.metrics,
+                data_fingerprint=self.data_fingerprint,
+                feature_ranges=self.feature_ranges,
+            )
 
-    def predict_batch(self, data_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """
-        Пакетное предсказание с обработкой ошибок
+        print("✅ Модель сохранена")
 
-        Args:
-            data_list (list): Список словарей с признаками сессий
 
-        Returns:
-            list: Список результатов предсказаний
-        """
-        results = []
-        for i, data in enumerate(data_list):
-            try:
-                result = self.predict(data)
-                result["session_id"] = i
-                results.append(result)
-            except Exception as e:
-                results.append(
-                    {
-                        "session_id": i,
-                        "error": str(e),
-                        "prediction": 0,
-                        "probability": 0.0,
-                        "will_convert": False,
-                        "conversion_probability": "0.00%",
-                    }
-                )
-        return results
-
-
-def train_and_save_model() -> SberAutoModel:
-    """Обучение и сохранение модели"""
+def train_and_save_model(
+    negative_rate: Optional[float] = None,
+    engine: str = "random_forest",
+    start_date: Optional[DateLike] = None,
+    end_date: Optional[DateLike] = None,
+    last_days: Optional[int] = None,
+    hashed: bool = False,
+    sequences: bool = False,
+    workers: int = 1,
+) -> SberAutoModel:
+    """
+    Обучение и сохранение модели
+
+    Args:
+        negative_rate (float, optional): Доля негативов для ускоренного обучения
+            (см. SberAutoModel.train_model)
+        engine (str): Движок модели из MODEL_ENGINES
+        start_date, end_date, last_days: Окно дат визита для обучения
+            (см. SberAutoModel.load_data)
+        hashed (bool): Логистическая регрессия на плотных и хешированных признаках
+            (SberAutoModel.train_hashed_model) вместо модели engine; сохраняется в
+            DEFAULT_HASHED_MODEL_PATH
+        sequences (bool): Признаки последовательности хитов (hit_sequences): ключевые
+            действия - столбцы матрицы, n-граммы переходов - в режиме hashed
+        workers (int): Процессов для построения признаков по шардам session_id
+            (SberAutoModel.create_features)
+    """
     print("🚀 Запуск обучения модели СберАвтоподписка")
     print("=" * 60)
 
     # Создание экземпляра модели
-    model = SberAutoModel()
+    model = SberAutoModel(engine)
 
     # Проверяем, есть ли уже сохраненная модель
-    model_path = "../build/sber_auto_model.pkl"
-    if os.path.exists(model_path):
+    model_path = DEFAULT_MODEL_PATH
+    if not hashed and os.path.exists(model_path):
         print("📂 Найдена сохраненная модель, загружаем...")
         try:
             model.load_model(model_path)
@@ -613,22 +678,40 @@ def train_and_save_model() -> SberAutoModel:
             print("🔄 Начинаем обучение новой модели...")
 
     # Загрузка данных
-    sessions, hits = model.load_data()
+    sessions, hits = model.load_data(start_date, end_date, last_days)
 
     # Определение целевых действий
     model.define_target_actions(hits)
 
     # Создание признаков
-    df = model.create_features(sessions, hits)
+    df = model.create_features(sessions, hits, workers=workers, sequences=sequences)
 
     # Подготовка признаков
     X, y = model.prepare_features(df)
 
+    if hashed:
+        roc_auc = model.train_hashed_model(
+            X, y, sessions, hits, city_codes=df[CITY_CODE_COLUMN].to_numpy()
+        )
+        model.save_hashed_model()
+        print(f"🎉 Модель на хешированных признаках обучена! ROC-AUC: {roc_auc:.4f}")
+        return model
+
     # Обучение модели
-    roc_auc = model.train_model(X, y)
+    roc_auc = model.train_model(
+        X, y, negative_rate=negative_rate, city_codes=df[CITY_CODE_COLUMN].to_numpy()
+    )
 
-    # Сохранение модели
+    # Сохранение модели и итогов клиентов для признаков истории в API
     model.save_model()
+    if "client_id" in sessions:
+        save_client_history(
+            DEFAULT_CLIENT_HISTORY_PATH,
+            sessions["client_id"],
+            visit_timestamps(sessions),
+            y.to_numpy(),
+            df["session_duration"].to_numpy(),
+        )
 
     print("🎉 Модель обучена и сохранена!")
     print(f"📊 ROC-AUC: {roc_auc:.4f}")
@@ -637,9 +720,42 @@ def train_and_save_model() -> SberAutoModel:
     return model
 
 
-if __name__ == "__main__":
-    # Обучение модели
-    model = train_and_save_model()
+def main() -> None:
+    """Обучение модели из командной строки и пример предсказания"""
+    parser = argparse.ArgumentParser(description="Обучение модели СберАвтоподписка")
+    parser.add_argument("--engine", choices=MODEL_ENGINES, default="random_forest")
+    parser.add_argument(
+        "--negative-rate", type=float, default=None, help="Доля негативов при обучении"
+    )
+    parser.add_argument("--start-date", default=None, help="Первая дата визита YYYY-MM-DD")
+    parser.add_argument("--end-date", default=None, help="Последняя дата визита YYYY-MM-DD")
+    parser.add_argument("--last-days", type=int, default=None, help="Окно из последних дней")
+    parser.add_argument(
+        "--workers", type=int, default=1, help="Процессов для построения признаков по шардам"
+    )
+    parser.add_argument(
+        "--hashed",
+        action="store_true",
+        help="Логистическая регрессия на плотных и хешированных признаках UTM и страниц",
+    )
+    parser.add_argument(
+        "--sequences",
+        action="store_true",
+        help="Признаки последовательности хитов (ключевые действия, n-граммы переходов)",
+    )
+    args = parser.parse_args()
+    model = train_and_save_model(
+        negative_rate=args.negative_rate,
+        engine=args.engine,
+        start_date=args.start_date,
+        end_date=args.end_date,
+        last_days=args.last_days,
+        hashed=args.hashed,
+        sequences=args.sequences,
+        workers=args.workers,
+    )
+    if args.hashed:
+        return
 
     # Пример использования
     print("\n🧪 Тестирование модели:")
@@ -673,3 +789,7 @@ if __name__ == "__main__":
     print(f"   Будет ли конверсия: {result['will_convert']}")
     print(f"   Вероятность: {result['probability']:.4f}")
     print(f"   Уровень уверенности: {result['confidence_level']}")
+
+
+if __name__ == "__main__":
+    main()
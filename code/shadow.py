@@ -0,0 +1,210 @@
+"""
+Теневое скоринг-сравнение: модель-претендент считает часть живого трафика
+
+Основная модель отвечает на запрос как обычно, а доля запросов
+(SHADOW_FRACTION) без ожидания кладется в ограниченную очередь теневой
+модели. Теневая модель работает в отдельном процессе с низким приоритетом и
+одним потоком - не конкурирует с обработчиками запросов за GIL и ядра - и
+пишет пары вероятностей в JSONL-журнал.
+Если очередь заполнена, запрос в тень не попадает (учитывается в dropped),
+поэтому задержка основных ответов не зависит от скорости теневой модели.
+
+Сводка по журналу (из папки code/):
+    python shadow.py ../build/shadow_predictions.jsonl
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import random
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+DEFAULT_SHADOW_LOG = "../build/shadow_predictions.jsonl"
+
+# Приоритет процесса теневой модели (nice, 19 - самый низкий)
+SHADOW_NICENESS = 19
+
+
+def _score_worker(model_path: str, version: str, requests: Any, log_path: str) -> None:
+    """Процесс теневой модели: читает запросы из очереди и пишет журнал"""
+    from inference import InferenceModel
+    from threadpoolctl import threadpool_limits
+
+    # Тень уступает процессор основным запросам: низкий приоритет, один поток
+    os.nice(SHADOW_NICENESS)
+
+    model = InferenceModel()
+    model.load_model(model_path)
+
+    with threadpool_limits(1), open(log_path, "a", encoding="utf-8") as log:
+        while True:
+            item = requests.get()
+            if item is None:
+                break
+            timestamp, primary_version, rows, primary_probabilities = item
+
+            start = time.perf_counter()
+            results = model.predict_batch(rows)
+            shadow_ms = round((time.perf_counter() - start) * 1000, 3)
+
+            for result, primary_probability in zip(results, primary_probabilities):
+                record = {
+                    "timestamp": timestamp,
+                    "primary_version": primary_version,
+                    "shadow_version": version,
+                    "primary_probability": primary_probability,
+                    "shadow_probability": result["probability"],
+                    "shadow_ms": shadow_ms,
+                }
+                if "error" in result:
+                    record["shadow_error"] = result["error"]
+                log.write(json.dumps(record, ensure_ascii=False) + "\n")
+            log.flush()
+
+
+class ShadowScorer:
+    """
+    Теневая модель в отдельном процессе с ограниченной очередью
+
+    Args:
+        model_path (str): Папка модели-претендента
+        version (str): Версия модели-претендента (пишется в журнал)
+        fraction (float): Доля запросов, отправляемых в тень [0, 1]
+        log_path (str): JSONL-журнал сравнения
+        max_queue (int): Размер очереди запросов
+        seed (int, optional): Зерно выбора запросов
+    """
+
+    def __init__(
+        self,
+        model_path: str,
+        version: str,
+        fraction: float,
+        log_path: str = DEFAULT_SHADOW_LOG,
+        max_queue: int = 1000,
+        seed: Optional[int] = None,
+    ) -> None:
+        if not 0 <= fraction <= 1:
+            raise ValueError("fraction должен быть в интервале [0, 1]")
+        self.model_path = model_path
+        self.version = version
+        self.fraction = fraction
+        self.log_path = log_path
+        self.rng = random.Random(seed)
+
+        # spawn: дочерний процесс не наследует потоки и блокировки сервера
+        context = multiprocessing.get_context("spawn")
+        self.requests = context.Queue(maxsize=max_queue)
+        # Недоставленные теневые запросы не должны задерживать остановку сервера
+        self.requests.cancel_join_thread()
+        self.process = context.Process(
+            target=_score_worker,
+            args=(model_path, version, self.requests, log_path),
+            name=f"shadow-{version}",
+            daemon=True,
+        )
+        self._lock = threading.Lock()
+        self.counters = {"submitted": 0, "dropped": 0}
+
+    def start(self) -> "ShadowScorer":
+        """Запуск процесса теневой модели"""
+        self.process.start()
+        return self
+
+    def submit(
+        self, rows: List[Dict[str, Any]], primary_version: str, primary_probabilities: List[float]
+    ) -> bool:
+        """
+        Отправка запроса в тень (без ожидания)
+
+        Returns:
+            bool: True, если запрос выбран и поставлен в очередь
+        """
+        if not rows or self.rng.random() >= self.fraction:
+            return False
+        try:
+            self.requests.put_nowait((time.time(), primary_version, rows, primary_probabilities))
+        except queue.Full:
+            with self._lock:
+                self.counters["dropped"] += 1
+            return False
+        with self._lock:
+            self.counters["submitted"] += 1
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики отправленных и отброшенных запросов"""
+        with self._lock:
+            counters = dict(self.counters)
+        return {
+            "version": self.version,
+            "fraction": self.fraction,
+            "alive": self.process.is_alive(),
+            **counters,
+        }
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Обработка оставшейся очереди и остановка процесса"""
+        if self.process.is_alive():
+            self.requests.put(None)
+            self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+def summarize_shadow_log(log_path: str = DEFAULT_SHADOW_LOG) -> "pd.DataFrame":
+    """
+    Сводка сравнения основной и теневых моделей по журналу
+
+    Returns:
+        DataFrame: по паре (основная, теневая версия) - число строк, средние
+        вероятности, средняя абсолютная разница, доля совпадений класса
+        (порог 0.5), корреляция и медианное время теневой модели
+    """
+    import pandas as pd
+
+    log = pd.read_json(log_path, lines=True)
+    if "shadow_error" in log:
+        log = log[log["shadow_error"].isna()]
+    rows = []
+    for (primary, shadow), group in log.groupby(["primary_version", "shadow_version"]):
+        primary_probability = group["primary_probability"].to_numpy(dtype=float)
+        shadow_probability = group["shadow_probability"].to_numpy(dtype=float)
+        rows.append(
+            {
+                "primary_version": primary,
+                "shadow_version": shadow,
+                "rows": len(group),
+                "primary_mean": primary_probability.mean(),
+                "shadow_mean": shadow_probability.mean(),
+                "mean_abs_diff": np.abs(primary_probability - shadow_probability).mean(),
+                "class_agreement": (
+                    (primary_probability > 0.5) == (shadow_probability > 0.5)
+                ).mean(),
+                "correlation": (
+                    np.corrcoef(primary_probability, shadow_probability)[0, 1]
+                    if len(group) > 1
+                    else np.nan
+                ),
+                "shadow_ms_median": group["shadow_ms"].median(),
+            }
+        )
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Сводка журнала теневых предсказаний")
+    parser.add_argument("log_path", nargs="?", default=DEFAULT_SHADOW_LOG)
+    args = parser.parse_args()
+
+    print("📊 Сравнение основной и теневой моделей:")
+    print(summarize_shadow_log(args.log_path).to_string(index=False))
@@ -0,0 +1,177 @@
+"""
+Кодирование городов по целевой переменной без утечки (out-of-fold)
+
+city_conversion_rate и сегменты city_tier_* считаются по is_target. Если
+считать их по всем данным до train_test_split и кросс-валидации, метка
+каждой сессии попадает в ее же признаки, и оценки качества завышены.
+
+CityTargetEncodingClassifier пересчитывает эти признаки внутри fit только по
+обучающим строкам:
+- строки обучения получают конверсию города по остальным фолдам (out-of-fold);
+- строки предсказания - по всем строкам обучения.
+Суммы по (фолд, город) считаются одним np.bincount по кодам городов, а
+результат кэшируется по разбиению: кандидаты поиска гиперпараметров и точки
+наращивания леса на одном фолде пересчета не повторяют.
+
+Код города передается столбцом CITY_CODE_COLUMN (pd.factorize по geo_city),
+базовая модель его не видит. Без этого столбца обертка передает признаки как
+есть (так обученная модель считает запросы API с готовой конверсией города).
+"""
+
+import hashlib
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+import numpy as np
+from features import CITY_TIERS, city_rate_and_tier, city_tier
+from sklearn.base import BaseEstimator, ClassifierMixin, clone
+
+# Столбец с кодом города (не признак модели)
+CITY_CODE_COLUMN = "geo_city_code"
+
+# Фолды out-of-fold кодирования строк обучения
+OOF_FOLDS = 5
+
+# Кэш статистик городов: ключ разбиения -> (конверсия строк обучения, конверсия городов)
+_CACHE_SIZE = 16
+_stats_cache: "OrderedDict[bytes, Tuple[np.ndarray, np.ndarray]]" = OrderedDict()
+
+
+def oof_city_rates(
+    codes: np.ndarray, y: np.ndarray, n_folds: int = OOF_FOLDS, random_state: Optional[int] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Конверсия городов по фолдам одним проходом
+
+    Строки делятся на n_folds фолдов, суммы сессий и конверсий по
+    (фолд, город) считаются одним np.bincount. Конверсия строки - по всем
+    фолдам, кроме своего (итог минус свой фолд).
+
+    Args:
+        codes: Код города строки (-1 - город неизвестен)
+        y: Целевая переменная
+        n_folds: Число фолдов
+        random_state: Зерно разбиения на фолды
+
+    Returns:
+        tuple: out-of-fold конверсия строк и конверсия городов по всем строкам (%)
+    """
+    codes = np.asarray(codes, dtype=np.int64)
+    y = np.asarray(y, dtype=np.float64)
+    key = hashlib.blake2b(
+        b"".join([codes.tobytes(), y.tobytes(), repr((n_folds, random_state)).encode()]),
+        digest_size=16,
+    ).digest()
+    if key in _stats_cache:
+        _stats_cache.move_to_end(key)
+        return _stats_cache[key]
+
+    n_cities = int(codes.max()) + 1 if len(codes) else 0
+    folds = np.random.default_rng(random_state).integers(0, n_folds, len(codes))
+    known = codes >= 0
+    cells = np.where(known, folds * n_cities + codes, n_folds * n_cities)
+    size = n_folds * n_cities + 1
+    sessions = np.bincount(cells, minlength=size)[:-1].reshape(n_folds, n_cities)
+    conversions = np.bincount(cells, weights=y, minlength=size)[:-1].reshape(n_folds, n_cities)
+
+    total_sessions, total_conversions = sessions.sum(axis=0), conversions.sum(axis=0)
+    city_rate, _ = city_rate_and_tier(total_conversions, total_sessions)
+    rows = np.flatnonzero(known)
+    row_rate = np.zeros(len(codes))
+    row_rate[rows], _ = city_rate_and_tier(
+        total_conversions[codes[rows]] - conversions[folds[rows], codes[rows]],
+        (total_sessions[codes[rows]] - sessions[folds[rows], codes[rows]]).astype(np.float64),
+    )
+
+    _stats_cache[key] = (row_rate, city_rate)
+    if len(_stats_cache) > _CACHE_SIZE:
+        _stats_cache.popitem(last=False)
+    return row_rate, city_rate
+
+
+def encode_city_features(X: Any, rate: np.ndarray) -> Any:
+    """Признаки без столбца кода города, конверсия и сегменты города - из rate"""
+    features = X.drop(columns=CITY_CODE_COLUMN)
+    tier = city_tier(rate)
+    features["city_conversion_rate"] = rate.astype(np.float32)
+    for value, name in enumerate(CITY_TIERS):
+        features[f"city_tier_{name}"] = (tier == value).astype(np.float32)
+    return features
+
+
+class CityTargetEncodingClassifier(ClassifierMixin, BaseEstimator):
+    """
+    Обертка классификатора: конверсия городов только по строкам обучения
+
+    Args:
+        estimator: Базовый классификатор (в том числе NegativeDownsamplingClassifier)
+        n_folds: Фолды out-of-fold кодирования строк обучения
+        random_state: Зерно разбиения на фолды
+    """
+
+    def __init__(
+        self, estimator: Any, n_folds: int = OOF_FOLDS, random_state: Optional[int] = None
+    ) -> None:
+        self.estimator = estimator
+        self.n_folds = n_folds
+        self.random_state = random_state
+
+    def fit(self, X: Any, y: Any) -> "CityTargetEncodingClassifier":
+        """Обучение базовой модели на признаках с out-of-fold конверсией городов"""
+        features = X
+        self.city_rate_ = np.zeros(0)
+        if hasattr(X, "columns") and CITY_CODE_COLUMN in X.columns:
+            row_rate, self.city_rate_ = oof_city_rates(
+                X[CITY_CODE_COLUMN].to_numpy(), np.asarray(y), self.n_folds, self.random_state
+            )
+            features = encode_city_features(X, row_rate)
+        # warm_start базовой модели: продолжение обучения (как в NegativeDownsamplingClassifier)
+        if _warm_start(self.estimator) and hasattr(self, "estimator_"):
+            self.estimator_.set_params(**self.estimator.get_params())
+        else:
+            self.estimator_ = clone(self.estimator)
+        self.estimator_.fit(features, y)
+        self.classes_ = self.estimator_.classes_
+        return self
+
+    def _features(self, X: Any) -> Any:
+        """Признаки для предсказания: конверсия городов по всем строкам обучения"""
+        if not hasattr(X, "columns") or CITY_CODE_COLUMN not in X.columns:
+            return X
+        codes = X[CITY_CODE_COLUMN].to_numpy()
+        known = (codes >= 0) & (codes < len(self.city_rate_))
+        # Города, которых не было в обучении, получают конверсию 0 и сегмент "low"
+        rate = np.append(self.city_rate_, 0.0)[np.where(known, codes, -1)]
+        return encode_city_features(X, rate)
+
+    def predict_proba(self, X: Any) -> np.ndarray:
+        """Вероятности классов базовой модели"""
+        return self.estimator_.predict_proba(self._features(X))
+
+    def predict(self, X: Any) -> np.ndarray:
+        """Предсказание класса базовой модели"""
+        return self.estimator_.predict(self._features(X))
+
+    @property
+    def feature_importances_(self) -> np.ndarray:
+        return self.estimator_.feature_importances_
+
+    @property
+    def feature_names_in_(self) -> np.ndarray:
+        return self.estimator_.feature_names_in_
+
+    @property
+    def n_train_samples_(self) -> int:
+        """Строк обучения базовой модели (есть у NegativeDownsamplingClassifier)"""
+        if not hasattr(self.estimator_, "n_train_samples_"):
+            raise AttributeError("Базовая модель не сообщает n_train_samples_")
+        return self.estimator_.n_train_samples_
+
+
+def _warm_start(estimator: Any) -> bool:
+    """warm_start базовой модели (в том числе внутри NegativeDownsamplingClassifier)"""
+    while estimator is not None:
+        if getattr(estimator, "warm_start", False):
+            return True
+        estimator = getattr(estimator, "estimator", None)
+    return False
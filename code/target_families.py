@@ -0,0 +1,427 @@
+"""
+Отдельные модели для семейств целевых действий на общей матрице признаков
+
+define_target_actions объединяет все ключевые слова (звонки, чаты,
+авторизация, sms-коды, заявки) в одну метку is_target. Здесь каждое целевое
+действие относится к семейству (TARGET_FAMILIES), и за один проход:
+- family_labels размечает все семейства сразу: события факторизуются один
+  раз, метка семейства - np.bincount по кодам сессий;
+- матрица признаков строится один раз (create_features) и общая для всех
+  семейств;
+- модели семейств обучаются параллельно (joblib, как warm_start_search):
+  матрица передается процессам через memmap, а не копируется для каждого.
+
+Разбиение на обучение и тест (family_split) делается до кодирования городов.
+Конверсия и сегменты городов в общей матрице считаются по объединенной метке
+только по строкам обучения: out-of-fold для них (target_encoding.oof_city_rates)
+и по всем строкам обучения для теста, как в CityTargetEncodingClassifier. Так
+же, как в /predict, клиент присылает одну конверсию города на все семейства.
+
+Модели семейств сохраняются в одну папку (manifest.json и папка модели
+каждого семейства в формате model_artifact). FamilyModels загружает их без
+pandas и sklearn и считает вероятности всех семейств по одной строке
+признаков (POST /predict_families в API).
+
+Запуск обучения:
+    cd code
+    python target_families.py --workers 4
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from inference import InferenceModel, format_prediction
+from model_artifact import replace_directory, save_artifact, write_arrays
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+DEFAULT_FAMILY_MODELS_PATH = "../build/family_models"
+FORMAT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+
+# Семейства целевых действий и их ключевые слова. Событие относится к первому
+# семейству, ключевое слово которого входит в событие; "заявки" - последние,
+# их слова (success, request, contact) самые общие
+TARGET_FAMILIES: Dict[str, List[str]] = {
+    "calls": ["звонок", "callback", "call", "phone"],
+    "chats": ["chat", "start_chat", "user_message", "proactive", "invitation"],
+    "auth": ["auth", "confirm"],
+    "sms": ["sms", "code"],
+    "orders": [
+        "заявка",
+        "оформление",
+        "покупка",
+        "order",
+        "submit",
+        "request",
+        "claim",
+        "contact",
+        "success",
+    ],
+}
+
+# Все ключевые слова (define_target_actions)
+TARGET_KEYWORDS = [keyword for keywords in TARGET_FAMILIES.values() for keyword in keywords]
+
+
+def family_target_actions(events: Iterable[Any]) -> Dict[str, List[str]]:
+    """
+    Целевые действия каждого семейства
+
+    Объединение по семействам совпадает с define_target_actions для тех же событий.
+
+    Args:
+        events: Различные значения event_action
+
+    Returns:
+        dict: семейство -> список событий (в порядке TARGET_FAMILIES)
+    """
+    actions: Dict[str, List[str]] = {family: [] for family in TARGET_FAMILIES}
+    for event in events:
+        event_lower = str(event).lower()
+        for family, keywords in TARGET_FAMILIES.items():
+            if any(keyword in event_lower for keyword in keywords):
+                actions[family].append(event)
+                break
+    return actions
+
+
+def family_labels(
+    hits: "pd.DataFrame", family_actions: Dict[str, List[str]], session_ids: Sequence[Any]
+) -> np.ndarray:
+    """
+    Метки всех семейств одним проходом по хитам
+
+    Хит относится к семейству так же, как target_hit_mask: одно из действий
+    семейства входит в event_action. Проверка подстрок - только для
+    различных событий.
+
+    Args:
+        hits: Хиты (session_id, event_action)
+        family_actions: Семейство -> целевые действия (family_target_actions)
+        session_ids: Порядок строк результата; сессии без хитов получают 0
+
+    Returns:
+        ndarray: (len(session_ids), число семейств) int8
+    """
+    import pandas as pd
+
+    if hits["session_id"].isna().any():
+        hits = hits[hits["session_id"].notna()]
+    codes, unique_ids = pd.factorize(hits["session_id"])
+    event_codes, events = pd.factorize(hits["event_action"], use_na_sentinel=False)
+    event_flags = np.array(
+        [
+            [any(action in str(event).lower() for action in actions) for event in events]
+            for actions in family_actions.values()
+        ],
+        dtype=bool,
+    ).reshape(len(family_actions), len(events))
+
+    positions = unique_ids.get_indexer(pd.Index(session_ids))
+    labels = np.zeros((len(positions), len(family_actions)), dtype=np.int8)
+    for j, flags in enumerate(event_flags):
+        per_session = np.bincount(codes, weights=flags[event_codes], minlength=len(unique_ids)) > 0
+        labels[:, j] = np.append(per_session, False)[positions]
+    return labels
+
+
+def family_split(labels: np.ndarray, random_state: int = 42) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Разбиение строк на обучение и тест (80/20, стратификация по объединенной метке)
+
+    Args:
+        labels: Метки семейств (family_labels) или одна метка
+
+    Returns:
+        tuple: индексы строк обучения и теста
+    """
+    from sklearn.model_selection import train_test_split
+
+    stratify = labels.any(axis=1) if labels.ndim == 2 else labels
+    train, test = train_test_split(
+        np.arange(len(labels)), test_size=0.2, random_state=random_state, stratify=stratify
+    )
+    return train, test
+
+
+def shared_city_encoding(
+    X: "pd.DataFrame",
+    city_codes: np.ndarray,
+    y_any: np.ndarray,
+    train: np.ndarray,
+    random_state: int = 42,
+) -> np.ndarray:
+    """
+    Общая матрица признаков float32 с конверсией городов по объединенной метке
+
+    Конверсия считается только по строкам train: для них - out-of-fold, для
+    остальных строк - по всем строкам train (города, которых нет в обучении,
+    получают 0), поэтому метки теста в признаки не попадают.
+
+    Args:
+        X: Признаки prepare_features
+        city_codes: Код города строки (CITY_CODE_COLUMN)
+        y_any: Конверсия в любом семействе
+        train: Индексы строк обучения (family_split)
+
+    Returns:
+        ndarray: матрица в порядке X.columns
+    """
+    from target_encoding import CITY_CODE_COLUMN, encode_city_features, oof_city_rates
+
+    city_codes = np.asarray(city_codes)
+    train_rate, city_rate = oof_city_rates(
+        city_codes[train], np.asarray(y_any)[train], random_state=random_state
+    )
+    known = (city_codes >= 0) & (city_codes < len(city_rate))
+    row_rate = np.append(city_rate, 0.0)[np.where(known, city_codes, -1)]
+    row_rate[train] = train_rate
+    encoded = encode_city_features(X.assign(**{CITY_CODE_COLUMN: city_codes}), row_rate)
+    return np.ascontiguousarray(encoded[list(X.columns)].to_numpy(dtype=np.float32))
+
+
+def _fit_family(
+    X: np.ndarray,
+    y: np.ndarray,
+    train: np.ndarray,
+    test: np.ndarray,
+    engine: str,
+    params: Dict[str, Any],
+) -> Tuple[Any, Dict[str, Any]]:
+    """Модель одного семейства (выполняется в процессе joblib) и ее метрики на тесте"""
+    from sber_auto_model import make_estimator
+    from sklearn.metrics import average_precision_score, roc_auc_score
+
+    estimator, _ = make_estimator(engine)
+    estimator.set_params(**params)
+    # Параллельность - по семействам: модель семейства обучается в одном потоке
+    if "n_jobs" in estimator.get_params():
+        estimator.set_params(n_jobs=1)
+
+    start = time.perf_counter()
+    estimator.fit(X[train], y[train])
+    fit_s = time.perf_counter() - start
+    probability = estimator.predict_proba(X[test])[:, 1]
+    metrics = {
+        "positives": int(y.sum()),
+        "positive_rate": float(y.mean()),
+        "roc_auc": float(roc_auc_score(y[test], probability)),
+        "avg_precision": float(average_precision_score(y[test], probability)),
+        "fit_s": fit_s,
+    }
+    return estimator, metrics
+
+
+def train_family_models(
+    X: np.ndarray,
+    labels: np.ndarray,
+    families: Sequence[str],
+    engine: str = "random_forest",
+    params: Optional[Dict[str, Any]] = None,
+    workers: Optional[int] = None,
+    min_positives: int = 20,
+    split: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+    """
+    Параллельное обучение моделей семейств на общей матрице
+
+    Разбиение на обучение и тест общее для всех семейств.
+
+    Args:
+        X: Общая матрица признаков (shared_city_encoding)
+        labels: Метки семейств (family_labels)
+        families: Имена семейств в порядке столбцов labels
+        engine: Движок модели из MODEL_ENGINES
+        params: Параметры модели (None - default_params движка)
+        workers: Процессов joblib (None - по одному на семейство)
+        min_positives: Семейства с меньшим числом конверсий не обучаются
+        split: Индексы обучения и теста (None - family_split(labels)); при
+            кодировании городов - то же разбиение, что у shared_city_encoding
+
+    Returns:
+        tuple: модели и метрики по семействам
+    """
+    from joblib import Parallel, delayed
+    from sber_auto_model import default_params
+
+    params = default_params(engine) if params is None else params
+    train, test = family_split(labels) if split is None else split
+    trained = [
+        j
+        for j in range(len(families))
+        if labels[:, j].sum() >= min_positives and 0 < labels[test, j].sum() < len(test)
+    ]
+    results = Parallel(n_jobs=workers or len(trained) or 1)(
+        delayed(_fit_family)(X, labels[:, j], train, test, engine, params) for j in trained
+    )
+
+    models = {families[j]: model for j, (model, _) in zip(trained, results)}
+    metrics = {families[j]: family_metrics for j, (_, family_metrics) in zip(trained, results)}
+    return models, metrics
+
+
+def save_family_models(
+    path: str,
+    models: Dict[str, Any],
+    engine: str,
+    feature_names: List[str],
+    family_actions: Dict[str, List[str]],
+    metrics: Dict[str, Dict[str, Any]],
+    feature_ranges: Optional[Dict[str, Dict[str, float]]] = None,
+) -> Dict[str, Any]:
+    """
+    Модели семейств в одну папку (атомарно, model_artifact.replace_directory)
+
+    Returns:
+        dict: записанный манифест
+    """
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "engine": engine,
+        "families": list(models),
+        "feature_names": list(feature_names),
+    }
+
+    def write(staging: str) -> None:
+        for family, model in models.items():
+            save_artifact(
+                os.path.join(staging, family),
+                model,
+                engine=engine,
+                feature_names=feature_names,
+                target_actions=family_actions[family],
+                metrics=metrics.get(family),
+                feature_ranges=feature_ranges,
+            )
+        write_arrays(staging, {}, manifest)
+
+    replace_directory(path, write)
+    return manifest
+
+
+class FamilyModels:
+    """
+    Модели семейств для предсказаний: вероятности всех семейств по одному запросу
+
+    Строка признаков собирается и проверяется схемой один раз, затем ее
+    считает модель каждого семейства.
+
+    Args:
+        path (str): Папка save_family_models
+    """
+
+    def __init__(self, path: str = DEFAULT_FAMILY_MODELS_PATH) -> None:
+        # Одна версия папки replace_directory для манифеста и моделей
+        path = os.path.realpath(path)
+        with open(os.path.join(path, MANIFEST_NAME), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("format_version") != FORMAT_VERSION:
+            raise ValueError(
+                f"Неподдерживаемая версия моделей семейств {self.manifest.get('format_version')}"
+            )
+        self.families: List[str] = self.manifest["families"]
+        self.models: Dict[str, InferenceModel] = {}
+        for family in self.families:
+            model = InferenceModel()
+            model.load_model(os.path.join(path, family))
+            self.models[family] = model
+        self.feature_names: List[str] = self.manifest["feature_names"]
+
+    def predict_proba_rows(self, X: np.ndarray) -> np.ndarray:
+        """Вероятности (n_rows, число семейств) для матрицы в порядке feature_names"""
+        probabilities = np.zeros((len(X), len(self.families)))
+        for j, family in enumerate(self.families):
+            probabilities[:, j] = self.models[family].predict_proba_rows(X)
+        return probabilities
+
+    def predict(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Предсказания всех семейств для одной сессии
+
+        Returns:
+            dict: результат format_prediction по семействам и самое вероятное семейство
+
+        Raises:
+            SchemaValidationError: некорректные признаки запроса
+        """
+        if not self.families:
+            raise ValueError("Нет обученных моделей семейств")
+        X = self.models[self.families[0]].feature_schema().assemble(data)
+        probabilities = self.predict_proba_rows(X)[0]
+        return {
+            "families": {
+                family: format_prediction(int(probability > 0.5), float(probability))
+                for family, probability in zip(self.families, probabilities.tolist())
+            },
+            "top_family": self.families[int(np.argmax(probabilities))],
+        }
+
+
+def main() -> None:
+    """Разметка семейств, общая матрица признаков и параллельное обучение моделей"""
+    parser = argparse.ArgumentParser(description="Модели семейств целевых действий")
+    parser.add_argument("--engine", default="random_forest", help="Движок модели")
+    parser.add_argument("--workers", type=int, help="Процессов (по умолчанию на семейство)")
+    parser.add_argument("--last-days", type=int, help="Обучение на последних днях")
+    parser.add_argument("--out", default=DEFAULT_FAMILY_MODELS_PATH, help="Папка моделей")
+    args = parser.parse_args()
+
+    import pandas as pd
+    from model_metadata import feature_ranges
+    from sber_auto_model import SberAutoModel
+    from target_encoding import CITY_CODE_COLUMN
+
+    print("🎯 Модели семейств целевых действий")
+    print("=" * 60)
+    model = SberAutoModel(args.engine)
+    sessions, hits = model.load_data(last_days=args.last_days)
+
+    # Объединенная метка и признаки - один раз для всех семейств
+    model.define_target_actions(hits)
+    family_actions = family_target_actions(model.target_actions)
+    df = model.create_features(sessions, hits)
+    X, y = model.prepare_features(df)
+
+    start = time.perf_counter()
+    labels = family_labels(hits, family_actions, sessions["session_id"])
+    labels_s = time.perf_counter() - start
+    del hits
+    families = list(family_actions)
+    print(f"🏷️ Метки {len(families)} семейств за {labels_s:.2f} с")
+
+    # Разбиение до кодирования городов: конверсия городов только по обучению
+    split = family_split(labels)
+    shared = shared_city_encoding(X, df[CITY_CODE_COLUMN].to_numpy(), y.to_numpy(), split[0])
+    start = time.perf_counter()
+    models, metrics = train_family_models(
+        shared, labels, families, args.engine, workers=args.workers, split=split
+    )
+    train_s = time.perf_counter() - start
+
+    save_family_models(
+        args.out,
+        models,
+        args.engine,
+        list(X.columns),
+        family_actions,
+        metrics,
+        feature_ranges(X, list(X.columns)),
+    )
+
+    print("\n📊 МЕТРИКИ ПО СЕМЕЙСТВАМ:")
+    print(pd.DataFrame(metrics).T.round(4).to_string())
+    skipped = [family for family in families if family not in models]
+    if skipped:
+        print(f"⚠️ Мало конверсий, модели не обучены: {', '.join(skipped)}")
+    print(f"⏱️ Обучение {len(models)} моделей: {train_s:.1f} с")
+    print(f"💾 Модели сохранены: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Поиск гиперпараметров с наращиванием деревьев (warm_start)
+
+GridSearchCV обучает каждое значение n_estimators заново: лес из 200
+деревьев повторно строит 100 деревьев, уже построенных для n_estimators=100.
+WarmStartGridSearch считает n_estimators осью наращивания: для каждой
+комбинации остальных параметров и каждого фолда растет один лес с
+warm_start=True и оценивается в контрольных точках (50, 100, 200, ...).
+Стоимость всей оси - стоимость самого большого значения.
+
+Лес sklearn с warm_start и фиксированным random_state строит те же деревья,
+что и обучение с нуля, поэтому оценки совпадают с GridSearchCV.
+"""
+
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.metrics import get_scorer
+from sklearn.model_selection import ParameterGrid, check_cv
+
+# Параметр, по которому лес наращивается (в том числе внутри обертки: estimator__n_estimators)
+INCREMENTAL_PARAM = "n_estimators"
+
+
+def _incremental_key(param_grid: Dict[str, List[Any]]) -> Optional[str]:
+    """Имя параметра числа деревьев в сетке (None - наращивать нечего)"""
+    for name in param_grid:
+        if name.split("__")[-1] == INCREMENTAL_PARAM:
+            return name
+    return None
+
+
+def _grow_and_score(
+    estimator: Any,
+    params: Dict[str, Any],
+    key: Optional[str],
+    checkpoints: List[Any],
+    scorer: Any,
+    X: Any,
+    y: Any,
+    train: np.ndarray,
+    test: np.ndarray,
+) -> Tuple[List[float], List[float]]:
+    """
+    Один лес на фолде: наращивание до каждой контрольной точки и оценка
+
+    Returns:
+        tuple: оценки и накопленное время обучения для каждой контрольной точки
+    """
+    model = clone(estimator).set_params(**params)
+    if key is not None:
+        model.set_params(**{key.replace(INCREMENTAL_PARAM, "warm_start"): True})
+    X_train, y_train = _rows(X, train), _rows(y, train)
+    X_test, y_test = _rows(X, test), _rows(y, test)
+
+    scores, fit_times = [], []
+    elapsed = 0.0
+    for value in checkpoints:
+        start = time.perf_counter()
+        if key is not None:
+            model.set_params(**{key: value})
+        model.fit(X_train, y_train)
+        elapsed += time.perf_counter() - start
+        scores.append(float(scorer(model, X_test, y_test)))
+        fit_times.append(elapsed)
+    return scores, fit_times
+
+
+def _rows(data: Any, index: np.ndarray) -> Any:
+    """Строки DataFrame / Series / массива по позициям"""
+    return data.iloc[index] if hasattr(data, "iloc") else data[index]
+
+
+class WarmStartGridSearch:
+    """
+    Поиск по сетке с n_estimators как осью наращивания
+
+    Интерфейс совпадает с GridSearchCV в той части, которую использует
+    проект: fit, best_params_, best_score_, best_estimator_, cv_results_.
+    Без n_estimators в сетке (градиентный бустинг) каждая комбинация
+    обучается один раз, как в GridSearchCV.
+
+    Args:
+        estimator: Базовая модель (лес или обертка с лесом в estimator)
+        param_grid (dict): Сетка параметров
+        cv (int): Число фолдов (стратифицированных для классификатора)
+        scoring (str): Метрика sklearn
+        n_jobs (int): Параллельных задач (комбинация x фолд)
+        verbose (int): Печатать ход поиска
+    """
+
+    def __init__(
+        self,
+        estimator: Any,
+        param_grid: Dict[str, List[Any]],
+        cv: int = 2,
+        scoring: str = "roc_auc",
+        n_jobs: Optional[int] = None,
+        verbose: int = 0,
+    ) -> None:
+        self.estimator = estimator
+        self.param_grid = param_grid
+        self.cv = cv
+        self.scoring = scoring
+        self.n_jobs = n_jobs
+        self.verbose = verbose
+
+    def fit(self, X: Any, y: Any) -> "WarmStartGridSearch":
+        """Поиск по сетке и обучение лучшей модели на всех данных"""
+        key = _incremental_key(self.param_grid)
+        checkpoints = sorted(self.param_grid[key]) if key is not None else [None]
+        other = {name: values for name, values in self.param_grid.items() if name != key}
+        combinations = list(ParameterGrid(other))
+        folds = list(check_cv(self.cv, y, classifier=True).split(X, y))
+        scorer = get_scorer(self.scoring)
+
+        if self.verbose:
+            print(
+                f"🌲 {len(combinations)} комбинаций x {len(folds)} фолдов, "
+                f"деревья наращиваются до {checkpoints[-1]} (точки: {checkpoints})"
+            )
+        results = Parallel(n_jobs=self.n_jobs)(
+            delayed(_grow_and_score)(
+                self.estimator, params, key, checkpoints, scorer, X, y, train, test
+            )
+            for params in combinations
+            for train, test in folds
+        )
+
+        # Результаты: (комбинация, фолд, точка) -> строки cv_results_ по (комбинация, точка)
+        scores = np.array([r[0] for r in results]).reshape(len(combinations), len(folds), -1)
+        fit_times = np.array([r[1] for r in results]).reshape(len(combinations), len(folds), -1)
+        candidates = [
+            {**params, key: value} if key is not None else params
+            for params in combinations
+            for value in checkpoints
+        ]
+        mean_scores = scores.mean(axis=1).ravel()
+        self.cv_results_ = {
+            "params": candidates,
+            "mean_test_score": mean_scores,
+            "std_test_score": scores.std(axis=1).ravel(),
+            "rank_test_score": (
+                np.argsort(np.argsort(-mean_scores, kind="stable"), kind="stable") + 1
+            ),
+            "mean_fit_time": fit_times.mean(axis=1).ravel(),
+        }
+        # При равных оценках - первый кандидат, как в GridSearchCV
+        best = int(np.argmax(mean_scores))
+        self.best_index_ = best
+        self.best_params_ = candidates[best]
+        self.best_score_ = float(mean_scores[best])
+        self.best_estimator_ = clone(self.estimator).set_params(**self.best_params_).fit(X, y)
+        return self
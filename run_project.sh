@@ -50,7 +50,7 @@ case $choice in
         echo ""
         echo "🌐 ЗАПУСК API СЕРВЕРА..."
         echo "======================="
-        if [ ! -f "build/sber_auto_model.pkl" ]; then
+        if [ ! -d "build/sber_auto_model" ]; then
             echo "⚠️ Модель не найдена. Сначала обучите модель (опция 1)"
             exit 1
         fi
@@ -72,7 +72,7 @@ case $choice in
         echo ""
         echo "🧪 ТЕСТИРОВАНИЕ МОДЕЛИ..."
         echo "========================="
-        if [ ! -f "build/sber_auto_model.pkl" ]; then
+        if [ ! -d "build/sber_auto_model" ]; then
             echo "⚠️ Модель не найдена. Сначала обучите модель (опция 1)"
             exit 1
         fi
@@ -95,7 +95,7 @@ case $choice in
         echo ""
         echo "🎯 ДЕМОНСТРАЦИЯ ЗАПРОСОВ К МОДЕЛИ..."
         echo "===================================="
-        if [ ! -f "build/sber_auto_model.pkl" ]; then
+        if [ ! -d "build/sber_auto_model" ]; then
             echo "⚠️ Модель не найдена. Сначала обучите модель (опция 1)"
             exit 1
         fi
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Досрочная остановка обхода деревьев: задержка, число деревьев и точность
+
+Модели обоих движков сохраняются в формате папки и загружаются как
+TreeEnsemble. Строки тестовой выборки подаются по одной (как в /predict) и
+пакетами (как в /predict_batch), сравниваются полный обход и досрочная
+остановка: медианная и p99 задержка вызова, среднее число деревьев, доля
+совпадений класса с полным ансамблем и средняя разница вероятностей. Бюджеты
+времени на вызов задаются через --budgets.
+
+Запуск из корня проекта:
+    python scripts/benchmark_anytime.py --rows 2000 --batch 500 --budgets 0.5 5
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "code"))
+sys.path.append(os.path.dirname(__file__))
+
+from benchmark_engines import ENGINE_PARAMS, load_features  # noqa: E402
+from sber_auto_model import MODEL_ENGINES, SberAutoModel, make_estimator  # noqa: E402
+
+
+def train_artifact(engine: str, X: pd.DataFrame, y: pd.Series, path: str) -> SberAutoModel:
+    """Обучение модели движка, сохранение в папку и загрузка TreeEnsemble"""
+    estimator, _ = make_estimator(engine)
+    model = SberAutoModel(engine)
+    model.model = estimator.set_params(**ENGINE_PARAMS[engine]).fit(X, y)
+    model.feature_names = list(X.columns)
+    model.target_actions = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        model.save_model(path)
+        model.load_model(path)
+    return model
+
+
+def measure(
+    model: SberAutoModel,
+    rows: np.ndarray,
+    batch: int,
+    anytime: bool,
+    budget_ms: Optional[float] = None,
+) -> Dict[str, Any]:
+    """Задержка вызовов по batch строк и отличие от полного обхода"""
+    full = model.predict_proba_rows(rows)
+    timings = []
+    probabilities = []
+    trees_used = []
+    for start in range(0, len(rows), batch):
+        chunk = rows[start : start + batch]
+        began = time.perf_counter()
+        if anytime:
+            probability, used = model.predict_proba_anytime(chunk, budget_ms)
+        else:
+            probability, used = model.predict_proba_rows(chunk), np.full(len(chunk), 0)
+        timings.append(time.perf_counter() - began)
+        probabilities.append(probability)
+        trees_used.append(used if anytime else np.full(len(chunk), model.n_trees()))
+    timings_ms = np.array(timings) * 1000
+    probability = np.concatenate(probabilities)
+    return {
+        "p50_ms": round(float(np.percentile(timings_ms, 50)), 3),
+        "p99_ms": round(float(np.percentile(timings_ms, 99)), 3),
+        "trees_mean": round(float(np.concatenate(trees_used).mean()), 1),
+        "class_agreement": round(float(np.mean((probability > 0.5) == (full > 0.5))), 4),
+        "mean_abs_diff": round(float(np.abs(probability - full).mean()), 4),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--sessions", type=int, default=100_000)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--budgets", type=float, nargs="*", default=[0.5, 5.0])
+    args = parser.parse_args()
+
+    print("🔧 Строим признаки...")
+    X, y = load_features(args.sessions)
+    X_train, X_test, y_train, _ = train_test_split(X, y, test_size=0.2, random_state=42)
+    rows = X_test.sample(min(args.rows, len(X_test)), random_state=0).to_numpy(dtype=float)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for engine in MODEL_ENGINES:
+            print(f"🌲 {engine}...")
+            model = train_artifact(engine, X_train, y_train, os.path.join(tmp, engine))
+            for batch in (1, args.batch):
+                modes = [("все деревья", False, None), ("досрочно", True, None)]
+                modes += [(f"досрочно, {b:g} мс", True, b) for b in args.budgets]
+                for mode, anytime, budget_ms in modes:
+                    results.append(
+                        {
+                            "engine": engine,
+                            "batch": batch,
+                            "mode": mode,
+                            **measure(model, rows, batch, anytime, budget_ms),
+                        }
+                    )
+
+    print("\n📊 РЕЗУЛЬТАТЫ:")
+    print(pd.DataFrame(results).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Бэктест на скользящих окнах: общий кэш признаков и параллельные окна
+
+Сравнивается время признаков, построенных один раз (build_feature_cache),
+с пересчетом признаков для каждого окна, и время окон run_backtest для
+разного числа процессов.
+
+Запуск из корня проекта:
+    python scripts/benchmark_backtest.py --sessions 200000 --workers 1 2 4
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "code"))
+sys.path.append(os.path.dirname(__file__))
+
+from backtest import build_feature_cache, rolling_windows, run_backtest  # noqa: E402
+from features import visit_day_numbers  # noqa: E402
+from sber_auto_model import SberAutoModel  # noqa: E402
+from synthetic_data import make_synthetic_data  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--sessions", type=int, default=200_000)
+    parser.add_argument("--train-days", type=int, default=90)
+    parser.add_argument("--test-days", type=int, default=30)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    sessions, hits = make_synthetic_data(args.sessions)
+    print(f"💻 Ядер: {os.cpu_count()}, сессий: {len(sessions):,}, хитов: {len(hits):,}")
+    model = SberAutoModel()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        cache_path = os.path.join(work_dir, "features")
+        start = time.perf_counter()
+        cache = build_feature_cache(model, sessions, hits, cache_path)
+        features_s = time.perf_counter() - start
+        start = time.perf_counter()
+        build_feature_cache(model, sessions, hits, cache_path)
+        reuse_s = time.perf_counter() - start
+
+        windows = rolling_windows(np.asarray(cache["days"]), args.train_days, args.test_days)
+
+        # Пересчет признаков для каждого окна (обучение и проверка окна)
+        days = visit_day_numbers(sessions["visit_date"])
+        start = time.perf_counter()
+        for window in windows:
+            in_window = (days >= window["train_start"]) & (days < window["test_end"])
+            window_sessions = sessions[in_window]
+            window_hits = hits[hits["session_id"].isin(window_sessions["session_id"])]
+            model.prepare_features(model.create_features(window_sessions, window_hits))
+        per_window_s = time.perf_counter() - start
+
+        timings = {}
+        for workers in sorted(set(args.workers)):
+            start = time.perf_counter()
+            metrics = run_backtest(cache_path, windows, workers=workers)
+            timings[workers] = time.perf_counter() - start
+
+    print("\n📊 МЕТРИКИ ПО ОКНАМ:")
+    print(metrics.round(3).to_string(index=False))
+    print(f"\n📊 ПРИЗНАКИ ({len(windows)} окон), с:")
+    print(f"   Один раз в кэш: {features_s:.2f}, повторный запуск (кэш): {reuse_s:.2f}")
+    print(f"   Пересчет для каждого окна: {per_window_s:.2f}")
+    print("📊 ОКНА, с:")
+    for workers, elapsed in timings.items():
+        print(f"   {workers} процессов: {elapsed:.2f} ({timings[min(timings)] / elapsed:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
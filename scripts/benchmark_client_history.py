@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+История клиента: расчет при обучении и поиск в индексе на диске
+
+- Обучение: client_history_features (одна сортировка и накопленные суммы)
+  против groupby pandas (cumcount / cumsum / shift по клиенту).
+- Предсказание: построение ClientHistoryIndex, поиск пакетом и по одному
+  клиенту, размер индекса на диске и прирост памяти процесса после поиска
+  (массивы отображаются в память).
+
+Запуск из корня проекта:
+    python scripts/benchmark_client_history.py --clients 1000000
+"""
+
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "code"))
+
+from client_history import (  # noqa: E402
+    ClientHistoryIndex,
+    client_history_features,
+    save_client_history,
+)
+
+
+def groupby_history(frame: pd.DataFrame) -> pd.DataFrame:
+    """Те же суммы через groupby pandas (сессии с одинаковым временем не разделяются)"""
+    frame = frame.sort_values(["client", "timestamp"])
+    by_client = frame.groupby("client")
+    prior = by_client.cumcount()
+    return pd.DataFrame(
+        {
+            "prior_sessions": prior,
+            "prior_conversions": by_client["is_target"].cumsum() - frame["is_target"],
+            "days_since_last": by_client["timestamp"].diff().fillna(0) / 86400,
+            "avg_prior_duration": (by_client["duration"].cumsum() - frame["duration"])
+            / prior.clip(lower=1),
+        }
+    ).sort_index()
+
+
+def rss_mb() -> float:
+    """Текущая резидентная память процесса, МБ (Linux; иначе - пиковая)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--clients", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    n_sessions = 2 * args.clients
+    client_id = pd.Series(rng.integers(0, args.clients, n_sessions).astype(str))
+    timestamp = rng.integers(1_620_000_000, 1_640_000_000, n_sessions)
+    is_target = (rng.random(n_sessions) < 0.03).astype(np.int8)
+    duration = rng.exponential(120, n_sessions)
+    print(f"💻 Сессий: {n_sessions:,}, клиентов: {client_id.nunique():,}")
+
+    timings = {}
+    start = time.perf_counter()
+    client_history_features(client_id, timestamp, is_target, duration)
+    timings["обучение: client_history_features"] = time.perf_counter() - start
+    frame = pd.DataFrame(
+        {"client": client_id, "timestamp": timestamp, "is_target": is_target, "duration": duration}
+    )
+    start = time.perf_counter()
+    groupby_history(frame)
+    timings["обучение: groupby pandas"] = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "client_history")
+        start = time.perf_counter()
+        manifest = save_client_history(path, client_id, timestamp, is_target, duration)
+        timings["построение индекса"] = time.perf_counter() - start
+        size_mb = (
+            sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path)) / 2**20
+        )
+
+        del frame
+        rss_before = rss_mb()
+        index = ClientHistoryIndex(path)
+        queries = client_id.sample(100_000, random_state=1).tolist()
+        start = time.perf_counter()
+        index.lookup(queries, np.full(len(queries), 1_640_000_000))
+        lookup_us = (time.perf_counter() - start) / len(queries) * 1e6
+        start = time.perf_counter()
+        for client in queries[:2000]:
+            index.features(client, 1_640_000_000)
+        single_us = (time.perf_counter() - start) / 2000 * 1e6
+        rss_growth = rss_mb() - rss_before
+
+    print("\n📊 ВРЕМЯ, с:")
+    print(pd.Series(timings).round(2).to_string())
+    print("\n📊 ИНДЕКС:")
+    print(f"   Клиентов: {manifest['n_clients']:,}, ячеек: {manifest['capacity']:,}")
+    print(f"   Размер на диске: {size_mb:.1f} МБ")
+    print(f"   Поиск пакетом: {lookup_us:.2f} мкс на клиента, по одному: {single_us:.1f} мкс")
+    print(f"   Прирост памяти процесса после открытия и поиска: {rss_growth:.1f} МБ")
+
+
+if __name__ == "__main__":
+    main()
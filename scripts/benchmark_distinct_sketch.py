@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Приближенный unique_pages / unique_events (HyperLogLog): ошибка и ROC-AUC
+
+Для нескольких precision сравниваются с точным подсчетом:
+- время подсчета и память эскизов на сессию;
+- относительная ошибка оценок (средняя, 99-й перцентиль, доля точных);
+- ROC-AUC леса на отложенной выборке с точными и приближенными признаками.
+Отдельно проверяется, что эскизы порций хитов после объединения дают те же
+оценки, что эскиз всех хитов сразу.
+
+Запуск из корня проекта:
+    python scripts/benchmark_distinct_sketch.py --sessions 100000
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import train_test_split
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "code"))
+sys.path.append(os.path.dirname(__file__))
+
+from distinct_sketch import SessionDistinctSketch  # noqa: E402
+from features import FEATURE_NAMES, aggregate_sessions, build_feature_matrix  # noqa: E402
+from sber_auto_model import SberAutoModel, make_estimator  # noqa: E402
+from synthetic_data import make_synthetic_data  # noqa: E402
+
+FIELDS = {"unique_pages": "hit_page_path", "unique_events": "event_action"}
+
+
+def holdout_auc(X: np.ndarray, y: np.ndarray) -> float:
+    """ROC-AUC леса make_estimator на отложенных 20%"""
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=42, stratify=y
+    )
+    forest, _ = make_estimator("random_forest")
+    forest.set_params(max_depth=12, min_samples_split=50, min_samples_leaf=20)
+    forest.fit(pd.DataFrame(X_train, columns=FEATURE_NAMES), y_train)
+    return roc_auc_score(
+        y_test, forest.predict_proba(pd.DataFrame(X_test, columns=FEATURE_NAMES))[:, 1]
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--sessions", type=int, default=100_000)
+    args = parser.parse_args()
+
+    sessions, hits = make_synthetic_data(args.sessions)
+    model = SberAutoModel()
+    with contextlib.redirect_stdout(io.StringIO()):
+        target_actions = model.define_target_actions(hits)
+    print(f"💻 Сессий: {len(sessions):,}, хитов: {len(hits):,}")
+
+    start = time.perf_counter()
+    exact = aggregate_sessions(hits, target_actions)
+    exact_s = time.perf_counter() - start
+    X, y = build_feature_matrix(sessions, exact)
+
+    rows = [{"distinct": "точно", "aggregate_s": round(exact_s, 2), "roc_auc": holdout_auc(X, y)}]
+    for precision in (4, 6, 8):
+        start = time.perf_counter()
+        approx = aggregate_sessions(hits, target_actions, distinct_precision=precision)
+        row = {
+            "distinct": f"HLL p={precision}",
+            "aggregate_s": round(time.perf_counter() - start, 2),
+            "bytes_per_session": 2 * 2**precision,
+        }
+        for name in FIELDS:
+            true = exact[name].to_numpy()
+            error = np.abs(approx[name].to_numpy() - true) / np.maximum(true, 1)
+            row[f"{name}_err_mean"] = round(float(error.mean()), 4)
+            row[f"{name}_err_p99"] = round(float(np.quantile(error, 0.99)), 3)
+            row[f"{name}_exact_share"] = round(float((error == 0).mean()), 3)
+        X_approx, _ = build_feature_matrix(sessions, approx)
+        row["roc_auc"] = holdout_auc(X_approx, y)
+        rows.append(row)
+
+    report = pd.DataFrame(rows).set_index("distinct")
+    report["roc_auc"] = report["roc_auc"].round(4)
+    print("\n📊 ТОЧНЫЙ И ПРИБЛИЖЕННЫЙ ПОДСЧЕТ:")
+    print(report.T.to_string())
+
+    # Порции хитов в случайном порядке: эскизы объединяются без потерь
+    shuffled = hits.sample(frac=1, random_state=0)
+    merged = SessionDistinctSketch("hit_page_path")
+    for part in range(8):
+        chunk = shuffled.iloc[part::8]
+        merged.merge(
+            SessionDistinctSketch("hit_page_path").update(
+                chunk["session_id"], chunk["hit_page_path"]
+            )
+        )
+    whole = SessionDistinctSketch("hit_page_path").update(hits["session_id"], hits["hit_page_path"])
+    same = np.array_equal(merged.estimate(exact.index), whole.estimate(exact.index))
+    print(f"\n🧩 8 порций после объединения совпадают с одним проходом: {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Сравнение движков модели: случайный лес и гистограммный градиентный бустинг
+
+Для каждого движка измеряются время обучения, размер модели в pickle,
+задержка предсказания для одной строки и пакета из 1000 строк и ROC-AUC.
+Без реальных данных (data/ga_*.pkl) используется синтетический набор.
+
+Запуск из корня проекта:
+    python scripts/benchmark_engines.py --sessions 200000
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import pickle
+import sys
+import time
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import train_test_split
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "code"))
+sys.path.append(os.path.dirname(__file__))
+
+from sber_auto_model import MODEL_ENGINES, SberAutoModel, make_estimator  # noqa: E402
+from synthetic_data import make_synthetic_data  # noqa: E402
+
+# Параметры, выбранные поиском по сетке для каждого движка
+ENGINE_PARAMS: Dict[str, Dict[str, Any]] = {
+    "random_forest": {
+        "n_estimators": 200,
+        "max_depth": 12,
+        "min_samples_split": 50,
+        "min_samples_leaf": 20,
+    },
+    "hist_gradient_boosting": {"learning_rate": 0.1, "max_leaf_nodes": 31, "min_samples_leaf": 20},
+}
+
+
+def load_features(n_sessions: int) -> Tuple[pd.DataFrame, pd.Series]:
+    """Матрица признаков реальных данных или синтетического набора"""
+    if os.path.exists("data/ga_sessions.pkl") and os.path.exists("data/ga_hits.pkl"):
+        sessions = pd.read_pickle("data/ga_sessions.pkl")
+        hits = pd.read_pickle("data/ga_hits.pkl")
+    else:
+        print(f"⚠️ Данные не найдены, используем синтетический набор ({n_sessions:,} сессий)")
+        sessions, hits = make_synthetic_data(n_sessions)
+
+    model = SberAutoModel()
+    with contextlib.redirect_stdout(io.StringIO()):
+        model.define_target_actions(hits)
+        X, y = model.prepare_features(model.create_features(sessions, hits))
+    return X, y
+
+
+def latency_ms(estimator: Any, rows: pd.DataFrame, repeats: int) -> float:
+    """Медианная задержка predict_proba в миллисекундах"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        estimator.predict_proba(rows)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings) * 1000)
+
+
+def benchmark_engine(
+    engine: str,
+    X_train: pd.DataFrame,
+    y_train: pd.Series,
+    X_test: pd.DataFrame,
+    y_test: pd.Series,
+) -> Dict[str, Any]:
+    """Измерения для одного движка"""
+    estimator, _ = make_estimator(engine)
+    estimator.set_params(**ENGINE_PARAMS[engine])
+
+    start = time.perf_counter()
+    estimator.fit(X_train, y_train)
+    train_time = time.perf_counter() - start
+
+    # Задержка в одном потоке, как при обработке запроса API
+    if hasattr(estimator, "n_jobs"):
+        estimator.set_params(n_jobs=1)
+
+    return {
+        "engine": engine,
+        "train_s": round(train_time, 1),
+        "size_mb": round(len(pickle.dumps(estimator)) / 1024**2, 2),
+        "single_ms": round(latency_ms(estimator, X_test.iloc[:1], repeats=200), 2),
+        "batch_1000_ms": round(latency_ms(estimator, X_test.iloc[:1000], repeats=20), 1),
+        "roc_auc": round(float(roc_auc_score(y_test, estimator.predict_proba(X_test)[:, 1])), 4),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--sessions", type=int, default=200_000)
+    parser.add_argument("--engines", nargs="+", default=list(MODEL_ENGINES))
+    args = parser.parse_args()
+
+    print("🔧 Строим признаки...")
+    X, y = load_features(args.sessions)
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=42, stratify=y
+    )
+    print(f"📊 Обучение: {X_train.shape}, тест: {X_test.shape}, конверсия: {y.mean():.2%}")
+
+    results: List[Dict[str, Any]] = []
+    for engine in args.engines:
+        print(f"🤖 {engine}...")
+        results.append(benchmark_engine(engine, X_train, y_train, X_test, y_test))
+
+    print("\n📊 РЕЗУЛЬТАТЫ:")
+    print(pd.DataFrame(results).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Хешированные признаки UTM и страниц: время, память и качество
+
+- Время построения матрицы: hashed_feature_matrix (хеш только различных
+  значений) против sklearn FeatureHasher по строкам "поле=значение".
+- Память: CSR-матрица фиксированной ширины против ширины one-hot
+  кодирования при росте числа сессий (и различных значений).
+- ROC-AUC логистической регрессии (make_hashed_estimator) на плотных
+  признаках и на плотных признаках с корзинами; лес на плотных - ориентир.
+
+Запуск из корня проекта:
+    python scripts/benchmark_hashed_features.py --sessions 100000
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction import FeatureHasher
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import train_test_split
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "code"))
+sys.path.append(os.path.dirname(__file__))
+
+from hashed_features import (  # noqa: E402
+    HASHED_HIT_FIELDS,
+    HASHED_SESSION_FIELDS,
+    N_HASH_BUCKETS,
+    hashed_design_matrix,
+    hashed_feature_matrix,
+    make_hashed_estimator,
+)
+from sber_auto_model import SberAutoModel, make_estimator  # noqa: E402
+from synthetic_data import make_synthetic_data  # noqa: E402
+
+
+def feature_hasher_matrix(sessions: pd.DataFrame, hits: pd.DataFrame) -> None:
+    """Та же матрица через FeatureHasher (строки "поле=значение" на каждую строку)"""
+    pages = hits.groupby("session_id")[HASHED_HIT_FIELDS[0]].agg(list)
+    pages = pages.reindex(sessions["session_id"]).tolist()
+    tokens = [
+        [f"{field}={value}" for field, value in zip(HASHED_SESSION_FIELDS, row)]
+        + [f"{HASHED_HIT_FIELDS[0]}={page}" for page in (session_pages or [])]
+        for row, session_pages in zip(
+            sessions[HASHED_SESSION_FIELDS].itertuples(index=False), pages
+        )
+    ]
+    FeatureHasher(N_HASH_BUCKETS, input_type="string", alternate_sign=False).transform(tokens)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--sessions", type=int, default=100_000)
+    args = parser.parse_args()
+
+    print("📊 ПАМЯТЬ И ВРЕМЯ ПОСТРОЕНИЯ:")
+    rows = []
+    for n_sessions in (args.sessions // 4, args.sessions // 2, args.sessions):
+        sessions, hits = make_synthetic_data(n_sessions)
+        start = time.perf_counter()
+        hashed = hashed_feature_matrix(sessions, hits)
+        hashed_s = time.perf_counter() - start
+        start = time.perf_counter()
+        feature_hasher_matrix(sessions, hits)
+        hasher_s = time.perf_counter() - start
+        one_hot_width = sum(sessions[field].nunique() for field in HASHED_SESSION_FIELDS) + sum(
+            hits[field].nunique() for field in HASHED_HIT_FIELDS
+        )
+        rows.append(
+            {
+                "sessions": n_sessions,
+                "hits": len(hits),
+                "one_hot_columns": one_hot_width,
+                "one_hot_dense_mb": round(n_sessions * one_hot_width * 4 / 2**20, 1),
+                "hashed_columns": hashed.shape[1],
+                "hashed_csr_mb": round(
+                    (hashed.data.nbytes + hashed.indices.nbytes + hashed.indptr.nbytes) / 2**20, 1
+                ),
+                "hashed_s": round(hashed_s, 3),
+                "feature_hasher_s": round(hasher_s, 3),
+            }
+        )
+    print(pd.DataFrame(rows).to_string(index=False))
+
+    model = SberAutoModel()
+    with contextlib.redirect_stdout(io.StringIO()):
+        model.define_target_actions(hits)
+        df = model.create_features(sessions, hits)
+        X, y = model.prepare_features(df)
+    train, test = train_test_split(np.arange(len(y)), test_size=0.2, random_state=42, stratify=y)
+    labels = y.to_numpy()
+
+    print("\n📊 КАЧЕСТВО (ROC-AUC на отложенной выборке):")
+    results = []
+    for name, design in (
+        ("SGD: плотные", hashed_design_matrix(X, hashed[:, :0])),
+        ("SGD: плотные + корзины", hashed_design_matrix(X, hashed)),
+    ):
+        estimator = make_hashed_estimator()
+        start = time.perf_counter()
+        estimator.fit(design[train], labels[train])
+        fit_s = time.perf_counter() - start
+        score = roc_auc_score(labels[test], estimator.predict_proba(design[test])[:, 1])
+        results.append({"model": name, "fit_s": round(fit_s, 2), "roc_auc": round(score, 4)})
+
+    forest, _ = make_estimator("random_forest")
+    start = time.perf_counter()
+    forest.fit(X.iloc[train], labels[train])
+    fit_s = time.perf_counter() - start
+    score = roc_auc_score(labels[test], forest.predict_proba(X.iloc[test])[:, 1])
+    results.append({"model": "лес: плотные", "fit_s": round(fit_s, 2), "roc_auc": round(score, 4)})
+    print(pd.DataFrame(results).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Признаки последовательности хитов: время против агрегации сессий
+
+sequence_features (n-граммы переходов и ключевые действия) сравнивается с
+aggregate_sessions на тех же хитах: хиты в порядке выгрузки (сортировка
+пропускается) и перемешанные (одна сортировка lexsort).
+
+Запуск из корня проекта:
+    python scripts/benchmark_hit_sequences.py --sessions 100000
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "code"))
+sys.path.append(os.path.dirname(__file__))
+
+from features import aggregate_sessions  # noqa: E402
+from hit_sequences import sequence_features  # noqa: E402
+from synthetic_data import TARGET_EVENTS, make_synthetic_data  # noqa: E402
+
+
+def best_s(function: Callable[[], Any], repeats: int = 3) -> float:
+    """Лучшее время из repeats вызовов, с"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--sessions", type=int, default=100_000)
+    args = parser.parse_args()
+
+    sessions, hits = make_synthetic_data(args.sessions)
+    shuffled = hits.sample(frac=1, random_state=0)
+    session_ids = sessions["session_id"]
+    print(f"💻 Сессий: {len(sessions):,}, хитов: {len(hits):,}")
+
+    baseline = best_s(lambda: aggregate_sessions(hits, TARGET_EVENTS))
+    timings = {
+        "aggregate_sessions": baseline,
+        "sequence_features": best_s(lambda: sequence_features(hits, TARGET_EVENTS, session_ids)),
+        "sequence_features (перемешаны)": best_s(
+            lambda: sequence_features(shuffled, TARGET_EVENTS, session_ids)
+        ),
+    }
+    matrix, _ = sequence_features(hits, TARGET_EVENTS, session_ids)
+    print("\n📊 ВРЕМЯ, с:")
+    print(
+        pd.DataFrame(
+            {"time_s": timings, "vs_aggregate": {k: v / baseline for k, v in timings.items()}}
+        )
+        .round(3)
+        .to_string()
+    )
+    per_session = np.mean(matrix.getnnz(axis=1))
+    print(f"\n🧮 Ненулевых корзин n-грамм: {matrix.nnz:,}, на сессию {per_session:.1f}")
+
+
+if __name__ == "__main__":
+    main()
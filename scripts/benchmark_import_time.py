@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Время импорта и холодного старта модулей предсказания
+
+Для каждого модуля (inference, api, sber_auto_model) в новом интерпретаторе
+запускается python -X importtime: из отчета берется суммарное время импорта
+модуля и число загруженных модулей, отдельно отмечается, попали ли в процесс
+pandas и sklearn. Холодный старт - новый интерпретатор от запуска до первого
+предсказания: импорт модуля модели, загрузка папки модели и predict({}),
+цель - меньше 200 мс для InferenceModel.
+
+Запуск из корня проекта:
+    python scripts/benchmark_import_time.py --sessions 50000 --repeats 5
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+CODE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "code")
+sys.path.append(CODE_DIR)
+sys.path.append(os.path.dirname(__file__))
+
+from benchmark_engines import ENGINE_PARAMS, load_features  # noqa: E402
+from sber_auto_model import SberAutoModel, make_estimator  # noqa: E402
+
+MODULES = ("inference", "api", "sber_auto_model")
+COLD_START_TARGET_MS = 200.0
+
+IMPORT = """
+import sys
+sys.path.insert(0, {code_dir!r})
+import {module}
+print(len(sys.modules), int("pandas" in sys.modules), int("sklearn" in sys.modules))
+"""
+
+COLD_START = """
+import contextlib, io, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {code_dir!r})
+from {module} import {name}
+model = {name}()
+with contextlib.redirect_stdout(io.StringIO()):
+    model.load_model({path!r})
+model.predict({{}})
+print(time.perf_counter() - start)
+"""
+
+
+def import_time(module: str) -> Dict[str, float]:
+    """Отчет -X importtime для импорта модуля в новом интерпретаторе"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", IMPORT.format(code_dir=CODE_DIR, module=module)],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=CODE_DIR,
+    )
+    # Строки отчета: "import time: self [us] | cumulative | imported package"
+    cumulative = 0
+    for line in result.stderr.splitlines():
+        parts = line.split("|")
+        if line.startswith("import time:") and parts[-1].strip() == module:
+            cumulative = int(parts[1])
+    n_modules, pandas_loaded, sklearn_loaded = map(int, result.stdout.split())
+    return {
+        "import_ms": cumulative / 1000,
+        "modules": n_modules,
+        "pandas": bool(pandas_loaded),
+        "sklearn": bool(sklearn_loaded),
+    }
+
+
+def cold_start_ms(module: str, name: str, path: str, repeats: int) -> List[float]:
+    """Холодный старт: импорт, загрузка модели и первое предсказание, мс"""
+    code = COLD_START.format(code_dir=CODE_DIR, module=module, name=name, path=path)
+    return [
+        float(subprocess.check_output([sys.executable, "-c", code], cwd=CODE_DIR)) * 1000
+        for _ in range(repeats)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--sessions", type=int, default=50_000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    print("📦 Время импорта (python -X importtime)...")
+    imports = []
+    for module in MODULES:
+        # Первый запуск прогревает кэш байткода и файловой системы
+        import_time(module)
+        imports.append({"module": module, **import_time(module)})
+    print(pd.DataFrame(imports).round(1).to_string(index=False))
+
+    print("\n🔧 Обучаем модель для холодного старта...")
+    X, y = load_features(args.sessions)
+    estimator, _ = make_estimator("random_forest")
+    model = SberAutoModel()
+    model.model = estimator.set_params(**ENGINE_PARAMS["random_forest"]).fit(X, y)
+    model.feature_names = list(X.columns)
+    model.target_actions = []
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "model")
+        with contextlib.redirect_stdout(io.StringIO()):
+            model.save_model(path)
+        for module, name in (("inference", "InferenceModel"), ("sber_auto_model", "SberAutoModel")):
+            print(f"⏱️ Холодный старт {name}...")
+            timings = cold_start_ms(module, name, path, args.repeats)
+            results.append({"class": name, "cold_start_ms": float(np.median(timings))})
+
+    table = pd.DataFrame(results)
+    table["target_met"] = table["cold_start_ms"] < COLD_START_TARGET_MS
+    print("\n📊 РЕЗУЛЬТАТЫ:")
+    print(table.round(1).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Пропускная способность заданий скоринга против цепочки /predict_batch
+
+Строки тестовой выборки (с повторами) записываются в CSV и считаются
+заданием с разным числом процессов пула. Для сравнения те же строки
+отправляются последовательными вызовами /predict_batch по 1000 сессий
+через тестовый клиент Flask (без сети).
+
+Запуск из корня проекта:
+    python scripts/benchmark_jobs.py --rows 500000 --workers 1 2 4
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "code"))
+sys.path.append(os.path.dirname(__file__))
+
+import api  # noqa: E402
+from benchmark_engines import ENGINE_PARAMS, load_features  # noqa: E402
+from jobs import JobManager  # noqa: E402
+from prediction_cache import PredictionCache  # noqa: E402
+from sber_auto_model import SberAutoModel, make_estimator  # noqa: E402
+
+
+def run_job(root: str, model_path: str, input_path: str, workers: int) -> float:
+    """Время задания от создания до results.csv, секунды"""
+    manager = JobManager(root, workers=workers)
+    manager.pool().submit(int).result()  # процессы пула запущены заранее
+    start = time.perf_counter()
+    status = manager.submit(lambda path: os.link(input_path, path), "csv", "benchmark", model_path)
+    job_id = status["job_id"]
+    while manager.status(job_id)["state"] not in ("done", "failed"):
+        time.sleep(0.1)
+    elapsed = time.perf_counter() - start
+    manager.close()
+    if manager.status(job_id)["state"] != "done":
+        raise RuntimeError(manager.status(job_id)["error"])
+    return elapsed
+
+
+def run_batches(frame: pd.DataFrame) -> float:
+    """Время последовательных /predict_batch по 1000 сессий, секунды"""
+    client = api.app.test_client()
+    rows = frame.to_dict("records")
+    start = time.perf_counter()
+    for i in range(0, len(rows), 1000):
+        response = client.post("/predict_batch", json={"sessions": rows[i : i + 1000]})
+        assert response.status_code == 200
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--sessions", type=int, default=50_000)
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    print("🔧 Строим признаки и обучаем модель...")
+    X, y = load_features(args.sessions)
+    estimator, _ = make_estimator("random_forest")
+    model = SberAutoModel()
+    model.model = estimator.set_params(**ENGINE_PARAMS["random_forest"]).fit(X, y)
+    model.feature_names = list(X.columns)
+    model.target_actions = []
+    frame = X.sample(args.rows, replace=True, random_state=0).reset_index(drop=True)
+    print(f"💻 Ядер: {os.cpu_count()}, строк: {len(frame):,}")
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, "model")
+        with contextlib.redirect_stdout(io.StringIO()):
+            model.save_model(model_path)
+            model.load_model(model_path)
+        input_path = os.path.join(tmp, "sessions.csv")
+        frame.to_csv(input_path, index=False)
+
+        for workers in args.workers:
+            print(f"⏱️ Задание, процессов: {workers}...")
+            elapsed = run_job(os.path.join(tmp, "jobs"), model_path, input_path, workers)
+            results.append({"способ": f"задание, {workers} проц.", "time_s": elapsed})
+
+        print("⏱️ /predict_batch по 1000...")
+        api.live_model.serve("benchmark", model)
+        api.prediction_cache = PredictionCache(0)
+        api.logger.setLevel("WARNING")
+        results.append({"способ": "/predict_batch x1000", "time_s": run_batches(frame)})
+
+    table = pd.DataFrame(results)
+    table["rows_per_s"] = (len(frame) / table["time_s"]).round()
+    table["time_s"] = table["time_s"].round(1)
+    print("\n📊 РЕЗУЛЬТАТЫ:")
+    print(table.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Сравнение форматов сохранения модели: pickle и папка с массивами (mmap)
+
+Лес из 200 деревьев глубины 12 сохраняется в обоих форматах. Измеряются
+размер на диске, время загрузки в текущем процессе, холодный старт в новом
+интерпретаторе (импорт + загрузка + первое предсказание) и задержка
+предсказания одной строки.
+
+Запуск из корня проекта:
+    python scripts/benchmark_model_load.py --sessions 200000
+"""
+
+import argparse
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+CODE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "code")
+sys.path.append(CODE_DIR)
+sys.path.append(os.path.dirname(__file__))
+
+from benchmark_engines import ENGINE_PARAMS, latency_ms, load_features  # noqa: E402
+from model_artifact import load_artifact, save_artifact  # noqa: E402
+from sber_auto_model import make_estimator  # noqa: E402
+
+COLD_START = """
+import sys, time
+start = time.perf_counter()
+sys.path.insert(0, {code_dir!r})
+from sber_auto_model import SberAutoModel
+model = SberAutoModel()
+model.load_model({path!r})
+model.predict({{}})
+print(time.perf_counter() - start)
+"""
+
+
+def disk_size_mb(path: str) -> float:
+    """Размер файла или папки на диске"""
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path)) / 1024**2
+    return os.path.getsize(path) / 1024**2
+
+
+def median_ms(function: Callable[[], Any], repeats: int) -> float:
+    """Медианное время вызова в миллисекундах"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings) * 1000)
+
+
+def cold_start_ms(path: str, repeats: int) -> float:
+    """Медианный холодный старт в отдельном интерпретаторе"""
+    code = COLD_START.format(code_dir=os.path.abspath(CODE_DIR), path=path)
+    timings = []
+    for _ in range(repeats):
+        output = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        ).stdout
+        timings.append(float(output.strip().splitlines()[-1]))
+    return float(np.median(timings) * 1000)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--sessions", type=int, default=200_000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    print("🔧 Строим признаки...")
+    X, y = load_features(args.sessions)
+    X_train, X_test, y_train, _ = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+
+    print("🤖 Обучаем лес...")
+    forest, _ = make_estimator("random_forest")
+    forest.set_params(**ENGINE_PARAMS["random_forest"]).fit(X_train, y_train)
+    forest.set_params(n_jobs=1)
+
+    results: List[Dict[str, Any]] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        pickle_path = os.path.join(tmp, "sber_auto_model.pkl")
+        with open(pickle_path, "wb") as f:
+            pickle.dump(
+                {
+                    "model": forest,
+                    "engine": "random_forest",
+                    "feature_names": list(X.columns),
+                    "target_actions": [],
+                },
+                f,
+            )
+        artifact_path = os.path.join(tmp, "sber_auto_model")
+        save_artifact(artifact_path, forest, "random_forest", list(X.columns), [])
+
+        def load_pickle() -> Any:
+            with open(pickle_path, "rb") as f:
+                return pickle.load(f)["model"]
+
+        ensemble, _ = load_artifact(artifact_path)
+        probability = ensemble.predict_proba(X_test)[:, 1]
+        max_diff = np.abs(probability - forest.predict_proba(X_test)[:, 1]).max()
+        print(f"✅ Максимальное расхождение вероятностей: {max_diff:.2e}")
+
+        for name, path, load, estimator in (
+            ("pickle", pickle_path, load_pickle, forest),
+            ("artifact (mmap)", artifact_path, lambda: load_artifact(artifact_path), ensemble),
+        ):
+            results.append(
+                {
+                    "format": name,
+                    "size_mb": round(disk_size_mb(path), 2),
+                    "load_ms": round(median_ms(load, args.repeats), 2),
+                    "cold_start_ms": round(cold_start_ms(path, args.repeats), 1),
+                    "single_ms": round(latency_ms(estimator, X_test.iloc[:1], repeats=200), 2),
+                    "batch_1000_ms": round(latency_ms(estimator, X_test.iloc[:1000], 20), 1),
+                }
+            )
+
+    print("\n📊 РЕЗУЛЬТАТЫ:")
+    print(pd.DataFrame(results).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
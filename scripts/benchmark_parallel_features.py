@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Параллельное построение признаков по шардам session_id: время и ускорение
+
+Сравнивается build_feature_matrix в одном процессе с
+parallel_feature_matrix для разного числа процессов. Отдельно измеряются
+последовательная часть родителя (коды столбцов и запись шардов в .npy) и
+расчет одного шарда - они ограничивают достижимое ускорение.
+
+Запуск из корня проекта:
+    python scripts/benchmark_parallel_features.py --sessions 200000 --workers 1 2 4
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "code"))
+sys.path.append(os.path.dirname(__file__))
+
+from features import aggregate_sessions, build_feature_matrix  # noqa: E402
+from parallel_features import (  # noqa: E402
+    parallel_feature_matrix,
+    shard_features_from_files,
+    write_shards,
+)
+from synthetic_data import TARGET_EVENTS, make_synthetic_data  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--sessions", type=int, default=200_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    sessions, hits = make_synthetic_data(args.sessions)
+    print(f"💻 Ядер: {os.cpu_count()}, сессий: {len(sessions):,}, хитов: {len(hits):,}")
+
+    start = time.perf_counter()
+    X, y = build_feature_matrix(sessions, aggregate_sessions(hits, TARGET_EVENTS))
+    serial_s = time.perf_counter() - start
+
+    rows = [{"mode": "один процесс", "time_s": serial_s, "speedup": 1.0}]
+    for workers in sorted(set(args.workers)):
+        start = time.perf_counter()
+        X_parallel, y_parallel = parallel_feature_matrix(
+            sessions, hits, TARGET_EVENTS, workers=workers
+        )
+        elapsed = time.perf_counter() - start
+        if not (np.array_equal(X, X_parallel) and np.array_equal(y, y_parallel)):
+            raise AssertionError("Признаки шардов не совпадают с расчетом в одном процессе")
+        rows.append(
+            {"mode": f"{workers} процессов", "time_s": elapsed, "speedup": serial_s / elapsed}
+        )
+    print("\n📊 ВРЕМЯ ПОСТРОЕНИЯ ПРИЗНАКОВ:")
+    print(pd.DataFrame(rows).round(2).to_string(index=False))
+
+    # Последовательная часть родителя и работа одного шарда (из 4)
+    n_shards = 4
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        _, categories = write_shards(sessions, hits, n_shards, directory)
+        partition_s = time.perf_counter() - start
+        start = time.perf_counter()
+        shard_features_from_files(os.path.join(directory, "shard-0000"), categories, TARGET_EVENTS)
+        shard_s = time.perf_counter() - start
+    print("\n📊 СОСТАВЛЯЮЩИЕ (4 шарда), с:")
+    print(f"   Коды и запись шардов в .npy (родитель): {partition_s:.2f}")
+    print(f"   Расчет одного шарда: {shard_s:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Набор, разложенный по датам визита: время чтения окна дат
+
+Сравнивается чтение окна (последние N дней) из разделов visit_date с
+загрузкой полных pickle-файлов сессий и хитов и фильтрацией в памяти, как
+делал load_data раньше. Также измеряется время раскладки.
+
+Запуск из корня проекта:
+    python scripts/benchmark_partitioned_store.py --sessions 500000 --last-days 90
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "code"))
+sys.path.append(os.path.dirname(__file__))
+
+from features import visit_day_numbers  # noqa: E402
+from partitioned_store import (  # noqa: E402
+    load_partitions,
+    select_partitions,
+    window_mask,
+    write_partitions,
+)
+from synthetic_data import make_synthetic_data  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--sessions", type=int, default=500_000)
+    parser.add_argument("--last-days", type=int, default=90)
+    args = parser.parse_args()
+
+    sessions, hits = make_synthetic_data(args.sessions)
+    print(f"📊 Сессий: {len(sessions):,}, хитов: {len(hits):,}")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        sessions_path = os.path.join(work_dir, "ga_sessions.pkl")
+        hits_path = os.path.join(work_dir, "ga_hits.pkl")
+        sessions.to_pickle(sessions_path)
+        hits.to_pickle(hits_path)
+        dataset_dir = os.path.join(work_dir, "dataset")
+
+        start = time.perf_counter()
+        write_partitions(sessions, hits, dataset_dir)
+        write_s = time.perf_counter() - start
+        del sessions, hits
+
+        # Полная загрузка и фильтрация окна в памяти
+        start = time.perf_counter()
+        full_sessions = pd.read_pickle(sessions_path)
+        full_hits = pd.read_pickle(hits_path)
+        days = visit_day_numbers(full_sessions["visit_date"])
+        full_sessions = full_sessions[window_mask(days, last_days=args.last_days)]
+        full_hits = full_hits[full_hits["session_id"].isin(full_sessions["session_id"])]
+        full_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        window_sessions, window_hits = load_partitions(dataset_dir, last_days=args.last_days)
+        window_s = time.perf_counter() - start
+
+        if sorted(window_sessions["session_id"]) != sorted(full_sessions["session_id"]) or len(
+            window_hits
+        ) != len(full_hits):
+            raise AssertionError("Окно из разделов не совпадает с фильтрацией в памяти")
+
+        n_partitions = len(select_partitions(dataset_dir))
+        n_window = len(select_partitions(dataset_dir, last_days=args.last_days))
+        print(f"🗂️ Разделов: {n_partitions}, в окне {args.last_days} дней: {n_window}")
+        print(f"   Сессий в окне: {len(window_sessions):,}, хитов: {len(window_hits):,}")
+        print("\n📊 ВРЕМЯ, с:")
+        print(f"   Раскладка по датам: {write_s:.2f}")
+        print(f"   Полная загрузка + фильтр: {full_s:.2f}")
+        print(f"   Чтение разделов окна: {window_s:.2f} ({full_s / window_s:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
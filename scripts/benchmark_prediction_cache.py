@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Кэш предсказаний на потоке запросов с повторами
+
+Запросы /predict содержат поля примера API (GET /example). Поток запросов
+выбирается из различных строк признаков по закону Ципфа: несколько частых
+комбинаций (например, отказные мобильные сессии) и длинный хвост редких.
+Сравниваются задержки без кэша и с кэшем, выводится доля попаданий.
+
+Запуск из корня проекта:
+    python scripts/benchmark_prediction_cache.py --requests 20000 --zipf 1.2
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "code"))
+sys.path.append(os.path.dirname(__file__))
+
+import api  # noqa: E402
+from benchmark_engines import ENGINE_PARAMS, load_features  # noqa: E402
+from model_registry import LiveModel, ModelRegistry  # noqa: E402
+from prediction_cache import PredictionCache  # noqa: E402
+from sber_auto_model import SberAutoModel, make_estimator  # noqa: E402
+
+
+def request_fields() -> List[str]:
+    """Поля примера запроса из GET /example"""
+    with api.app.test_request_context():
+        return list(api.get_example().get_json()["example_data"])
+
+
+def zipf_requests(X: pd.DataFrame, n_requests: int, exponent: float) -> List[Dict[str, Any]]:
+    """Поток запросов: различные строки с частотами по закону Ципфа"""
+    distinct = X[request_fields()].drop_duplicates().sample(frac=1.0, random_state=0)
+    ranks = np.arange(1, len(distinct) + 1)
+    weights = ranks**-exponent
+    rng = np.random.default_rng(0)
+    choice = rng.choice(len(distinct), size=n_requests, p=weights / weights.sum())
+    return distinct.iloc[choice].to_dict("records")
+
+
+def measure(rows: List[Dict[str, Any]]) -> Dict[str, float]:
+    """Задержки /predict в миллисекундах"""
+    client = api.app.test_client()
+    timings = []
+    for row in rows:
+        start = time.perf_counter()
+        client.post("/predict", json=row)
+        timings.append(time.perf_counter() - start)
+    timings_ms = np.array(timings) * 1000
+    return {
+        "total_s": round(timings_ms.sum() / 1000, 2),
+        "p50_ms": round(float(np.percentile(timings_ms, 50)), 3),
+        "p99_ms": round(float(np.percentile(timings_ms, 99)), 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--sessions", type=int, default=100_000)
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--zipf", type=float, default=1.2)
+    parser.add_argument("--cache-size", type=int, default=50_000)
+    args = parser.parse_args()
+
+    print("🔧 Строим признаки и обучаем модель...")
+    X, y = load_features(args.sessions)
+    rows = zipf_requests(X, args.requests, args.zipf)
+    unique = len({tuple(row.values()) for row in rows})
+    print(f"📊 Запросов: {len(rows):,}, различных: {unique:,}")
+
+    estimator, _ = make_estimator("random_forest")
+    model = SberAutoModel()
+    model.model = estimator.set_params(**ENGINE_PARAMS["random_forest"]).fit(X, y)
+    model.feature_names = list(X.columns)
+    model.target_actions = []
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        model.save_model(os.path.join(tmp, "model"))
+        registry = ModelRegistry(os.path.join(tmp, "registry"))
+        registry.publish(os.path.join(tmp, "model"), version="v1")
+        api.live_model = LiveModel(registry)
+        api.live_model.reload()
+        api.logger.setLevel("WARNING")
+
+        for size in (0, args.cache_size):
+            api.prediction_cache = PredictionCache(size)
+            results.append({"cache_size": size, **measure(rows), **api.prediction_cache.stats()})
+
+    print("\n📊 РЕЗУЛЬТАТЫ:")
+    columns = ["cache_size", "total_s", "p50_ms", "p99_ms", "hit_rate", "size", "evictions"]
+    print(pd.DataFrame(results)[columns].to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
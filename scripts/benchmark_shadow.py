@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Задержка основных ответов API с теневой моделью и без нее
+
+В реестр во временной папке публикуются основная модель (случайный лес) и
+претендент (гистограммный бустинг). Запросы /predict отправляются из
+нескольких потоков через тестовый клиент Flask, сравниваются p50/p99
+задержки без теневой модели и с теневым скорингом доли трафика.
+
+Запуск из корня проекта:
+    python scripts/benchmark_shadow.py --requests 2000 --threads 4
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "code"))
+sys.path.append(os.path.dirname(__file__))
+
+import api  # noqa: E402
+from benchmark_engines import ENGINE_PARAMS, load_features  # noqa: E402
+from model_registry import LiveModel, ModelRegistry  # noqa: E402
+from sber_auto_model import SberAutoModel, make_estimator  # noqa: E402
+from shadow import ShadowScorer, summarize_shadow_log  # noqa: E402
+
+
+def publish(registry: ModelRegistry, X: pd.DataFrame, y: pd.Series, engine: str, tmp: str) -> str:
+    """Обучение модели движка и публикация в реестр"""
+    estimator, _ = make_estimator(engine)
+    estimator.set_params(**ENGINE_PARAMS[engine])
+    model = SberAutoModel(engine)
+    model.model = estimator.fit(X, y)
+    model.feature_names = list(X.columns)
+    model.target_actions = []
+    path = os.path.join(tmp, engine)
+    with contextlib.redirect_stdout(io.StringIO()):
+        model.save_model(path)
+    return registry.publish(path, version=engine, activate=engine == "random_forest")
+
+
+def measure(rows: List[Dict[str, Any]], threads: int) -> Dict[str, float]:
+    """p50 / p99 задержки /predict в миллисекундах"""
+
+    def call(row: Dict[str, Any]) -> float:
+        client = api.app.test_client()
+        start = time.perf_counter()
+        response = client.post("/predict", json=row)
+        assert response.status_code == 200
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(threads) as pool:
+        timings = np.array(list(pool.map(call, rows))) * 1000
+    return {
+        "p50_ms": round(np.percentile(timings, 50), 2),
+        "p99_ms": round(np.percentile(timings, 99), 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--sessions", type=int, default=50_000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--fractions", type=float, nargs="+", default=[0.1, 1.0])
+    args = parser.parse_args()
+
+    print("🔧 Строим признаки и обучаем модели...")
+    X, y = load_features(args.sessions)
+    rows = X.sample(args.requests, replace=True, random_state=0).to_dict("records")
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        registry = ModelRegistry(os.path.join(tmp, "registry"))
+        publish(registry, X, y, "random_forest", tmp)
+        challenger = publish(registry, X, y, "hist_gradient_boosting", tmp)
+        api.live_model = LiveModel(registry)
+        api.live_model.reload()
+        api.logger.setLevel("WARNING")
+
+        measure(rows[:100], args.threads)  # прогрев
+        results.append({"shadow": "нет", **measure(rows, args.threads)})
+
+        log_path = os.path.join(tmp, "shadow.jsonl")
+        for fraction in args.fractions:
+            scorer = ShadowScorer(registry.version_path(challenger), challenger, fraction, log_path)
+            api.shadow_scorers[:] = [scorer.start()]
+            time.sleep(5)  # загрузка модели в процессе тени
+            results.append(
+                {"shadow": f"{fraction:.0%}", **measure(rows, args.threads), **scorer.stats()}
+            )
+            scorer.close(timeout=120)
+
+        print("\n📊 РЕЗУЛЬТАТЫ:")
+        print(pd.DataFrame(results).to_string(index=False))
+        print("\n📊 Сравнение моделей:")
+        print(summarize_shadow_log(log_path).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
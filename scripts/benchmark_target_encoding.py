@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Конверсия городов без утечки: стоимость честной кросс-валидации
+
+Поиск гиперпараметров леса (сетка make_estimator) выполняется дважды:
+- с утечкой: city_conversion_rate и city_tier_* посчитаны по всем данным;
+- без утечки: CityTargetEncodingClassifier пересчитывает их в каждом фолде.
+Сравниваются время поиска и ROC-AUC кросс-валидации. Отдельно измеряется
+пересчет статистик городов для одного фолда: oof_city_rates (bincount, без
+кэша и из кэша) против groupby по городу и фолду в pandas.
+
+Запуск из корня проекта:
+    python scripts/benchmark_target_encoding.py --sessions 50000
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "code"))
+sys.path.append(os.path.dirname(__file__))
+
+import target_encoding  # noqa: E402
+from sber_auto_model import SberAutoModel, make_estimator  # noqa: E402
+from synthetic_data import make_synthetic_data  # noqa: E402
+from target_encoding import (  # noqa: E402
+    CITY_CODE_COLUMN,
+    OOF_FOLDS,
+    CityTargetEncodingClassifier,
+    oof_city_rates,
+)
+from warm_start_search import WarmStartGridSearch  # noqa: E402
+
+
+def median_ms(function: Callable[[], Any], repeats: int = 20) -> float:
+    """Медианное время вызова, мс"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1000
+
+
+def groupby_rates(codes: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Out-of-fold конверсия строк через groupby pandas (для сравнения)"""
+    folds = np.random.default_rng(42).integers(0, OOF_FOLDS, len(codes))
+    frame = pd.DataFrame({"city": codes, "fold": folds, "y": y})
+    by_fold = frame.groupby(["city", "fold"])["y"].agg(["sum", "count"])
+    total = frame.groupby("city")["y"].agg(["sum", "count"])
+    own = by_fold.reindex(pd.MultiIndex.from_arrays([codes, folds])).to_numpy()
+    rest = total.reindex(codes).to_numpy() - own
+    return np.round(rest[:, 0] / np.maximum(rest[:, 1], 1) * 100, 2)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--sessions", type=int, default=50_000)
+    args = parser.parse_args()
+
+    sessions, hits = make_synthetic_data(args.sessions)
+    model = SberAutoModel()
+    with contextlib.redirect_stdout(io.StringIO()):
+        model.define_target_actions(hits)
+        df = model.create_features(sessions, hits)
+        X, y = model.prepare_features(df)
+    codes = df[CITY_CODE_COLUMN].to_numpy()
+    print(f"💻 Ядер: {os.cpu_count()}, строк: {len(X):,}, городов: {codes.max() + 1}")
+
+    estimator, param_grid = make_estimator("random_forest")
+    results = []
+    for name, features, search_estimator, grid in (
+        ("с утечкой", X, estimator, param_grid),
+        (
+            "без утечки (OOF)",
+            X.assign(**{CITY_CODE_COLUMN: codes}),
+            CityTargetEncodingClassifier(estimator, random_state=42),
+            {f"estimator__{key}": values for key, values in param_grid.items()},
+        ),
+    ):
+        print(f"⏱️ Поиск {name}...")
+        search = WarmStartGridSearch(search_estimator, grid, cv=2, scoring="roc_auc", n_jobs=-1)
+        start = time.perf_counter()
+        search.fit(features, y)
+        results.append(
+            {
+                "search": name,
+                "time_s": round(time.perf_counter() - start, 1),
+                "cv_roc_auc": round(search.best_score_, 4),
+            }
+        )
+
+    print("\n📊 ПОИСК ГИПЕРПАРАМЕТРОВ:")
+    print(pd.DataFrame(results).to_string(index=False))
+
+    labels = y.to_numpy()
+
+    def cold() -> None:
+        target_encoding._stats_cache.clear()
+        oof_city_rates(codes, labels, random_state=42)
+
+    print("\n📊 СТАТИСТИКА ГОРОДОВ ДЛЯ ОДНОГО ФОЛДА, мс:")
+    timings = {
+        "bincount": median_ms(cold),
+        "bincount из кэша": median_ms(lambda: oof_city_rates(codes, labels, random_state=42)),
+        "groupby pandas": median_ms(lambda: groupby_rates(codes, labels)),
+    }
+    print(pd.Series(timings).round(2).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Модели семейств целевых действий: один проход против конвейера на семейство
+
+Сравнивается построение меток и признаков для каждого семейства отдельно
+(create_features с целевыми действиями семейства) с одним проходом:
+family_labels и одна общая матрица признаков. Затем модели семейств
+обучаются последовательно и параллельно, и измеряется предсказание всех
+семейств по одной строке (FamilyModels.predict).
+
+Запуск из корня проекта:
+    python scripts/benchmark_target_families.py --sessions 200000 --workers 1 3
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "code"))
+sys.path.append(os.path.dirname(__file__))
+
+from sber_auto_model import SberAutoModel  # noqa: E402
+from synthetic_data import make_synthetic_data  # noqa: E402
+from target_encoding import CITY_CODE_COLUMN  # noqa: E402
+from target_families import (  # noqa: E402
+    FamilyModels,
+    family_labels,
+    family_split,
+    family_target_actions,
+    save_family_models,
+    shared_city_encoding,
+    train_family_models,
+)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--sessions", type=int, default=200_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    sessions, hits = make_synthetic_data(args.sessions)
+    print(f"💻 Ядер: {os.cpu_count()}, сессий: {len(sessions):,}, хитов: {len(hits):,}")
+    model = SberAutoModel()
+    model.define_target_actions(hits)
+    union_actions = model.target_actions
+    family_actions = family_target_actions(union_actions)
+    families = [family for family, actions in family_actions.items() if actions]
+    family_actions = {family: family_actions[family] for family in families}
+    print(f"🏷️ Семейства с событиями: {', '.join(families)}")
+
+    # Конвейер на семейство: признаки и метка заново для каждого семейства
+    start = time.perf_counter()
+    per_family_y = {}
+    for family in families:
+        model.target_actions = family_actions[family]
+        per_family_y[family] = model.create_features(sessions, hits)["is_target"].to_numpy()
+    per_family_s = time.perf_counter() - start
+
+    # Один проход: общая матрица и метки всех семейств
+    start = time.perf_counter()
+    model.target_actions = union_actions
+    df = model.create_features(sessions, hits)
+    X, y = model.prepare_features(df)
+    labels = family_labels(hits, family_actions, sessions["session_id"])
+    split = family_split(labels)
+    shared = shared_city_encoding(X, df[CITY_CODE_COLUMN].to_numpy(), y.to_numpy(), split[0])
+    one_pass_s = time.perf_counter() - start
+    for j, family in enumerate(families):
+        if not np.array_equal(labels[:, j], per_family_y[family]):
+            raise AssertionError(f"Метки семейства {family} не совпадают с конвейером")
+
+    timings = {}
+    for workers in sorted(set(args.workers)):
+        start = time.perf_counter()
+        models, metrics = train_family_models(
+            shared, labels, families, workers=workers, split=split
+        )
+        timings[workers] = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        path = os.path.join(work_dir, "family_models")
+        save_family_models(path, models, "random_forest", list(X.columns), family_actions, metrics)
+        served = FamilyModels(path)
+        request = {name: float(value) for name, value in zip(X.columns, shared[0])}
+        request["total_hits"] = int(request["total_hits"])
+        n_requests = 200
+        start = time.perf_counter()
+        for _ in range(n_requests):
+            served.predict(request)
+        predict_ms = (time.perf_counter() - start) / n_requests * 1000
+
+    print("\n📊 МЕТРИКИ ПО СЕМЕЙСТВАМ:")
+    print(pd.DataFrame(metrics).T.round(4).to_string())
+    print(f"\n📊 МЕТКИ И ПРИЗНАКИ ({len(families)} семейств), с:")
+    print(f"   Конвейер на семейство: {per_family_s:.2f}")
+    print(f"   Один проход: {one_pass_s:.2f} ({per_family_s / one_pass_s:.1f}x)")
+    print("📊 ОБУЧЕНИЕ, с:")
+    for workers, elapsed in timings.items():
+        print(f"   {workers} процессов: {elapsed:.2f}")
+    print(f"📊 Все семейства по одному запросу: {predict_ms:.2f} мс")
+
+
+if __name__ == "__main__":
+    main()
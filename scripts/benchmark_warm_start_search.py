@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Поиск гиперпараметров леса: GridSearchCV против WarmStartGridSearch
+
+Сетка random_forest из make_estimator (n_estimators 50/100/200) ищется
+обоими способами на одной выборке. Сравниваются время поиска, лучшие
+параметры и наибольшая разница оценок кандидатов (должна быть 0).
+
+Запуск из корня проекта:
+    python scripts/benchmark_warm_start_search.py --sessions 50000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+from sklearn.model_selection import GridSearchCV
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "code"))
+sys.path.append(os.path.dirname(__file__))
+
+from benchmark_engines import load_features  # noqa: E402
+from sber_auto_model import make_estimator  # noqa: E402
+from warm_start_search import WarmStartGridSearch  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--sessions", type=int, default=50_000)
+    args = parser.parse_args()
+
+    X, y = load_features(args.sessions)
+    estimator, param_grid = make_estimator("random_forest")
+    print(f"💻 Ядер: {os.cpu_count()}, строк: {len(X):,}, сетка: {param_grid}")
+
+    results = []
+    scores = []
+    for name, search_class in (("GridSearchCV", GridSearchCV), ("WarmStart", WarmStartGridSearch)):
+        print(f"⏱️ {name}...")
+        search = search_class(estimator, param_grid, cv=2, scoring="roc_auc", n_jobs=-1)
+        start = time.perf_counter()
+        search.fit(X, y)
+        elapsed = time.perf_counter() - start
+        results.append(
+            {
+                "search": name,
+                "time_s": round(elapsed, 1),
+                "best_roc_auc": round(search.best_score_, 4),
+                "best_params": search.best_params_,
+            }
+        )
+        scores.append(
+            {
+                tuple(sorted(params.items())): score
+                for params, score in zip(
+                    search.cv_results_["params"], search.cv_results_["mean_test_score"]
+                )
+            }
+        )
+
+    table = pd.DataFrame(results)
+    table["speedup"] = (table["time_s"].iloc[0] / table["time_s"]).round(2)
+    print("\n📊 РЕЗУЛЬТАТЫ:")
+    print(table.to_string(index=False))
+    difference = max(abs(scores[0][key] - scores[1][key]) for key in scores[0])
+    print(f"\n🔎 Наибольшая разница оценок кандидатов: {difference:.2e}")
+
+
+if __name__ == "__main__":
+    main()
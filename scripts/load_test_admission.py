@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Нагрузочный тест контроля допуска: одиночные предсказания под потоком пакетов
+
+API поднимается на werkzeug (по потоку на запрос, как app.run) со случайным
+портом. Несколько клиентов в отдельных процессах непрерывно шлют
+/predict_batch по 1000 сессий (после 429/503 ждут Retry-After), один клиент
+последовательно шлет /predict и /health. Сравниваются задержки одиночных
+запросов без пакетов, под потоком пакетов без ограничений и с полосами
+контроля допуска (лимиты из переменных окружения api.py).
+
+Запуск из корня проекта:
+    python scripts/load_test_admission.py --flooders 8 --duration 20
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+import requests
+from werkzeug.serving import make_server
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "code"))
+sys.path.append(os.path.dirname(__file__))
+
+import api  # noqa: E402
+from admission import AdmissionController  # noqa: E402
+from benchmark_engines import ENGINE_PARAMS, load_features  # noqa: E402
+from prediction_cache import PredictionCache  # noqa: E402
+from sber_auto_model import SberAutoModel, make_estimator  # noqa: E402
+
+# Лимиты, при которых контроль допуска фактически выключен
+UNLIMITED = {"predict": (10_000, 0), "batch": (10_000, 0), "service": (10_000, 0)}
+
+
+def flood(url: str, body: bytes, stop: Any, results: Any) -> None:
+    """Процесс клиента, непрерывно отправляющего пакеты"""
+    codes: Counter = Counter()
+    headers = {"Content-Type": "application/json"}
+    with requests.Session() as http:
+        while not stop.is_set():
+            response = http.post(f"{url}/predict_batch", data=body, headers=headers)
+            codes[response.status_code] += 1
+            if response.status_code in (429, 503):
+                stop.wait(float(response.headers.get("Retry-After", 1)))
+    results.put(dict(codes))
+
+
+def probe(url: str, rows: List[Dict[str, Any]], duration: float) -> Dict[str, Any]:
+    """Последовательные /predict и /health: задержки и коды ответов"""
+    timings: Dict[str, List[float]] = {"predict": [], "health": []}
+    codes: Counter = Counter()
+    deadline = time.perf_counter() + duration
+    with requests.Session() as http:
+        i = 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            codes[http.post(f"{url}/predict", json=rows[i % len(rows)]).status_code] += 1
+            timings["predict"].append(time.perf_counter() - start)
+            if i % 10 == 0:
+                start = time.perf_counter()
+                http.get(f"{url}/health")
+                timings["health"].append(time.perf_counter() - start)
+            i += 1
+    predict_ms = np.array(timings["predict"]) * 1000
+    return {
+        "predict_n": len(predict_ms),
+        "predict_p50_ms": round(float(np.percentile(predict_ms, 50)), 2),
+        "predict_p99_ms": round(float(np.percentile(predict_ms, 99)), 2),
+        "health_p99_ms": round(float(np.percentile(np.array(timings["health"]) * 1000, 99)), 2),
+        "predict_200": codes[200],
+    }
+
+
+def run(
+    url: str, rows: List[Dict[str, Any]], flooders: int, duration: float, batch: int
+) -> Dict[str, Any]:
+    """Замер одиночных запросов под потоком пакетов от flooders клиентов"""
+    context = multiprocessing.get_context("spawn")
+    stop = context.Event()
+    results = context.Queue()
+    body = json.dumps({"sessions": rows[:batch]}).encode()
+    processes = [
+        context.Process(target=flood, args=(url, body, stop, results)) for _ in range(flooders)
+    ]
+    for process in processes:
+        process.start()
+    time.sleep(3.0 if flooders else 0.0)  # клиенты запускаются и занимают сервер
+    result = probe(url, rows, duration)
+    stop.set()
+    codes: Counter = Counter()
+    for _ in processes:
+        codes.update(results.get())
+    for process in processes:
+        process.join()
+    return {
+        **result,
+        "batch_200": codes[200],
+        "batch_429": codes[429],
+        "batch_503": codes[503],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--sessions", type=int, default=50_000)
+    parser.add_argument("--flooders", type=int, default=8)
+    parser.add_argument("--batch", type=int, default=1000)
+    parser.add_argument("--duration", type=float, default=20.0)
+    args = parser.parse_args()
+
+    print("🔧 Строим признаки и обучаем модель...")
+    X, y = load_features(args.sessions)
+    estimator, _ = make_estimator("random_forest")
+    model = SberAutoModel()
+    model.model = estimator.set_params(**ENGINE_PARAMS["random_forest"], n_jobs=1).fit(X, y)
+    model.feature_names = list(X.columns)
+    model.target_actions = []
+    rows = X.sample(max(args.batch, 2000), random_state=0).to_dict("records")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with contextlib.redirect_stdout(io.StringIO()):
+            model.save_model(os.path.join(tmp, "model"))
+            model.load_model(os.path.join(tmp, "model"))
+        api.live_model.serve("load-test", model)
+        api.prediction_cache = PredictionCache(0)  # каждый запрос считается моделью
+        api.logger.setLevel("WARNING")
+        api.logging.getLogger("werkzeug").setLevel("WARNING")
+
+        server = make_server("127.0.0.1", 0, api.app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}"
+
+        results = []
+        admission = api.admission
+        scenarios = [
+            ("без пакетов", 0, admission),
+            ("пакеты, без ограничений", args.flooders, AdmissionController(UNLIMITED)),
+            ("пакеты, полосы допуска", args.flooders, admission),
+        ]
+        for name, flooders, controller in scenarios:
+            print(f"⏱️ {name}...")
+            api.admission = controller
+            results.append(
+                {"сценарий": name, **run(url, rows, flooders, args.duration, args.batch)}
+            )
+        server.shutdown()
+
+    print("\n📊 РЕЗУЛЬТАТЫ:")
+    print(pd.DataFrame(results).to_string(index=False))
+    print(f"\n🚦 Полосы: {api.admission.stats()}")
+
+
+if __name__ == "__main__":
+    main()
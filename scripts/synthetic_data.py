@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Синтетические ga_sessions / ga_hits для бенчмарков и тестов
+"""
+
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+CITIES = ["Moscow", "Saint Petersburg", "Kazan", "Yekaterinburg", "Krasnodar", "(not set)"] + [
+    f"City {i}" for i in range(200)
+]
+EVENTS = [
+    "view_card",
+    "sub_page_view",
+    "go_to_car_card",
+    "search_form_region",
+    "photos",
+    "view_more_click",
+    "showed_number_ads",
+]
+TARGET_EVENTS = ["sub_submit_success", "start_chat", "sub_car_claim_click", "sub_call_number_click"]
+
+
+def make_synthetic_data(
+    n_sessions: int = 100_000, conversion: float = 0.04, seed: int = 42
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Сессии и хиты со структурой данных СберАвтоподписки
+
+    Вероятность конверсии зависит от числа хитов, устройства, города, часа
+    и номера визита, средняя доля конверсий близка к conversion.
+    """
+    rng = np.random.default_rng(seed)
+    n = n_sessions
+
+    session_id = (
+        pd.Index(np.arange(n)).astype(str)
+        + "."
+        + pd.Index(rng.integers(1_600_000_000, 1_640_000_000, n)).astype(str)
+    )
+    days = rng.integers(0, 225, n)
+    seconds = rng.integers(0, 86400, n)
+    visit_date = (np.datetime64("2021-05-19") + days.astype("timedelta64[D]")).astype(str)
+    visit_time = pd.to_timedelta(seconds, unit="s").astype(str).str[-8:]
+
+    city_weights = np.r_[[0.43, 0.16, 0.03, 0.03, 0.02, 0.03], np.full(200, 0.30 / 200)]
+    city = rng.choice(len(CITIES), n, p=city_weights / city_weights.sum())
+    device = rng.choice(3, n, p=[0.78, 0.2, 0.02])
+    os_names = np.array(["Android", "iOS", "Windows", "Macintosh", "(not set)"], dtype=object)
+    device_os = np.where(
+        device == 1, os_names[rng.choice([2, 3], n)], os_names[rng.choice([0, 1, 4], n)]
+    )
+    medium = rng.choice(["banner", "cpc", "(none)", "cpm", "referral", "organic"], n)
+    visit_number = rng.geometric(0.6, n)
+    total_hits = rng.geometric(0.12, n)
+
+    logit = (
+        -4.2
+        + 0.9 * np.log1p(total_hits)
+        + 0.3 * (device == 1)
+        + 0.4 * (city == 0)
+        - 0.3 * (city >= 6)
+        + 0.2 * np.sin(seconds / 86400 * 2 * np.pi)
+        + 0.15 * (visit_number > 1)
+    )
+    probability = 1 / (1 + np.exp(-logit))
+    probability *= conversion / probability.mean()
+    is_target = rng.random(n) < np.clip(probability, 0, 1)
+
+    sessions = pd.DataFrame(
+        {
+            "session_id": session_id,
+            "client_id": pd.Index(rng.integers(0, n // 2, n)).astype(str),
+            "visit_date": visit_date,
+            "visit_time": visit_time,
+            "visit_number": visit_number,
+            "utm_source": rng.choice([f"source_{i}" for i in range(50)], n),
+            "utm_medium": medium,
+            "utm_campaign": rng.choice([f"campaign_{i}" for i in range(400)], n),
+            "utm_adcontent": rng.choice([f"ad_{i}" for i in range(80)], n),
+            "device_category": np.array(["mobile", "desktop", "tablet"])[device],
+            "device_os": device_os,
+            "geo_country": "Russia",
+            "geo_city": np.array(CITIES, dtype=object)[city],
+        }
+    )
+
+    hit_session = np.repeat(np.arange(n), total_hits)
+    starts = np.repeat(np.cumsum(total_hits) - total_hits, total_hits)
+    hit_number = np.arange(len(hit_session)) - starts + 1
+    step = rng.exponential(30_000, len(hit_session))
+    elapsed = np.cumsum(step)
+    hit_time = elapsed - elapsed[starts]
+
+    event = np.array(EVENTS, dtype=object)[rng.integers(0, len(EVENTS), len(hit_session))]
+    # Одно целевое действие на последнем хите сессии с конверсией
+    last_hits = np.cumsum(total_hits) - 1
+    converted = last_hits[is_target]
+    event[converted] = np.array(TARGET_EVENTS, dtype=object)[
+        rng.integers(0, len(TARGET_EVENTS), len(converted))
+    ]
+
+    pages = np.array([f"sberauto.com/cars/{i}" for i in range(2000)], dtype=object)
+    hits = pd.DataFrame(
+        {
+            "session_id": session_id[hit_session],
+            "hit_date": visit_date[hit_session],
+            "hit_time": np.round(hit_time),
+            "hit_number": hit_number,
+            "hit_type": "event",
+            "hit_page_path": pages[rng.zipf(1.5, len(hit_session)) % len(pages)],
+            "event_category": "card_web",
+            "event_action": event,
+        }
+    )
+    return sessions, hits
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+🧪 Тесты контроля допуска запросов API
+"""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+# Добавляем путь к модулям
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "code"))
+
+import api  # noqa: E402
+from admission import AdmissionController, AdmissionLane, LaneRejected  # noqa: E402
+
+
+def test_lane_limits_and_queue():
+    """Сверх лимита запрос ждет в очереди, при полной очереди - 429, по таймауту - 503"""
+    lane = AdmissionLane("batch", max_concurrent=1, max_queue=1, timeout=0.05)
+    lane.acquire()
+
+    with pytest.raises(LaneRejected) as rejected:
+        lane.acquire()
+    assert rejected.value.status == 503
+
+    def wait() -> None:
+        with lane:
+            pass
+
+    lane.timeout = 5.0
+    waiter = threading.Thread(target=wait)
+    waiter.start()
+    while lane.stats()["waiting"] == 0:
+        time.sleep(0.001)
+    with pytest.raises(LaneRejected) as rejected:
+        lane.acquire()
+    assert rejected.value.status == 429
+
+    lane.release()
+    waiter.join()
+    stats = lane.stats()
+    assert (stats["admitted"], stats["rejected"], stats["timed_out"]) == (2, 1, 1)
+    assert stats["in_flight"] == 0
+
+
+def test_api_sheds_saturated_lane(monkeypatch):
+    """Занятая полоса пакетов отвечает 429, остальные эндпоинты работают"""
+    controller = AdmissionController(
+        {"predict": (1, 0), "batch": (1, 0), "service": (1, 0)}, timeout=0.01
+    )
+    monkeypatch.setattr(api, "admission", controller)
+    client = api.app.test_client()
+
+    controller.lane("batch").acquire()
+    response = client.post("/predict_batch", json={"sessions": [{}]})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+    assert response.get_json()["lane"] == "batch"
+
+    assert client.get("/health").status_code == 200
+    assert client.get("/example").status_code == 200
+    stats = client.get("/admission/stats").get_json()
+    assert stats["batch"]["rejected"] == 1
+    assert stats["service"]["admitted"] == 1
+    controller.lane("batch").release()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+🧪 Тесты бэктеста на скользящих окнах дат
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Добавляем путь к модулям
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "code"))
+
+from backtest import (  # noqa: E402
+    feature_cache_key,
+    load_feature_cache,
+    rolling_windows,
+    run_backtest,
+    save_feature_cache,
+    window_city_features,
+)
+from features import FEATURE_NAMES  # noqa: E402
+from target_encoding import CITY_CODE_COLUMN  # noqa: E402
+
+
+def make_cache(path, n_rows=3000, n_days=60, seed=0):
+    """Кэш признаков: конверсия зависит от первого признака"""
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_rows, len(FEATURE_NAMES))).astype(np.float32)
+    y = (rng.random(n_rows) < 1 / (1 + np.exp(2 - 2 * X[:, 0]))).astype(np.int8)
+    days = 18900 + rng.integers(0, n_days, n_rows)
+    save_feature_cache(path, X, y, rng.integers(-1, 5, n_rows), days, FEATURE_NAMES, "key")
+    return days
+
+
+def test_rolling_windows(tmp_path):
+    """Окна сдвигаются на step_days, проверка не выходит за данные; кэш проверяет ключ"""
+    days = make_cache(str(tmp_path / "features"))
+    first = int(days.min())
+
+    windows = rolling_windows(days, train_days=30, test_days=10)
+    assert [w["origin"] - first for w in windows] == [30, 40, 50]
+    assert all(w["test_end"] - w["origin"] == 10 for w in windows)
+    assert [w["train_start"] - first for w in windows] == [0, 10, 20]
+    expanding = rolling_windows(days, train_days=30, test_days=10, step_days=5, expanding=True)
+    assert len(expanding) == 5
+    assert all(w["train_start"] == first for w in expanding)
+
+    assert load_feature_cache(str(tmp_path / "features"), "other") is None
+    sessions = pd.DataFrame({"session_id": ["a", "b"], "visit_date": ["2021-05-01"] * 2})
+    hits = pd.DataFrame({"session_id": ["a", "b"], "event_action": ["view", "submit"]})
+    key = feature_cache_key(sessions, hits, ["submit"], FEATURE_NAMES)
+    assert key == feature_cache_key(sessions.copy(), hits.copy(), ["submit"], list(FEATURE_NAMES))
+    assert key != feature_cache_key(
+        sessions, hits, ["submit"], FEATURE_NAMES + ["client_prior_sessions"]
+    )
+    # Смена действия хита меняет целевую переменную - ключ другой
+    relabeled = hits.assign(event_action=["submit", "view"])
+    assert key != feature_cache_key(sessions, relabeled, ["submit"], FEATURE_NAMES)
+    moved = sessions.assign(visit_date=["2021-05-01", "2021-05-02"])
+    assert key != feature_cache_key(moved, hits, ["submit"], FEATURE_NAMES)
+    cache = load_feature_cache(str(tmp_path / "features"), "key")
+    assert isinstance(cache["X"], np.memmap)
+    assert cache["manifest"]["n_rows"] == 3000
+
+
+def test_parallel_backtest_matches_serial(tmp_path):
+    """Окна в процессах по общему кэшу дают те же метрики, что и в текущем процессе"""
+    cache_path = str(tmp_path / "features")
+    days = make_cache(cache_path)
+    windows = rolling_windows(days, train_days=30, test_days=10)
+    params = {"n_estimators": 10, "max_depth": 4, "min_samples_split": 50, "min_samples_leaf": 20}
+
+    serial = run_backtest(cache_path, windows, params=params, workers=1)
+    parallel = run_backtest(cache_path, windows, params=params, workers=2)
+
+    assert serial["window"].tolist() == [0, 1, 2]
+    assert (serial["n_train"] > 0).all() and (serial["n_test"] > 0).all()
+    assert (serial["roc_auc"] > 0.7).all()
+    columns = ["test_start", "n_train", "n_test", "roc_auc", "avg_precision", "brier"]
+    assert serial[columns].equals(parallel[columns])
+
+
+def test_window_city_stats_use_training_rows():
+    """Средние городов окна - только по строкам обучения, проверка их не меняет"""
+    columns = ["total_hits", "session_duration", "city_avg_duration", "city_avg_hits"]
+    train = pd.DataFrame(
+        [[2, 10, -1, -1], [0, 20, -1, -1], [4, 30, -1, -1], [1, 5, -1, -1]], columns=columns
+    ).assign(**{CITY_CODE_COLUMN: [0, 0, 1, -1]})
+    test = pd.DataFrame(
+        [[99, 999, -1, -1], [1, 1, -1, -1], [1, 1, -1, -1]], columns=columns
+    ).assign(**{CITY_CODE_COLUMN: [0, 2, -1]})
+
+    window_city_features(train, test)
+    # Город 0: длительность (10 + 20) / 2, хиты - по сессиям с хитами: 2 / 1
+    assert train["city_avg_duration"].tolist() == [15, 15, 30, 0]
+    assert train["city_avg_hits"].tolist() == [2, 2, 4, 0]
+    # Будущая сессия города 0 не влияет на его статистику, город 2 не встречался в обучении
+    assert test["city_avg_duration"].tolist() == [15, 0, 0]
+    assert test["city_avg_hits"].tolist() == [2, 0, 0]
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+🧪 Тесты признаков истории клиента и индекса клиентов на диске
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Добавляем путь к модулям
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "code"))
+
+from client_history import (  # noqa: E402
+    CLIENT_HISTORY_FEATURES,
+    ClientHistoryIndex,
+    client_history_features,
+    client_history_rows,
+    local_now,
+    save_client_history,
+    visit_timestamps,
+)
+
+DAY = 86400
+
+
+def test_history_uses_only_earlier_sessions():
+    """Только сессии раньше текущей; сессии с одинаковым временем друг друга не видят"""
+    client_id = pd.Series(["a", "b", "a", "a", "a", None])
+    timestamp = np.array([3, 0, 1, 3, 0, 5]) * DAY
+    is_target = np.array([0, 1, 1, 0, 0, 1])
+    duration = np.array([10.0, 50.0, 30.0, 70.0, 20.0, 5.0])
+    X = pd.DataFrame(
+        client_history_features(client_id, timestamp, is_target, duration),
+        columns=CLIENT_HISTORY_FEATURES,
+    )
+    assert X["client_prior_sessions"].tolist() == [2, 0, 1, 2, 0, 0]
+    assert X["client_prior_conversions"].tolist() == [1, 0, 0, 1, 0, 0]
+    assert X["client_days_since_last"].tolist() == [2, 0, 1, 2, 0, 0]
+    assert X["client_avg_prior_duration"].tolist() == [25, 0, 20, 25, 0, 0]
+
+
+def test_index_lookup_matches_training_history(tmp_path):
+    """Индекс на диске дает те же признаки, что история на момент после всех сессий"""
+    rng = np.random.default_rng(0)
+    client_id = pd.Series(rng.integers(0, 3000, 10000).astype(str))
+    timestamp = rng.integers(0, 100, 10000) * DAY
+    is_target = (rng.random(10000) < 0.1).astype(int)
+    duration = rng.uniform(0, 600, 10000)
+    manifest = save_client_history(
+        str(tmp_path / "index"), client_id, timestamp, is_target, duration
+    )
+    assert manifest["capacity"] >= 2 * manifest["n_clients"]
+
+    index = ClientHistoryIndex(str(tmp_path / "index"))
+    clients = client_id.unique().tolist() + ["unknown"]
+    found = index.lookup(clients, np.full(len(clients), 200 * DAY))
+
+    # История на момент новой сессии каждого клиента через 200 дней
+    extended = client_history_features(
+        pd.concat([client_id, pd.Series(clients)], ignore_index=True),
+        np.r_[timestamp, np.full(len(clients), 200 * DAY)],
+        np.r_[is_target, np.zeros(len(clients))],
+        np.r_[duration, np.zeros(len(clients))],
+    )[len(client_id) :]
+    np.testing.assert_allclose(found, extended, rtol=1e-6)
+    assert not found[-1].any()
+
+    rows = [
+        {"client_id": clients[0], "visit_timestamp": 200 * DAY, "client_prior_sessions": 99},
+        {"total_hits": 3},
+    ]
+    client_history_rows(index, rows)
+    assert rows[0]["client_prior_sessions"] == 99
+    assert rows[0]["client_prior_conversions"] == found[0, 1]
+    assert rows[1] == {"total_hits": 3}
+
+
+def test_default_time_uses_training_clock(tmp_path):
+    """Время запроса без visit_timestamp - в шкале visit_timestamps (Москва), а не UTC"""
+    moscow = time.gmtime(time.time() + 3 * 3600 - 2 * DAY)
+    sessions = pd.DataFrame(
+        {
+            "visit_date": [time.strftime("%Y-%m-%d", moscow)],
+            "visit_time": [time.strftime("%H:%M:%S", moscow)],
+        }
+    )
+    save_client_history(
+        str(tmp_path / "index"), pd.Series(["a"]), visit_timestamps(sessions), [0], [60.0]
+    )
+    index = ClientHistoryIndex(str(tmp_path / "index"))
+
+    days = index.features("a")["client_days_since_last"]
+    assert abs(days - 2) < 0.01
+    rows = [{"client_id": "a"}]
+    client_history_rows(index, rows)
+    assert abs(rows[0]["client_days_since_last"] - 2) < 0.01
+    assert abs(local_now() - time.time() - 3 * 3600) < 1
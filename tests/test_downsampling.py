@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+🧪 Тесты прореживания негативов с пересчетом вероятностей
+"""
+
+import os
+import sys
+
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+
+# Добавляем путь к модулям
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "code"))
+
+from downsampling import NegativeDownsamplingClassifier, correct_probability  # noqa: E402
+
+
+def test_correct_probability():
+    """Поправка возвращает шансы к исходному масштабу"""
+    probability = np.array([0.0, 0.5, 0.9])
+    corrected = correct_probability(probability, 0.1)
+
+    assert corrected[0] == 0
+    assert np.isclose(corrected[1], 0.1 / 1.1)
+    assert np.allclose(corrected / (1 - corrected), probability / (1 - probability) * 0.1)
+
+
+def test_downsampled_probabilities_match_base_rate():
+    """Средняя исправленная вероятность близка к исходной доле позитивов"""
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(40_000, 2))
+    y = (rng.random(40_000) < 1 / (1 + np.exp(-(X[:, 0] - 3.5)))).astype(int)
+
+    model = NegativeDownsamplingClassifier(LogisticRegression(), negative_rate=0.1, random_state=0)
+    model.fit(X, y)
+
+    assert model.n_train_samples_ < len(y) * 0.2
+    assert abs(model.predict_proba(X)[:, 1].mean() - y.mean()) < 0.005
+    assert set(np.unique(model.predict(X))) <= {0, 1}
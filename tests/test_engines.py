@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+🧪 Тесты выбора движка модели
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# Добавляем путь к модулям
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "code"))
+
+from sber_auto_model import MODEL_ENGINES, SberAutoModel, make_estimator  # noqa: E402
+
+
+@pytest.mark.parametrize("engine", MODEL_ENGINES)
+def test_engine_fits_and_predicts(engine):
+    """Каждый движок обучается и выдает вероятности"""
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(500, 4))
+    y = (X[:, 0] + rng.normal(scale=0.5, size=500) > 1).astype(int)
+
+    estimator, param_grid = make_estimator(engine)
+    assert param_grid
+    probability = estimator.fit(X, y).predict_proba(X)[:, 1]
+
+    assert probability.shape == (500,)
+    assert probability[y == 1].mean() > probability[y == 0].mean()
+
+
+def test_unknown_engine():
+    """Неизвестный движок отклоняется сразу"""
+    with pytest.raises(ValueError):
+        SberAutoModel(engine="xgboost")
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+🧪 Тесты схемы признаков и проверки запросов
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+# Добавляем путь к модулям
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "code"))
+
+import api  # noqa: E402
+from feature_schema import FeatureSchema, SchemaValidationError  # noqa: E402
+from sber_auto_model import SberAutoModel  # noqa: E402
+
+FEATURES = ["total_hits", "session_duration", "visit_hour", "is_mobile"]
+
+
+def make_model():
+    """Маленькая модель на случайных данных"""
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(
+        {
+            "total_hits": rng.integers(0, 20, 300),
+            "session_duration": rng.uniform(0, 600, 300),
+            "visit_hour": rng.integers(0, 24, 300),
+            "is_mobile": rng.integers(0, 2, 300),
+        }
+    )
+    model = SberAutoModel()
+    model.model = RandomForestClassifier(n_estimators=5, random_state=0).fit(
+        X, X["total_hits"] > 10
+    )
+    model.feature_names = FEATURES
+    model.target_actions = []
+    return model
+
+
+def test_assemble_defaults_and_order():
+    """Недостающие поля и None равны 0, лишние поля игнорируются"""
+    schema = FeatureSchema(FEATURES)
+    row = schema.assemble({"is_mobile": True, "total_hits": 3, "visit_hour": None, "utm": "x"})
+    np.testing.assert_array_equal(row, [[3, 0, 0, 1]])
+
+
+def test_assemble_collects_all_errors():
+    """Ошибки возвращаются сразу по всем некорректным полям"""
+    schema = FeatureSchema(FEATURES)
+    with pytest.raises(SchemaValidationError) as error:
+        schema.assemble(
+            {"total_hits": "много", "session_duration": -1, "visit_hour": 1.5, "is_mobile": 2}
+        )
+    assert set(error.value.errors) == set(FEATURES)
+
+    with pytest.raises(SchemaValidationError) as error:
+        schema.assemble([1, 2, 3])
+    assert "request" in error.value.errors
+
+
+def test_predict_matches_pandas_path():
+    """Сборка строки без pandas дает ту же вероятность, что и DataFrame"""
+    model = make_model()
+    data = {"total_hits": 12, "session_duration": 30.5, "is_mobile": 1}
+    frame = pd.DataFrame([data]).reindex(columns=FEATURES, fill_value=0)
+
+    result = model.predict(data)
+    assert result["probability"] == pytest.approx(model.model.predict_proba(frame)[0, 1])
+
+    batch = model.predict_batch([data, {"visit_hour": 30}])
+    assert batch[0]["probability"] == result["probability"]
+    assert "visit_hour" in batch[1]["fields"]
+
+
+def test_api_rejects_invalid_request(monkeypatch):
+    """Некорректный запрос получает 400 с описанием полей"""
+    monkeypatch.setattr(api, "current_model", lambda: ("test", make_model()))
+    client = api.app.test_client()
+
+    response = client.post("/predict", json={"total_hits": -5, "visit_hour": "утро"})
+    assert response.status_code == 400
+    assert set(response.get_json()["fields"]) == {"total_hits", "visit_hour"}
+
+    response = client.post("/predict", json={"total_hits": 5})
+    assert response.status_code == 200
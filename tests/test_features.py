@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+🧪 Тесты построения признаков на небольших синтетических данных
+"""
+
+import datetime
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Добавляем путь к модулям
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "code"))
+
+from features import (  # noqa: E402
+    FEATURE_NAMES,
+    aggregate_sessions,
+    build_feature_matrix,
+    temporal_features,
+)
+
+
+def make_sessions():
+    """Три сессии: Москва (будни, утро), Казань (суббота, ночь), без хитов"""
+    return pd.DataFrame(
+        {
+            "session_id": ["s1", "s2", "s3"],
+            "visit_date": ["2021-11-24", "2021-11-27", "2021-11-28"],
+            "visit_time": ["07:15:00", "03:00:59", "23:59:59"],
+            "visit_number": [1, 3, 2],
+            "utm_medium": ["banner", "organic", "(none)"],
+            "device_category": ["mobile", "desktop", "tablet"],
+            "device_os": ["iOS", "Windows", None],
+            "geo_city": ["Moscow", "Kazan", "Moscow"],
+        }
+    )
+
+
+def make_hits():
+    """Хиты двух первых сессий; в s1 есть целевое действие"""
+    return pd.DataFrame(
+        {
+            "session_id": ["s1", "s1", "s1", "s2"],
+            "hit_number": [1, 2, 3, 1],
+            "hit_time": [0.0, 200.0, 400.0, 50.0],
+            "hit_page_path": ["/a", "/b", "/a", "/c"],
+            "event_action": ["view_card", "sub_submit_success", "view_card", "photos"],
+        }
+    )
+
+
+def test_temporal_features():
+    """Час, день недели и части суток без разбора строк datetime"""
+    sessions = make_sessions()
+    result = temporal_features(sessions["visit_date"], sessions["visit_time"])
+
+    assert result["visit_hour"].tolist() == [7, 3, 23]
+    assert result["visit_weekday"].tolist() == [2, 5, 6]
+    assert result["is_weekend"].tolist() == [False, True, True]
+    assert result["is_morning"].tolist() == [True, False, False]
+    assert result["is_night"].tolist() == [False, True, False]
+    assert result["is_evening"].tolist() == [False, False, True]
+
+
+def test_temporal_features_typed_columns():
+    """Типизированные столбцы дают тот же результат, что и строки"""
+    sessions = make_sessions()
+    expected = temporal_features(sessions["visit_date"], sessions["visit_time"])
+
+    typed = [
+        (pd.to_datetime(sessions["visit_date"]), pd.to_timedelta(sessions["visit_time"])),
+        (
+            pd.Series([datetime.date.fromisoformat(d) for d in sessions["visit_date"]]),
+            pd.Series([datetime.time.fromisoformat(t) for t in sessions["visit_time"]]),
+        ),
+    ]
+    for visit_date, visit_time in typed:
+        result = temporal_features(visit_date, visit_time)
+        for name, values in expected.items():
+            assert np.array_equal(result[name], values), name
+
+
+def test_aggregate_sessions():
+    """Агрегаты сессий: целевое действие, хиты, страницы, длительность"""
+    metrics = aggregate_sessions(make_hits(), ["submit"])
+
+    assert metrics.loc["s1"].to_dict() == {
+        "is_target": 1,
+        "total_hits": 3,
+        "unique_pages": 2,
+        "session_duration": 400.0,
+        "unique_events": 2,
+    }
+    assert metrics.loc["s2", "session_duration"] == 0
+    assert metrics.loc["s2", "is_target"] == 0
+
+
+def test_build_feature_matrix():
+    """Матрица признаков: порядок столбцов, флаги, города и сессии без хитов"""
+    sessions = make_sessions()
+    X, y = build_feature_matrix(sessions, aggregate_sessions(make_hits(), ["submit"]))
+    features = pd.DataFrame(X, columns=FEATURE_NAMES)
+
+    assert X.dtype == np.float32
+    assert X.shape == (3, len(FEATURE_NAMES))
+    assert y.tolist() == [1, 0, 0]
+    assert not np.isnan(X).any()
+
+    first = features.iloc[0]
+    assert first["total_hits"] == 3
+    assert first["avg_time_per_page"] == np.float32(400 / 3)
+    assert first["events_per_page"] == 1
+    assert first["is_paid"] == 1 and first["is_workday"] == 1
+    assert first["is_mobile"] == 1 and first["is_ios"] == 1
+
+    # Москва: 2 сессии, 1 конверсия -> 50% выше границы 10% -> сегмент "low"
+    assert first["city_conversion_rate"] == 50
+    assert first["city_tier_low"] == 1
+    assert first["city_avg_duration"] == 200
+    assert first["city_avg_hits"] == 3
+
+    # Сессия без хитов получает нулевые метрики
+    third = features.iloc[2]
+    assert third[["total_hits", "unique_pages", "session_duration"]].sum() == 0
+    assert third["is_direct"] == 1 and third["is_paid"] == 0
+    assert third["is_returning"] == 1 and third["is_frequent"] == 0
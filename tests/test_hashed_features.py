@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+🧪 Тесты хешированных признаков UTM и страниц
+"""
+
+import os
+import pickle
+import sys
+import zlib
+
+import numpy as np
+import pandas as pd
+
+# Добавляем путь к модулям
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "code"))
+
+from hashed_features import (  # noqa: E402
+    hash_buckets,
+    hashed_design_matrix,
+    hashed_feature_matrix,
+    make_hashed_estimator,
+)
+from sber_auto_model import SberAutoModel  # noqa: E402
+from target_encoding import CITY_CODE_COLUMN  # noqa: E402
+
+
+def test_hashed_matrix_fixed_width_and_page_counts():
+    """Ширина не зависит от числа значений; хиты по страницам суммируются в строке сессии"""
+    sessions = pd.DataFrame(
+        {
+            "session_id": ["a", "b", "c"],
+            "utm_source": ["google", "yandex", None],
+            "utm_campaign": ["c1", "c1", "c2"],
+        }
+    )
+    hits = pd.DataFrame(
+        {
+            "session_id": ["b", "a", "b", "b", "zzz"],
+            "hit_page_path": ["/cars", "/cars", "/cars", "/cart", "/cars"],
+        }
+    )
+    matrix = hashed_feature_matrix(sessions, hits, n_buckets=1024)
+    assert matrix.shape == (3, 1024) and matrix.dtype == np.float32
+
+    # Одинаковое значение разных полей - разные корзины, корзина стабильна между процессами
+    assert (
+        hash_buckets(pd.Series(["x"]), "utm_source")[0]
+        != hash_buckets(pd.Series(["x"]), "utm_campaign")[0]
+    )
+    cars = zlib.crc32(b"hit_page_path=/cars") % 1024
+    assert matrix[1, cars] == 2 and matrix[0, cars] == 1
+    # Пропуск utm_source не учитывается, хит неизвестной сессии отброшен
+    assert matrix[2].sum() == 1 and matrix.sum() == 5 + 4
+
+    many = pd.DataFrame({"session_id": range(5000), "utm_campaign": np.arange(5000).astype(str)})
+    assert hashed_feature_matrix(many, n_buckets=1024).shape == (5000, 1024)
+
+
+def test_hashed_estimator_uses_buckets():
+    """Модель на плотных признаках и корзинах находит сигнал, которого нет в плотных"""
+    rng = np.random.default_rng(0)
+    n = 4000
+    campaigns = rng.integers(0, 200, n).astype(str)
+    y = np.isin(campaigns, [str(i) for i in range(20)]).astype(int)
+    sessions = pd.DataFrame({"session_id": np.arange(n), "utm_campaign": campaigns})
+    X = rng.normal(size=(n, 3))
+
+    design = hashed_design_matrix(X, hashed_feature_matrix(sessions, n_buckets=2**12))
+    assert design.shape == (n, 3 + 2**12)
+    model = make_hashed_estimator().fit(design[:3000], y[:3000])
+    assert (model.predict(design[3000:]) == y[3000:]).mean() > 0.95
+
+
+def test_train_hashed_model_path(tmp_path):
+    """Обучение SberAutoModel на хешированных признаках: метрики и сохраненная модель"""
+    rng = np.random.default_rng(1)
+    n = 3000
+    campaigns = rng.integers(0, 100, n).astype(str)
+    sessions = pd.DataFrame(
+        {
+            "session_id": [f"s{i}" for i in range(n)],
+            "visit_date": "2021-11-24",
+            "visit_time": "12:30:00",
+            "visit_number": rng.integers(1, 5, n),
+            "utm_medium": rng.choice(["banner", "organic", "cpc"], n),
+            "utm_campaign": campaigns,
+            "device_category": rng.choice(["mobile", "desktop"], n),
+            "device_os": rng.choice(["iOS", "Android"], n),
+            "geo_city": rng.choice(["Moscow", "Kazan", "Omsk"], n),
+        }
+    )
+    # Целевое действие только в сессиях первых 10 кампаний
+    converted = np.isin(campaigns, [str(i) for i in range(10)]) & (rng.random(n) < 0.8)
+    hits = pd.DataFrame(
+        {
+            "session_id": sessions["session_id"],
+            "hit_number": 1,
+            "hit_time": 0.0,
+            "hit_page_path": "/cars",
+            "event_action": np.where(converted, "sub_submit_success", "view_card"),
+        }
+    )
+
+    model = SberAutoModel()
+    model.target_actions = ["sub_submit_success"]
+    df = model.create_features(sessions, hits)
+    X, y = model.prepare_features(df)
+    # Признаки без истории клиента - представление матрицы create_features
+    assert np.shares_memory(X.to_numpy(), df["total_hits"].to_numpy())
+    roc_auc = model.train_hashed_model(
+        X, y, sessions, hits, city_codes=df[CITY_CODE_COLUMN].to_numpy()
+    )
+    assert roc_auc > 0.85 and model.metrics["roc_auc"] == roc_auc
+
+    path = str(tmp_path / "hashed_model.pkl")
+    model.save_hashed_model(path)
+    with open(path, "rb") as f:
+        saved = pickle.load(f)
+    assert saved["feature_names"] == list(X.columns)
+    design = hashed_design_matrix(X.to_numpy(), hashed_feature_matrix(sessions, hits))
+    assert saved["model"].predict_proba(design[:5]).shape == (5, 2)
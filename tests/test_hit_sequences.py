@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+🧪 Тесты признаков последовательности хитов
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Добавляем путь к модулям
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "code"))
+
+from hashed_features import value_hashes  # noqa: E402
+from hit_sequences import SEQUENCE_FEATURE_NAMES, ngram_hashes, sequence_features  # noqa: E402
+from sber_auto_model import SberAutoModel  # noqa: E402
+
+HITS = pd.DataFrame(
+    {
+        "session_id": ["a", "a", "a", "b", "b", "a", "b"],
+        "hit_number": [1, 2, 3, 1, 2, 4, 3],
+        "hit_time": [0.0, 10.0, 25.0, 0.0, 7.0, 30.0, 9.0],
+        "hit_page_path": ["/p1", "/p2", "/p3", "/p1", "/p2", "/done", "/p9"],
+        "event_action": [
+            "sub_page_view",
+            "go_to_car_card",
+            "photos",
+            "sub_page_view",
+            "sub_page_view",
+            "sub_submit_success",
+            "start_chat",
+        ],
+    }
+)
+TARGETS = ["sub_submit_success", "start_chat"]
+
+
+def test_ngrams_ignore_row_order_and_target_hits():
+    """Порядок - по hit_number; целевые хиты и переходы между сессиями не учитываются"""
+    matrix, _ = sequence_features(HITS, TARGETS, ["b", "a", "c"], n_buckets=2**20)
+    shuffled, _ = sequence_features(
+        HITS.sample(frac=1, random_state=3), TARGETS, ["b", "a", "c"], n_buckets=2**20
+    )
+    assert (matrix != shuffled).nnz == 0
+
+    pages = value_hashes(["/p1", "/p2", "/p3"], "hit_page_path")
+    expected = {int(h % 2**20) for h in ngram_hashes(pages, 2)} | {
+        int(ngram_hashes(pages, 3)[0] % 2**20)
+    }
+    assert expected <= set(matrix[1].indices)
+    # "a": 2 биграммы и 1 триграмма на поле; "b" без целевого хита - по 1 биграмме
+    assert matrix[1].sum() == 6 and matrix[0].sum() == 2 and matrix[2].sum() == 0
+    assert int(value_hashes(["/done"], "hit_page_path")[0] % 2**20) not in matrix[1].indices
+
+
+def test_first_key_event_features():
+    """Номер хита и время до первого ключевого действия, доля ключевых хитов"""
+    _, features = sequence_features(HITS, TARGETS, ["a", "b", "c"])
+    a, b, c = features.to_dict("records")
+    assert a == {
+        "hits_to_first_key_event": 2,
+        "time_to_first_key_event": 10,
+        "has_key_event": 1,
+        "key_event_share": np.float32(2 / 3),
+    }
+    assert b["has_key_event"] == 0 and b["hits_to_first_key_event"] == 0
+    assert set(c.values()) == {0}
+
+
+def test_training_path_with_sequences():
+    """create_features(sequences=True): столбцы ключевых действий и n-граммы в hashed-модели"""
+    rng = np.random.default_rng(2)
+    n = 2000
+    sessions = pd.DataFrame(
+        {
+            "session_id": [f"s{i}" for i in range(n)],
+            "visit_date": "2021-11-24",
+            "visit_time": "12:30:00",
+            "visit_number": 1,
+            "utm_medium": "organic",
+            "device_category": "mobile",
+            "device_os": "Android",
+            "geo_city": rng.choice(["Moscow", "Kazan"], n),
+        }
+    )
+    # Сигнал только в порядке страниц: /p2 после /p1 ведет к целевому действию
+    forward = rng.random(n) < 0.5
+    converted = forward & (rng.random(n) < 0.8)
+    first = np.where(forward, "/p1", "/p2")
+    second = np.where(forward, "/p2", "/p1")
+    hits = pd.DataFrame(
+        {
+            "session_id": np.repeat(sessions["session_id"], 3),
+            "hit_number": np.tile([1, 2, 3], n),
+            "hit_time": np.tile([0.0, 5.0, 9.0], n),
+            "hit_page_path": np.column_stack([first, second, np.full(n, "/done")]).ravel(),
+            "event_action": np.column_stack(
+                [
+                    np.full(n, "view_card"),
+                    np.full(n, "photos"),
+                    np.where(converted, "sub_submit_success", "sub_page_view"),
+                ]
+            ).ravel(),
+        }
+    )
+
+    model = SberAutoModel()
+    model.target_actions = TARGETS
+    df = model.create_features(sessions, hits, sequences=True)
+    X, y = model.prepare_features(df)
+    assert model.feature_names[-len(SEQUENCE_FEATURE_NAMES) :] == SEQUENCE_FEATURE_NAMES
+    _, expected = sequence_features(hits, TARGETS, sessions["session_id"])
+    np.testing.assert_array_equal(X[SEQUENCE_FEATURE_NAMES].to_numpy(), expected.to_numpy())
+    assert model.sequence_ngrams.shape[0] == n
+
+    # Без n-грамм у сессий одинаковые плотные признаки и страницы - сигнала нет
+    assert model.train_hashed_model(X, y, sessions, hits) > 0.85
+    assert model.create_features(sessions, hits).shape[1] == df.shape[1] - 4
+    assert model.sequence_ngrams is None
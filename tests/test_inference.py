@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+🧪 Тесты модели для предсказаний без обучения
+"""
+
+import os
+import subprocess
+import sys
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+# Добавляем путь к модулям
+CODE_DIR = os.path.join(os.path.dirname(__file__), "..", "code")
+sys.path.append(CODE_DIR)
+
+from inference import InferenceModel  # noqa: E402
+from sber_auto_model import SberAutoModel  # noqa: E402
+
+
+def test_serving_imports_skip_pandas_and_sklearn():
+    """Импорт inference и api не загружает pandas и sklearn"""
+    code = (
+        "import sys; import inference, api; "
+        "print(sorted(m for m in ('pandas', 'sklearn', 'scipy') if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=CODE_DIR, capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == "[]"
+
+
+def test_inference_model_matches_training_model(tmp_path):
+    """InferenceModel загружает папку модели и предсказывает как SberAutoModel"""
+    rng = np.random.default_rng(0)
+    X = np.column_stack([rng.integers(0, 20, 300), rng.uniform(0, 600, 300)])
+    model = SberAutoModel()
+    model.model = RandomForestClassifier(n_estimators=10, random_state=0).fit(X, X[:, 0] > 10)
+    model.feature_names = ["total_hits", "session_duration"]
+    model.target_actions = []
+    model.save_model(str(tmp_path / "model"))
+
+    served = InferenceModel()
+    served.load_model(str(tmp_path / "model"))
+    sessions = [{"total_hits": 3, "session_duration": 40.0}, {"total_hits": 15}]
+    expected = model.predict_proba_rows(X[:2])
+    np.testing.assert_allclose(served.predict_proba_rows(X[:2]), expected)
+    assert served.predict_batch(sessions) == model.predict_batch(sessions)
+    assert served.n_trees() == 10
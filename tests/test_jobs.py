@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+🧪 Тесты асинхронных заданий скоринга
+"""
+
+import io
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+
+# Добавляем путь к модулям
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "code"))
+
+import api  # noqa: E402
+from client_history import (  # noqa: E402
+    ClientHistoryIndex,
+    client_history_rows,
+    save_client_history,
+)
+from jobs import JobManager  # noqa: E402
+from sber_auto_model import SberAutoModel  # noqa: E402
+
+FEATURES = ["total_hits", "session_duration", "is_mobile"]
+
+
+def save_model(path, features=FEATURES):
+    """Маленькая модель в формате папки (метка - по первому признаку)"""
+    rng = np.random.default_rng(0)
+    X = np.column_stack(
+        [rng.integers(0, 20, 500), rng.uniform(0, 600, 500), rng.integers(0, 2, 500)]
+    )[:, : len(features)]
+    model = SberAutoModel()
+    model.model = RandomForestClassifier(n_estimators=10, random_state=0).fit(X, X[:, 0] > 10)
+    model.feature_names = list(features)
+    model.target_actions = []
+    model.save_model(path)
+    model.load_model(path)
+    return model
+
+
+def make_sessions(n_rows):
+    """Сессии с session_id и двумя некорректными строками"""
+    rng = np.random.default_rng(1)
+    frame = pd.DataFrame(
+        {
+            "session_id": [f"s{i}" for i in range(n_rows)],
+            "total_hits": rng.integers(0, 20, n_rows).astype(object),
+            "session_duration": rng.uniform(0, 600, n_rows),
+            "is_mobile": rng.integers(0, 2, n_rows),
+        }
+    )
+    frame.loc[3, "total_hits"] = "много"
+    frame.loc[7, "is_mobile"] = 5
+    return frame
+
+
+def wait_for(manager, job_id, timeout=120):
+    """Ожидание завершения задания"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        status = manager.status(job_id)
+        if status["state"] in ("done", "failed"):
+            return status
+        time.sleep(0.2)
+    raise TimeoutError(job_id)
+
+
+def test_job_scores_file_in_chunks(tmp_path):
+    """Файл считается блоками, результаты совпадают с моделью, ошибки по строкам"""
+    model = save_model(str(tmp_path / "model"))
+    frame = make_sessions(450)
+    manager = JobManager(str(tmp_path / "jobs"), workers=2, chunk_rows=100)
+    try:
+        status = manager.submit(
+            lambda path: frame.to_csv(path, index=False), "csv", "v1", str(tmp_path / "model")
+        )
+        status = wait_for(manager, status["job_id"])
+    finally:
+        manager.close()
+
+    assert status["state"] == "done", status.get("error")
+    assert (status["rows"], status["invalid_rows"], status["chunks_done"]) == (450, 2, 5)
+    results = pd.read_csv(manager.result_path(status["job_id"]))
+    assert results["session_id"].tolist() == frame["session_id"].tolist()
+
+    valid = results["error"].isna().to_numpy()
+    assert np.flatnonzero(~valid).tolist() == [3, 7]
+    assert "total_hits" in results.loc[3, "error"]
+    expected = model.predict_batch(frame.drop(columns="session_id").to_dict("records"))
+    np.testing.assert_allclose(
+        results.loc[valid, "probability"], [r["probability"] for r, v in zip(expected, valid) if v]
+    )
+
+
+def test_job_resumes_after_restart(tmp_path, monkeypatch):
+    """Незавершенное задание продолжается новым менеджером"""
+    save_model(str(tmp_path / "model"))
+    frame = make_sessions(120)
+    stopped = JobManager(str(tmp_path / "jobs"), workers=1, chunk_rows=50)
+    monkeypatch.setattr(stopped, "start", lambda job_id: None)  # API упал до запуска
+    job_id = stopped.submit(
+        lambda path: frame.to_json(path, orient="records", lines=True),
+        "jsonl",
+        "v1",
+        str(tmp_path / "model"),
+    )["job_id"]
+    assert stopped.status(job_id)["state"] == "queued"
+
+    restarted = JobManager(str(tmp_path / "jobs"), workers=1, chunk_rows=50)
+    try:
+        assert restarted.resume() == [job_id]
+        assert wait_for(restarted, job_id)["state"] == "done"
+    finally:
+        restarted.close()
+    assert len(pd.read_csv(restarted.result_path(job_id))) == 120
+
+
+def test_job_rows_get_client_history(tmp_path):
+    """Строки с client_id дополняются признаками истории, как запросы /predict"""
+    features = ["client_prior_sessions", "session_duration"]
+    model = save_model(str(tmp_path / "model"), features)
+    index_path = str(tmp_path / "client_history")
+    client_id = pd.Series(np.repeat(["1.5", "2.5", "3.5"], [15, 4, 1]))
+    save_client_history(index_path, client_id, np.zeros(20), np.zeros(20), np.ones(20))
+
+    frame = pd.DataFrame(
+        {
+            "client_id": ["1.5", "2.5", "3.5", None, "1.5"],
+            "session_duration": [10.0, 20.0, 30.0, 40.0, 50.0],
+            "client_prior_sessions": [None, None, None, None, 2],
+        }
+    )
+    manager = JobManager(str(tmp_path / "jobs"), workers=1, client_history_path=index_path)
+    try:
+        status = manager.submit(
+            lambda path: frame.to_csv(path, index=False), "csv", "v1", str(tmp_path / "model")
+        )
+        status = wait_for(manager, status["job_id"])
+    finally:
+        manager.close()
+    assert status["state"] == "done", status.get("error")
+
+    rows = [{k: v for k, v in row.items() if pd.notna(v)} for row in frame.to_dict("records")]
+    client_history_rows(ClientHistoryIndex(index_path), rows)
+    assert [row.get("client_prior_sessions") for row in rows] == [15, 4, 1, None, 2]
+    expected = model.predict_batch([{k: v for k, v in r.items() if k in features} for r in rows])
+    results = pd.read_csv(manager.result_path(status["job_id"]))
+    np.testing.assert_allclose(results["probability"], [r["probability"] for r in expected])
+    assert results["probability"].nunique() > 1
+
+
+def test_api_job_lifecycle(tmp_path, monkeypatch):
+    """POST /jobs -> GET /jobs/<id> -> GET /jobs/<id>/result"""
+    model = save_model(str(tmp_path / "model"))
+    manager = JobManager(str(tmp_path / "jobs"), workers=1)
+    monkeypatch.setattr(api, "job_manager", manager)
+    monkeypatch.setattr(api, "current_model", lambda: ("local", model))
+    monkeypatch.setattr(api, "DEFAULT_MODEL_PATH", str(tmp_path / "model"))
+    client = api.app.test_client()
+
+    sessions = make_sessions(30).drop(columns="session_id").iloc[10:].to_dict("records")
+    try:
+        response = client.post("/jobs", json={"sessions": sessions})
+        assert response.status_code == 202
+        job_id = response.get_json()["job_id"]
+        assert wait_for(manager, job_id)["state"] == "done"
+
+        assert client.get(f"/jobs/{job_id}").get_json()["rows"] == 20
+        assert [job["job_id"] for job in client.get("/jobs").get_json()["jobs"]] == [job_id]
+        result = client.get(f"/jobs/{job_id}/result")
+        assert result.status_code == 200
+        assert len(pd.read_csv(io.BytesIO(result.data))) == 20
+    finally:
+        manager.close()
+
+    assert client.get("/jobs/unknown").status_code == 404
+    assert client.get("/jobs/..%2Fmodel").status_code == 404
+    assert client.post("/jobs", json={"rows": []}).status_code == 400
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+🧪 Тесты формата сохранения модели (массивы деревьев + manifest.json)
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+
+# Добавляем путь к модулям
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "code"))
+
+from downsampling import NegativeDownsamplingClassifier  # noqa: E402
+from model_artifact import load_artifact, replace_directory, save_artifact  # noqa: E402
+from sber_auto_model import SberAutoModel  # noqa: E402
+
+
+def make_data():
+    """Небольшой набор с пропусками в одном признаке"""
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(3000, 5)).astype(np.float32)
+    X[::40, 2] = np.nan
+    y = (X[:, 0] + np.nan_to_num(X[:, 2]) + rng.normal(size=3000) > 1).astype(int)
+    return X, y
+
+
+@pytest.mark.parametrize(
+    "estimator",
+    [
+        RandomForestClassifier(n_estimators=20, max_depth=8, class_weight={0: 1, 1: 3}),
+        HistGradientBoostingClassifier(max_iter=30),
+        NegativeDownsamplingClassifier(RandomForestClassifier(n_estimators=10), 0.5, 0),
+    ],
+)
+def test_artifact_matches_estimator(tmp_path, estimator):
+    """Загруженный ансамбль дает те же вероятности, что и модель sklearn"""
+    X, y = make_data()
+    estimator.fit(X, y)
+
+    path = str(tmp_path / "model")
+    save_artifact(path, estimator, "random_forest", [f"f{i}" for i in range(5)], ["submit"])
+    ensemble, manifest = load_artifact(path)
+
+    assert isinstance(ensemble.arrays["threshold"], np.memmap)
+    assert manifest["feature_names"] == ["f0", "f1", "f2", "f3", "f4"]
+    np.testing.assert_allclose(
+        ensemble.predict_proba(X)[:, 1], estimator.predict_proba(X)[:, 1], atol=1e-12
+    )
+    assert np.array_equal(ensemble.predict(X), estimator.predict(X))
+
+
+def test_model_roundtrip(tmp_path):
+    """save_model / load_model сохраняют метаданные и предсказания"""
+    X, y = make_data()
+    names = [f"f{i}" for i in range(5)]
+
+    model = SberAutoModel()
+    model.model = RandomForestClassifier(n_estimators=10, random_state=0).fit(X, y)
+    model.feature_names = names
+    model.target_actions = ["submit"]
+    model.metrics = {"roc_auc": np.float64(0.7)}
+    model.data_fingerprint = "abc"
+    path = str(tmp_path / "sber_auto_model")
+    model.save_model(path)
+    model.save_model(path)  # повторное сохранение заменяет папку целиком
+
+    loaded = SberAutoModel()
+    loaded.load_model(path)
+
+    assert loaded.target_actions == ["submit"]
+    assert loaded.metrics == {"roc_auc": 0.7}
+    assert loaded.data_fingerprint == "abc"
+    row = dict(zip(names, X[0].tolist()))
+    assert loaded.predict(row) == model.predict(row)
+    # Ссылка sber_auto_model, текущая и предыдущая версии; временных папок нет
+    assert len(os.listdir(tmp_path)) == 3
+    assert os.path.islink(path)
+    assert list(loaded.model.predict_proba(pd.DataFrame([row]))[0]) == list(
+        model.model.predict_proba(X[:1])[0]
+    )
+
+
+@pytest.mark.parametrize(
+    "estimator",
+    [
+        RandomForestClassifier(n_estimators=100, max_depth=6, random_state=0),
+        NegativeDownsamplingClassifier(RandomForestClassifier(n_estimators=100), 0.5, 0),
+        HistGradientBoostingClassifier(max_iter=40),
+    ],
+)
+def test_anytime_matches_full_class(tmp_path, estimator):
+    """Досрочная остановка сохраняет класс, бюджет ограничивает число деревьев"""
+    X, y = make_data()
+    estimator.fit(X, y)
+    save_artifact(str(tmp_path / "model"), estimator, "random_forest", list("abcde"), [])
+    ensemble, _ = load_artifact(str(tmp_path / "model"))
+    full = ensemble.predict_proba(X)[:, 1]
+
+    probability, trees_used = ensemble.predict_proba_anytime(X)
+    assert np.mean((probability > 0.5) == (full > 0.5)) > 0.99
+    np.testing.assert_allclose(
+        probability[trees_used == ensemble.n_trees], full[trees_used == ensemble.n_trees]
+    )
+    if ensemble.kind == "forest":
+        assert trees_used.mean() < ensemble.n_trees / 2
+
+    probability, trees_used = ensemble.predict_proba_anytime(X, budget_ms=0)
+    assert (trees_used == 8).all()
+    assert ((probability >= 0) & (probability <= 1)).all()
+
+    # Несколько строк считаются одним проходом по всем деревьям
+    probability, trees_used = ensemble.predict_proba_anytime(X[:1], budget_ms=0)
+    assert trees_used.tolist() == [ensemble.n_trees]
+    np.testing.assert_allclose(probability, full[:1])
+
+
+def test_replace_directory_keeps_old_on_error(tmp_path):
+    """Замена одной ссылкой; ошибка записи оставляет прежнюю версию и не оставляет мусора"""
+    path = str(tmp_path / "index")
+
+    def write(version):
+        def writer(staging):
+            with open(os.path.join(staging, "version.txt"), "w") as f:
+                f.write(version)
+
+        return writer
+
+    replace_directory(path, write("1"))
+    first = os.path.realpath(path)
+    replace_directory(path, write("2"))
+    # path - ссылка на новую версию, предыдущая остается для уже открывших ее читателей
+    assert os.path.islink(path) and os.path.realpath(path) != first
+    with open(os.path.join(first, "version.txt")) as f:
+        assert f.read() == "1"
+    replace_directory(path, write("2"))
+    assert not os.path.exists(first)
+
+    def failing(staging):
+        write("3")(staging)
+        raise RuntimeError("диск заполнен")
+
+    with pytest.raises(RuntimeError):
+        replace_directory(path, failing)
+    with open(os.path.join(path, "version.txt")) as f:
+        assert f.read() == "2"
+    assert len(os.listdir(tmp_path)) == 3  # ссылка, текущая и предыдущая версии
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+🧪 Тесты метаданных модели и заранее сериализованных ответов API
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+
+# Добавляем путь к модулям
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "code"))
+
+import api  # noqa: E402
+from inference import InferenceModel  # noqa: E402
+from model_metadata import categorize_features, feature_ranges  # noqa: E402
+from model_registry import LiveModel, ModelRegistry  # noqa: E402
+from sber_auto_model import SberAutoModel  # noqa: E402
+
+FEATURES = ["total_hits", "visit_hour", "is_mobile", "city_avg_hits"]
+
+
+def test_metadata_saved_with_model(tmp_path):
+    """Диапазоны обучающей выборки сохраняются в папке модели, категории считаются при загрузке"""
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(
+        {
+            "total_hits": rng.integers(1, 20, 300),
+            "visit_hour": rng.integers(0, 24, 300),
+            "is_mobile": rng.integers(0, 2, 300),
+            "city_avg_hits": rng.uniform(2, 8, 300),
+        }
+    )
+    model = SberAutoModel()
+    model.model = RandomForestClassifier(n_estimators=5, random_state=0).fit(X, X["is_mobile"])
+    model.feature_names = FEATURES
+    model.target_actions = []
+    model.feature_ranges = feature_ranges(X, FEATURES)
+    model.save_model(str(tmp_path / "model"))
+
+    served = InferenceModel()
+    served.load_model(str(tmp_path / "model"))
+    metadata = served.metadata()
+    assert metadata["feature_ranges"]["visit_hour"]["max"] == X["visit_hour"].max()
+    assert metadata["feature_ranges"]["city_avg_hits"]["mean"] == X["city_avg_hits"].mean()
+    assert metadata["feature_defaults"] == dict.fromkeys(FEATURES, 0.0)
+    assert metadata["feature_categories"] == categorize_features(FEATURES)
+    assert metadata["feature_categories"]["behavioral"] == ["total_hits", "city_avg_hits"]
+    assert metadata["feature_categories"]["geographic"] == ["city_avg_hits"]
+
+
+def test_api_metadata_etag(tmp_path, monkeypatch):
+    """Повтор с If-None-Match - 304; после подмены модели ETag меняется"""
+    live = LiveModel(ModelRegistry(str(tmp_path / "registry")))
+    monkeypatch.setattr(api, "live_model", live)
+    client = api.app.test_client()
+    rng = np.random.default_rng(0)
+
+    etags = []
+    for version, n_features in (("v1", 3), ("v2", 4)):
+        X = rng.uniform(0, 1, (100, n_features))
+        model = InferenceModel()
+        model.model = RandomForestClassifier(n_estimators=3, random_state=0).fit(X, X[:, 0] > 0.5)
+        model.feature_names = FEATURES[:n_features]
+        model.target_actions = []
+        live.serve(version, model)
+
+        response = client.get("/features")
+        assert response.get_json()["features"] == FEATURES[:n_features]
+        etag = response.headers["ETag"]
+        cached = client.get("/features", headers={"If-None-Match": etag})
+        assert (cached.status_code, cached.data) == (304, b"")
+        assert client.get("/model_info").get_json()["model_version"] == version
+        etags.append(etag)
+
+    assert etags[0] != etags[1]
+    example = client.get("/example")
+    assert (
+        client.get("/example", headers={"If-None-Match": example.headers["ETag"]}).status_code
+        == 304
+    )
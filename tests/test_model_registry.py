@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+🧪 Тесты реестра моделей и горячей замены модели в API
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+# Добавляем путь к модулям
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "code"))
+
+import api  # noqa: E402
+from model_registry import LiveModel, ModelRegistry  # noqa: E402
+from sber_auto_model import SberAutoModel  # noqa: E402
+
+FEATURES = ["total_hits", "session_duration", "visit_number"]
+
+
+def save_model(path, seed):
+    """Маленькая модель на случайных данных"""
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(500, len(FEATURES)))
+    y = (X[:, 0] + rng.normal(size=500) > 0.5).astype(int)
+
+    model = SberAutoModel()
+    model.model = RandomForestClassifier(n_estimators=5, random_state=seed).fit(X, y)
+    model.feature_names = FEATURES
+    model.target_actions = ["submit"]
+    model.save_model(path)
+    return path
+
+
+def test_publish_and_activate(tmp_path):
+    """Публикация создает версии, CURRENT переключается атомарно"""
+    registry = ModelRegistry(str(tmp_path / "registry"))
+    assert registry.current_version() is None
+
+    first = registry.publish(save_model(str(tmp_path / "m1"), 1), version="v1")
+    registry.publish(save_model(str(tmp_path / "m2"), 2), version="v2", activate=False)
+
+    assert registry.versions() == ["v1", "v2"]
+    assert registry.current_version() == first == "v1"
+    with pytest.raises(ValueError):
+        registry.publish(str(tmp_path / "m1"), version="v1")
+
+    registry.activate("v2")
+    assert registry.current_version() == "v2"
+    assert sorted(os.listdir(registry.root)) == ["CURRENT", "versions"]
+
+
+def test_live_model_swaps_version(tmp_path):
+    """Новая версия подменяет модель, полученный ранее снимок не меняется"""
+    registry = ModelRegistry(str(tmp_path / "registry"))
+    registry.publish(save_model(str(tmp_path / "m1"), 1), version="v1")
+
+    live = LiveModel(registry)
+    assert live.reload() is True
+    snapshot = live.current
+    assert live.reload() is False
+
+    registry.publish(save_model(str(tmp_path / "m2"), 2), version="v2")
+    assert live.reload() is True
+    assert live.current.version == "v2"
+    assert snapshot.version == "v1" and snapshot.model.predict({})["prediction"] in (0, 1)
+
+
+def test_api_reports_model_version(tmp_path, monkeypatch):
+    """Ответ /predict содержит версию модели, /reload подхватывает новую"""
+    registry = ModelRegistry(str(tmp_path / "registry"))
+    registry.publish(save_model(str(tmp_path / "m1"), 1), version="v1")
+    monkeypatch.setattr(api, "live_model", LiveModel(registry))
+    api.live_model.reload()
+    client = api.app.test_client()
+
+    response = client.post("/predict", json={"total_hits": 5, "session_duration": 120})
+    assert response.status_code == 200
+    assert response.get_json()["model_version"] == "v1"
+
+    registry.publish(save_model(str(tmp_path / "m2"), 2), version="v2")
+    assert client.post("/reload").get_json() == {
+        "reloaded": True,
+        "model_version": "v2",
+        "status": "success",
+    }
+    response = client.post("/predict_batch", json={"sessions": [{"total_hits": 1}]})
+    assert response.get_json()["model_version"] == "v2"
+    assert client.get("/health").get_json()["model_version"] == "v2"
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+🧪 Тесты режима out-of-core: корзины session_id и ограниченная выборка
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Добавляем путь к модулям
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "code"))
+
+import sber_auto_model  # noqa: E402
+from inference import InferenceModel  # noqa: E402
+from out_of_core import (  # noqa: E402
+    StratifiedSample,
+    partition_by_session,
+    read_bucket,
+    train_out_of_core,
+)
+
+
+def test_partition_keeps_sessions_together(tmp_path):
+    """Все хиты одной сессии попадают в одну корзину, строки не теряются"""
+    hits = pd.DataFrame(
+        {
+            "session_id": [f"s{i % 50}" for i in range(500)],
+            "event_action": ["view_card", "start_chat"] * 250,
+        }
+    )
+    source = tmp_path / "ga_hits.csv"
+    hits.to_csv(source, index=False)
+
+    out_dir = str(tmp_path / "hits")
+    total, counts = partition_by_session(
+        str(source), out_dir, n_buckets=4, chunksize=120, count_column="event_action"
+    )
+
+    assert total == 500
+    assert counts["start_chat"] == 250
+
+    buckets = [read_bucket(out_dir, bucket) for bucket in range(4)]
+    buckets = [bucket for bucket in buckets if bucket is not None]
+    assert sum(len(bucket) for bucket in buckets) == 500
+
+    sessions_per_bucket = [set(bucket["session_id"]) for bucket in buckets]
+    assert sum(len(ids) for ids in sessions_per_bucket) == 50
+
+
+def test_stratified_sample_weights():
+    """Выборка не превышает max_rows, веса восстанавливают размеры классов"""
+    sample = StratifiedSample(max_rows=300, negative_rate=0.2, seed=0)
+    for _ in range(5):
+        sample.add(pd.DataFrame({"is_target": np.r_[np.ones(20), np.zeros(980)]}))
+
+    rows = sample.frame()
+    weights = sample.class_weight()
+
+    assert len(rows) <= 300
+    assert (rows["is_target"] == 1).sum() == 100
+    assert weights[1] == 1.0
+    assert (rows["is_target"] == 0).sum() * weights[0] == 4900
+
+
+def test_train_out_of_core_end_to_end(tmp_path, monkeypatch):
+    """Корзины -> выборка -> обучение -> сохраненная модель на небольших синтетических данных"""
+    rng = np.random.default_rng(0)
+    n = 2000
+    sessions = pd.DataFrame(
+        {
+            "session_id": [f"s{i}" for i in range(n)],
+            "visit_date": (np.datetime64("2021-11-01") + rng.integers(0, 30, n)).astype(str),
+            "visit_time": "12:30:00",
+            "visit_number": rng.integers(1, 5, n),
+            "utm_medium": rng.choice(["banner", "organic", "cpc"], n),
+            "device_category": rng.choice(["mobile", "desktop"], n),
+            "device_os": rng.choice(["iOS", "Android"], n),
+            "geo_city": rng.choice(["Moscow", "Kazan", "Omsk"], n),
+        }
+    )
+    # Конверсия у сессий с большим числом хитов
+    n_hits = rng.integers(1, 8, n)
+    converted = (n_hits >= 5) & (rng.random(n) < 0.8)
+    session_ids = np.repeat(sessions["session_id"].to_numpy(), n_hits)
+    last_hit = np.cumsum(n_hits) - 1
+    actions = np.full(len(session_ids), "view_card", dtype=object)
+    actions[last_hit[converted]] = "sub_submit_success"
+    hits = pd.DataFrame(
+        {
+            "session_id": session_ids,
+            "hit_number": np.concatenate([np.arange(1, k + 1) for k in n_hits]),
+            "hit_time": 0.0,
+            "hit_page_path": "/cars",
+            "event_action": actions,
+        }
+    )
+    sessions.to_csv(tmp_path / "ga_sessions.csv", index=False)
+    hits.to_csv(tmp_path / "ga_hits.csv", index=False)
+
+    # Небольшая сетка поиска, чтобы тест был быстрым
+    make_estimator = sber_auto_model.make_estimator
+
+    def small_estimator(engine, class_weight=None):
+        estimator, _ = make_estimator(engine, class_weight)
+        return estimator.set_params(n_jobs=1), {"n_estimators": [20], "max_depth": [6]}
+
+    monkeypatch.setattr(sber_auto_model, "make_estimator", small_estimator)
+    model_path = str(tmp_path / "model")
+    model = train_out_of_core(
+        str(tmp_path / "ga_sessions.csv"),
+        str(tmp_path / "ga_hits.csv"),
+        work_dir=str(tmp_path / "work"),
+        n_buckets=4,
+        chunksize=1000,
+        negative_rate=0.5,
+        max_rows=1500,
+        model_path=model_path,
+    )
+
+    assert model.target_actions == ["sub_submit_success"]
+    assert model.metrics["roc_auc"] > 0.8
+    assert len(os.listdir(tmp_path / "work" / "aggregates")) == 4
+
+    served = InferenceModel()
+    served.load_model(model_path)
+    assert served.feature_names == model.feature_names
+    row = {"total_hits": 7, "session_duration": 60.0}
+    assert served.predict(row) == model.predict(row)
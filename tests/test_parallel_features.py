@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+🧪 Тесты параллельного построения признаков по шардам session_id
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Добавляем путь к модулям
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "code"))
+
+from features import aggregate_sessions, build_feature_matrix  # noqa: E402
+from parallel_features import load_shard, parallel_feature_matrix, write_shards  # noqa: E402
+
+
+def make_data(n_sessions=300, n_hits=2000, seed=0):
+    """Сессии в нескольких городах и хиты со случайными целевыми действиями"""
+    rng = np.random.default_rng(seed)
+    sessions = pd.DataFrame(
+        {
+            "session_id": [f"s{i}" for i in range(n_sessions)],
+            "visit_date": "2021-11-24",
+            "visit_time": "12:30:00",
+            "visit_number": rng.integers(1, 5, n_sessions),
+            "utm_medium": rng.choice(["banner", "organic", "cpc"], n_sessions),
+            "device_category": rng.choice(["mobile", "desktop"], n_sessions),
+            "device_os": rng.choice(["iOS", "Android", None], n_sessions),
+            "geo_city": rng.choice(["Moscow", "Kazan", "Omsk", None], n_sessions),
+        }
+    )
+    # Последние сессии без хитов
+    session_of_hit = rng.integers(0, n_sessions - 20, n_hits)
+    hits = pd.DataFrame(
+        {
+            "session_id": [f"s{i}" for i in session_of_hit],
+            "hit_number": rng.integers(1, 30, n_hits),
+            "hit_time": rng.uniform(0, 1000, n_hits),
+            "hit_page_path": rng.choice(["/a", "/b", "/c", "/d"], n_hits),
+            "event_action": rng.choice(["view_card", "photos", "sub_submit_success"], n_hits),
+        }
+    )
+    return sessions, hits
+
+
+def test_shards_keep_sessions_together_without_objects(tmp_path):
+    """Хиты сессии - в шарде сессии; в файлах шардов только числа, строки - коды"""
+    sessions, hits = make_data()
+    session_parts, categories = write_shards(sessions, hits, 3, str(tmp_path))
+
+    assert sorted(np.concatenate(session_parts).tolist()) == list(range(len(sessions)))
+    assert len(categories["hits.hit_page_path"]) == hits["hit_page_path"].nunique()
+    assert categories["hits.hit_page_path"].dtype.kind == "i"
+    n_hits = 0
+    for i, rows in enumerate(session_parts):
+        shard_dir = tmp_path / f"shard-{i:04d}"
+        for path in shard_dir.iterdir():
+            assert np.load(path, allow_pickle=False).dtype != object
+        shard_sessions, shard_hits = load_shard(str(shard_dir), categories)
+        assert shard_sessions["geo_city"].tolist() == sessions["geo_city"].iloc[rows].tolist()
+        assert set(shard_hits["session_id"]) <= set(shard_sessions["session_id"])
+        n_hits += len(shard_hits)
+    assert n_hits == len(hits)
+
+
+def test_parallel_matches_serial():
+    """Шарды в процессах дают ту же матрицу, что и build_feature_matrix, включая города"""
+    sessions, hits = make_data()
+    target_actions = ["sub_submit_success"]
+
+    X_serial, y_serial = build_feature_matrix(sessions, aggregate_sessions(hits, target_actions))
+    X, y = parallel_feature_matrix(sessions, hits, target_actions, workers=2, n_shards=3)
+
+    np.testing.assert_array_equal(X, X_serial)
+    np.testing.assert_array_equal(y, y_serial)
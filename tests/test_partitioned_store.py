@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+🧪 Тесты набора данных, разложенного по датам визита
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Добавляем путь к модулям
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "code"))
+
+import partitioned_store  # noqa: E402
+from partitioned_store import (  # noqa: E402
+    MANIFEST_NAME,
+    load_partitions,
+    read_manifest,
+    select_partitions,
+    write_partitions,
+)
+from sber_auto_model import SberAutoModel  # noqa: E402
+
+
+def make_data(n_sessions=60, seed=0):
+    """Сессии за 30 дней и по три хита на сессию"""
+    rng = np.random.default_rng(seed)
+    days = rng.integers(0, 30, n_sessions)
+    sessions = pd.DataFrame(
+        {
+            "session_id": [f"s{i}" for i in range(n_sessions)],
+            "visit_date": (np.datetime64("2021-11-01") + days).astype(str),
+            "visit_time": "12:00:00",
+        }
+    )
+    hits = pd.DataFrame(
+        {
+            "session_id": np.repeat(sessions["session_id"].to_numpy(), 3),
+            "hit_number": np.tile([1, 2, 3], n_sessions),
+        }
+    )
+    return sessions, hits
+
+
+def test_window_reads_only_matching_partitions(tmp_path):
+    """Хиты находят раздел сессии из прошлой порции; окно читает только свои даты"""
+    sessions, hits = make_data()
+    dataset_dir = str(tmp_path / "dataset")
+    first, second = sessions.iloc[:40], sessions.iloc[40:]
+    # Хиты первой порции приходят вместе со второй, плюс хит неизвестной сессии
+    write_partitions(first, hits.iloc[:0], dataset_dir)
+    orphan = pd.DataFrame({"session_id": ["unknown"], "hit_number": [1]})
+    counts = write_partitions(second, pd.concat([hits, orphan]), dataset_dir)
+
+    assert counts == {"sessions": 20, "hits": len(hits), "skipped_sessions": 0, "skipped_hits": 1}
+    manifest = read_manifest(dataset_dir)["partitions"]
+    assert sum(entry["sessions"] for entry in manifest.values()) == len(sessions)
+    assert sum(entry["hits"] for entry in manifest.values()) == len(hits)
+
+    partitions = select_partitions(dataset_dir, "2021-11-10", "2021-11-19")
+    assert partitions == sorted(partitions)
+    assert all("2021-11-10" <= name.split("=")[1] <= "2021-11-19" for name in partitions)
+
+    window_sessions, window_hits = load_partitions(dataset_dir, "2021-11-10", "2021-11-19")
+    expected = sessions[sessions["visit_date"].between("2021-11-10", "2021-11-19")]
+    assert sorted(window_sessions["session_id"]) == sorted(expected["session_id"])
+    assert sorted(window_hits["session_id"]) == sorted(
+        hits.loc[hits["session_id"].isin(expected["session_id"]), "session_id"]
+    )
+
+
+def test_load_data_last_days(tmp_path):
+    """load_data с last_days берет последние дни разложенного набора"""
+    sessions, hits = make_data()
+    dataset_dir = str(tmp_path / "dataset")
+    write_partitions(sessions, hits, dataset_dir)
+
+    loaded_sessions, loaded_hits = SberAutoModel().load_data(last_days=7, dataset_dir=dataset_dir)
+    last_date = np.datetime64(sessions["visit_date"].max())
+    first_date = str(last_date - 6)
+    expected = sessions[sessions["visit_date"] >= first_date]
+    assert sorted(loaded_sessions["session_id"]) == sorted(expected["session_id"])
+    assert len(loaded_hits) == 3 * len(expected)
+
+
+def test_rewritten_sessions_are_not_duplicated(tmp_path):
+    """Повторная запись тех же сессий и хитов не задваивает набор"""
+    sessions, hits = make_data()
+    dataset_dir = str(tmp_path / "dataset")
+    write_partitions(sessions, hits, dataset_dir)
+    before = read_manifest(dataset_dir)
+
+    new_session = sessions.iloc[:1].assign(session_id="new")
+    new_hits = hits.iloc[:2].assign(session_id="new")
+    counts = write_partitions(
+        pd.concat([sessions.iloc[:10], new_session]),
+        pd.concat([hits.iloc[:30], new_hits]),
+        dataset_dir,
+    )
+    assert counts == {"sessions": 1, "hits": 2, "skipped_sessions": 10, "skipped_hits": 30}
+
+    loaded_sessions, loaded_hits = load_partitions(dataset_dir)
+    assert not loaded_sessions["session_id"].duplicated().any()
+    assert len(loaded_sessions) == len(sessions) + 1 and len(loaded_hits) == len(hits) + 2
+    after = read_manifest(dataset_dir)["partitions"]
+    assert sum(entry["sessions"] for entry in after.values()) == len(sessions) + 1
+    assert after != before["partitions"]
+
+
+def test_interrupted_write_is_invisible_and_retried(tmp_path, monkeypatch):
+    """Части, записанные до сбоя перед заменой манифеста, не читаются и не задваивают набор"""
+    sessions, hits = make_data()
+    dataset_dir = str(tmp_path / "dataset")
+    write_partitions(sessions.iloc[:30], hits.iloc[:90], dataset_dir)
+    before = load_partitions(dataset_dir)
+
+    replace = partitioned_store._replace
+
+    def crash_on_manifest(path, write):
+        if path.endswith(MANIFEST_NAME):
+            raise OSError("сбой")
+        replace(path, write)
+
+    monkeypatch.setattr(partitioned_store, "_replace", crash_on_manifest)
+    with pytest.raises(OSError):
+        write_partitions(sessions.iloc[30:], hits.iloc[90:], dataset_dir)
+    # Части второй порции уже на диске, но набор прежний
+    pd.testing.assert_frame_equal(load_partitions(dataset_dir)[0], before[0])
+    pd.testing.assert_frame_equal(load_partitions(dataset_dir)[1], before[1])
+
+    monkeypatch.setattr(partitioned_store, "_replace", replace)
+    counts = write_partitions(sessions.iloc[30:], hits.iloc[90:], dataset_dir)
+    assert counts["sessions"] == 30 and counts["skipped_sessions"] == 0
+    loaded_sessions, loaded_hits = load_partitions(dataset_dir)
+    assert sorted(loaded_sessions["session_id"]) == sorted(sessions["session_id"])
+    assert len(loaded_hits) == len(hits)
+    assert len(os.listdir(dataset_dir)) == len(read_manifest(dataset_dir)["partitions"]) + 2
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+🧪 Тесты LRU-кэша предсказаний
+"""
+
+import os
+import sys
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+# Добавляем путь к модулям
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "code"))
+
+import api  # noqa: E402
+from feature_schema import FeatureSchema  # noqa: E402
+from model_registry import LiveModel, ModelRegistry  # noqa: E402
+from prediction_cache import PredictionCache, feature_key  # noqa: E402
+from sber_auto_model import SberAutoModel  # noqa: E402
+
+FEATURES = ["total_hits", "session_duration", "is_mobile"]
+
+
+def test_feature_key_canonical():
+    """Пропуски, None и 0 дают один ключ; порядок полей не важен"""
+    schema = FeatureSchema(FEATURES)
+
+    def key(data):
+        return feature_key(schema.assemble(data))
+
+    base = key({"total_hits": 1, "session_duration": 0, "is_mobile": 1})
+
+    assert key({"is_mobile": True, "total_hits": 1.0}) == base
+    assert key({"total_hits": 1, "session_duration": None, "is_mobile": 1}) == base
+    assert key({"total_hits": 2, "is_mobile": 1}) != base
+    assert feature_key(schema.assemble({"session_duration": 0.1}), np.float64) != feature_key(
+        schema.assemble({"session_duration": 0.1 + 1e-12}), np.float64
+    )
+
+
+def test_lru_eviction_and_version():
+    """Вытесняется самая давняя запись; get другой версии - промах, put другой версии очищает кэш"""
+    cache = PredictionCache(max_entries=2)
+    assert cache.get("v1", b"a") is None
+    cache.put("v1", b"a", (0, 0.1))
+    cache.put("v1", b"b", (1, 0.9))
+    assert cache.get("v1", b"a") == (0, 0.1)
+    cache.put("v1", b"c", (0, 0.2))
+
+    assert cache.get("v1", b"b") is None
+    assert cache.get("v1", b"a") == (0, 0.1)
+    assert cache.stats()["evictions"] == 1
+
+    assert cache.get("v2", b"a") is None
+    assert cache.stats()["size"] == 2  # промах другой версии кэш не очищает
+    assert cache.get("v1", b"a") == (0, 0.1)
+
+    cache.put("v2", b"b", (1, 0.8))
+    assert cache.stats()["size"] == 1 and cache.stats()["version"] == "v2"
+    assert cache.get("v1", b"b") is None
+    assert cache.get("v2", b"b") == (1, 0.8)
+
+
+def test_api_cache_matches_model(tmp_path, monkeypatch):
+    """Ответы из кэша совпадают с ответами модели"""
+    rng = np.random.default_rng(0)
+    X = rng.integers(0, 3, size=(300, len(FEATURES))).astype(float)
+    model = SberAutoModel()
+    model.model = RandomForestClassifier(n_estimators=5, random_state=0).fit(X, X[:, 0] > 1)
+    model.feature_names = FEATURES
+    model.target_actions = []
+    model.save_model(str(tmp_path / "model"))
+
+    registry = ModelRegistry(str(tmp_path / "registry"))
+    registry.publish(str(tmp_path / "model"), version="v1")
+    monkeypatch.setattr(api, "live_model", LiveModel(registry))
+    monkeypatch.setattr(api, "prediction_cache", PredictionCache(100))
+    api.live_model.reload()
+    client = api.app.test_client()
+
+    rows = [{"total_hits": 2, "is_mobile": 1}, {"total_hits": 0}, {"total_hits": "x"}]
+    first = client.post("/predict_batch", json={"sessions": rows}).get_json()["predictions"]
+    second = client.post("/predict_batch", json={"sessions": rows}).get_json()["predictions"]
+    single = client.post("/predict", json=rows[0]).get_json()
+
+    assert first[:2] == second[:2]
+    assert [r["session_id"] for r in second] == [0, 1, 2]
+    assert second[2]["fields"] == {"total_hits": "ожидается число, получено str"}
+    assert single["probability"] == first[0]["probability"]
+    assert client.get("/cache/stats").get_json()["hits"] == 3
+
+
+def test_api_anytime_not_cached(tmp_path, monkeypatch):
+    """Результат досрочной остановки не попадает в кэш, ответ содержит trees_used"""
+    rng = np.random.default_rng(0)
+    X = rng.integers(0, 3, size=(300, len(FEATURES))).astype(float)
+    model = SberAutoModel()
+    model.model = RandomForestClassifier(n_estimators=40, random_state=0).fit(X, X[:, 0] > 1)
+    model.feature_names = FEATURES
+    model.target_actions = []
+    model.save_model(str(tmp_path / "model"))
+    model.load_model(str(tmp_path / "model"))
+
+    monkeypatch.setattr(api, "current_model", lambda: ("v1", model))
+    monkeypatch.setattr(api, "prediction_cache", PredictionCache(100))
+    client = api.app.test_client()
+
+    rows = [{"total_hits": 2, "is_mobile": 1}] * 10
+    batch = client.post("/predict_batch?budget_ms=1000", json={"sessions": rows}).get_json()
+    assert all(r["trees_used"] < 40 for r in batch["predictions"])
+    assert api.prediction_cache.stats()["size"] == 0
+
+    single = client.post("/predict", json=rows[0]).get_json()
+    assert single["trees_used"] == 40
+    assert api.prediction_cache.stats()["size"] == 1
+    assert client.post("/predict?budget_ms=abc", json=rows[0]).status_code == 400
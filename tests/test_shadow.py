@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+🧪 Тесты теневого скоринга
+"""
+
+import json
+import os
+import sys
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+# Добавляем путь к модулям
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "code"))
+
+from sber_auto_model import SberAutoModel  # noqa: E402
+from shadow import ShadowScorer, summarize_shadow_log  # noqa: E402
+
+
+def save_model(path):
+    """Маленькая модель на случайных данных"""
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(300, 2))
+    y = (X[:, 0] > 0.5).astype(int)
+
+    model = SberAutoModel()
+    model.model = RandomForestClassifier(n_estimators=5, random_state=0).fit(X, y)
+    model.feature_names = ["total_hits", "session_duration"]
+    model.target_actions = []
+    model.save_model(path)
+    return path
+
+
+def test_shadow_scoring_log(tmp_path):
+    """Теневая модель в отдельном процессе пишет журнал сравнения"""
+    log_path = str(tmp_path / "shadow.jsonl")
+    scorer = ShadowScorer(save_model(str(tmp_path / "challenger")), "v2", 1.0, log_path).start()
+
+    rows = [{"total_hits": 2.0, "session_duration": 10.0}, {"total_hits": 0.0}]
+    assert scorer.submit(rows, "v1", [0.9, 0.1])
+    assert scorer.submit(rows[:1], "v1", [0.8])
+    scorer.close()
+
+    with open(log_path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert len(records) == 3
+    assert {r["shadow_version"] for r in records} == {"v2"}
+    assert [r["primary_probability"] for r in records] == [0.9, 0.1, 0.8]
+
+    summary = summarize_shadow_log(log_path)
+    assert summary.loc[0, "rows"] == 3
+    assert scorer.stats()["submitted"] == 2
+
+
+def test_shadow_queue_is_bounded(tmp_path):
+    """Переполненная очередь отбрасывает запросы, не блокируя основной поток"""
+    scorer = ShadowScorer(str(tmp_path / "model"), "v2", 1.0, max_queue=1)
+    row = [{"total_hits": 1}]
+
+    assert scorer.submit(row, "v1", [0.5])
+    assert not scorer.submit(row, "v1", [0.5])
+    assert scorer.stats()["dropped"] == 1
+
+    sampled = ShadowScorer(str(tmp_path / "model"), "v2", 0.0)
+    assert not sampled.submit(row, "v1", [0.5])
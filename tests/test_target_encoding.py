@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+🧪 Тесты кодирования городов без утечки
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+
+# Добавляем путь к модулям
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "code"))
+
+from features import city_partial_stats, finalize_city_stats  # noqa: E402
+from inference import InferenceModel  # noqa: E402
+from sber_auto_model import SberAutoModel  # noqa: E402
+from target_encoding import (  # noqa: E402
+    CITY_CODE_COLUMN,
+    CityTargetEncodingClassifier,
+    oof_city_rates,
+)
+
+
+def test_oof_rates_exclude_own_fold():
+    """Конверсия строки - по чужим фолдам, конверсия города - как finalize_city_stats"""
+    rng = np.random.default_rng(0)
+    codes = rng.integers(-1, 30, 2000)
+    y = (rng.random(2000) < 0.05).astype(np.int8)
+    row_rate, city_rate = oof_city_rates(codes, y, n_folds=4, random_state=1)
+
+    folds = np.random.default_rng(1).integers(0, 4, 2000)
+    for row in rng.choice(2000, 50, replace=False):
+        if codes[row] < 0:
+            assert row_rate[row] == 0
+            continue
+        others = (codes == codes[row]) & (folds != folds[row])
+        expected = round(y[others].mean() * 100, 2) if others.any() else 0.0
+        assert row_rate[row] == expected
+
+    known = codes >= 0
+    stats = finalize_city_stats(
+        city_partial_stats(
+            pd.Series(codes[known]),
+            y[known],
+            np.zeros(known.sum()),
+            np.zeros(known.sum()),
+            np.zeros(known.sum(), dtype=bool),
+        )
+    )
+    np.testing.assert_array_equal(city_rate[stats.index], stats["city_conversion_rate"])
+
+
+def test_wrapper_ignores_leaky_columns(tmp_path):
+    """Обертка не видит готовую конверсию городов и экспортируется как базовый лес"""
+    rng = np.random.default_rng(0)
+    codes = rng.integers(0, 20, 3000)
+    y = (rng.random(3000) < np.where(codes < 5, 0.3, 0.02)).astype(int)
+    X = pd.DataFrame({"total_hits": rng.integers(1, 20, 3000).astype(np.float32)})
+    X["city_conversion_rate"] = np.float32(0)
+    for name in ["city_tier_low", "city_tier_medium", "city_tier_high", "city_tier_very_high"]:
+        X[name] = np.float32(0)
+
+    honest = X.assign(**{CITY_CODE_COLUMN: codes})
+    leaky = honest.assign(city_conversion_rate=y * 100.0)  # утечка: метка в признаке
+    forest = RandomForestClassifier(n_estimators=10, max_depth=4, random_state=0)
+    a = CityTargetEncodingClassifier(forest, random_state=0).fit(honest, y)
+    b = CityTargetEncodingClassifier(forest, random_state=0).fit(leaky, y)
+    np.testing.assert_array_equal(a.predict_proba(honest), b.predict_proba(leaky))
+    # Лес без прореживания не сообщает число строк обучения
+    assert not hasattr(a, "n_train_samples_")
+
+    model = SberAutoModel()
+    model.model = a
+    model.feature_names = list(X.columns)
+    model.target_actions = []
+    model.save_model(str(tmp_path / "model"))
+    served = InferenceModel()
+    served.load_model(str(tmp_path / "model"))
+    encoded = a.predict_proba(honest)[:, 1]
+    rows = a._features(honest).to_numpy()
+    np.testing.assert_allclose(served.predict_proba_rows(rows), encoded)
+    assert served.n_trees() == model.n_trees() == 10
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+🧪 Тесты моделей семейств целевых действий
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Добавляем путь к модулям
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "code"))
+
+import api  # noqa: E402
+from features import aggregate_sessions  # noqa: E402
+from sber_auto_model import SberAutoModel  # noqa: E402
+from target_families import (  # noqa: E402
+    FamilyModels,
+    family_labels,
+    family_split,
+    family_target_actions,
+    save_family_models,
+    shared_city_encoding,
+    train_family_models,
+)
+
+EVENTS = [
+    "view_card",
+    "click_on_phone_button",
+    "start_chat",
+    "sub_submit_success",
+    "auth_success",
+    "sms_code_sent",
+    "photos",
+]
+
+
+def test_family_labels_partition_union_target():
+    """Семейства делят целевые действия define_target_actions, метки - за один проход"""
+    model = SberAutoModel()
+    union = model.define_target_actions_from_counts(pd.Series(1, index=EVENTS), len(EVENTS))
+    actions = family_target_actions(EVENTS)
+
+    assert sorted(sum(actions.values(), [])) == sorted(union)
+    assert actions["calls"] == ["click_on_phone_button"]
+    assert actions["auth"] == ["auth_success"]
+    assert actions["orders"] == ["sub_submit_success"]
+
+    rng = np.random.default_rng(0)
+    hits = pd.DataFrame(
+        {
+            "session_id": rng.integers(0, 200, 3000).astype(str),
+            "hit_number": 1,
+            "hit_time": 0.0,
+            "hit_page_path": "/",
+            "event_action": rng.choice(EVENTS, 3000, p=[0.8] + [0.1 / 3] * 3 + [0.1 / 3] * 3),
+        }
+    )
+    session_ids = sorted(hits["session_id"].unique()) + ["no_hits"]
+    labels = family_labels(hits, actions, session_ids)
+
+    is_target = aggregate_sessions(hits, union)["is_target"].reindex(session_ids, fill_value=0)
+    np.testing.assert_array_equal(labels.any(axis=1), is_target.to_numpy() > 0)
+    calls = hits.loc[hits["event_action"] == "click_on_phone_button", "session_id"].unique()
+    assert labels[:, list(actions).index("calls")].sum() == len(calls)
+    assert not labels[-1].any()
+
+
+def test_shared_city_encoding_ignores_test_labels():
+    """Конверсия городов считается только по строкам обучения: метки теста ее не меняют"""
+    rng = np.random.default_rng(2)
+    city_codes = rng.integers(-1, 5, 1000)
+    y = (rng.random(1000) < 0.3).astype(np.int8)
+    X = pd.DataFrame({"total_hits": rng.integers(0, 10, 1000), "city_conversion_rate": 0.0})
+    train, test = family_split(y)
+    assert len(np.intersect1d(train, test)) == 0 and len(train) + len(test) == 1000
+
+    shared = shared_city_encoding(X, city_codes, y, train)
+    flipped = y.copy()
+    flipped[test] = 1 - flipped[test]
+    np.testing.assert_array_equal(shared, shared_city_encoding(X, city_codes, flipped, train))
+    rate = shared[:, list(X.columns).index("city_conversion_rate")]
+    assert (rate[test][city_codes[test] < 0] == 0).all()
+
+
+def test_family_models_serve_all_families(tmp_path, monkeypatch):
+    """Модели семейств на общей матрице сохраняются, API отдает все семейства одним запросом"""
+    rng = np.random.default_rng(1)
+    feature_names = ["total_hits", "session_duration", "is_mobile"]
+    X = np.column_stack(
+        [rng.integers(0, 11, 1500), rng.uniform(0, 10, 1500), rng.integers(0, 2, 1500)]
+    ).astype(np.float32)
+    labels = np.column_stack([X[:, 0] > 8, X[:, 1] > 8, X[:, 2] > 1]).astype(np.int8)
+    families = ["calls", "chats", "sms"]
+    params = {"n_estimators": 5, "max_depth": 4, "min_samples_split": 50, "min_samples_leaf": 20}
+
+    models, metrics = train_family_models(X, labels, families, params=params, workers=2)
+    assert list(models) == ["calls", "chats"]  # в sms нет конверсий
+    assert all(metrics[family]["roc_auc"] > 0.9 for family in models)
+
+    path = str(tmp_path / "family_models")
+    save_family_models(
+        path, models, "random_forest", feature_names, {f: [f] for f in families}, metrics
+    )
+    served = FamilyModels(path)
+    np.testing.assert_allclose(
+        served.predict_proba_rows(X[:20]),
+        np.column_stack([models[family].predict_proba(X[:20])[:, 1] for family in models]),
+    )
+
+    monkeypatch.setattr(api, "family_models", served)
+    client = api.app.test_client()
+    response = client.post(
+        "/predict_families", json={"total_hits": 10, "session_duration": 1.0}
+    ).get_json()
+    assert set(response["families"]) == {"calls", "chats"}
+    assert response["top_family"] == "calls"
+    assert response["families"]["calls"]["probability"] > 0.5
+    bad = client.post("/predict_families", json={"total_hits": "x"})
+    assert bad.status_code == 400
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+🧪 Тесты поиска гиперпараметров с наращиванием деревьев
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import GridSearchCV
+
+# Добавляем путь к модулям
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "code"))
+
+from downsampling import NegativeDownsamplingClassifier  # noqa: E402
+from warm_start_search import WarmStartGridSearch  # noqa: E402
+
+
+@pytest.mark.parametrize("downsampling", [False, True])
+def test_warm_start_matches_grid_search(downsampling):
+    """Оценки всех кандидатов и лучшая модель совпадают с GridSearchCV"""
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(1000, 5))
+    y = (X[:, 0] + rng.normal(size=1000) > 1).astype(int)
+    estimator = RandomForestClassifier(max_depth=5, random_state=42)
+    param_grid = {"n_estimators": [5, 10, 20], "min_samples_leaf": [5, 20]}
+    if downsampling:
+        estimator = NegativeDownsamplingClassifier(estimator, 0.5, random_state=42)
+        param_grid = {f"estimator__{name}": values for name, values in param_grid.items()}
+
+    grid = GridSearchCV(estimator, param_grid, cv=2, scoring="roc_auc").fit(X, y)
+    warm = WarmStartGridSearch(estimator, param_grid, cv=2, scoring="roc_auc").fit(X, y)
+
+    expected = {
+        tuple(sorted(p.items())): s
+        for p, s in zip(grid.cv_results_["params"], grid.cv_results_["mean_test_score"])
+    }
+    actual = {
+        tuple(sorted(p.items())): s
+        for p, s in zip(warm.cv_results_["params"], warm.cv_results_["mean_test_score"])
+    }
+    assert actual.keys() == expected.keys()
+    np.testing.assert_allclose([actual[k] for k in expected], list(expected.values()))
+    assert warm.best_params_ == grid.best_params_
+    np.testing.assert_allclose(
+        warm.best_estimator_.predict_proba(X), grid.best_estimator_.predict_proba(X)
+    )